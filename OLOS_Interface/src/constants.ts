@@ -34,6 +34,9 @@ export const Constants = {
   JOYSTICK_STATUS_DATA_TYPE: 'JOYSTICK_STATUS' as string,
   USB_STORAGE_MONITOR_DATA_TYPE: 'USB_STORAGE_MONITOR' as string,
 
+  // websocket encodings offered to the server, the first supported one is used
+  WEBSOCKET_SUBPROTOCOLS: ['olos.binary.v1', 'olos.json'] as string[],
+
   // small notes/messages
   SMALL_MESSAGES: {
     CONNECTING_MESSAGE: 'Please wait until the machine is ready',
@@ -280,7 +283,11 @@ export const Constants = {
   DITHERING_ALGORITHMS: {
     HALFTONE: 'Halftone',
     FLOYDSTEINBERG: 'Floyd-Steinberg',
+    JARVIS: 'Jarvis',
+    STUCKI: 'Stucki',
+    ATKINSON: 'Atkinson',
     ORDERED: 'Ordered',
+    BAYER: 'Bayer',
     RANDOM: 'Random',
     AVERAGE: 'Average',
     GRID: 'Grid',
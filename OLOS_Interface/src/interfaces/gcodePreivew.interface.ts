@@ -31,7 +31,12 @@ export interface GCodeColors {
 
 export interface CameraData {
   type: string;
-  frame: string;
+  // base64 jpeg of the json message or jpeg bytes of the binary message
+  frame?: string;
+  image?: Uint8Array;
+  frame_id?: number;
+  width?: number;
+  height?: number;
   time: string;
 }
 
@@ -19,6 +19,8 @@ export interface GcodeGeneratorImageData {
   modifiedSVGCutting: SVGGraphicsElement | null;
   modifiedSVGMarking: SVGGraphicsElement | null;
   modifiedEngravingImage: HTMLImageElement | null;
+  // undithered engraving image sent to the server (dithered by the server)
+  grayscaleEngravingImage: HTMLImageElement | null;
   // table reactive states
   tableFilterType: string;
   tableSelectedElements: QTableProps['selected'];
@@ -1,7 +1,7 @@
 export interface JobsManagerWebsocketData {
   type: string;
   opened_file: string;
-  file_content: string;
+  file_content: string | null;
   files_list: JobFileData[];
   time: string;
 }
@@ -18,4 +18,6 @@ export interface JobFileData {
   file: string;
   date: string;
   size: number;
+  // seconds, null until the job file is estimated
+  estimated_time: number | null;
 }
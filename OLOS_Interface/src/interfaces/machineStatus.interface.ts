@@ -1,6 +1,7 @@
 export interface StatusData {
   type: string;
   state?: string;
+  sub_state?: number | null;
   machine_position: {
     x: number;
     y: number;
@@ -12,10 +13,19 @@ export interface StatusData {
     y: number;
     z?: number;
   };
+  work_position?: {
+    x: number | null;
+    y: number | null;
+    z?: number | null;
+  };
   buffer_state: {
     commands_queued: number;
     buffer_length: number;
   };
+  line_number?: number | null;
+  // input pins (X, Y, Z, P, D, H, R, S) and accessories (S, C, F, M) reported by GRBL
+  pins?: string;
+  accessories?: string;
   feed_and_speed: {
     feed_rate: number;
     speed: number;
@@ -1,3 +1,5 @@
+import { Constants } from 'src/constants';
+
 export const floydSteinbergDithering = (
   imageData: ImageData,
   grayShift: number
@@ -411,3 +413,149 @@ export const averageDithering = (imageData: ImageData, grayShift: number) => {
   }
   return ctx.getImageData(0, 0, canvasElement.width, canvasElement.height);
 };
+
+// error diffusion matrices, the pixel is on the first row in the middle column
+const errorDiffusionMatrices: Record<
+  string,
+  { matrix: number[][]; divisor: number }
+> = {
+  [Constants.DITHERING_ALGORITHMS.JARVIS]: {
+    matrix: [
+      [0, 0, 0, 7, 5],
+      [3, 5, 7, 5, 3],
+      [1, 3, 5, 3, 1],
+    ],
+    divisor: 48,
+  },
+  [Constants.DITHERING_ALGORITHMS.STUCKI]: {
+    matrix: [
+      [0, 0, 0, 8, 4],
+      [2, 4, 8, 4, 2],
+      [1, 2, 4, 2, 1],
+    ],
+    divisor: 42,
+  },
+  // only 3/4 of the error is diffused
+  [Constants.DITHERING_ALGORITHMS.ATKINSON]: {
+    matrix: [
+      [0, 0, 0, 1, 1],
+      [0, 1, 1, 1, 0],
+      [0, 0, 1, 0, 0],
+    ],
+    divisor: 8,
+  },
+};
+
+export const errorDiffusionDithering = (
+  imageData: ImageData,
+  grayShift: number,
+  algorithm: string
+) => {
+  const { matrix, divisor } = errorDiffusionMatrices[algorithm];
+  const width = imageData.width;
+  const height = imageData.height;
+  const data = imageData.data;
+
+  // Calculate the shifted intensity of every pixel, the error is diffused on the intensities
+  const intensities = new Float32Array(width * height);
+  for (let i = 0; i < intensities.length; i++) {
+    const intensity =
+      0.2126 * data[i * 4] +
+      0.7152 * data[i * 4 + 1] +
+      0.0722 * data[i * 4 + 2];
+    intensities[i] = Math.min(Math.max(intensity + grayShift, 0), 255);
+  }
+
+  // Create a new ImageData object to hold the modified pixel data
+  const modifiedImageData = new ImageData(width, height);
+
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      const index = y * width + x;
+      if (data[index * 4 + 3] > 0) {
+        // Threshold the shifted intensity
+        const threshold = intensities[index] < 128 ? 0 : 255;
+        const error = intensities[index] - threshold;
+
+        modifiedImageData.data[index * 4] =
+          modifiedImageData.data[index * 4 + 1] =
+          modifiedImageData.data[index * 4 + 2] =
+            threshold;
+        modifiedImageData.data[index * 4 + 3] = 255; // Set alpha to 255
+
+        // Diffuse the error to neighboring pixels
+        for (let i = 0; i < 3; i++) {
+          for (let j = -2; j <= 2; j++) {
+            const weight = matrix[i][j + 2];
+            if (weight && x + j >= 0 && x + j < width && y + i < height) {
+              intensities[(y + i) * width + x + j] +=
+                (error * weight) / divisor;
+            }
+          }
+        }
+      }
+    }
+  }
+  return modifiedImageData;
+};
+
+// bayer matrix of size 2^n built recursively, the values are 0 to size^2 - 1
+const createBayerMatrix = (size: number) => {
+  let matrix = [[0]];
+  while (matrix.length < size) {
+    const previousMatrix = matrix;
+    matrix = [
+      ...previousMatrix.map((row) => [
+        ...row.map((value) => 4 * value),
+        ...row.map((value) => 4 * value + 2),
+      ]),
+      ...previousMatrix.map((row) => [
+        ...row.map((value) => 4 * value + 3),
+        ...row.map((value) => 4 * value + 1),
+      ]),
+    ];
+  }
+  return matrix;
+};
+
+export const bayerDithering = (imageData: ImageData, grayShift: number) => {
+  const bayerMatrix = createBayerMatrix(8);
+  const matrixSize = bayerMatrix.length;
+  const data = imageData.data;
+
+  // Create a new ImageData object to hold the modified pixel data
+  const modifiedImageData = new ImageData(imageData.width, imageData.height);
+
+  for (let y = 0; y < imageData.height; y++) {
+    for (let x = 0; x < imageData.width; x++) {
+      const index = (y * imageData.width + x) * 4;
+      if (data[index + 3] > 0) {
+        // Calculate grayscale intensity using luminance formula
+        const intensity =
+          0.2126 * data[index] +
+          0.7152 * data[index + 1] +
+          0.0722 * data[index + 2];
+
+        // Apply gray shift, Ensure intensity is within the valid range [0, 255]
+        const shiftedIntensity = Math.min(
+          Math.max(intensity + grayShift, 0),
+          255
+        );
+
+        // Threshold the intensity using the bayer matrix
+        const isBlack =
+          shiftedIntensity <
+          ((bayerMatrix[y % matrixSize][x % matrixSize] + 0.5) * 256) /
+            (matrixSize * matrixSize);
+        const threshold = isBlack ? 0 : 255;
+
+        modifiedImageData.data[index] =
+          modifiedImageData.data[index + 1] =
+          modifiedImageData.data[index + 2] =
+            threshold;
+        modifiedImageData.data[index + 3] = 255; // Set alpha to 255
+      }
+    }
+  }
+  return modifiedImageData;
+};
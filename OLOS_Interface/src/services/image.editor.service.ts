@@ -3,6 +3,8 @@ import { Config } from 'src/interfaces/configSettings.interface';
 import { DitheringSettings } from 'src/interfaces/imageToGcode.interface';
 import {
   averageDithering,
+  bayerDithering,
+  errorDiffusionDithering,
   floydSteinbergDithering,
   gridDithering,
   halftoneDithering,
@@ -37,6 +39,31 @@ export const modifyImageForEngraving = (
   return ditheringImageData;
 };
 
+// the server dithers the engraving image at the engraving resolution,
+// so it receives the grayscale image and the dithered image is only the preview
+export const grayscaleAnImage = (imageData: ImageData) => {
+  const data = imageData.data;
+
+  // Create a new ImageData object to hold the modified pixel data
+  const modifiedImageData = new ImageData(imageData.width, imageData.height);
+
+  for (let index = 0; index < data.length; index += 4) {
+    // Calculate grayscale intensity using luminance formula of the previews
+    const intensity =
+      0.2126 * data[index] +
+      0.7152 * data[index + 1] +
+      0.0722 * data[index + 2];
+
+    modifiedImageData.data[index] =
+      modifiedImageData.data[index + 1] =
+      modifiedImageData.data[index + 2] =
+        intensity;
+    // keep the transparency, the transparent pixels are not engraved
+    modifiedImageData.data[index + 3] = data[index + 3];
+  }
+  return modifiedImageData;
+};
+
 export const drawImageOnOffscreenCanvas = (
   imageContent: string,
   resolution: number
@@ -164,10 +191,24 @@ export const ditheringAnImage = (
       image = floydSteinbergDithering(imageData, dithering.grayShift);
       break;
 
+    case Constants.DITHERING_ALGORITHMS.JARVIS:
+    case Constants.DITHERING_ALGORITHMS.STUCKI:
+    case Constants.DITHERING_ALGORITHMS.ATKINSON:
+      image = errorDiffusionDithering(
+        imageData,
+        dithering.grayShift,
+        dithering.algorithm
+      );
+      break;
+
     case Constants.DITHERING_ALGORITHMS.ORDERED:
       image = orderedDithering(imageData, dithering.grayShift);
       break;
 
+    case Constants.DITHERING_ALGORITHMS.BAYER:
+      image = bayerDithering(imageData, dithering.grayShift);
+      break;
+
     case Constants.DITHERING_ALGORITHMS.HALFTONE:
       image = halftoneDithering(imageData, dithering.grayShift);
       break;
@@ -0,0 +1,158 @@
+import { Constants } from 'src/constants';
+
+// binary layout of the machine status, job progress and camera frame messages
+// (same layout as WebsocketBinaryData in the server)
+const MACHINE_STATUS_MESSAGE_ID = 1;
+const JOB_PROGRESS_MESSAGE_ID = 2;
+const CAMERA_FRAME_MESSAGE_ID = 3;
+
+// the state id is the index of the state + 1, 0 for a missing state
+const MACHINE_STATES = [
+  'Idle',
+  'Run',
+  'Hold',
+  'Jog',
+  'Alarm',
+  'Door',
+  'Check',
+  'Home',
+  'Sleep',
+];
+
+const JOB_PROGRESS_HEADER_SIZE = 29;
+const CAMERA_FRAME_HEADER_SIZE = 9;
+
+const textDecoder = new TextDecoder();
+
+// missing values are sent as NaN
+const readFloat = (view: DataView, offset: number) => {
+  const value = view.getFloat32(offset, true);
+  return Number.isNaN(value) ? null : value;
+};
+
+// round the float32 values to the precision of the machine reports
+const readPosition = (view: DataView, offset: number) => {
+  const value = readFloat(view, offset);
+  return value === null ? null : Math.round(value * 1000) / 1000;
+};
+
+const formatTime = (date: Date) => {
+  const pad = (value: number) => String(value).padStart(2, '0');
+  return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(
+    date.getDate()
+  )} ${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(
+    date.getSeconds()
+  )}`;
+};
+
+// order of the status fields in the message, the bit of every field in the mask is its index
+// (field, keys of the values inside the field, empty for the single value fields)
+const MACHINE_STATUS_FIELDS: [string, string[]][] = [
+  ['state', []],
+  ['machine_position', ['x', 'y', 'z']],
+  ['work_position', ['x', 'y', 'z']],
+  ['work_coordinate_offset', ['x', 'y', 'z']],
+  ['buffer_state', ['commands_queued', 'buffer_length']],
+  ['line_number', []],
+  ['feed_and_speed', ['feed_rate', 'speed']],
+  ['pins', []],
+  ['overrides', ['feed', 'rapids', 'spindle']],
+  ['accessories', []],
+  ['machine_tool', []],
+];
+const TEXT_FIELDS = ['pins', 'accessories'];
+const POSITION_FIELDS = [
+  'machine_position',
+  'work_position',
+  'work_coordinate_offset',
+];
+
+// the message contains only the changed fields (or all of them for a snapshot)
+const decodeMachineStatus = (view: DataView) => {
+  const fieldsMask = view.getUint16(1, true);
+  const status: Record<string, unknown> = {
+    type: Constants.MACHINE_STATUS_DATA_TYPE,
+  };
+  let offset = 3;
+
+  MACHINE_STATUS_FIELDS.forEach(([field, keys], bit) => {
+    if (!(fieldsMask & (1 << bit))) {
+      return;
+    }
+
+    if (field === 'state') {
+      const stateId = view.getUint8(offset);
+      const subState = view.getInt8(offset + 1);
+      status.state = stateId ? MACHINE_STATES[stateId - 1] : null;
+      status.sub_state = subState < 0 ? null : subState;
+      offset += 2;
+    } else if (TEXT_FIELDS.includes(field)) {
+      const length = view.getUint8(offset);
+      status[field] = textDecoder.decode(
+        new Uint8Array(view.buffer, offset + 1, length)
+      );
+      offset += 1 + length;
+    } else if (!keys.length) {
+      status[field] = readFloat(view, offset);
+      offset += 4;
+    } else {
+      const read = POSITION_FIELDS.includes(field) ? readPosition : readFloat;
+      const values: Record<string, number | null> = {};
+      keys.forEach((key) => {
+        values[key] = read(view, offset);
+        offset += 4;
+      });
+      status[field] = values;
+    }
+  });
+
+  return status;
+};
+
+const decodeJobProgress = (view: DataView) => {
+  const linesNumber = view.getUint32(25, true);
+  const linesText = textDecoder.decode(
+    new Uint8Array(view.buffer, JOB_PROGRESS_HEADER_SIZE)
+  );
+
+  return {
+    type: Constants.JOB_EXECUTION_DATA_TYPE,
+    lines: linesNumber ? linesText.split('\n') : [],
+    line_index: view.getUint32(1, true),
+    acknowledged_index: view.getUint32(5, true),
+    total_lines: view.getUint32(9, true),
+    lines_per_second: readFloat(view, 13),
+    eta: readFloat(view, 17),
+    file_timer: readFloat(view, 21),
+    // the binary messages do not carry the server time
+    time: formatTime(new Date()),
+  };
+};
+
+// the jpeg frame is kept as bytes, it is shown without the base64 conversion
+const decodeCameraFrame = (view: DataView) => {
+  return {
+    type: Constants.CAMERAS_SYSTEM_DATA_TYPE,
+    frame_id: view.getUint32(1, true),
+    width: view.getUint16(5, true),
+    height: view.getUint16(7, true),
+    image: new Uint8Array(view.buffer, CAMERA_FRAME_HEADER_SIZE),
+    time: formatTime(new Date()),
+  };
+};
+
+// decode the binary message to the same object as its json message
+export const decodeBinaryMessage = (buffer: ArrayBuffer) => {
+  const view = new DataView(buffer);
+
+  switch (view.getUint8(0)) {
+    case MACHINE_STATUS_MESSAGE_ID:
+      return decodeMachineStatus(view);
+    case JOB_PROGRESS_MESSAGE_ID:
+      return decodeJobProgress(view);
+    case CAMERA_FRAME_MESSAGE_ID:
+      return decodeCameraFrame(view);
+    default:
+      return {};
+  }
+};
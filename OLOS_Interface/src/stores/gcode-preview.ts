@@ -32,6 +32,9 @@ import { convertLinesToSVGElements } from 'src/services/draw.gcode.service/draw.
 import { getPreviewerWorker } from 'src/workers';
 import { useDebuggerDialogStore } from './debugger-dialog';
 
+// object url of the previous binary camera frame, released when the next frame arrives
+let previousCameraFrameUrl = '';
+
 export const useGcodePreviewStore = defineStore('gcodePreview', {
   state: () => ({
     graphContainer: document.createElement('div') as HTMLDivElement,
@@ -64,12 +67,15 @@ export const useGcodePreviewStore = defineStore('gcodePreview', {
     isGcodeError: false as boolean,
     isGraphLoading: false as boolean,
     isGcodeBiggerThanPlatform: false as boolean,
+    // number of the job file lines drawn as executed lines
+    executedGcodeLinesIndex: 0 as number,
     isNewFileToDraw: true as boolean,
     previewWebWorker: null as Worker | null,
   }),
   actions: {
     async createGcodePreviewerGraph(fileContent: string) {
       const config = await configurationSettings();
+      this.executedGcodeLinesIndex = 0;
       if (
         config.machine_type === Constants.MACHINE_TYPE.LASER_CUTTER ||
         config.machine_type === Constants.MACHINE_TYPE.VINYL_CUTTER
@@ -208,19 +214,29 @@ export const useGcodePreviewStore = defineStore('gcodePreview', {
         this.resizeThreeJSCanvasToFitPageDimensions();
       }
     },
-    async drawExecutedGcodeLine() {
+    // draw all the lines executed since the last job progress
+    async drawExecutedGcodeLines(executedLinesIndex: number) {
+      // new job started from the beginning of the file
+      if (executedLinesIndex < this.executedGcodeLinesIndex) {
+        this.executedGcodeLinesIndex = 0;
+      }
+      if (this.executedGcodeLinesIndex === executedLinesIndex) return;
+
       const config = await configurationSettings();
-      if (
-        config.machine_type === Constants.MACHINE_TYPE.LASER_CUTTER ||
-        config.machine_type === Constants.MACHINE_TYPE.VINYL_CUTTER
-      ) {
-        add2DExecutedLineToGraph(
-          this.graphSettings.GcodeCommandsColor.executedLine
-        );
-      } else if (config.machine_type === Constants.MACHINE_TYPE.CNC) {
-        add3DExecutedLineToGraph(
-          this.graphSettings.GcodeCommandsColor.executedLine
-        );
+      while (this.executedGcodeLinesIndex < executedLinesIndex) {
+        if (
+          config.machine_type === Constants.MACHINE_TYPE.LASER_CUTTER ||
+          config.machine_type === Constants.MACHINE_TYPE.VINYL_CUTTER
+        ) {
+          add2DExecutedLineToGraph(
+            this.graphSettings.GcodeCommandsColor.executedLine
+          );
+        } else if (config.machine_type === Constants.MACHINE_TYPE.CNC) {
+          add3DExecutedLineToGraph(
+            this.graphSettings.GcodeCommandsColor.executedLine
+          );
+        }
+        this.executedGcodeLinesIndex += 1;
       }
     },
     async addGraphTools() {
@@ -279,7 +295,18 @@ export const useGcodePreviewStore = defineStore('gcodePreview', {
       dragAndDropControls?.deactivate();
     },
     setCameraFrame(res: CameraData) {
-      this.cameraFrame = `data:image/png;base64,${res.frame}`;
+      // the url of the previous frame can still be loading, the one before it is released
+      if (previousCameraFrameUrl) {
+        URL.revokeObjectURL(previousCameraFrameUrl);
+        previousCameraFrameUrl = '';
+      }
+      if (this.cameraFrame.startsWith('blob:')) {
+        previousCameraFrameUrl = this.cameraFrame;
+      }
+
+      this.cameraFrame = res.image
+        ? URL.createObjectURL(new Blob([res.image], { type: 'image/jpeg' }))
+        : `data:image/jpeg;base64,${res.frame}`;
       if (this.graphSettings.showCamera) {
         this.addCameraFrameTo2DGraph();
       }
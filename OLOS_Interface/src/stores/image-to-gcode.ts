@@ -105,6 +105,7 @@ export const useImageToGcodeConvertor = defineStore('imageToGcodeConvertor', {
       const modifiedSVGCutting = null as SVGGraphicsElement | null;
       const modifiedSVGMarking = null as SVGGraphicsElement | null;
       const modifiedEngravingImage = null as HTMLImageElement | null;
+      const grayscaleEngravingImage = null as HTMLImageElement | null;
 
       // parse dxf and svg images
       let filteredElementsByShape = [] as Array<IShapeElement>;
@@ -151,6 +152,7 @@ export const useImageToGcodeConvertor = defineStore('imageToGcodeConvertor', {
         modifiedSVGCutting,
         modifiedSVGMarking,
         modifiedEngravingImage,
+        grayscaleEngravingImage,
         tableFilterType,
         tableSelectedElements,
         tableProfileModels,
@@ -472,7 +474,12 @@ export const useImageToGcodeConvertor = defineStore('imageToGcodeConvertor', {
       // listen to the worker data
       worker.addEventListener('message', (e) => {
         if (this.activeImage) {
-          const { cutSVGContent, markSVGContent, engravedImageData } = e.data;
+          const {
+            cutSVGContent,
+            markSVGContent,
+            engravedImageData,
+            grayscaleImageData,
+          } = e.data;
 
           if (cutSVGContent) {
             // generate the cut svg element
@@ -489,6 +496,11 @@ export const useImageToGcodeConvertor = defineStore('imageToGcodeConvertor', {
             this.activeImage.modifiedEngravingImage =
               createImageFromImageData(engravedImageData);
           }
+          if (grayscaleImageData) {
+            // generate the engraving image sent to the server
+            this.activeImage.grayscaleEngravingImage =
+              createImageFromImageData(grayscaleImageData);
+          }
           this.isImageLoading = false;
         }
       });
@@ -512,6 +524,7 @@ export const useImageToGcodeConvertor = defineStore('imageToGcodeConvertor', {
     resetAllImageModifications() {
       if (this.activeImage) {
         this.activeImage.modifiedEngravingImage = null;
+        this.activeImage.grayscaleEngravingImage = null;
         this.activeImage.modifiedSVGCutting = null;
         this.activeImage.modifiedSVGMarking = null;
       }
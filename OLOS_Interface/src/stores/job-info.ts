@@ -5,12 +5,18 @@ export const useJobInfoStore = defineStore('jobInfo', {
     isJobEnded: false as boolean,
     jobTimer: 0 as number,
     jobProgress: 0 as number,
+    jobLinesRate: 0 as number,
+    jobRemainingTime: null as number | null,
   }),
 
   actions: {
     updateJobTimer(file_timer: number) {
       this.jobTimer = file_timer;
     },
+    updateJobRate(lines_per_second: number, eta: number | null) {
+      this.jobLinesRate = lines_per_second;
+      this.jobRemainingTime = eta;
+    },
     updateJobProgress(line_index: number, total_lines: number) {
       this.jobProgress = line_index / total_lines;
       // job finished
@@ -20,6 +26,8 @@ export const useJobInfoStore = defineStore('jobInfo', {
     },
     restJobProgress() {
       this.jobProgress = 0;
+      this.jobLinesRate = 0;
+      this.jobRemainingTime = null;
       this.isJobEnded = false;
     },
   },
@@ -344,7 +344,9 @@ export const useJobsFilesManagementStore = defineStore('jobsFilesManager', {
     updateFileManagerStatus(res: JobsManagerWebsocketData) {
       if (res.opened_file) {
         this.selectedFilename = res.opened_file;
-        this.fileData.fileContent = res.file_content;
+        // the content is sent only when the opened file is changed
+        if (res.file_content !== null)
+          this.fileData.fileContent = res.file_content;
         this.fileData.fileName = this.selectedFilename;
       }
       if (res.files_list) this.filesListData = res.files_list;
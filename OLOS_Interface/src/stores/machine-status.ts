@@ -102,22 +102,18 @@ export const useMachineStatusStore = defineStore('status', {
         this.status = statusInitialValue;
       }
     },
-    updateStatus(status: StatusData) {
-      // Check if the offset values are present in the incoming status
+    // the server sends only the changed fields of the status
+    updateStatus(status: Partial<StatusData>) {
+      const newStatus = { ...this.status, ...status };
+      // If offset values are missing, preserve the existing offset values
       if (
-        status.work_coordinate_offset &&
-        status.work_coordinate_offset.x !== null &&
-        status.work_coordinate_offset.y !== null
+        !newStatus.work_coordinate_offset ||
+        newStatus.work_coordinate_offset.x === null ||
+        newStatus.work_coordinate_offset.y === null
       ) {
-        this.status = status; // Update status directly
-      } else {
-        // If offset values are missing, preserve the existing offset values
-        const pre_work_coordinate_offset = this.status.work_coordinate_offset;
-        this.status = {
-          ...status, // Override with new status values
-          work_coordinate_offset: pre_work_coordinate_offset,
-        };
+        newStatus.work_coordinate_offset = this.status.work_coordinate_offset;
       }
+      this.status = newStatus;
     },
     resetXJobPosition() {
       this.status.work_coordinate_offset.x = this.machinePosition.x;
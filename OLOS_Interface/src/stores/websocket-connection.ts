@@ -1,5 +1,6 @@
 import { defineStore } from 'pinia';
 import { handleJoystickData } from 'src/services/joystick.movement.service';
+import { decodeBinaryMessage } from 'src/services/websocket.binary.service';
 import { Constants } from '../constants';
 import { useConsoleOutputStore } from './console-output';
 import { useDebuggerDialogStore } from './debugger-dialog';
@@ -25,7 +26,9 @@ export const useWebSocketStore = defineStore('websocket', {
 
   actions: {
     connect(url: string) {
-      this.connection = new WebSocket(url);
+      // the server sends the frequent messages as binary when it supports it
+      this.connection = new WebSocket(url, Constants.WEBSOCKET_SUBPROTOCOLS);
+      this.connection.binaryType = 'arraybuffer';
 
       this.connection.onopen = () => {
         console.log('WebSocket connection opened.');
@@ -67,10 +70,16 @@ export const useWebSocketStore = defineStore('websocket', {
       };
 
       this.connection.onmessage = async (event: MessageEvent) => {
-        const res = JSON.parse(event.data);
+        const res =
+          typeof event.data === 'string'
+            ? JSON.parse(event.data)
+            : decodeBinaryMessage(event.data);
         if (res.type === Constants.MACHINE_STATUS_DATA_TYPE) {
           this.machineStatusStore.updateStatus(res);
-          this.messagesOutputStore.updateMessageBasedOnStatus(res.state);
+          // the state is sent only when it changes
+          if (res.state !== undefined) {
+            this.messagesOutputStore.updateMessageBasedOnStatus(res.state);
+          }
         } else if (res.type === Constants.MACHINE_CONNECTION_DATA_TYPE) {
           this.machineStatusStore.updateConnectionStatus(res);
           if (res.success) {
@@ -83,10 +92,23 @@ export const useWebSocketStore = defineStore('websocket', {
             );
           }
         } else if (res.type === Constants.JOB_EXECUTION_DATA_TYPE) {
-          this.jobInfoStore.updateJobProgress(res.line_index, res.total_lines);
+          this.jobInfoStore.updateJobProgress(
+            res.acknowledged_index,
+            res.total_lines
+          );
           this.jobInfoStore.updateJobTimer(res.file_timer);
-          this.consoleOutputStore.addText(res);
-          await this.gcodePreviewStore.drawExecutedGcodeLine();
+          this.jobInfoStore.updateJobRate(res.lines_per_second, res.eta);
+          // the server sends the executed lines in batches
+          res.lines.forEach((line: string) =>
+            this.consoleOutputStore.addText({
+              type: res.type,
+              text: line,
+              time: res.time,
+            })
+          );
+          await this.gcodePreviewStore.drawExecutedGcodeLines(
+            res.acknowledged_index
+          );
         } else if (res.type === Constants.SERIAL_COMMAND_DATA_TYPE) {
           this.consoleOutputStore.addText(res);
           this.messagesOutputStore.checkReceivedMessage(res.text);
@@ -1,5 +1,6 @@
 import { Constants } from 'src/constants';
 import {
+  grayscaleAnImage,
   modifyImageForEngraving,
   modifyImageForCuttingOrMarking,
 } from 'src/services/image.editor.service';
@@ -7,6 +8,7 @@ import {
 addEventListener('message', (event) => {
   if (event.data) {
     let engravedImageData: ImageData | null = null;
+    let grayscaleImageData: ImageData | null = null;
     let cutSVGContent: string | null = null;
     const { drawType, imageData } = event.data;
     const ditheringSettings = JSON.parse(event.data.dithering);
@@ -15,7 +17,8 @@ addEventListener('message', (event) => {
       cutSVGContent = modifyImageForCuttingOrMarking(imageData);
     } else if (Constants.IMAGE_DRAW_TYPE.ENGRAVE) {
       engravedImageData = modifyImageForEngraving(imageData, ditheringSettings);
+      grayscaleImageData = grayscaleAnImage(imageData);
     }
-    postMessage({ cutSVGContent, engravedImageData });
+    postMessage({ cutSVGContent, engravedImageData, grayscaleImageData });
   }
 });
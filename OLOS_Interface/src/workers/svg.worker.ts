@@ -1,3 +1,4 @@
+import { grayscaleAnImage } from 'src/services/image.editor.service';
 import {
   modifySVGElementsForCuttingOrMarking,
   modifySVGElementsForEngraving,
@@ -14,6 +15,7 @@ addEventListener('message', async (event) => {
     let cutSVGContent: string | null = null;
     let markSVGContent: string | null = null;
     let engravedImageData: ImageData | null = null;
+    let grayscaleImageData: ImageData | null = null;
     // modify all cutting elements
     if (elementsToCut.length) {
       cutSVGContent = await modifySVGElementsForCuttingOrMarking(
@@ -36,11 +38,13 @@ addEventListener('message', async (event) => {
         imageData,
         dithering
       );
+      grayscaleImageData = grayscaleAnImage(imageData);
     }
     postMessage({
       cutSVGContent,
       markSVGContent,
       engravedImageData,
+      grayscaleImageData,
     });
   }
 });
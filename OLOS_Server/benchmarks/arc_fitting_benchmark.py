@@ -0,0 +1,157 @@
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from files_manager.job_file import JobFile  # noqa: E402
+from utils.gcode_arc_fitter import GcodeArcFitter  # noqa: E402
+from utils.grbl_settings import GrblSettings  # noqa: E402
+from utils.job_time_estimator import JobTimeEstimator  # noqa: E402
+from utils.svg_gcode_engine import SvgGcodeEngine  # noqa: E402
+
+# Fit the cutting gcode of svg files to arcs and merged lines and compare the job before and after
+# - lines and size (KB) of the gcode, the serial transfer time at the baud rate (10 bits per byte)
+# - job time estimated with the GRBL planner model (short moves limit the speed at their junctions)
+# - max distance between the sampled fitted path and the original moves (must be under the tolerance)
+# usage: python benchmarks/arc_fitting_benchmark.py
+
+ARC_TOLERANCE = 0.01
+SVG_CURVE_TOLERANCE = 0.01
+SVG_SIZE = (100, 100)
+BAUD_RATE = 115200
+# distance between the samples of the fitted path (mm)
+SAMPLES_DISTANCE = 0.005
+# size of the grid cells used to find the original moves close to the samples (mm)
+GRID_CELL_SIZE = 0.5
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '..', '..', 'OLOS_Interface', 'public', 'icons', 'safari-pinned-tab.svg')
+
+SVG_HEADER = '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">'
+SVG_FILES = {
+    'circles': SVG_HEADER + ''.join(
+        f'<circle cx="{10 + 20 * column}" cy="{10 + 20 * row}" r="{3 + column + row}" fill="none" stroke="black"/>'
+        for column in range(5) for row in range(5)) + '</svg>',
+    'rounded': SVG_HEADER +
+    '<rect x="5" y="5" width="90" height="60" rx="8" fill="none" stroke="black"/>'
+    '<ellipse cx="50" cy="80" rx="30" ry="10" fill="none" stroke="black"/>'
+    '<path d="M10 90 C 30 60, 70 120, 90 90 S 60 40 10 90" fill="none" stroke="black"/></svg>'
+}
+
+
+def get_path_elements(gcode_lines):
+    # samples of the laser moves (G1, G2, G3) and the lines of the G1 moves
+    samples, segments = [], []
+    x = y = None
+    motion = 'G0'
+    for line in gcode_lines:
+        line = line.upper().split(';')[0]
+        words = dict(re.findall(r'([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))', line))
+        for motion_number in re.findall(r'G0*([0-3])(?![\d.])', line):
+            motion = f'G{motion_number}'
+        if 'X' not in words and 'Y' not in words:
+            continue
+
+        end_x, end_y = float(words.get('X', x)), float(words.get('Y', y))
+        if motion == 'G1' and x is not None:
+            segments.append((x, y, end_x, end_y))
+            ratios = np.linspace(0, 1, int(math.hypot(end_x - x, end_y - y) / SAMPLES_DISTANCE) + 2)
+            samples.append(np.column_stack((x + (end_x - x) * ratios, y + (end_y - y) * ratios)))
+        elif motion in ('G2', 'G3') and x is not None:
+            center_x, center_y = x + float(words['I']), y + float(words['J'])
+            radius = math.hypot(x - center_x, y - center_y)
+            start_angle = math.atan2(y - center_y, x - center_x)
+            end_angle = math.atan2(end_y - center_y, end_x - center_x)
+            if motion == 'G3' and end_angle <= start_angle:
+                end_angle += 2 * math.pi
+            elif motion == 'G2' and end_angle >= start_angle:
+                end_angle -= 2 * math.pi
+            angles = np.linspace(start_angle, end_angle,
+                                 int(abs(end_angle - start_angle) * radius / SAMPLES_DISTANCE) + 2)
+            samples.append(np.column_stack((center_x + radius * np.cos(angles),
+                                            center_y + radius * np.sin(angles))))
+        x, y = end_x, end_y
+
+    return np.concatenate(samples), np.array(segments)
+
+
+def get_max_deviation(fitted_lines, original_lines):
+    samples, _ = get_path_elements(fitted_lines)
+    _, segments = get_path_elements(original_lines)
+
+    # original moves of every grid cell (with the neighbour cells)
+    cells_segments = {}
+    for index, (start_x, start_y, end_x, end_y) in enumerate(segments):
+        for cell_x in range(int(min(start_x, end_x) // GRID_CELL_SIZE) - 1,
+                            int(max(start_x, end_x) // GRID_CELL_SIZE) + 2):
+            for cell_y in range(int(min(start_y, end_y) // GRID_CELL_SIZE) - 1,
+                                int(max(start_y, end_y) // GRID_CELL_SIZE) + 2):
+                cells_segments.setdefault((cell_x, cell_y), []).append(index)
+
+    cells = (samples // GRID_CELL_SIZE).astype(int)
+    order = np.lexsort((cells[:, 1], cells[:, 0]))
+    cells, samples = cells[order], samples[order]
+    groups_starts = np.flatnonzero(np.any(np.diff(cells, axis=0) != 0, axis=1)) + 1
+
+    max_deviation = 0
+    for group in np.split(np.arange(len(samples)), groups_starts):
+        points = samples[group]
+        cell_segments = segments[cells_segments[tuple(cells[group[0]])]]
+        starts, directions = cell_segments[:, :2], cell_segments[:, 2:] - cell_segments[:, :2]
+        lengths = np.maximum((directions * directions).sum(axis=1), 1e-12)
+        ratios = np.clip(((points[:, None] - starts) * directions).sum(axis=2) / lengths, 0, 1)
+        closest_points = starts + ratios[..., None] * directions
+        distances = np.sqrt(((points[:, None] - closest_points) ** 2).sum(axis=2)).min(axis=1)
+        max_deviation = max(max_deviation, distances.max())
+    return max_deviation
+
+
+def estimate_job_time(gcode_lines, file_path):
+    with open(file_path, 'w') as gcode_file:
+        gcode_file.write('\n'.join(gcode_lines))
+    JobFile.build_index(file_path)
+
+    job_file = JobFile(file_path)
+    try:
+        return JobTimeEstimator(GrblSettings.load()).estimate_job_file(job_file)[-1]
+    finally:
+        job_file.close()
+
+
+def run_benchmark(name, svg_content, directory):
+    svg_gcode_engine = SvgGcodeEngine(power=800, speed=1000, curve_tolerance=SVG_CURVE_TOLERANCE)
+    gcode_lines = ['G21 G90', 'M4'] + svg_gcode_engine.generate(svg_content, size=SVG_SIZE).split('\n') + ['M5']
+
+    arc_fitter = GcodeArcFitter(ARC_TOLERANCE)
+    start_time = time.perf_counter()
+    fitted_lines = list(arc_fitter.fit_lines(gcode_lines))
+    fitting_time = time.perf_counter() - start_time
+
+    for label, lines in (('original', gcode_lines), ('fitted', fitted_lines)):
+        size = len('\n'.join(lines)) + 1
+        job_time = estimate_job_time(lines, os.path.join(directory, f'{name}_{label}.gcode'))
+        print(f"{name:<10}{label:<10}{len(lines):>8}{size / 1000:>8.1f}{size * 10 / BAUD_RATE:>12.2f}"
+              f"{job_time:>10.1f}")
+
+    print(f"{'':<20}fitted {arc_fitter.get_stats()['moves']} moves to {arc_fitter.get_stats()['fitted_moves']}"
+          f" in {fitting_time:.3f} s, max deviation {get_max_deviation(fitted_lines, gcode_lines):.4f} mm")
+
+
+if __name__ == '__main__':
+    svg_files = dict(SVG_FILES)
+    if os.path.exists(LOGO_PATH):
+        with open(LOGO_PATH) as logo_file:
+            svg_files['logo'] = logo_file.read()
+
+    print(f"{'svg':<10}{'gcode':<10}{'lines':>8}{'KB':>8}{'serial (s)':>12}{'job (s)':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, svg_content in svg_files.items():
+            run_benchmark(name, svg_content, directory)
@@ -0,0 +1,149 @@
+import base64
+import io
+import os
+import resource
+import sys
+import time
+from multiprocessing import Process, Semaphore
+from multiprocessing.managers import SyncManager
+
+import numpy as np
+from PIL import Image
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.shared_frame_ring import SharedFrameRing  # noqa: E402
+from utils.shared_memory_priority_queue import SharedMemoryPriorityQueue  # noqa: E402
+from utils.websocket_binary_data import WebsocketBinaryData  # noqa: E402
+from utils.websocket_json_data import WebsocketJsonData  # noqa: E402
+
+# Send 1080p jpeg frames from a camera process through a core process to a websocket process
+# - base64 json: base64 frame in a manager queue, json message in the websocket queue
+# - shared frames ring: jpeg in the shared memory, metadata in the queues, binary message with a header
+# the frames are encoded once before the benchmark (the jpeg encoding is the same for both transports),
+# the camera waits when the frames are not sent yet (like the frames ring slots), the cpu is the time
+# of all the processes (camera, core, websocket and the manager process) for every sent frame
+# usage: python benchmarks/camera_frames_benchmark.py [frames_number]
+
+FRAMES_NUMBER = 300
+FRAME_SIZE = (1920, 1080)
+# frames sent before the camera waits for the websocket process
+FRAMES_IN_FLIGHT = 3
+CAMERAS_STREAM_DATA_TYPE = 'CAMERAS_STREAM'
+CAMERAS_FRAME_DATA_TYPE = 'CAMERAS_FRAME'
+
+
+# camera like frame with fine details so the jpeg has a realistic size
+def create_jpeg_frame(width, height):
+    rows, columns = np.mgrid[0:height, 0:width]
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (columns * 255 // width).astype(np.uint8)
+    pixels[..., 1] = (127 + 100 * np.sin(columns / 23) * np.cos(rows / 31)).astype(np.uint8)
+    pixels[..., 2] = np.random.default_rng(0).integers(0, 64, (height, width), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def send_base64_frames(frames_queue, frame_content, frames_number, credits):
+    for _ in range(frames_number):
+        credits.acquire()
+        frames_queue.put(base64.b64encode(frame_content).decode('utf-8'))
+
+
+def forward_base64_frames(frames_queue, websocket_queue, frames_number):
+    for _ in range(frames_number):
+        frame = frames_queue.get()
+        websocket_queue.put(CAMERAS_STREAM_DATA_TYPE, 2, WebsocketJsonData.to_json(
+            {"type": CAMERAS_STREAM_DATA_TYPE, "frame": frame, "time": WebsocketJsonData.get_time()}))
+
+
+def receive_json_frames(websocket_queue, frames_number, credits):
+    for _ in range(frames_number):
+        websocket_queue.get()
+        credits.release()
+
+
+def send_ring_frames(frames_ring, frames_queue, frame_content, frames_number, credits):
+    for _ in range(frames_number):
+        credits.acquire()
+        frames_queue.put(CAMERAS_FRAME_DATA_TYPE, 1, frames_ring.write(frame_content, *FRAME_SIZE))
+
+
+def forward_ring_frames(frames_queue, websocket_queue, frames_number):
+    for _ in range(frames_number):
+        _, frame_metadata = frames_queue.get()
+        websocket_queue.put(CAMERAS_STREAM_DATA_TYPE, 2, frame_metadata)
+
+
+def receive_binary_frames(frames_ring, websocket_queue, frames_number, credits):
+    for _ in range(frames_number):
+        _, frame_metadata = websocket_queue.get()
+        frame_content = frames_ring.read(frame_metadata['frame_id'])
+        WebsocketBinaryData.encode_camera_frame({**frame_metadata, 'frame': frame_content})
+        credits.release()
+
+
+def run_processes(processes):
+    start_time = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return time.perf_counter() - start_time
+
+
+def get_children_cpu_time(resources):
+    children_resources = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (children_resources.ru_utime - resources.ru_utime) + (children_resources.ru_stime - resources.ru_stime)
+
+
+def run_base64_json(frame_content, frames_number):
+    resources = resource.getrusage(resource.RUSAGE_CHILDREN)
+    manager = SyncManager()
+    manager.start()
+    frames_queue = manager.Queue()
+    websocket_queue = SharedMemoryPriorityQueue()
+    credits = Semaphore(FRAMES_IN_FLIGHT)
+
+    elapsed_time = run_processes([
+        Process(target=send_base64_frames, args=(frames_queue, frame_content, frames_number, credits)),
+        Process(target=forward_base64_frames, args=(frames_queue, websocket_queue, frames_number)),
+        Process(target=receive_json_frames, args=(websocket_queue, frames_number, credits))])
+
+    # the manager process cpu is counted after it stops
+    manager.shutdown()
+    websocket_queue.close()
+    return elapsed_time, get_children_cpu_time(resources)
+
+
+def run_shared_frames_ring(frame_content, frames_number):
+    resources = resource.getrusage(resource.RUSAGE_CHILDREN)
+    frames_ring = SharedFrameRing()
+    frames_queue = SharedMemoryPriorityQueue(priorities_number=1, ring_buffer_size=64 * 1024)
+    websocket_queue = SharedMemoryPriorityQueue()
+    credits = Semaphore(FRAMES_IN_FLIGHT)
+
+    elapsed_time = run_processes([
+        Process(target=send_ring_frames, args=(frames_ring, frames_queue, frame_content, frames_number, credits)),
+        Process(target=forward_ring_frames, args=(frames_queue, websocket_queue, frames_number)),
+        Process(target=receive_binary_frames, args=(frames_ring, websocket_queue, frames_number, credits))])
+
+    frames_ring.close()
+    frames_queue.close()
+    websocket_queue.close()
+    return elapsed_time, get_children_cpu_time(resources)
+
+
+if __name__ == '__main__':
+    frames_number = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES_NUMBER
+    frame_content = create_jpeg_frame(*FRAME_SIZE)
+    print(f"frame {FRAME_SIZE[0]}x{FRAME_SIZE[1]} jpeg {len(frame_content) / 1024:.0f} KB, "
+          f"base64 {len(base64.b64encode(frame_content)) / 1024:.0f} KB, {frames_number} frames")
+
+    print(f"{'transport':<22}{'frames / s':>12}{'cpu / frame (ms)':>18}")
+    for name, transport in (('base64 json', run_base64_json), ('shared frames ring', run_shared_frames_ring)):
+        elapsed_time, cpu_time = transport(frame_content, frames_number)
+        print(f"{name:<22}{frames_number / elapsed_time:>12.1f}{cpu_time / frames_number * 1000:>18.2f}")
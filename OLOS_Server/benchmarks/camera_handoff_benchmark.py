@@ -0,0 +1,122 @@
+import os
+import resource
+import sys
+import time
+from multiprocessing import Event, Pipe, Process, Value
+
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.shared_frame_ring import SharedFrameRing  # noqa: E402
+
+# Hand off the raw 1080p frames of the camera processes to the cameras system process
+# - pipe: every captured frame is pickled through a pipe (the cameras system reads all of them)
+# - shared frames ring: the frame is captured in the ring slot, the cameras system copies the latest frames
+# the cameras capture at the camera rate (a new frame array for the pipe like cv2 read, the slot for the ring),
+# the cameras system uses the frames as fast as it can (like the jpeg encoding loop), the cpu is the time
+# of all the processes in percent of one core
+# usage: python benchmarks/camera_handoff_benchmark.py [cameras_number]
+
+CAMERAS_NUMBER = 2
+FRAME_SHAPE = (1080, 1920, 3)
+CAMERA_RATE = 30
+DURATION = 5
+# time used by the cameras system for every frames (jpeg encoding, stitching)
+FRAMES_PROCESSING_TIME = 0.01
+
+
+def capture_to_pipe(pipe_end, camera_frame, stop_event):
+    next_time = time.perf_counter()
+    while not stop_event.is_set():
+        pipe_end.send(camera_frame.copy())
+        next_time += 1 / CAMERA_RATE
+        time.sleep(max(0, next_time - time.perf_counter()))
+    pipe_end.close()
+
+
+def capture_to_ring(frames_ring, camera_frame, stop_event):
+    next_time = time.perf_counter()
+    while not stop_event.is_set():
+        slot_content = frames_ring.begin_write()
+        np.copyto(np.ndarray(camera_frame.shape, dtype=np.uint8, buffer=slot_content), camera_frame)
+        del slot_content
+        frames_ring.end_write(camera_frame.nbytes, camera_frame.shape[1], camera_frame.shape[0])
+        next_time += 1 / CAMERA_RATE
+        time.sleep(max(0, next_time - time.perf_counter()))
+
+
+def use_pipe_frames(pipes_ends, stop_event, used_frames):
+    while not stop_event.is_set():
+        frames = [pipe_end.recv() for pipe_end in pipes_ends]
+        time.sleep(FRAMES_PROCESSING_TIME)
+        used_frames.value += len(frames)
+
+
+def use_ring_frames(frames_rings, stop_event, used_frames):
+    frames_ids = [0] * len(frames_rings)
+    while not stop_event.is_set():
+        # a new frame of every camera, the frames closest to the oldest latest frame are used together
+        cameras_frames_metadata = [[frame_metadata for frame_metadata in frames_ring.get_frames_metadata()
+                                    if frame_metadata['frame_id'] > frame_id]
+                                   for frames_ring, frame_id in zip(frames_rings, frames_ids)]
+        if not all(cameras_frames_metadata):
+            time.sleep(0.002)
+            continue
+
+        frames_time = min(frames_metadata[-1]['time'] for frames_metadata in cameras_frames_metadata)
+        paired_frames_metadata = [min(frames_metadata, key=lambda frame_metadata: abs(frame_metadata['time'] -
+                                                                                    frames_time))
+                                  for frames_metadata in cameras_frames_metadata]
+        frames = [frames_ring.read(frame_metadata['frame_id'])
+                  for frames_ring, frame_metadata in zip(frames_rings, paired_frames_metadata)]
+        # a frame was overwritten while it was read
+        if any(frame is None for frame in frames):
+            continue
+        frames_ids = [frame_metadata['frame_id'] for frame_metadata in paired_frames_metadata]
+        time.sleep(FRAMES_PROCESSING_TIME)
+        used_frames.value += len(frames)
+
+
+def run_benchmark(cameras_targets, system_target, system_arguments):
+    resources = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stop_event = Event()
+    used_frames = Value('l', 0, lock=False)
+
+    processes = [Process(target=target, args=arguments + (stop_event,)) for target, arguments in cameras_targets]
+    processes.append(Process(target=system_target, args=system_arguments + (stop_event, used_frames)))
+    for process in processes:
+        process.start()
+    time.sleep(DURATION)
+    stop_event.set()
+    for process in processes:
+        process.join(timeout=2)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+    children_resources = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = (children_resources.ru_utime - resources.ru_utime) + (children_resources.ru_stime - resources.ru_stime)
+    return used_frames.value / DURATION, cpu_time / DURATION * 100
+
+
+if __name__ == '__main__':
+    cameras_number = int(sys.argv[1]) if len(sys.argv) > 1 else CAMERAS_NUMBER
+    camera_frame = np.random.default_rng(0).integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+    print(f"{cameras_number} cameras {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]} at {CAMERA_RATE} frames / s, "
+          f"frame {camera_frame.nbytes / 1024 / 1024:.1f} MB")
+    print(f"{'handoff':<22}{'used frames / s':>16}{'cpu (%)':>10}")
+
+    pipes = [Pipe(duplex=False) for _ in range(cameras_number)]
+    used_rate, cpu = run_benchmark([(capture_to_pipe, (send_end, camera_frame)) for _, send_end in pipes],
+                                   use_pipe_frames, ([receive_end for receive_end, _ in pipes],))
+    print(f"{'pipe':<22}{used_rate:>16.1f}{cpu:>10.0f}")
+
+    frames_rings = [SharedFrameRing(3, camera_frame.nbytes) for _ in range(cameras_number)]
+    used_rate, cpu = run_benchmark([(capture_to_ring, (frames_ring, camera_frame)) for frames_ring in frames_rings],
+                                   use_ring_frames, (frames_rings,))
+    print(f"{'shared frames ring':<22}{used_rate:>16.1f}{cpu:>10.0f}")
+    for frames_ring in frames_rings:
+        frames_ring.close()
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.configuration_loader import ConfigurationLoader  # noqa: E402
+from utils.camera_streaming_controller import CameraStreamingController  # noqa: E402
+
+# Encode the 1080p camera frames (new frame every 1 / CAMERA_RATE s) for the cameras stream
+# - continuous: every frame encoded at full resolution with a 10 ms sleep (the loop before the controller)
+# - controller: the streaming settings of the configuration file with the users watching the stream
+#   (no user, thumbnail, live view, a live view and a thumbnail, live view during a job)
+# the cpu is the time used by the encoding loop in percent of one core, the data is the jpeg data sent
+# usage: python benchmarks/camera_streaming_benchmark.py [duration]
+
+DURATION = 3
+CAMERA_RATE = 30
+FRAME_SIZE = (1920, 1080)
+CONTINUOUS_TIMEOUT = 0.01
+
+
+# camera like frame with fine details so the jpeg has a realistic size
+def create_frame(width, height):
+    rows, columns = np.mgrid[0:height, 0:width]
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = (columns * 255 // width).astype(np.uint8)
+    frame[..., 1] = (127 + 100 * np.sin(columns / 23) * np.cos(rows / 31)).astype(np.uint8)
+    frame[..., 2] = np.random.default_rng(0).integers(0, 64, (height, width), dtype=np.uint8)
+    return frame
+
+
+# wait for the next frame of the camera like the cameras system reading the frames rings
+def wait_for_camera_frame(start_time, last_frame_number):
+    frame_number = int((time.perf_counter() - start_time) * CAMERA_RATE)
+    if frame_number <= last_frame_number:
+        time.sleep((last_frame_number + 1) / CAMERA_RATE - (time.perf_counter() - start_time))
+    return int((time.perf_counter() - start_time) * CAMERA_RATE)
+
+
+def run_continuous(frame, duration):
+    frames_number, data_size, frame_number = 0, 0, -1
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start_time < duration:
+        frame_number = wait_for_camera_frame(start_time, frame_number)
+        _, buffer = cv2.imencode('.jpg', frame)
+        frames_number += 1
+        data_size += len(buffer)
+        time.sleep(CONTINUOUS_TIMEOUT)
+    return frames_number, data_size, time.process_time() - start_cpu_time
+
+
+def run_controller(frame, duration, streaming_settings, qualities, is_job_execute_process=False):
+    streaming_controller = CameraStreamingController(streaming_settings)
+    streaming_controller.update_subscription(qualities)
+    streaming_controller.set_job_execution(is_job_execute_process)
+
+    frames_number, data_size, frame_number = 0, 0, -1
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start_time < duration:
+        # the capture and the encoding wait for a user
+        if streaming_controller.is_paused():
+            time.sleep(min(0.5, duration - (time.perf_counter() - start_time)))
+            continue
+        time.sleep(streaming_controller.get_wait_time())
+        frame_number = wait_for_camera_frame(start_time, frame_number)
+        for _, buffer, _, _ in streaming_controller.encode_frame(frame):
+            frames_number += 1
+            data_size += len(buffer)
+    return frames_number, data_size, time.process_time() - start_cpu_time
+
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else DURATION
+    streaming_settings = ConfigurationLoader.from_yaml().get_dict('cameras_connection.streaming_settings')
+    frame = create_frame(*FRAME_SIZE)
+    print(f"frame {FRAME_SIZE[0]}x{FRAME_SIZE[1]}, camera {CAMERA_RATE} frames / s, {duration:.0f} s per scenario")
+    print(f"{'stream':<28}{'frames / s':>12}{'cpu (%)':>10}{'data (KB/s)':>13}")
+
+    scenarios = [
+        ('continuous full frames', lambda: run_continuous(frame, duration)),
+        ('no user', lambda: run_controller(frame, duration, streaming_settings, [])),
+        ('thumbnail', lambda: run_controller(frame, duration, streaming_settings, ['thumbnail'])),
+        ('live', lambda: run_controller(frame, duration, streaming_settings, ['live'])),
+        ('live and thumbnail', lambda: run_controller(frame, duration, streaming_settings, ['live', 'thumbnail'])),
+        ('live during a job', lambda: run_controller(frame, duration, streaming_settings, ['live'], True)),
+    ]
+    for name, run_scenario in scenarios:
+        frames_number, data_size, cpu_time = run_scenario()
+        print(f"{name:<28}{frames_number / duration:>12.1f}{cpu_time / duration * 100:>10.1f}"
+              f"{data_size / 1024 / duration:>13.0f}")
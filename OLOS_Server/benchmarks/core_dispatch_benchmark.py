@@ -0,0 +1,156 @@
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing import Process
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.shared_memory_priority_queue import SharedMemoryPriorityQueue  # noqa: E402
+
+# Compare the polling dispatch (empty() then sleep 10 ms) with the blocking dispatch (get with timeout)
+# the benchmark follows the path of a user command: websocket process -> core thread -> machine connector
+# - idle CPU: CPU time used by the core and the machine connector while there are no commands
+# - latency: time between the websocket process sending a command and the machine connector receiving it
+# usage: python benchmarks/core_dispatch_benchmark.py
+
+IDLE_SECONDS = 3
+COMMANDS_NUMBER = 200
+# time between the user commands
+COMMANDS_INTERVAL = 0.02
+
+POLLING_TIMEOUT = 0.01
+QUEUE_WAIT_TIMEOUT = 0.5
+STOP_COMMAND = 'STOP'
+
+
+def get_message(shared_queue, is_polling):
+    if is_polling:
+        while shared_queue.empty():
+            time.sleep(POLLING_TIMEOUT)
+        return shared_queue.get()
+
+    while True:
+        try:
+            return shared_queue.get(timeout=QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            pass
+
+
+# the core reads the user command and forward it to the machine connector
+# the idle handlers (machine data, rest api, cameras) run at the same time as threads
+def run_core(websocket_read_queue, serial_write_queue, results_queue, is_polling):
+    idle_queues = [SharedMemoryPriorityQueue(ring_buffer_size=1024)
+                   for _ in range(3)]
+    is_running = True
+
+    def run_idle_handler(idle_queue):
+        while is_running:
+            try:
+                if is_polling:
+                    if idle_queue.empty():
+                        time.sleep(POLLING_TIMEOUT)
+                else:
+                    idle_queue.get(timeout=QUEUE_WAIT_TIMEOUT)
+            except queue.Empty:
+                pass
+
+    idle_threads = [threading.Thread(target=run_idle_handler, args=(idle_queue,))
+                    for idle_queue in idle_queues]
+    for idle_thread in idle_threads:
+        idle_thread.start()
+
+    start_cpu_time = time.process_time()
+    idle_cpu_time = None
+
+    while True:
+        type, command = get_message(websocket_read_queue, is_polling)
+        if idle_cpu_time is None:
+            idle_cpu_time = time.process_time() - start_cpu_time
+
+        serial_write_queue.put(type, 2, command)
+        if type == STOP_COMMAND:
+            break
+
+    is_running = False
+    for idle_thread in idle_threads:
+        idle_thread.join()
+    for idle_queue in idle_queues:
+        idle_queue.close()
+
+    results_queue.put('core', 3, idle_cpu_time)
+
+
+# the machine connector receives the command and measures the latency
+def run_machine_connector(serial_write_queue, results_queue, is_polling):
+    start_cpu_time = time.process_time()
+    idle_cpu_time = None
+    latencies = []
+
+    while True:
+        if is_polling:
+            # same as the previous machine connector loop
+            message = serial_write_queue.get() if not serial_write_queue.empty() else None
+            if message is None:
+                time.sleep(POLLING_TIMEOUT)
+                continue
+        else:
+            try:
+                message = serial_write_queue.get(timeout=POLLING_TIMEOUT)
+            except queue.Empty:
+                continue
+
+        type, sent_time = message
+        if type == STOP_COMMAND:
+            break
+
+        latencies.append(time.perf_counter() - sent_time)
+        if idle_cpu_time is None:
+            idle_cpu_time = time.process_time() - start_cpu_time
+
+    results_queue.put('machine_connector', 3, (idle_cpu_time, latencies))
+
+
+def run_benchmark(name, is_polling):
+    websocket_read_queue = SharedMemoryPriorityQueue()
+    serial_write_queue = SharedMemoryPriorityQueue()
+    results_queue = SharedMemoryPriorityQueue()
+
+    processes = [Process(target=run_core, args=(websocket_read_queue, serial_write_queue, results_queue, is_polling)),
+                 Process(target=run_machine_connector, args=(serial_write_queue, results_queue, is_polling))]
+    for process in processes:
+        process.start()
+
+    time.sleep(IDLE_SECONDS)
+
+    # the websocket process sends the user commands
+    for _ in range(COMMANDS_NUMBER):
+        websocket_read_queue.put('NORMAL_COMMAND', 1, time.perf_counter())
+        time.sleep(COMMANDS_INTERVAL)
+    websocket_read_queue.put(STOP_COMMAND, 1, None)
+
+    results = dict(results_queue.get() for _ in processes)
+    for process in processes:
+        process.join()
+
+    for shared_queue in (websocket_read_queue, serial_write_queue, results_queue):
+        shared_queue.close()
+
+    machine_connector_idle_cpu_time, latencies = results['machine_connector']
+    idle_cpu = (results['core'] + machine_connector_idle_cpu_time) / \
+        IDLE_SECONDS * 100
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+
+    print(f"{name:<24}{idle_cpu:>16.2f}{p50:>14.2f}{p99:>14.2f}")
+
+
+if __name__ == '__main__':
+    print(f"{'dispatch':<24}{'idle CPU (%)':>16}{'p50 (ms)':>14}{'p99 (ms)':>14}")
+    run_benchmark('Polling (before)', is_polling=True)
+    run_benchmark('Blocking (after)', is_polling=False)
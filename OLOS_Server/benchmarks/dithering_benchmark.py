@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.dithering_engine import DitheringEngine  # noqa: E402
+
+# Dither grayscale images of different sizes with every algorithm of the dithering engine
+# - numpy: the error diffusion is dithered by wavefronts (vectorized), the threshold maps at once
+# - numba: the error diffusion is dithered by the compiled scan (only incase numba is installed)
+# the speed is in megapixels per second, the black ratio is close to the darkness of the image
+# usage: python benchmarks/dithering_benchmark.py
+
+IMAGES_SIZES = [(1000, 1000), (2000, 2000), (3000, 4000)]
+GRID_BLOCK_SIZE = 3
+GRID_BLOCK_DISTANCE = 2
+
+
+# smooth shades with fine noise like a photo at the engraving resolution
+def create_image(height, width):
+    rows, columns = np.mgrid[0:height, 0:width]
+    pixels = 127 + 100 * np.sin(columns / 37) * np.cos(rows / 53) + \
+        np.random.default_rng(height).normal(0, 10, (height, width))
+    return np.clip(pixels, 0, 254).astype(np.uint8)
+
+
+def run_benchmark(name, dithering_engine, pixels, algorithm):
+    # the first call compiles the numba scan
+    dithering_engine.dither(pixels[:8, :8], algorithm)
+
+    start_time = time.perf_counter()
+    dithered_pixels = dithering_engine.dither(pixels, algorithm, 0, GRID_BLOCK_SIZE, GRID_BLOCK_DISTANCE)
+    dithering_time = time.perf_counter() - start_time
+
+    megapixels = pixels.size / 1e6
+    print(f"{algorithm:<18}{name:<8}{megapixels:>8.1f}{dithering_time:>12.3f}"
+          f"{megapixels / dithering_time:>10.1f}{np.mean(dithered_pixels == 0):>10.3f}")
+
+
+if __name__ == '__main__':
+    dithering_engines = [('numpy', DitheringEngine(use_numba=False))]
+    if DitheringEngine.is_numba_available():
+        dithering_engines.append(('numba', DitheringEngine()))
+
+    print(f"{'algorithm':<18}{'engine':<8}{'MP':>8}{'time (s)':>12}{'MP / s':>10}{'black':>10}")
+    for height, width in IMAGES_SIZES:
+        pixels = create_image(height, width)
+        print(f"image {width}x{height}, darkness {1 - pixels.mean() / 255:.3f}")
+
+        for algorithm in DitheringEngine.get_algorithms():
+            for name, dithering_engine in dithering_engines:
+                # the threshold maps do not use numba
+                if name == 'numba' and algorithm not in DitheringEngine.ERROR_DIFFUSION_KERNELS:
+                    continue
+                run_benchmark(name, dithering_engine, pixels, algorithm)
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from gcode_generation_benchmark import create_layout  # noqa: E402
+from utils.gcode_cache import GcodeCache  # noqa: E402
+from utils.image_to_gcode_generator import ImageToGcodeGenerator  # noqa: E402
+
+# Generate the same layout again after small tweaks with the gcode fragments cache
+# - cold: the cache is empty, all the images are generated
+# - unchanged: the layout is generated again without changes, all the fragments are read from the cache
+# - one edited: the power of the first image changed, only its operations are generated again
+# the generated gcode is compared with the gcode generated without the cache
+# usage: python benchmarks/gcode_cache_benchmark.py [workers]
+
+LAYOUTS_IMAGES_NUMBERS = [1, 4, 8, 20]
+CACHE_SIZE = 1000
+
+
+def generate_gcode(gcode_file_data, workers, cache_directory):
+    generator_init = ImageToGcodeGenerator.__init__
+
+    def init_with_cache(generator):
+        generator_init(generator)
+        generator._workers = workers
+        generator._gcode_cache = GcodeCache(CACHE_SIZE, cache_directory) if cache_directory else None
+
+    ImageToGcodeGenerator.__init__ = init_with_cache
+    try:
+        start_time = time.perf_counter()
+        gcode_content = '\n'.join(
+            ImageToGcodeGenerator.generate_gcode_lines(gcode_file_data))
+        return gcode_content, time.perf_counter() - start_time
+    finally:
+        ImageToGcodeGenerator.__init__ = generator_init
+
+
+def run_benchmark(images_number, workers):
+    gcode_file_data = create_layout(images_number)
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        cold_gcode, cold_time = generate_gcode(gcode_file_data, workers, cache_directory)
+        unchanged_gcode, unchanged_time = generate_gcode(gcode_file_data, workers, cache_directory)
+
+        gcode_file_data.modifiedImagesData[0].gcodeSettings.engravingSettings.power = 500.0
+        edited_gcode, edited_time = generate_gcode(gcode_file_data, workers, cache_directory)
+        uncached_edited_gcode = generate_gcode(gcode_file_data, workers, None)[0]
+
+    is_same = cold_gcode == unchanged_gcode and edited_gcode == uncached_edited_gcode
+    print(f"{images_number:<10}{cold_time:>12.2f}{unchanged_time:>14.2f}{edited_time:>14.2f}"
+          f"{'':>4}{'same' if is_same else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+
+    print(f"process pool: {workers} workers")
+    print(f"{'images':<10}{'cold (s)':>12}{'unchanged':>14}{'one edited':>14}{'':>4}gcode")
+    for images_number in LAYOUTS_IMAGES_NUMBERS:
+        run_benchmark(images_number, workers)
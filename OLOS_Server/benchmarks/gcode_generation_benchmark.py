@@ -0,0 +1,106 @@
+import base64
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from fastapi_server.models.jobs_manager_model import GcodeFileData  # noqa: E402
+from utils.image_to_gcode_generator import ImageToGcodeGenerator  # noqa: E402
+
+# Compare the sequential and the parallel generation of a multi images layout
+# every image of the layout has a dithered engraving image, a marking svg and a cutting svg
+# - sequential: all the images are generated one after the other (workers = 1)
+# - process pool: the images are generated by a pool of worker processes (image_to_gcode.workers)
+# the generated gcode is the same, the time is the wall time of ImageToGcodeGenerator.generate_gcode_lines
+# usage: python benchmarks/gcode_generation_benchmark.py [workers]
+
+LAYOUTS_IMAGES_NUMBERS = [1, 4, 8, 20]
+# size of every image on the bed (mm) and engraving resolution (pixels per 100 mm, 0.1 mm pixels)
+IMAGE_SIZE = 60
+ENGRAVING_RESOLUTION = 1000
+# svg of the marked text outline and of the cut shape
+SVG_CONTENT = ('<svg xmlns="http://www.w3.org/2000/svg" width="60mm" height="60mm" viewBox="0 0 600 600">'
+               '<circle cx="300" cy="300" r="280" stroke="black" fill="none"/>'
+               '<path d="M100 300 C100 100 500 100 500 300 S100 500 100 300 Z" stroke="black" fill="none"/>'
+               '</svg>')
+
+
+def create_engraving_image(seed):
+    pixels_number = IMAGE_SIZE * ENGRAVING_RESOLUTION // 100
+    pixels = np.random.default_rng(seed).random(
+        (pixels_number, pixels_number)) > 0.5
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8) * 255).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def create_layout(images_number):
+    svg_image = 'data:image/svg+xml;base64,' + \
+        base64.b64encode(SVG_CONTENT.encode()).decode()
+    operation_settings = {'power': 800.0, 'speed': 1000.0, 'tool': 'CO2'}
+    dithering_settings = {'algorithm': 'Floyd-Steinberg', 'grayShift': 0.0, 'resolution': ENGRAVING_RESOLUTION,
+                          'blockSize': 0.0, 'blockDistance': 0.0}
+
+    modified_images_data = []
+    for index in range(images_number):
+        metrics = {'x': index % 5 * (IMAGE_SIZE + 10), 'y': index // 5 * (IMAGE_SIZE + 10),
+                   'width': IMAGE_SIZE, 'height': IMAGE_SIZE, 'rotation': 0.0,
+                   'scaleX': 1.0, 'scaleY': 1.0, 'offsetX': 0.0, 'offsetY': 0.0}
+        modified_images_data.append({
+            'modifiedSVGCutting': svg_image,
+            'modifiedSVGMarking': svg_image,
+            'modifiedEngravingImage': create_engraving_image(index),
+            'gcodeSettings': {
+                'mainSettings': {'material': 'Wood', 'thickness': 3.0, 'metrics': metrics, 'filename': f'{index}'},
+                'cuttingSettings': operation_settings,
+                'markingSettings': operation_settings,
+                'engravingSettings': {**operation_settings, 'dithering': dithering_settings}
+            }
+        })
+
+    return GcodeFileData(name='benchmark.gcode', modifiedImagesData=modified_images_data)
+
+
+def generate_gcode(gcode_file_data, workers):
+    generator_init = ImageToGcodeGenerator.__init__
+
+    def init_with_workers(generator):
+        generator_init(generator)
+        generator._workers = workers
+        # every run generates all the images
+        generator._gcode_cache = None
+
+    ImageToGcodeGenerator.__init__ = init_with_workers
+    try:
+        start_time = time.perf_counter()
+        gcode_content = '\n'.join(
+            ImageToGcodeGenerator.generate_gcode_lines(gcode_file_data))
+        return gcode_content, time.perf_counter() - start_time
+    finally:
+        ImageToGcodeGenerator.__init__ = generator_init
+
+
+def run_benchmark(images_number, workers):
+    gcode_file_data = create_layout(images_number)
+    sequential_gcode, sequential_time = generate_gcode(gcode_file_data, 1)
+    parallel_gcode, parallel_time = generate_gcode(gcode_file_data, workers)
+
+    print(f"{images_number:<10}{sequential_time:>16.2f}{parallel_time:>16.2f}"
+          f"{sequential_time / parallel_time:>10.1f}x{len(parallel_gcode) / 2 ** 20:>10.1f}"
+          f"{'':>4}{'same' if parallel_gcode == sequential_gcode else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+
+    print(f"process pool: {workers} workers")
+    print(f"{'images':<10}{'sequential (s)':>16}{'pool (s)':>16}{'speedup':>11}{'MiB':>10}{'':>4}gcode")
+    for images_number in LAYOUTS_IMAGES_NUMBERS:
+        run_benchmark(images_number, workers)
@@ -0,0 +1,87 @@
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.raster_gcode_engine import RasterGcodeEngine  # noqa: E402
+
+# Compare the loading of an engraving image before and after the single affine warp
+# - resize + rotate: RGBA resize (lanczos), flip and rotate (expand), white background and grayscale
+# - affine warp: grayscale with a white background, then one warp (scale, flip, rotate and gcode flip)
+# every run is in a new process, the memory is the increase of the process peak memory while loading
+# usage: python benchmarks/image_transform_benchmark.py
+
+# image size (pixels), engraving size (pixels at the engraving resolution), rotation (degrees)
+IMAGES = [((2000, 1500), (1500, 1125), 30),
+          ((4000, 3000), (3000, 2250), 30),
+          ((4000, 3000), (3000, 2250), 90),
+          ((6000, 4500), (3000, 2250), 15)]
+
+
+def create_image_content(size):
+    width, height = size
+    rows, columns = np.mgrid[0:height, 0:width]
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[..., 0] = columns * 255 // width
+    pixels[..., 1] = rows * 255 // height
+    pixels[..., 2] = 128
+    # transparent background around an ellipse
+    pixels[..., 3] = np.where(((columns / width - 0.5) ** 2 + (rows / height - 0.5) ** 2) < 0.2, 255, 0)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, 'RGBA').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def load_with_resize_and_rotate(image, size, rotation):
+    image = image.resize(size, Image.Resampling.LANCZOS)
+    image = ImageOps.flip(image).rotate(rotation, expand=True, fillcolor=(255, 255, 255))
+    image = image.convert('RGBA')
+    background = Image.new(mode='RGBA', size=image.size, color=(255, 255, 255))
+    return np.flipud(np.asarray(Image.alpha_composite(background, image).convert('L')))
+
+
+def load_with_affine_warp(image, size, rotation):
+    return RasterGcodeEngine.load_image(image, size=size, rotation=rotation, is_flipped=True)
+
+
+def run_loader(loader, image_content, size, rotation, results):
+    image = Image.open(io.BytesIO(image_content))
+    image.load()
+
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    pixels = loader(image, size, rotation)
+    loading_time = time.perf_counter() - start_time
+
+    # ru_maxrss is in kilobytes
+    results.put((loading_time, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_memory) / 1024,
+                 pixels.shape, float(pixels.mean())))
+
+
+def run_benchmark(loader, image_content, size, rotation):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_loader, args=(loader, image_content, size, rotation, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+if __name__ == '__main__':
+    print(f"{'image':<12}{'engraving':<12}{'angle':>6}{'loader':>18}{'time (s)':>10}{'MiB':>8}{'mean':>8}")
+    for image_size, engraving_size, rotation in IMAGES:
+        image_content = create_image_content(image_size)
+        for name, loader in (('resize + rotate', load_with_resize_and_rotate),
+                             ('affine warp', load_with_affine_warp)):
+            loading_time, memory, shape, mean = run_benchmark(loader, image_content, engraving_size, rotation)
+            print(f"{'x'.join(map(str, image_size)):<12}{'x'.join(map(str, engraving_size)):<12}{rotation:>6}"
+                  f"{name:>18}{loading_time:>10.2f}{memory:>8.0f}{mean:>8.1f}")
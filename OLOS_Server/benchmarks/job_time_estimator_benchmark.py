@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from files_manager.job_file import JobFile  # noqa: E402
+from utils.grbl_settings import GrblSettings  # noqa: E402
+from utils.job_time_estimator import JobTimeEstimator  # noqa: E402
+
+# Estimate the time of generated job files with the GRBL planner model
+# - raster: engraving rows of short moves with power changes (like the raster engine output)
+# - vector: random cut lines and arcs with travel moves between them
+# the settings are the configured default GRBL settings (or the cached controller settings)
+# usage: python benchmarks/job_time_estimator_benchmark.py
+
+JOBS_LINES_NUMBERS = [10000, 100000, 1000000]
+RASTER_PIXEL_SIZE = 0.1
+
+
+def create_raster_job(lines_number, random_generator):
+    lines = ['G21 G90', 'M3', 'G0X0Y0', 'G1F1000']
+    x, y = 0.0, 0.0
+    while len(lines) < lines_number:
+        x = round(x + RASTER_PIXEL_SIZE * random_generator.integers(1, 6), 1)
+        lines.append(f'X{x}S{random_generator.choice((0, 800))}')
+        if x > 300:
+            x, y = 0.0, round(y + RASTER_PIXEL_SIZE, 1)
+            lines.append(f'G0X0Y{y}\nG1F1000')
+    return lines[:lines_number] + ['M5', 'M2']
+
+
+def create_vector_job(lines_number, random_generator):
+    lines = ['G21 G90', 'M4']
+    while len(lines) < lines_number:
+        x, y = random_generator.uniform(0, 300, 2).round(3)
+        lines.append(f'M5\nG0 X{x} Y{y}\nM3 S800')
+        for _ in range(20):
+            x, y = random_generator.uniform(0, 300, 2).round(3)
+            if random_generator.random() < 0.2:
+                lines.append(f'G2 X{x} Y{y} R{random_generator.uniform(150, 300):.3f} F1500')
+            else:
+                lines.append(f'G1 X{x} Y{y} F1500')
+    return lines[:lines_number] + ['M5', 'M2']
+
+
+def run_benchmark(name, lines, directory):
+    file_path = os.path.join(directory, f'{name}.gcode')
+    with open(file_path, 'w') as gcode_file:
+        gcode_file.write('\n'.join(lines))
+    JobFile.build_index(file_path)
+
+    estimator = JobTimeEstimator(GrblSettings.load())
+    job_file = JobFile(file_path)
+    try:
+        start_time = time.perf_counter()
+        lines_times = estimator.estimate_job_file(job_file)
+        estimation_time = time.perf_counter() - start_time
+    finally:
+        job_file.close()
+
+    print(f"{name:<10}{len(lines):>10}{estimation_time:>12.2f}"
+          f"{len(lines) / estimation_time / 1000:>16.0f}{lines_times[-1] / 60:>16.1f}")
+
+
+if __name__ == '__main__':
+    print(f"{'job':<10}{'lines':>10}{'time (s)':>12}{'k lines / s':>16}{'job (min)':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        for lines_number in JOBS_LINES_NUMBERS:
+            random_generator = np.random.default_rng(lines_number)
+            run_benchmark('raster', create_raster_job(lines_number, random_generator), directory)
+            run_benchmark('vector', create_vector_job(lines_number, random_generator), directory)
@@ -0,0 +1,75 @@
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.path_optimizer import PathOptimizer  # noqa: E402
+
+# Order the cut paths of nested parts layouts with the path optimizer
+# every part is a circle (outer contour) with 3 holes and an engraved line, the paths are shuffled
+# like the paths of a svg exported by a drawing software
+# - travel: distance of the moves with the laser off before and after the optimization
+# - inner first: every hole and line is cut before the contour of its part
+# usage: python benchmarks/path_optimizer_benchmark.py
+
+LAYOUTS_PARTS_NUMBERS = [10, 100, 1000, 2000]
+PART_SIZE = 30
+HOLES_NUMBER = 3
+
+
+def get_circle(center_x, center_y, radius, points_number):
+    angles = np.linspace(0, 2 * np.pi, points_number + 1)
+    points = np.round(np.column_stack((center_x + radius * np.cos(angles),
+                                       center_y + radius * np.sin(angles))), 3)
+    points[-1] = points[0]
+    return points
+
+
+def create_layout(parts_number, random_generator):
+    sub_paths = []
+    columns_number = math.ceil(math.sqrt(parts_number))
+    for part in range(parts_number):
+        center_x = (part % columns_number + 0.5) * PART_SIZE
+        center_y = (part // columns_number + 0.5) * PART_SIZE
+
+        sub_paths.append(get_circle(center_x, center_y, PART_SIZE * 0.4, 64))
+        for _ in range(HOLES_NUMBER):
+            sub_paths.append(get_circle(center_x + random_generator.uniform(-5, 5),
+                                        center_y + random_generator.uniform(-5, 5), 1.5, 16))
+        sub_paths.append(np.array([[center_x - 3, center_y + 8], [center_x + 3, center_y + 8]]))
+
+    return [sub_paths[index] for index in random_generator.permutation(len(sub_paths))]
+
+
+def run_benchmark(parts_number):
+    sub_paths = create_layout(parts_number, np.random.default_rng(parts_number))
+    path_optimizer = PathOptimizer()
+
+    start_time = time.perf_counter()
+    optimized_sub_paths = path_optimizer.optimize(sub_paths)
+    optimization_time = time.perf_counter() - start_time
+
+    travel_distance = path_optimizer.get_travel_distance(sub_paths)
+    optimized_travel_distance = path_optimizer.get_travel_distance(
+        optimized_sub_paths)
+    is_closed = np.array([PathOptimizer.is_closed(points)
+                         for points in optimized_sub_paths])
+    containers = PathOptimizer.get_containers(optimized_sub_paths, is_closed)
+    is_inner_first = bool((containers[:, 0] < containers[:, 1]).all())
+
+    print(f"{len(sub_paths):<10}{optimization_time:>10.2f}{travel_distance / 1000:>14.1f}"
+          f"{optimized_travel_distance / 1000:>14.1f}"
+          f"{path_optimizer.get_travel_time(travel_distance - optimized_travel_distance) / 60:>14.1f}"
+          f"{'':>4}{is_inner_first}")
+
+
+if __name__ == '__main__':
+    print(f"{'paths':<10}{'time (s)':>10}{'travel (m)':>14}{'optimized':>14}{'saved (min)':>14}{'':>4}inner first")
+    for parts_number in LAYOUTS_PARTS_NUMBERS:
+        run_benchmark(parts_number)
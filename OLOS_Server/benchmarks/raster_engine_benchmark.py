@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.raster_gcode_engine import RasterGcodeEngine  # noqa: E402
+
+# Time the raster engraving gcode generation of a large image
+# - Photo: grayscale gradients with a blank margin around the picture (many power changes on every line)
+# - Dithered: the same picture dithered to black and white pixels (the usual engraving image)
+# the image2gcode tool (previous subprocess) is timed on the same images when it is installed
+# usage: python benchmarks/raster_engine_benchmark.py [image size in pixels]
+
+IMAGE_SIZE = 4000
+# 10 pixels per mm
+PIXEL_SIZE = 0.1
+SPEED = 3000
+MAX_POWER = 1000
+MARGIN = 0.1
+
+
+def create_photo_image(size):
+    y, x = np.mgrid[0:size, 0:size] / size
+    pixels = 127.5 + 127.5 * np.sin(12 * x + 3 * np.cos(9 * y)) * np.cos(7 * y)
+    image = pixels.astype(np.uint8)
+
+    margin = int(size * MARGIN)
+    image[:margin, :] = 255
+    image[-margin:, :] = 255
+    image[:, :margin] = 255
+    image[:, -margin:] = 255
+    return image
+
+
+def create_dithered_image(image):
+    # random threshold dithering keeps the density of the gray levels
+    thresholds = np.random.default_rng(0).integers(0, 255, image.shape)
+    return np.where(image > thresholds, 255, 0).astype(np.uint8)
+
+
+def run_raster_engine(pixels):
+    return RasterGcodeEngine(PIXEL_SIZE, SPEED, MAX_POWER).generate(pixels)
+
+
+def run_image2gcode(pixels):
+    from image2gcode.image2gcode import Image2gcode
+
+    args = dict(pixelsize=PIXEL_SIZE, speed=SPEED, maxpower=MAX_POWER, poweroffset=0, invert=True,
+                offset=[0, 0], speedmoves=10, noise=0, overscan=0, showoverscan=False)
+    return Image2gcode().image2gcode(pixels, args)
+
+
+def is_image2gcode_installed():
+    try:
+        import image2gcode.image2gcode  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def run_benchmark(name, image_name, run, pixels):
+    start_time = time.perf_counter()
+    gcode = run(pixels)
+    elapsed_time = time.perf_counter() - start_time
+
+    print(f"{name:<16}{image_name:<12}{elapsed_time:>12.2f}{len(gcode) / 1024 ** 2:>14.1f}"
+          f"{gcode.count(chr(10)) / elapsed_time / 1000:>16.0f}")
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else IMAGE_SIZE
+    photo_image = create_photo_image(size)
+    images = {'Photo': photo_image,
+              'Dithered': create_dithered_image(photo_image)}
+
+    print(f"image: {size}x{size} pixels, pixel size {PIXEL_SIZE} mm")
+    print(f"{'generator':<16}{'image':<12}{'time (s)':>12}{'gcode (MiB)':>14}{'klines/s':>16}")
+    for image_name, pixels in images.items():
+        run_benchmark('Raster engine', image_name,
+                      run_raster_engine, pixels)
+        if is_image2gcode_installed():
+            run_benchmark('image2gcode', image_name, run_image2gcode, pixels)
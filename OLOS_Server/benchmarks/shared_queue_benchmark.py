@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+from multiprocessing import Process
+from multiprocessing.managers import SyncManager
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.priority_queue_with_counter import PriorityQueueWithCounter  # noqa: E402
+from utils.shared_memory_priority_queue import SharedMemoryPriorityQueue  # noqa: E402
+
+# Compare the manager based priority queue (proxy) with the shared memory priority queue
+# a producer process sends messages with the time they were sent,
+# the consumer reads them the same way the core does (empty() then get())
+# - throughput: the producer sends the messages as fast as possible
+# - latency: the producer sends a message every 1 ms (similar to a streamed job)
+# usage: python benchmarks/shared_queue_benchmark.py [messages_number]
+
+MESSAGES_NUMBER = 20000
+LATENCY_MESSAGES_NUMBER = 2000
+LATENCY_MESSAGES_INTERVAL = 0.001
+# similar to a job execution message sent to the interface
+MESSAGE = {"type": "JOB_EXECUTION", "text": "G1 X120.125 Y30.5 S255",
+           "line_index": 1000, "total_lines": 200000, "file_timer": 12.5}
+
+
+def produce(shared_queue, messages_number, interval):
+    for _ in range(messages_number):
+        shared_queue.put('JOB_EXECUTION', 2, (time.perf_counter(), MESSAGE))
+        if interval:
+            time.sleep(interval)
+
+
+def consume(shared_queue, messages_number):
+    latencies = []
+    start_time = time.perf_counter()
+
+    while len(latencies) < messages_number:
+        if not shared_queue.empty():
+            type, (sent_time, message) = shared_queue.get()
+            latencies.append(time.perf_counter() - sent_time)
+
+    duration = time.perf_counter() - start_time
+    return duration, latencies
+
+
+def run_producer_consumer(shared_queue, messages_number, interval=0):
+    producer = Process(target=produce, args=(
+        shared_queue, messages_number, interval))
+    producer.start()
+    duration, latencies = consume(shared_queue, messages_number)
+    producer.join()
+
+    return duration, latencies
+
+
+def run_benchmark(name, shared_queue, messages_number):
+    duration, _ = run_producer_consumer(shared_queue, messages_number)
+
+    _, latencies = run_producer_consumer(
+        shared_queue, LATENCY_MESSAGES_NUMBER, LATENCY_MESSAGES_INTERVAL)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+
+    print(f"{name:<32}{messages_number / duration:>14.0f}{p50:>14.1f}{p99:>14.1f}")
+
+
+if __name__ == '__main__':
+    messages_number = int(sys.argv[1]) if len(
+        sys.argv) > 1 else MESSAGES_NUMBER
+
+    SyncManager.register("PriorityQueueWithCounter", PriorityQueueWithCounter)
+    manager = SyncManager()
+    manager.start()
+
+    print(f"{'queue':<32}{'messages/sec':>14}{'p50 (us)':>14}{'p99 (us)':>14}")
+    run_benchmark('SyncManager PriorityQueue',
+                  manager.PriorityQueueWithCounter(), messages_number)
+
+    shared_memory_queue = SharedMemoryPriorityQueue()
+    run_benchmark('Shared memory PriorityQueue',
+                  shared_memory_queue, messages_number)
+    shared_memory_queue.close()
+
+    manager.shutdown()
@@ -0,0 +1,130 @@
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.configuration_loader import ConfigurationLoader  # noqa: E402
+from utils.stitching_calibration import StitchingCalibration  # noqa: E402
+
+# Stitch the frames of two cameras looking at the machine bed (overlapping views of a textured bed,
+# the second camera is slightly rotated, both frames have the lens distortion of the configuration file)
+# - stitcher: undistort every frame and stitch it with the stitching library (features, matching,
+#   estimation, warping, seams and blending of every frame)
+# - cached calibration: homographies estimated once, every frame is composed with the remap maps
+#   and the seam masks, loading the calibration from the cache file is timed too (the frames are
+#   undistorted by the camera capture processes, not in the stitching loop)
+# the error is the mean absolute difference with the bed in the overlap of the cameras
+# usage: python benchmarks/stitching_benchmark.py [frames_number]
+
+FRAMES_NUMBER = 30
+FRAME_SIZE = (800, 600)
+# position of the second camera on the bed (pixels) and its rotation (degrees)
+CAMERA_OFFSET = (560, 12)
+CAMERA_ROTATION = 1.5
+
+
+# bed with engraved like shapes and a noisy texture so the frames have features
+def create_bed(width, height):
+    random_generator = np.random.default_rng(0)
+    bed = cv2.GaussianBlur(random_generator.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 2)
+    for _ in range(300):
+        center = tuple(int(value) for value in random_generator.integers(0, (width, height)))
+        color = tuple(int(value) for value in random_generator.integers(0, 256, 3))
+        cv2.circle(bed, center, int(random_generator.integers(4, 30)), color, int(random_generator.integers(-1, 4)))
+    return bed
+
+
+# raw frame of a camera: view of the bed (undistorted frame) with the lens distortion of the camera
+def create_camera_frame(bed, view_matrix, camera_matrix, camera_coeffs):
+    width, height = FRAME_SIZE
+    undistorted_frame = cv2.warpAffine(bed, view_matrix, FRAME_SIZE)
+    raw_pixels = np.stack(np.meshgrid(np.arange(width), np.arange(height)), axis=-1).astype(np.float32)
+    undistorted_pixels = cv2.undistortPoints(raw_pixels.reshape(-1, 1, 2), camera_matrix, camera_coeffs,
+                                             P=camera_matrix).reshape(height, width, 2)
+    return cv2.remap(undistorted_frame, undistorted_pixels[..., 0], undistorted_pixels[..., 1], cv2.INTER_LINEAR)
+
+
+def stitch_frames(stitcher, frames, cameras_matrix, cameras_coeffs):
+    undistorted_frames = [cv2.undistort(frame, camera_matrix, camera_coeffs, None, camera_matrix)
+                          for frame, camera_matrix, camera_coeffs in zip(frames, cameras_matrix, cameras_coeffs)]
+    return stitcher.stitch(undistorted_frames)
+
+
+# mean difference of the panorama with the bed in the overlap, the panorama is aligned with the bed first
+def get_overlap_error(panorama, bed):
+    overlap = bed[100:500, CAMERA_OFFSET[0] + 40:FRAME_SIZE[0] - 40]
+    result = cv2.matchTemplate(panorama, overlap, cv2.TM_SQDIFF)
+    x, y = cv2.minMaxLoc(result)[2]
+    panorama_overlap = panorama[y:y + overlap.shape[0], x:x + overlap.shape[1]]
+    return float(np.mean(np.abs(panorama_overlap.astype(np.float32) - overlap)))
+
+
+def time_frames(stitch, frames, frames_number):
+    panorama = stitch(frames)
+    start_time = time.perf_counter()
+    for _ in range(frames_number):
+        panorama = stitch(frames)
+    return frames_number / (time.perf_counter() - start_time), panorama
+
+
+if __name__ == '__main__':
+    frames_number = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES_NUMBER
+    config = ConfigurationLoader.from_yaml()
+    calibration_settings = config.cameras_connection.stitching_settings.cameras_calibration_settings
+    algorithm_settings = config.get_dict('cameras_connection.stitching_settings.algorithm_settings')
+    cameras_calibration = config.get_dict('cameras_connection.stitching_settings.cameras_calibration_settings')
+    cameras_matrix = [np.array(camera_matrix) for camera_matrix in calibration_settings.cameras_matrix]
+    cameras_coeffs = [np.array(camera_coeffs) for camera_coeffs in calibration_settings.cameras_coeffs]
+
+    bed = create_bed(FRAME_SIZE[0] + CAMERA_OFFSET[0] + 40, FRAME_SIZE[1] + 2 * CAMERA_OFFSET[1])
+    second_view_matrix = cv2.getRotationMatrix2D((FRAME_SIZE[0] / 2, FRAME_SIZE[1] / 2), CAMERA_ROTATION, 1)
+    second_view_matrix[:, 2] -= CAMERA_OFFSET
+    frames = [create_camera_frame(bed, view_matrix, camera_matrix, camera_coeffs)
+              for view_matrix, camera_matrix, camera_coeffs
+              in zip((np.float64([[1, 0, 0], [0, 1, 0]]), second_view_matrix), cameras_matrix, cameras_coeffs)]
+    print(f"2 cameras {FRAME_SIZE[0]}x{FRAME_SIZE[1]}, {frames_number} frames, settings {algorithm_settings}")
+    print(f"{'stitching':<22}{'frames / s':>12}{'setup (ms)':>12}{'overlap error':>15}")
+
+    try:
+        from stitching import Stitcher
+        stitcher = Stitcher(**algorithm_settings)
+        frames_rate, panorama = time_frames(
+            lambda frames: stitch_frames(stitcher, frames, cameras_matrix, cameras_coeffs), frames,
+            max(frames_number // 10, 1))
+        print(f"{'stitcher':<22}{frames_rate:>12.1f}{0:>12.0f}{get_overlap_error(panorama, bed):>15.1f}")
+    except ImportError:
+        print(f"{'stitcher':<22}{'stitching library not installed':>39}")
+
+    stitching_calibration = StitchingCalibration(algorithm_settings, cameras_calibration)
+    frames = [cv2.undistort(frame, camera_matrix, camera_coeffs, None, camera_matrix)
+              for frame, camera_matrix, camera_coeffs in zip(frames, cameras_matrix, cameras_coeffs)]
+    start_time = time.perf_counter()
+    if not stitching_calibration.calibrate(frames):
+        sys.exit('Error: the frames could not be calibrated')
+    calibration_time = time.perf_counter() - start_time
+    frames_rate, panorama = time_frames(stitching_calibration.compose, frames, frames_number)
+    print(f"{'cached calibration':<22}{frames_rate:>12.1f}{calibration_time * 1000:>12.0f}"
+          f"{get_overlap_error(panorama, bed):>15.1f}")
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        cache_path = os.path.join(cache_directory, 'stitching_calibration.npz')
+        stitching_calibration.save(cache_path)
+        cached_calibration = StitchingCalibration(algorithm_settings, cameras_calibration)
+        start_time = time.perf_counter()
+        if not cached_calibration.load(cache_path, frames):
+            sys.exit('Error: the cached calibration could not be loaded')
+        load_time = time.perf_counter() - start_time
+        frames_rate, panorama = time_frames(cached_calibration.compose, frames, frames_number)
+        print(f"{'loaded calibration':<22}{frames_rate:>12.1f}{load_time * 1000:>12.0f}"
+              f"{get_overlap_error(panorama, bed):>15.1f}")
+
+    start_time = time.perf_counter()
+    is_drifted = stitching_calibration.check_drift(frames, tolerance=5)
+    print(f"drift check {(time.perf_counter() - start_time) * 1000:.0f} ms, recalibrated: {is_drifted}")
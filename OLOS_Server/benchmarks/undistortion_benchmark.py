@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.configuration_loader import ConfigurationLoader  # noqa: E402
+from utils.camera_stream import CameraStream  # noqa: E402
+
+# Undistort the camera frames with the calibration of the configuration file
+# - undistort: cv2.undistort with the calibration lists converted to arrays for every frame
+#   (the rectification maps are computed again for every frame)
+# - precomputed maps: the camera stream computes the fixed point maps once and remaps the frame
+#   directly in the frames ring slot (the cameras capture process)
+# the time is the mean time per frame of one camera, the maps time is the time to compute the maps once
+# usage: python benchmarks/undistortion_benchmark.py [frames_number]
+
+FRAMES_NUMBER = 200
+FRAMES_SIZES = ((800, 600), (1280, 720), (1920, 1080))
+
+
+# the calibration is for the 800x600 frames, the camera matrix is scaled for the other sizes
+def get_camera_calibration(config, frame_size):
+    calibration_settings = config.cameras_connection.stitching_settings.cameras_calibration_settings
+    camera_matrix = np.array(calibration_settings.cameras_matrix[0], dtype=np.float64)
+    camera_matrix[:2] *= frame_size[0] / 800
+    return camera_matrix.tolist(), calibration_settings.cameras_coeffs[0]
+
+
+def undistort_frames(frame, camera_matrix, camera_coeffs, frames_number):
+    start_time = time.perf_counter()
+    for _ in range(frames_number):
+        cv2.undistort(frame, np.array(camera_matrix), np.array(camera_coeffs), None, np.array(camera_matrix))
+    return (time.perf_counter() - start_time) / frames_number
+
+
+def remap_frames(frame, camera_stream, slot_frame, frames_number):
+    start_time = time.perf_counter()
+    map1, map2 = camera_stream.get_undistortion_maps(frame.shape[1], frame.shape[0])
+    maps_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(frames_number):
+        map1, map2 = camera_stream.get_undistortion_maps(frame.shape[1], frame.shape[0])
+        cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=slot_frame)
+    return (time.perf_counter() - start_time) / frames_number, maps_time
+
+
+if __name__ == '__main__':
+    frames_number = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES_NUMBER
+    config = ConfigurationLoader.from_yaml()
+    cv2.setNumThreads(1)
+    print(f"{frames_number} frames, one thread (the capture processes run next to each other)")
+    print(f"{'frame':<12}{'undistort (ms)':>16}{'precomputed maps (ms)':>23}{'maps once (ms)':>16}{'speedup':>9}")
+
+    for frame_size in FRAMES_SIZES:
+        frame = np.random.default_rng(0).integers(0, 256, (frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        camera_matrix, camera_coeffs = get_camera_calibration(config, frame_size)
+        camera_stream = CameraStream(0, None, camera_matrix, camera_coeffs)
+        slot_frame = np.empty_like(frame)
+
+        undistort_time = undistort_frames(frame, camera_matrix, camera_coeffs, frames_number)
+        remap_time, maps_time = remap_frames(frame, camera_stream, slot_frame, frames_number)
+        if not np.array_equal(slot_frame, cv2.undistort(frame, np.array(camera_matrix), np.array(camera_coeffs),
+                                                        None, np.array(camera_matrix))):
+            sys.exit('Error: the precomputed maps do not give the undistorted frame')
+        print(f"{frame_size[0]}x{frame_size[1]:<7}{undistort_time * 1000:>16.2f}{remap_time * 1000:>23.2f}"
+              f"{maps_time * 1000:>16.2f}{undistort_time / remap_time:>9.1f}")
@@ -0,0 +1,159 @@
+import datetime
+import json
+import os
+import re
+import sys
+import time
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from utils.machine_status_publisher import MachineStatusPublisher  # noqa: E402
+from utils.websocket_binary_data import WebsocketBinaryData  # noqa: E402
+from utils.websocket_json_data import WebsocketJsonData  # noqa: E402
+
+# Compare the websocket messages encodings for a simulated job:
+# a 10 Hz machine status stream and a 2 kHz job lines stream
+# - Per line JSON (before): every status and every executed line is a json message with indentation,
+#   the status patterns are compiled and the time is formatted for every message
+# - Coalesced JSON: compact json, only the changed status fields are sent (MachineStatusPublisher),
+#   the executed lines are sent in one progress message every 100 ms
+# - Coalesced binary: same messages with the binary layout of the binary subprotocol
+# the CPU time is the time used to parse the status and encode the messages
+# usage: python benchmarks/websocket_encoding_benchmark.py [seconds]
+
+SIMULATED_SECONDS = 20
+STATUS_RATE = 10
+JOB_LINES_RATE = 2000
+# job progress events per second (job_progress.rate in config.yaml)
+JOB_PROGRESS_RATE = 10
+EXECUTED_LINES_BATCH_SIZE = 50
+
+# the x axis moves between the reports, the rest of the status does not change
+MACHINE_STATUS = '<Run|MPos:{x:.3f},78.910,-1.250|Bf:15,128|FS:3000,800|Ov:100,100,100|T:1>'
+JOB_LINE = 'G1 X120.125 Y30.5 S255'
+
+
+# same as the previous WebsocketJsonData.parse_grbl_status_to_json
+def parse_grbl_status_to_indented_json(machine_status):
+    state_match = re.compile(r'<(\w+)|').search(machine_status)
+    machine_position_match = re.compile(
+        r'MPos:([-\d.]+),([-\d.]+),([-\d.]+)').search(machine_status)
+    work_coordinate_offset_match = re.compile(
+        r'WCO:([-\d.]+),([-\d.]+),([-\d.]+)').search(machine_status)
+    buffer_match = re.compile(r'Bf:(\d+),(\d+)').search(machine_status)
+    feed_speed_match = re.compile(r'FS:(\d+),(\d+)').search(machine_status)
+    override_match = re.compile(
+        r'Ov:(\d+),(\d+),(\d+)').search(machine_status)
+    machine_tool_match = re.compile(r'T:(\d+)').search(machine_status)
+
+    def group(match, index):
+        return float(match.group(index)) if match else None
+
+    status_dict = {
+        "type": "MACHINE_STATUS",
+        "state": state_match.group(1) if state_match else None,
+        "machine_position": {"x": group(machine_position_match, 1),
+                             "y": group(machine_position_match, 2),
+                             "z": group(machine_position_match, 3)},
+        "work_coordinate_offset": {"x": group(work_coordinate_offset_match, 1),
+                                   "y": group(work_coordinate_offset_match, 2),
+                                   "z": group(work_coordinate_offset_match, 3)},
+        "buffer_state": {"commands_queued": group(buffer_match, 1),
+                         "buffer_length": group(buffer_match, 2)},
+        "feed_and_speed": {"feed_rate": group(feed_speed_match, 1),
+                           "speed": group(feed_speed_match, 2)},
+        "overrides": {"feed": group(override_match, 1),
+                      "rapids": group(override_match, 2),
+                      "spindle": group(override_match, 3)},
+        "machine_tool": group(machine_tool_match, 1)
+    }
+    return json.dumps(status_dict, indent=2)
+
+
+# same as the previous per line job execution message
+def parse_job_line_to_indented_json(line, line_index, total_lines, file_timer):
+    return json.dumps({"type": "JOB_EXECUTION",
+                       "text": line,
+                       "line_index": line_index,
+                       "total_lines": total_lines,
+                       "file_timer": file_timer,
+                       "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, indent=2)
+
+
+def run_per_line_json(seconds):
+    total_lines = seconds * JOB_LINES_RATE
+    messages = []
+
+    for second in range(seconds):
+        for report in range(STATUS_RATE):
+            messages.append(parse_grbl_status_to_indented_json(
+                MACHINE_STATUS.format(x=second + report / STATUS_RATE)))
+        for line in range(JOB_LINES_RATE):
+            line_index = second * JOB_LINES_RATE + line + 1
+            messages.append(parse_job_line_to_indented_json(
+                JOB_LINE, line_index, total_lines, second + line / JOB_LINES_RATE))
+
+    return messages
+
+
+def run_coalesced(seconds, encode):
+    total_lines = seconds * JOB_LINES_RATE
+    lines_per_event = JOB_LINES_RATE // JOB_PROGRESS_RATE
+    # the reports are simulated faster than the real time, no rates (10 Hz is below the 20 Hz position rate)
+    machine_status_publisher = MachineStatusPublisher()
+    messages = []
+
+    for second in range(seconds):
+        for report in range(STATUS_RATE):
+            status = machine_status_publisher.update(
+                MACHINE_STATUS.format(x=second + report / STATUS_RATE))
+            if status:
+                messages.append(encode('MACHINE_STATUS', status))
+
+        for event in range(JOB_PROGRESS_RATE):
+            acknowledged_index = second * JOB_LINES_RATE + \
+                (event + 1) * lines_per_event
+            job_progress = {
+                'lines': [JOB_LINE] * min(lines_per_event, EXECUTED_LINES_BATCH_SIZE),
+                'line_index': acknowledged_index + 15,
+                'acknowledged_index': acknowledged_index,
+                'total_lines': total_lines,
+                'lines_per_second': float(JOB_LINES_RATE),
+                'eta': (total_lines - acknowledged_index) / JOB_LINES_RATE
+            }
+            progress = WebsocketJsonData.parse_job_progress(
+                job_progress, second + event / JOB_PROGRESS_RATE)
+            messages.append(encode('JOB_EXECUTION', progress))
+
+    return messages
+
+
+def encode_json(type, data):
+    return WebsocketJsonData.to_json(data)
+
+
+def encode_binary(type, data):
+    return WebsocketBinaryData.encode(type, data)
+
+
+def run_benchmark(name, seconds, run):
+    start_cpu_time = time.process_time()
+    messages = run(seconds)
+    cpu_time = time.process_time() - start_cpu_time
+
+    total_bytes = sum(len(message) for message in messages)
+    print(f"{name:<26}{len(messages) / seconds:>14.0f}{total_bytes / seconds / 1024:>14.1f}"
+          f"{cpu_time / seconds * 1000:>18.2f}")
+
+
+if __name__ == '__main__':
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else SIMULATED_SECONDS
+
+    print(f"{'encoding':<26}{'messages/s':>14}{'KiB/s':>14}{'CPU (ms/s)':>18}")
+    run_benchmark('Per line JSON (before)', seconds, run_per_line_json)
+    run_benchmark('Coalesced JSON', seconds,
+                  lambda seconds: run_coalesced(seconds, encode_json))
+    run_benchmark('Coalesced binary', seconds,
+                  lambda seconds: run_coalesced(seconds, encode_binary))
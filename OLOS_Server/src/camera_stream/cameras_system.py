@@ -1,12 +1,15 @@
-import base64
+import queue
 import time
 import cv2
-from multiprocessing import Pipe, Process
+from multiprocessing import Event, Process
 
 import numpy as np
 
 from utils.configuration_loader import ConfigurationLoader
 from utils.camera_stream import CameraStream
+from utils.camera_streaming_controller import CameraStreamingController
+from utils.shared_frame_ring import SharedFrameRing
+from utils.stitching_calibration import StitchingCalibration
 from stitching import Stitcher
 from .constants import CameraConstants as constants
 
@@ -18,43 +21,81 @@ class CamerasSystem(Process):
         # shared objects dictionary with the core
         self.cameras_system_data = cameras_system_data
 
+        # ids of the last frames read from the cameras, the next frames are newer
+        self._frames_ids = []
+
+        # the cameras capture only while the event is set (a user watches the stream)
+        self._capture_event = Event()
+        # quality levels asked by the users, frames rate and resolution of the stream
+        self._streaming_controller = None
+        # the user asked to calibrate the cameras stitching again
+        self._is_calibration_requested = False
+
     def run(self):
         try:
             config = ConfigurationLoader.from_yaml()
+            # the asked quality levels are kept when the cameras reconnect
+            if self._streaming_controller is None:
+                self._streaming_controller = CameraStreamingController(
+                    config.get_dict('cameras_connection.streaming_settings'))
             # Disable OpenCL in OpenCV
             cv2.ocl.setUseOpenCL(False)
 
-            camera_pipes = []
+            frames_rings = []
             camera_streams = []
 
-            for index in config.cameras_connection.cameras_port_index:
-                first_end_pipe, second_end_pipe = Pipe()
-                camera_pipes.append(first_end_pipe)
+            # every camera captures its raw frames in its own shared frames ring
+            for camera_number, index in enumerate(config.cameras_connection.cameras_port_index):
+                frames_ring = SharedFrameRing(
+                    constants.RAW_FRAMES_SLOTS_NUMBER, constants.RAW_FRAME_SLOT_SIZE)
+                frames_rings.append(frames_ring)
+                camera_matrix, camera_coeffs = self._get_camera_calibration(config, camera_number)
                 camera_stream = CameraStream(
-                    index=index, pipe_end=second_end_pipe)
+                    index=index, frames_ring=frames_ring, camera_matrix=camera_matrix, camera_coeffs=camera_coeffs,
+                    capture_event=self._capture_event)
                 camera_streams.append(camera_stream)
                 camera_stream.start()
 
             # use stitching incase of multiple cameras
             if (len(camera_streams) > 1 and
                     config.cameras_connection.stitching_settings.stitching_enabled):
-                self._handle_cameras_using_stitching(camera_pipes, config)
+                self._handle_cameras_using_stitching(frames_rings, config)
             # incase of multiple cameras without stitching
             elif (len(camera_streams) > 1 and
                   not config.cameras_connection.stitching_settings.stitching_enabled):
-                self._handle_cameras_without_stitching(camera_pipes)
+                self._handle_cameras_without_stitching(frames_rings)
             # one camera
             elif len(camera_streams) == 1:
-                self._handle_one_camera(camera_pipes)
+                self._handle_one_camera(frames_rings)
 
         except Exception as Error:
             print("Error in the camera system", Error)
             for stream in camera_streams:
                 stream.terminate()
                 stream.join()
+            for frames_ring in frames_rings:
+                frames_ring.close()
             self._reconnect_cameras()
 
-    def _handle_cameras_using_stitching(self, camera_pipes, config):
+    '''
+    calibration (camera matrix, distortion coefficients) of the camera incase its frames are undistorted
+    by the camera stream, the calibration of the cameras is in the order of the cameras port index
+    '''
+    def _get_camera_calibration(self, config, camera_number):
+        calibration_settings = config.cameras_connection.stitching_settings.cameras_calibration_settings
+        if (not calibration_settings or not calibration_settings.undistortion_enabled or
+                camera_number >= len(calibration_settings.cameras_matrix or []) or
+                camera_number >= len(calibration_settings.cameras_coeffs or [])):
+            return None, None
+
+        return calibration_settings.cameras_matrix[camera_number], calibration_settings.cameras_coeffs[camera_number]
+
+    def _handle_cameras_using_stitching(self, frames_rings, config):
+        # compose the frames with the cached calibration instead of stitching every frame
+        if config.cameras_connection.stitching_settings.cached_calibration:
+            self._handle_cameras_using_stitching_calibration(frames_rings, config)
+            return
+
         algorithm_settings = config.get_dict(
             'cameras_connection.stitching_settings.algorithm_settings')
 
@@ -62,37 +103,24 @@ class CamerasSystem(Process):
             **algorithm_settings)
 
         while True:
-            frames = [pipe.recv() for pipe in camera_pipes]
+            self._wait_for_stream()
+            frames = self._read_frames(frames_rings)
 
             if not all(frame.any() for frame in frames):
                 print("Error: Could not read frames from cameras")
                 break
 
-            # calibrate frames
-            adjusted_frames = []
-
-            for i, frame in enumerate(frames):
-                adjusted_frame = cv2.undistort(frame,
-                                               np.array(
-                                                   config.cameras_connection.stitching_settings.cameras_calibration_settings.cameras_matrix[i]),
-                                               np.array(
-                                                   config.cameras_connection.stitching_settings.cameras_calibration_settings.cameras_coeffs[i]),
-                                               None,
-                                               np.array(config.cameras_connection.stitching_settings.cameras_calibration_settings.cameras_matrix[i]))
-                adjusted_frames.append(adjusted_frame)
-
             # Define the dimensions of the patterned strip
 
-            strip_width = adjusted_frames[0].shape[1]
+            strip_width = frames[0].shape[1]
 
             # Create the patterned strip
             patterned_strip = self._create_patterned_strip(
                 strip_width, config.cameras_connection.stitching_settings.frames_strip_height)
             # Combine the patterned strip with the frame
             frames_with_strip = [
-                np.concatenate((patterned_strip, frame, patterned_strip), axis=0) for frame in adjusted_frames]
+                np.concatenate((patterned_strip, frame, patterned_strip), axis=0) for frame in frames]
 
-            # convert the frame to string to send to the interface
             stitched_frame = stitcher.stitch(frames_with_strip)
             stitched_frame = stitched_frame[config.cameras_connection.stitching_settings.frames_strip_height:-
                                             config.cameras_connection.stitching_settings.frames_strip_height]
@@ -101,31 +129,135 @@ class CamerasSystem(Process):
                                             config.cameras_connection.stitching_settings.start_strip_width:
                                             config.cameras_connection.stitching_settings.end_strip_width]
 
-            frame_str = self._convert_frame_to_string(
-                stitched_frame)
+            self._publish_frame(stitched_frame)
+
+    '''
+    the cameras are calibrated once (the cached calibration is used incase it matches the cameras),
+    they are calibrated again only when the user asks for it or when the cameras moved
+    '''
+    def _handle_cameras_using_stitching_calibration(self, frames_rings, config):
+        stitching_settings = config.cameras_connection.stitching_settings
+        stitching_calibration = StitchingCalibration(
+            config.get_dict('cameras_connection.stitching_settings.algorithm_settings'),
+            config.get_dict('cameras_connection.stitching_settings.cameras_calibration_settings'))
+        drift_check_interval = stitching_settings.drift_check_interval or 0
+        drift_tolerance = stitching_settings.drift_tolerance or 0
+        drift_check_time = time.monotonic()
 
-            # add to the queue shared with the core
-            self._add_to_cameras_system_read_queue(frame_str)
-            time.sleep(constants.TIMEOUT)
-
-    def _handle_cameras_without_stitching(self, camera_pips):
         while True:
-            frames = [pipe.recv() for pipe in camera_pips]
+            self._wait_for_stream()
+            frames = self._read_frames(frames_rings)
+
+            if self._is_calibration_requested:
+                self._is_calibration_requested = False
+                print('Calibrating the cameras stitching...')
+                if stitching_calibration.calibrate(frames):
+                    stitching_calibration.save(constants.STITCHING_CALIBRATION_CACHE_PATH)
+                drift_check_time = time.monotonic()
+
+            elif not stitching_calibration.is_calibrated():
+                if not stitching_calibration.load(constants.STITCHING_CALIBRATION_CACHE_PATH, frames):
+                    if not stitching_calibration.calibrate(frames):
+                        print('Error: Could not calibrate the cameras stitching, retrying...')
+                        time.sleep(constants.CALIBRATION_RETRY_TIMEOUT)
+                        continue
+                    stitching_calibration.save(constants.STITCHING_CALIBRATION_CACHE_PATH)
+                drift_check_time = time.monotonic()
+
+            elif drift_check_interval and time.monotonic() - drift_check_time >= drift_check_interval:
+                if stitching_calibration.check_drift(frames, drift_tolerance):
+                    print('The cameras moved, the stitching is calibrated again')
+                    stitching_calibration.save(constants.STITCHING_CALIBRATION_CACHE_PATH)
+                drift_check_time = time.monotonic()
+
+            if stitching_calibration.is_calibrated():
+                self._publish_frame(stitching_calibration.compose(frames))
+
+    def _handle_cameras_without_stitching(self, frames_rings):
+        while True:
+            self._wait_for_stream()
+            frames = self._read_frames(frames_rings)
             frame = np.concatenate(frames, axis=1)
-            frame_str = self._convert_frame_to_string(frame)
+            self._publish_frame(frame)
 
-            # add to the queue shared with the core
-            self._add_to_cameras_system_read_queue(frame_str)
-            time.sleep(constants.TIMEOUT)
-
-    def _handle_one_camera(self, camera_pipes):
+    def _handle_one_camera(self, frames_rings):
+        while True:
+            self._wait_for_stream()
+            frame, = self._read_frames(frames_rings)
+            self._publish_frame(frame)
+
+    '''
+    handle the commands of the core and wait for the next frame of the stream (frames rate of the asked
+    quality levels), the cameras capture is paused while no user watches the stream
+    '''
+    def _wait_for_stream(self):
+        self._handle_cameras_commands()
+        while self._streaming_controller.is_paused():
+            self._capture_event.clear()
+            self._handle_cameras_commands(constants.PAUSE_WAIT_TIMEOUT)
+        self._capture_event.set()
+
+        # the frames rate and resolution are lower while a job is executed
+        self._streaming_controller.set_job_execution(self.cameras_system_data.is_job_execute_process)
+        time.sleep(self._streaming_controller.get_wait_time())
+
+    # the core forwards the quality levels asked by the users and the calibration requests
+    def _handle_cameras_commands(self, timeout=0):
         while True:
-            frame = camera_pipes[0].recv()
-            frame_str = self._convert_frame_to_string(frame)
+            try:
+                if timeout:
+                    type, data = self.cameras_system_data.cameras_write_queue.get(timeout=timeout)
+                else:
+                    type, data = self.cameras_system_data.cameras_write_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            # only the first command is waited for, the next commands are already in the queue
+            timeout = 0
+            if type == constants.CAMERAS_CALIBRATION_DATA_TYPE:
+                self._is_calibration_requested = True
+            elif type == constants.CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE:
+                self._streaming_controller.update_subscription(data.get('qualities'))
+
+    '''
+    wait for a new frame of every camera and return the frames captured together:
+    the latest frame of the camera with the oldest latest frame and the closest new frame of the other cameras
+    (every ring keeps the last frames of its camera), the stale frames are never read
+    '''
+    def _read_frames(self, frames_rings):
+        if len(self._frames_ids) != len(frames_rings):
+            self._frames_ids = [0] * len(frames_rings)
 
-            # add to the queue shared with the core
-            self._add_to_cameras_system_read_queue(frame_str)
-            time.sleep(constants.TIMEOUT)
+        while True:
+            # frames of every camera newer than its last used frame
+            cameras_frames_metadata = [
+                [frame_metadata for frame_metadata in frames_ring.get_frames_metadata()
+                 if frame_metadata['frame_id'] > frame_id]
+                for frames_ring, frame_id in zip(frames_rings, self._frames_ids)]
+
+            if all(cameras_frames_metadata):
+                frames_time = min(frames_metadata[-1]['time'] for frames_metadata in cameras_frames_metadata)
+                paired_frames_metadata = [
+                    min(frames_metadata, key=lambda frame_metadata: abs(frame_metadata['time'] - frames_time))
+                    for frames_metadata in cameras_frames_metadata]
+                frames = [self._read_frame(frames_ring, frame_metadata)
+                          for frames_ring, frame_metadata in zip(frames_rings, paired_frames_metadata)]
+
+                # a frame was overwritten while it was read, the newer frames are paired again
+                if all(frame is not None for frame in frames):
+                    self._frames_ids = [frame_metadata['frame_id'] for frame_metadata in paired_frames_metadata]
+                    return frames
+
+            time.sleep(constants.FRAME_WAIT_TIMEOUT)
+
+    # copy of the raw frame (height x width x channels), None incase it is overwritten
+    def _read_frame(self, frames_ring, frame_metadata):
+        frame_content = frames_ring.read(frame_metadata['frame_id'])
+        if frame_content is None:
+            return None
+
+        width, height = frame_metadata['width'], frame_metadata['height']
+        return np.frombuffer(frame_content, dtype=np.uint8).reshape(height, width, -1)
 
     def _create_patterned_strip(self, width, height, direction='left', dot_size=3, dot_spacing=10, ):
         strip = np.ones((height, width), dtype=np.uint8) * \
@@ -141,19 +273,34 @@ class CamerasSystem(Process):
 
         return strip
 
-    def _convert_frame_to_string(self, frame):
-
-        # Convert frame to JPEG format
-        _, buffer = cv2.imencode('.jpg', frame)
-        # Convert the frame to base64 string
-        frame_str = base64.b64encode(buffer).decode('utf-8')
-
-        return frame_str
-
-    # add new message to the serial read queue
+    '''
+    the frame is encoded for every asked quality level and written in the shared frames ring, only the
+    metadata is sent to the core, the frames of the same frame are written together (group) and the
+    websocket connector skips them once a newer group is written
+    '''
+    def _publish_frame(self, frame):
+        frames_ring = self.cameras_system_data.frames_ring
+        frames_metadata = []
+        for quality, buffer, width, height in self._streaming_controller.encode_frame(frame):
+            frame_metadata = frames_ring.write(buffer, width, height)
+            if frame_metadata is None:
+                print('Error: the camera frame is bigger than the frames ring slot')
+                continue
+            frames_metadata.append({**frame_metadata, 'quality': quality})
+
+        # the group is the last frame written, the frames too big for a slot are not written
+        if not frames_metadata:
+            return
+        group_frame_id = frames_metadata[-1]['frame_id']
+
+        for frame_metadata in frames_metadata:
+            # add to the queue shared with the core
+            self._add_to_cameras_system_read_queue({**frame_metadata, 'group_frame_id': group_frame_id})
 
-    def _add_to_cameras_system_read_queue(self, frame):
-        self.cameras_system_data.cameras_read_queue.put(frame)
+    # add the new frame metadata to the cameras read queue
+    def _add_to_cameras_system_read_queue(self, frame_metadata):
+        self.cameras_system_data.cameras_read_queue.put(
+            constants.CAMERAS_FRAME_DATA_TYPE, constants.FRAME_PRIORITY, frame_metadata)
 
     def _reconnect_cameras(self):
         print('Trying to connect to cameras...')
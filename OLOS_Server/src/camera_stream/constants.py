@@ -1,2 +1,27 @@
+import os
+
+
 class CameraConstants:
-    TIMEOUT = 0.01
+    # max wait for a command of the core while the stream is paused (no user watches it)
+    PAUSE_WAIT_TIMEOUT = 0.5
+
+    # raw frames of every camera: triple buffer, the slots fit a 4k frame (3 bytes per pixel)
+    # the shared memory pages of the slots are used only when the frames are written in them
+    RAW_FRAMES_SLOTS_NUMBER = 3
+    RAW_FRAME_SLOT_SIZE = 3840 * 2160 * 3
+    # wait between the checks for new frames of the cameras
+    FRAME_WAIT_TIMEOUT = 0.002
+
+    # the metadata of the frames written in the shared frames ring
+    CAMERAS_FRAME_DATA_TYPE = 'CAMERAS_FRAME'
+    FRAME_PRIORITY = 1
+
+    # the cameras are recalibrated when the core sends this command in the cameras write queue
+    CAMERAS_CALIBRATION_DATA_TYPE = 'CAMERAS_CALIBRATION'
+    # quality levels of the stream asked by the users, forwarded by the core
+    CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE = 'CAMERAS_STREAM_SUBSCRIPTION'
+    # the stitching calibration of the cameras is cached next to the configuration file
+    STITCHING_CALIBRATION_CACHE_PATH = os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), '..', '..', 'stitching_calibration.npz')
+    # wait before calibrating again with the next frames incase the frames cannot be matched
+    CALIBRATION_RETRY_TIMEOUT = 5
@@ -22,10 +22,42 @@ class CoreConstants:
     CAMERAS_SYSTEM_STREAM_DATA_TYPE = 'CAMERAS_STREAM'
     JOYSTICK_STATUS_DATA_TYPE = 'JOYSTICK_STATUS'
     USB_STORAGE_MONITOR_DATA_TYPE = 'USB_STORAGE_MONITOR'
+    STREAMING_STATISTICS_DATA_TYPE = 'STREAMING_STATISTICS'
+    # the user asks to calibrate the stitching of the cameras again
+    CAMERAS_CALIBRATION_DATA_TYPE = 'CAMERAS_CALIBRATION'
+    # quality levels of the cameras stream asked by the users, sent by the websocket connector
+    CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE = 'CAMERAS_STREAM_SUBSCRIPTION'
+    # sent by the websocket connector when a new user connects
+    USER_CONNECTED_DATA_TYPE = 'USER_CONNECTED'
+
+    # Data types sent from the machine connector
+    JOB_PROGRESS_DATA_TYPE = 'JOB_PROGRESS'
+    JOB_FINISHED_DATA_TYPE = 'JOB_FINISHED'
 
     NEW_LINE = '\n'
 
     TIMEOUT = 0.01  # 10 ms
+    # max time to wait for a new message in the queues before checking the processes
+    QUEUE_WAIT_TIMEOUT = 0.5
+
+    # max messages per second of the machine status fields (machine_status_rates in config.yaml)
+    # the other fields (state, overrides, tool...) are sent as soon as they change
+    DEFAULT_MACHINE_STATUS_RATES = {
+        'machine_position': 20,
+        'work_position': 20,
+        'feed_and_speed': 10,
+        'buffer_state': 5,
+        'line_number': 5
+    }
+
+    # save the checkpoint of the running job every 5 seconds
+    JOB_CHECKPOINT_INTERVAL = 5
+    JOB_CHECKPOINT_FILE_EXTENSION = '.checkpoint'
+    # lines acknowledged by the controller but still waiting inside its planner buffer,
+    # they are lost on stop/power loss so the job resumes before them
+    GRBL_PLANNER_BUFFER_LINES = 15
+    # move the z axis to the top before moving to the resume position
+    GRBL_COMMAND_SAFE_Z = 'G53 G0 Z0'
 
     # make sure the joystick change its position to more than 500 ms to prevent any error movements
     JOYSTICK_STATUS_INTERVAL = 0.2
@@ -73,6 +105,8 @@ class CoreConstants:
 
     REAL_TIME_COMMANDS = [GRBL_COMMAND_PAUSE, GRBL_COMMAND_RESUME,
                           GRBL_COMMAND_STOP, GRBL_COMMAND_STATUS]
+    # the overrides (feed rate, rapids, spindle / laser power...) are single bytes from 0x80
+    REAL_TIME_COMMAND_MIN_BYTE = 0x80
 
     # GRBL status
     GBRL_PAUSE_STATUS = 'Hold'
@@ -93,6 +127,7 @@ class CoreConstants:
     GENERATE_JOB_PROCESS = "Generate"
     CANCEL_GENERATE_JOB_PROCESS = "Cancel"
     UPLOAD_USB_JOB_FILE_PROCESS = "Upload_USB_Job_File"
+    RESUME_JOB_PROCESS = "Resume"
 
     # images manager processes
     UPLOAD_IMAGE_PROCESS = "Upload"
@@ -119,8 +154,6 @@ class CoreConstants:
     MATERIAL_NAME_SEARCH_KEYWORD = ";Material Name: "
     MATERIAL_THICKNESS_SEARCH_KEYWORD = ";Material Thickness: "
 
-    BOUNDING_DIMENSION = 20
-
     AI_MODELS = {
         "openvino": [
             'rupeshs--sd-turbo-openvino',
@@ -147,3 +180,5 @@ class CoreConstants:
     IMAGE_GENERATOR_ENGRAVE_PROCESS = 'Engrave'
     IMAGE_GENERATOR_MARK_PROCESS = 'Mark'
     IMAGE_GENERATOR_CUT_PROCESS = 'Cut'
+    # gcode of an image written by a generator worker process
+    IMAGE_GENERATOR_FRAGMENT_FILE_EXTENSION = '.gcode'
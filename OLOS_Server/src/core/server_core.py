@@ -1,7 +1,7 @@
 import json
+import queue
 import tempfile
 import threading
-import time
 from files_manager.jobs_manager import JobsManager
 from machine_connection.machine_connector import MachineConnector
 from fastapi_server.main import FastApiServer
@@ -16,6 +16,8 @@ from utils.job_manager_helper import JobsManagerHelper
 from utils.configuration_loader import ConfigurationLoader
 # from utils.joystick_handler import JoystickHandler
 from utils.job_execution_timer import JobExecutionTimer
+from utils.job_checkpoint import JobCheckpoint
+from utils.machine_status_publisher import MachineStatusPublisher
 from utils.websocket_json_data import WebsocketJsonData
 from utils.shared_data import SharedCamerasSystemData, SharedFastApiData, SharedMachineData, SharedWebsocketData
 from websocket_connection.websocket_connector import WebSocketConnector
@@ -46,7 +48,7 @@ class ServerCore:
         self.machine_connector = MachineConnector(
             self.machine_connector_shared_data)
         self.websocket_connector = WebSocketConnector(
-            self.websocket_connector_shared_data)
+            self.websocket_connector_shared_data, self.cameras_system_shared_data.frames_ring)
         self.fastapi_server = FastApiServer(self.fastapi_server_shared_data)
         self.cameras_system = CamerasSystem(self.cameras_system_shared_data)
 
@@ -75,6 +77,8 @@ class ServerCore:
             self.jobs_manager, self.images_manager, self.websocket_connector_shared_data.websocket_write_queue)
 
         self.job_execution_timer = JobExecutionTimer()
+        # save the progress of the running job to resume it later
+        self.job_checkpoint = JobCheckpoint()
 
         '''
         flags to check if the process is job execution and
@@ -85,6 +89,13 @@ class ServerCore:
 
         self._is_job_execute_process = False
 
+        # id of the job streamed by the machine connector
+        self._job_id = 0
+
+        # send only the changed fields of the machine status to the users
+        self.machine_status_publisher = MachineStatusPublisher(
+            {**constants.DEFAULT_MACHINE_STATUS_RATES, **(self._config.get_dict('machine_status_rates') or {})})
+
     def start(self):
         try:
             print("Server is running...")
@@ -123,11 +134,6 @@ class ServerCore:
                     target=self.run_cameras_handler)
                 cameras_thread.start()
 
-            # job execution
-            job_execution_thread = threading.Thread(
-                target=self.run_job_execution_handler)
-            job_execution_thread.start()
-
             # start usb monitor
             self.usb_storage_monitor.start()
 
@@ -136,7 +142,6 @@ class ServerCore:
             websocket_thread.join()
             rest_api_thread.join()
             cameras_thread.join()
-            job_execution_thread.join()
 
         except Exception as e:
             print("Server core error:", e)
@@ -160,12 +165,19 @@ class ServerCore:
                 self.cameras_system.terminate()
                 self.cameras_system.join()
 
+            # release the shared memory used by the processes
+            self.machine_connector_shared_data.close()
+            self.websocket_connector_shared_data.close()
+            self.cameras_system_shared_data.close()
+
+    '''
+    every handler waits on its queue until a message is available (instead of polling it),
+    the wait is limited to check periodically if the process is still alive
+    '''
+
     def run_websocket_handler(self):
         while self.websocket_connector.is_alive():
             self.handle_incoming_websocket_messages()
-            # delay if it is not job execution process
-            if not self._is_job_execute_process:
-                time.sleep(constants.TIMEOUT)
 
     def run_machine_data_handler(self):
         # check if the tool changer is enabled from the configuration settings
@@ -177,26 +189,14 @@ class ServerCore:
 
         while self.machine_connector.is_alive():
             self.handle_incoming_machine_data()
-            # delay if it is not job execution process
-            if not self._is_job_execute_process:
-                time.sleep(constants.TIMEOUT)
-
-    def run_job_execution_handler(self):
-        while self.machine_connector.is_alive() and self.websocket_connector.is_alive():
-            self.handle_job_execution()
-            # delay if it is not job execution process
-            if not self._is_job_execute_process:
-                time.sleep(constants.TIMEOUT)
 
     def run_cameras_handler(self):
         while self.cameras_system.is_alive():
             self.handle_cameras_system()
-            time.sleep(constants.TIMEOUT)
 
     def run_rest_api_handler(self):
         while self.fastapi_server.is_alive():
             self.handle_rest_api_calls()
-            time.sleep(constants.TIMEOUT)
 
     def create_init_server_tmp_file(self):
         # Get the system's temporary directory
@@ -229,11 +229,14 @@ class ServerCore:
 
     def handle_incoming_websocket_messages(self):
         # add data coming from user interface to serial write queue
-        if not self.websocket_connector_shared_data.websocket_read_queue.empty():
-            type, data = self.websocket_connector_shared_data.websocket_read_queue.get()
+        try:
+            type, data = self.websocket_connector_shared_data.websocket_read_queue.get(
+                timeout=constants.QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            return
 
-            # handle different type of data sent from user
-            self.analyze_websocket_messages(type, data)
+        # handle different type of data sent from user
+        self.analyze_websocket_messages(type, data)
 
     def analyze_websocket_messages(self, type, data):
         # handle data send to serial
@@ -244,6 +247,11 @@ class ServerCore:
             self.handle_normal_commands(command)
         elif constants.SERIAL_COMMAND_DATA_TYPE == type:
             self.handle_serial_commands(type, command)
+        elif constants.USER_CONNECTED_DATA_TYPE == type:
+            self.send_machine_status_snapshot()
+        elif (constants.CAMERAS_CALIBRATION_DATA_TYPE == type or
+              constants.CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE == type):
+            self.send_to_cameras_system(type, data)
 
     # handle real time commands
 
@@ -310,7 +318,14 @@ class ServerCore:
     # handle commands user want to send to serial
 
     def handle_serial_commands(self, type, command):
-        if command in constants.REAL_TIME_COMMANDS:
+        # ignore the malformed messages, they would stop the websocket handler or the machine connector
+        if not isinstance(command, str):
+            if os.getenv('ENV') == 'development':
+                print('Serial Command Error: the command is not a text', command)
+            return
+
+        if (command in constants.REAL_TIME_COMMANDS or
+                (len(command) == 1 and ord(command) >= constants.REAL_TIME_COMMAND_MIN_BYTE)):
             self.handle_real_time_commands(command)
         # rest of commands
         # add them to serial write and websocket queues
@@ -325,9 +340,13 @@ class ServerCore:
                                                  res)
 
     def handle_rest_api_calls(self):
-        if not self.fastapi_server_shared_data.fastapi_read_queue.empty():
-            type, data = self.fastapi_server_shared_data.fastapi_read_queue.get()
-            self.analyze_fastapi_requests(type, data)
+        try:
+            type, data = self.fastapi_server_shared_data.fastapi_read_queue.get(
+                timeout=constants.QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            return
+
+        self.analyze_fastapi_requests(type, data)
 
     def analyze_fastapi_requests(self, type, data):
         if type == constants.JOBS_MANAGER_DATA_TYPE:
@@ -345,11 +364,14 @@ class ServerCore:
             process = data.get("process")
             # Flag to check if the data need to be distributed to all the client connected to the server
             is_distributed_info = False
+            # Flag to send the opened file content only when it could be changed
+            is_file_content_changed = False
             # handle uploading file
             if constants.UPLOAD_JOB_PROCESS == process:
                 filename = data.get("filename")
                 file_content = data.get("file_content")
                 is_distributed_info = True
+                is_file_content_changed = True
 
                 response = self.jobs_manager_helper.handle_upload_file(
                     filename, file_content)
@@ -361,6 +383,7 @@ class ServerCore:
             elif constants.OPEN_JOB_PROCESS == process:
                 filename = data.get("filename")
                 is_distributed_info = True
+                is_file_content_changed = True
 
                 response = self.jobs_manager_helper.handle_open_file(filename)
 
@@ -375,6 +398,25 @@ class ServerCore:
                 self.set_job_execution_flags()
                 is_distributed_info = True
 
+                # the machine connector streams the file and sends back the job progress
+                self.start_job_execution()
+
+                self.fastapi_server_shared_data.fastapi_write_queue.put(
+                    response)
+
+            # handle resume file from the checkpoint or from specific line
+            elif constants.RESUME_JOB_PROCESS == process:
+                line = data.get("line")
+                response, resume_data = self.jobs_manager_helper.handle_resume_file(
+                    line, self.machine_connector, self.job_execution_timer)
+                self.set_job_execution_flags()
+                is_distributed_info = True
+
+                self.start_job_execution(resume_data.get('start_line'),
+                                         resume_data.get('modal_state'),
+                                         resume_data.get('preamble'),
+                                         resume_data.get('stream_start_line'))
+
                 self.fastapi_server_shared_data.fastapi_write_queue.put(
                     response)
 
@@ -440,6 +482,7 @@ class ServerCore:
             elif constants.UPLOAD_USB_JOB_FILE_PROCESS == process:
                 file_path = data.get("file_path")
                 is_distributed_info = True
+                is_file_content_changed = True
 
                 response = self.jobs_manager_helper.handle_copy_file_to_system(
                     file_path)
@@ -462,52 +505,54 @@ class ServerCore:
         finally:
             if is_distributed_info:
                 # update the status of the file manager to all connected clients
-                self.distribute_job_manager_message_to_all_clients()
+                self.distribute_job_manager_message_to_all_clients(
+                    is_file_content_changed)
 
-    def handle_job_execution(self):
-        '''
-        incase the user is starting a file, execute a single line in every loop
-        to make sure always checking the status of the machine after executing the command
-        Also, when the machine is ready to receive new command
-        to prevent sending all the commands at once and fill the machine
-        buffer to max
-        '''
-        if (self._is_job_execute_process and
-                self.machine_connector.is_machine_ready()):
+    # the preamble can end with the resumed line (arc block), the streaming starts after it
+    def start_job_execution(self, start_line=1, modal_state=None, preamble=None, stream_start_line=None):
+        opened_filename = self.jobs_manager.get_open_filename()
+        if opened_filename:
+            file_path = self.jobs_manager.get_file_path(opened_filename)
+
+            self._job_id += 1
+            self.job_checkpoint.start(file_path, start_line, modal_state)
+            # the machine connector maps the same job file and its lines index
+            self.machine_connector.start_job_streaming(
+                self._job_id, file_path, stream_start_line or start_line, preamble)
 
-            self.execute_line()
+        else:
+            self.reset_job_execution_flags()
 
-    # this function will execute the next line in the executed file
-    def execute_line(self):
-        # get the next command in the file
-        line = self.jobs_manager.get_next_line()
+    # show the progress of the executed job to the user
+    def handle_job_progress(self, job_progress):
+        file_timer = self.job_execution_timer.get_elapsed_time()
+        # the websocket connector encodes the progress for every user (binary or json)
+        res = WebsocketJsonData.parse_job_progress(job_progress, file_timer)
 
-        # The system did not finish executing the file
-        if line is not None:
-            # check if the command is already a tool changing command
-            self.is_tool_changing_command(line)
+        self.job_checkpoint.update(
+            job_progress.get('acknowledged_index'), file_timer)
 
-            self.send_to_machine_serial(constants.SERIAL_COMMAND_DATA_TYPE,
-                                        constants.LOW_PRIORITY_COMMAND,
-                                        line)
+        self.send_to_interface_via_websocket(constants.JOB_EXECUTION_DATA_TYPE,
+                                             constants.MIDDLE_PRIORITY_COMMAND,
+                                             res)
 
-            # Add the command that is sent to machine to websocket, so that it will be shown to user being executed
-            line_index = self.jobs_manager.get_line_index()
-            total_lines = self.jobs_manager.get_total_lines()
-            file_timer = self.job_execution_timer.get_elapsed_time()
-            res = WebsocketJsonData.parse_job_execution_command_to_json(
-                line, line_index, total_lines, file_timer)
+    # the machine connector finished streaming the file or the job is stopped
+    def handle_job_finished(self, job_result):
+        # the job is completed only when the controller executed all its lines without errors or alarms
+        is_completed = bool(job_result.get('is_completed') and
+                            not job_result.get('errors_number'))
+        if is_completed:
+            self.handle_job_progress(job_result)
 
-            self.send_to_interface_via_websocket(constants.JOB_EXECUTION_DATA_TYPE,
-                                                 constants.MIDDLE_PRIORITY_COMMAND,
-                                                 res)
+        # remove the checkpoint of the completed job or save where the job stopped (before its first rejected line)
+        self.job_checkpoint.finish(is_completed,
+                                   job_result.get('acknowledged_index'),
+                                   job_result.get('error_index'))
 
-        # no remaining lines
-        else:
-            # reset
-            self.reset_job_execution_flags()
-            self.machine_connector.reset_counter()
-            self.job_execution_timer.stop()
+        # reset
+        self.reset_job_execution_flags()
+        self.jobs_manager.reset_line_index()
+        self.job_execution_timer.stop()
 
     # handle requests sent from user related to images management system
     def handle_images_management_requests(self, data):
@@ -687,77 +732,122 @@ class ServerCore:
             self.fastapi_server_shared_data.fastapi_write_queue.put(response)
 
     # This function will update the status of the file manager to all connected clients
-    def distribute_job_manager_message_to_all_clients(self):
+    # the file content is sent only when it could be changed, otherwise the clients keep their copy
+    def distribute_job_manager_message_to_all_clients(self, is_file_content_changed=False):
         opened_filename = self.jobs_manager.get_open_filename()
         files_list = self.jobs_manager.get_files_list()
-        file_content = self.jobs_manager.get_opened_file_content()
+        file_content = self.jobs_manager.get_opened_file_content() \
+            if is_file_content_changed else None
         res = WebsocketJsonData.parse_file_manager_message_to_json(
             opened_filename, file_content, files_list)
         self.send_to_interface_via_websocket(
             constants.JOBS_MANAGER_DATA_TYPE, constants.LOW_PRIORITY_COMMAND, res)
 
     def handle_incoming_machine_data(self):
-        # The serial read queue is not empty
-        if not self.machine_connector_shared_data.serial_read_queue.empty():
-            type, data = self.machine_connector_shared_data.serial_read_queue.get()
-
-            # initial json data
-            res = json.dumps({})
-
-            if type == constants.MACHINE_STATUS_DATA_TYPE:
-                res = WebsocketJsonData.parse_grbl_status_to_json(data)
-
-            elif type == constants.SERIAL_COMMAND_DATA_TYPE:
-                res = WebsocketJsonData.parse_serial_command_to_json(data)
-
-            elif type == constants.MACHINE_CONNECTION_DATA_TYPE:
-                res = WebsocketJsonData.parse_connection_status_to_json(
-                    data)
-
-            # elif type == constants.JOYSTICK_STATUS_DATA_TYPE:
-            #     res = WebsocketJsonData.parse_joystick_status_to_json(data)
+        # wait for the next message from the machine
+        try:
+            type, data = self.machine_connector_shared_data.serial_read_queue.get(
+                timeout=constants.QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            # send the status fields held back by their rate
+            self.send_machine_status(self.machine_status_publisher.flush())
+            return
+
+        # initial json data
+        res = json.dumps({})
+
+        if type in (constants.JOB_PROGRESS_DATA_TYPE, constants.JOB_FINISHED_DATA_TYPE):
+            # ignore the events of a previous job
+            if data.get('job_id') == self._job_id:
+                if type == constants.JOB_PROGRESS_DATA_TYPE:
+                    self.handle_job_progress(data)
+                else:
+                    self.handle_job_finished(data)
+            return
+
+        elif type == constants.MACHINE_STATUS_DATA_TYPE:
+            res = self.handle_machine_status(data)
+
+        elif type == constants.SERIAL_COMMAND_DATA_TYPE:
+            res = WebsocketJsonData.parse_serial_command_to_json(data)
+
+        elif type == constants.MACHINE_CONNECTION_DATA_TYPE:
+            # the users reset their status on connection change, send all the fields again
+            self.machine_status_publisher.reset()
+            res = WebsocketJsonData.parse_connection_status_to_json(
+                data)
+
+        elif type == constants.STREAMING_STATISTICS_DATA_TYPE:
+            if os.getenv('ENV') == 'development':
+                print("Job streaming statistics:", data)
+            res = WebsocketJsonData.parse_streaming_statistics_to_json(
+                data)
+
+        # elif type == constants.JOYSTICK_STATUS_DATA_TYPE:
+        #     res = WebsocketJsonData.parse_joystick_status_to_json(data)
+
+        if res:
+            self.send_to_interface_via_websocket(
+                type,
+                constants.MIDDLE_PRIORITY_COMMAND,
+                res)
+
+    # the websocket connector encodes the status for every user (binary or json)
+    def handle_machine_status(self, report):
+        return self.machine_status_publisher.update(report)
+
+    def send_machine_status(self, machine_status):
+        if machine_status:
+            self.send_to_interface_via_websocket(constants.MACHINE_STATUS_DATA_TYPE,
+                                                 constants.MIDDLE_PRIORITY_COMMAND,
+                                                 machine_status)
 
-            if res:
-                self.send_to_interface_via_websocket(
-                    type,
-                    constants.MIDDLE_PRIORITY_COMMAND,
-                    res)
+    # the new user gets all the fields of the machine status
+    def send_machine_status_snapshot(self):
+        self.send_machine_status(self.machine_status_publisher.get_snapshot())
 
+    # the frame stays in the shared frames ring, the core sends only its metadata
+    # and the websocket connector reads the frame content once for all the users
     def handle_cameras_system(self):
-        if not self.cameras_system_shared_data.cameras_read_queue.empty():
-            cameras_frame = self.cameras_system_shared_data.cameras_read_queue.get()
-
-            res = WebsocketJsonData.parse_cameras_frame_to_json(
-                cameras_frame)
+        try:
+            _, frame_metadata = self.cameras_system_shared_data.cameras_read_queue.get(
+                timeout=constants.QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            return
 
-            self.send_to_interface_via_websocket(constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE,
-                                                 constants.MIDDLE_PRIORITY_COMMAND,
-                                                 res)
+        self.send_to_interface_via_websocket(constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE,
+                                             constants.MIDDLE_PRIORITY_COMMAND,
+                                             frame_metadata)
 
     def send_to_machine_serial(self, type, priority, data):
         self.machine_connector.add_to_serial_write_queue(type,
                                                          priority,
                                                          data)
 
+    # the cameras system reads the commands only while it is running
+    def send_to_cameras_system(self, type, data):
+        if self.cameras_system.is_alive():
+            self.cameras_system_shared_data.cameras_write_queue.put((type, data))
+
     def send_to_interface_via_websocket(self, type, priority, data):
         self.websocket_connector.add_to_websocket_write_queue(
             type, priority, data)
 
     def reset_the_core_system(self):
         self.reset_job_execution_flags()
+        # stop streaming the job file
+        self.machine_connector.stop_job_streaming()
         # reset the line index to the begging of the file
         self.jobs_manager.reset_line_index()
 
-    def is_tool_changing_command(self, command):
-        if constants.GRBL_TOOL_CHANGE in command:
-            self.machine_connector_shared_data.is_tool_change_process = True
-
     def set_job_execution_flags(self):
         self._is_job_execute_process = True
         self.machine_connector_shared_data.is_job_execute_process = True
         self.websocket_connector_shared_data.is_job_execute_process = True
+        self.cameras_system_shared_data.is_job_execute_process = True
 
     def reset_job_execution_flags(self):
         self._is_job_execute_process = False
         self.machine_connector_shared_data.is_job_execute_process = False
         self.websocket_connector_shared_data.is_job_execute_process = False
+        self.cameras_system_shared_data.is_job_execute_process = False
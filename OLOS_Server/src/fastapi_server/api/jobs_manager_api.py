@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 from fastapi import APIRouter, Form, UploadFile, HTTPException, File, Request
 from fastapi.responses import JSONResponse, FileResponse
 
@@ -118,6 +119,20 @@ def start_job(request: Request):
         raise HTTPException(status_code=500, detail=str(error))
 
 
+# resume the opened job from the saved checkpoint, or from specific line
+@router.post("/resume", response_model=JobsManagerResponse)
+def resume_job(request: Request, line: Optional[int] = None):
+    try:
+        shared_core_data = request.app.shared_core_data
+        core_response = JobsManagerService.resume_file(
+            shared_core_data, line)
+
+        return JSONResponse(content=core_response, status_code=200)
+
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
 @router.get("/check", response_model=JobsManagerResponse)
 def check_opened_job(request: Request):
     try:
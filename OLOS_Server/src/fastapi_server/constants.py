@@ -26,6 +26,7 @@ class FastAPIServerConstants:
     GENERATE_JOB_PROCESS = "Generate"
     CANCEL_GENERATE_JOB_PROCESS = "Cancel"
     UPLOAD_USB_JOB_FILE_PROCESS = "Upload_USB_Job_File"
+    RESUME_JOB_PROCESS = "Resume"
 
     ERROR_UPLOAD_JOB_PROCESS = "Problem ocurred while uploading the job process"
     ERROR_OPEN_JOB_PROCESS = "Problem ocurred while opening the job process"
@@ -37,6 +38,7 @@ class FastAPIServerConstants:
     ERROR_GENERATE_JOB_PROCESS = "Problem ocurred while generating gcode job process"
     ERROR_CANCEL_GENERATE_JOB_PROCESS = "Problem ocurred while canceling generating a job process"
     ERROR_UPLOAD_USB_JOB_FILE_PROCESS = "Problem ocurred while uploading job from usb process"
+    ERROR_RESUME_JOB_PROCESS = "Problem ocurred while resuming the job process"
 
     # images manager processes
     UPLOAD_IMAGE_PROCESS = "Upload"
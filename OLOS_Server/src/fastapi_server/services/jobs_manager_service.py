@@ -63,6 +63,17 @@ class JobsManagerService:
         response = shared_core_data.fastapi_write_queue.get()
         return cls._check_response(response, constants.ERROR_START_JOB_PROCESS)
 
+    @classmethod
+    def resume_file(cls, shared_core_data, line):
+        shared_core_data.fastapi_read_queue.put(
+            [constants.JOBS_MANAGER_DATA_TYPE,
+                {
+                    'process': constants.RESUME_JOB_PROCESS,
+                    'line': line,
+                }])
+        response = shared_core_data.fastapi_write_queue.get()
+        return cls._check_response(response, constants.ERROR_RESUME_JOB_PROCESS)
+
     @classmethod
     def upload_file(cls, shared_core_data, file):
         shared_core_data.fastapi_read_queue.put(
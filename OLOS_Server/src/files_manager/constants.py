@@ -8,6 +8,9 @@ class FilesManagerConstants:
         os.path.abspath(__file__)), 'jobs_stored_files')
     IMAGES_BASE_DIR = os.path.join(os.path.dirname(
         os.path.abspath(__file__)), 'images_stored_files')
+    # gcode generated for every image and operation, reused while the image does not change
+    GCODE_CACHE_DIR = os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), 'gcode_cache_files')
 
     GCODE_FILE_EXTENSIONS = (".nc", ".cnc", "gcode")
     IMAGE_FILES_EXTENSIONS = {
@@ -25,3 +28,24 @@ class FilesManagerConstants:
 
     # file limit size in bytes, in this case 50MB;
     MAX_FILE_SIZE = 50 * BYTES_TO_MEGABYTES
+
+    # cached gcode fragments (<key>.gcode), the version changes when the generated gcode changes
+    GCODE_CACHE_FILE_EXTENSION = '.gcode'
+    GCODE_CACHE_VERSION = 2
+
+    # number of lines written at once while the generated gcode is written in the job file
+    WRITE_LINES_BATCH_SIZE = 10000
+
+    # line offsets index saved beside every job file (<job file>.idx)
+    JOB_INDEX_FILE_EXTENSION = '.idx'
+    JOB_INDEX_MAGIC = b'OLIX'
+    JOB_INDEX_VERSION = 1
+    # size of the chunks read from the job file while building the index
+    JOB_INDEX_CHUNK_SIZE = 16 * BYTES_TO_MEGABYTES
+
+    # estimated time of every line saved beside every job file (<job file>.estimate)
+    JOB_ESTIMATE_FILE_EXTENSION = '.estimate'
+    JOB_ESTIMATE_MAGIC = b'OLET'
+    JOB_ESTIMATE_VERSION = 1
+    # number of lines parsed at once while estimating the job time
+    JOB_ESTIMATE_BLOCK_LINES = 65536
@@ -0,0 +1,207 @@
+import mmap
+import os
+import re
+import struct
+import numpy as np
+from .constants import FilesManagerConstants as constants
+
+'''
+Read only view of a gcode job file, the file is memory mapped instead of being loaded into memory
+and the start offset of every line is saved in an index file beside the job file (<job file>.idx)
+the index is built once when the job file is written (upload, generate, usb copy)
+and rebuilt only incase the job file changed after that
+
+- get_line(line_number) reads any line directly without reading the lines before it
+- iter_lines() goes through the lines as slices of the mapped file without copying them
+- the lines numbers start from 1 like the job progress line index
+'''
+
+
+class JobFile:
+    # magic, version, job file size, job file modification time, total lines
+    INDEX_HEADER_FORMAT = '<4sIQQQ'
+    INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FORMAT)
+    INDEX_OFFSET_TYPE = np.dtype('<u8')
+
+    # number of offsets converted to python integers at once while iterating the lines
+    ITERATION_BLOCK_SIZE = 4096
+
+    def __init__(self, file_path):
+        self._file_path = file_path
+        self._file = open(file_path, 'rb')
+
+        file_stat = os.fstat(self._file.fileno())
+        # empty files can not be mapped
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if file_stat.st_size else None
+
+        # offsets[n - 1] is the start of line n, the last offset is the end of the file
+        self._line_offsets = self.load_index(file_path, file_stat)
+        if self._line_offsets is None:
+            self._line_offsets = self.build_index(file_path)
+
+        self._total_lines = len(self._line_offsets) - 1
+
+    @classmethod
+    def get_index_path(cls, file_path):
+        return file_path + constants.JOB_INDEX_FILE_EXTENSION
+
+    # find the start of every line and save them in the index file
+    @classmethod
+    def build_index(cls, file_path):
+        offsets = [np.zeros(1, dtype=cls.INDEX_OFFSET_TYPE)]
+        position = 0
+        is_ending_with_newline = True
+
+        with open(file_path, 'rb') as job_file:
+            file_stat = os.fstat(job_file.fileno())
+
+            while True:
+                chunk = job_file.read(constants.JOB_INDEX_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                # every line starts after a new line character
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord('\n'))
+                offsets.append(newlines.astype(cls.INDEX_OFFSET_TYPE) + (position + 1))
+
+                position += len(chunk)
+                is_ending_with_newline = chunk.endswith(b'\n')
+
+        # the last line does not end with a new line
+        if not is_ending_with_newline:
+            offsets.append(np.array([position + 1], dtype=cls.INDEX_OFFSET_TYPE))
+
+        line_offsets = np.concatenate(offsets)
+
+        try:
+            # write the index in a temporary file first to not leave a broken index behind
+            index_path = cls.get_index_path(file_path)
+            temporary_index_path = index_path + '.tmp'
+            with open(temporary_index_path, 'wb') as index_file:
+                index_file.write(struct.pack(cls.INDEX_HEADER_FORMAT,
+                                             constants.JOB_INDEX_MAGIC,
+                                             constants.JOB_INDEX_VERSION,
+                                             file_stat.st_size,
+                                             file_stat.st_mtime_ns,
+                                             len(line_offsets) - 1))
+                line_offsets.tofile(index_file)
+            os.replace(temporary_index_path, index_path)
+
+        # the index is still usable from the memory
+        except OSError as error:
+            if os.getenv('ENV') == 'development':
+                print('Job File Index Error:', error)
+
+        return line_offsets
+
+    # map the saved index incase it still matches the job file
+    @classmethod
+    def load_index(cls, file_path, file_stat):
+        index_path = cls.get_index_path(file_path)
+        try:
+            with open(index_path, 'rb') as index_file:
+                header = index_file.read(cls.INDEX_HEADER_SIZE)
+
+            if len(header) != cls.INDEX_HEADER_SIZE:
+                return None
+
+            magic, version, file_size, file_modification_time, total_lines = struct.unpack(
+                cls.INDEX_HEADER_FORMAT, header)
+
+            if (magic != constants.JOB_INDEX_MAGIC or
+                version != constants.JOB_INDEX_VERSION or
+                file_size != file_stat.st_size or
+                    file_modification_time != file_stat.st_mtime_ns):
+                return None
+
+            return np.memmap(index_path, dtype=cls.INDEX_OFFSET_TYPE, mode='r',
+                             offset=cls.INDEX_HEADER_SIZE, shape=(total_lines + 1,))
+
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def delete_index(cls, file_path):
+        index_path = cls.get_index_path(file_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    @classmethod
+    def rename_index(cls, old_file_path, new_file_path):
+        old_index_path = cls.get_index_path(old_file_path)
+        if os.path.exists(old_index_path):
+            os.replace(old_index_path, cls.get_index_path(new_file_path))
+
+    def get_file_path(self):
+        return self._file_path
+
+    def get_total_lines(self):
+        return self._total_lines
+
+    def get_line(self, line_number):
+        if not 1 <= line_number <= self._total_lines:
+            raise IndexError(f'Line {line_number} is out of the job file')
+
+        start = int(self._line_offsets[line_number - 1])
+        # remove the new line character
+        end = int(self._line_offsets[line_number]) - 1
+
+        return self._mmap[start:end].decode('utf-8', errors='replace').rstrip('\r')
+
+    # yield the line number and the line as a memoryview, decode it with str(line, 'utf-8')
+    def iter_lines(self, start_line=1):
+        if self._mmap is None:
+            return
+
+        view = memoryview(self._mmap)
+        try:
+            for block_start in range(max(start_line, 1) - 1, self._total_lines, self.ITERATION_BLOCK_SIZE):
+                offsets = self._line_offsets[block_start:
+                                             block_start + self.ITERATION_BLOCK_SIZE + 1].tolist()
+
+                for index in range(len(offsets) - 1):
+                    yield block_start + index + 1, view[offsets[index]:offsets[index + 1] - 1]
+        finally:
+            view.release()
+
+    # yield the first line number and a block of lines as a memoryview (the lines are separated by new lines)
+    def iter_blocks(self, lines_number):
+        if self._mmap is None:
+            return
+
+        view = memoryview(self._mmap)
+        try:
+            for block_start in range(0, self._total_lines, lines_number):
+                block_end = min(block_start + lines_number, self._total_lines)
+                yield block_start + 1, view[int(self._line_offsets[block_start]):
+                                            int(self._line_offsets[block_end]) - 1]
+        finally:
+            view.release()
+
+    # the whole content is decoded only when it is requested (gcode preview)
+    def read_content(self):
+        if self._mmap is None:
+            return ''
+        return self._mmap[:].decode('utf-8', errors='replace')
+
+    # search the mapped file without decoding it, return the first group of the match
+    def search(self, pattern):
+        if self._mmap is None:
+            return ''
+
+        match = re.search(pattern.encode('utf-8'), self._mmap)
+        return match.group(1).decode('utf-8', errors='replace').strip() if match else ''
+
+    def close(self):
+        self._line_offsets = None
+
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            # a line is still used outside, the map is closed when it is released
+            except BufferError:
+                pass
+            self._mmap = None
+
+        self._file.close()
@@ -1,10 +1,15 @@
 import datetime
+import itertools
 import math
 import os
 import shutil
+import threading
 
 from utils.image_to_gcode_generator import ImageToGcodeGenerator
+from utils.job_checkpoint import JobCheckpoint
+from utils.job_time_estimator import JobTimeEstimator
 from .constants import FilesManagerConstants as constants
+from .job_file import JobFile
 
 # This module is to handle all the functions related to gcode file management
 
@@ -12,12 +17,9 @@ from .constants import FilesManagerConstants as constants
 class JobsManager:
     def __init__(self):
         self._job_base_directory = constants.JOB_BASE_DIR
+        # memory mapped job file, the content is read from the file only when it is needed
         self._opened_file = None
 
-        # sum all the lines in the file in one string
-        # the reason to use this method is to minimize the usage of memory in the system
-        self._file_content = ''
-
         # an indicator which represent which line the system is processing
         self._line_counter = 0
 
@@ -39,10 +41,13 @@ class JobsManager:
                 # fetching file info
                 file_creation_time = self.get_file_creation_time(file_path)
                 file_size = self.get_file_size(file_path)
+                # saved with the file, only the header of the estimate file is read
+                estimated_time = JobTimeEstimator.load_total_time(file_path)
 
                 file_info = {"file": filename,
                              "date": file_creation_time,
-                             "size": file_size}
+                             "size": file_size,
+                             "estimated_time": estimated_time}
 
                 # add to files list
                 files_list_with_info.append(file_info)
@@ -86,17 +91,10 @@ class JobsManager:
             self.close_file()
 
         file_path = os.path.join(self._job_base_directory, filename)
-        self._opened_file = open(file_path, 'r')
-
-        # get the number of lines inside the file
-        self._total_lines_number = sum(1 for _ in self._opened_file)
-
-        # rewind the file cursor to the beginning
-        self._opened_file.seek(0)
+        self._opened_file = JobFile(file_path)
 
-        # put all the file content in one string
-        self._file_content = self._opened_file.read()
-        self._opened_file.seek(0)
+        # get the number of lines from the lines index
+        self._total_lines_number = self._opened_file.get_total_lines()
 
         # incase of restart procedure
         self.reset_line_index()
@@ -118,8 +116,12 @@ class JobsManager:
         new_file = os.path.join(self._job_base_directory, new_filename)
 
         stat = os.stat(old_file)
-        os.utime(old_file, (stat.st_atime, stat.st_mtime))
+        os.utime(old_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
         os.rename(old_file, new_file)
+        # the renamed file keeps the same content and modification time
+        JobFile.rename_index(old_file, new_file)
+        JobTimeEstimator.rename_estimate(old_file, new_file)
+        JobCheckpoint.rename(old_file, new_file)
 
         # reopen the new renamed file in case renaming an open file
         if is_opened_file:
@@ -128,11 +130,19 @@ class JobsManager:
     def get_open_filename(self):
         if self._opened_file:
             # remove the base_directory from the file name
-            return os.path.relpath(self._opened_file.name, self._job_base_directory)
+            return os.path.relpath(self._opened_file.get_file_path(), self._job_base_directory)
         return ''
 
     def get_opened_file_content(self):
-        return self._file_content
+        if self._opened_file:
+            return self._opened_file.read_content()
+        return ''
+
+    # search inside the opened file without reading all of its content
+    def search_opened_file(self, pattern):
+        if self._opened_file:
+            return self._opened_file.search(pattern)
+        return ''
 
     def get_line_index(self):
         return self._line_counter
@@ -140,19 +150,8 @@ class JobsManager:
     def get_total_lines(self):
         return self._total_lines_number
 
-    def get_next_line(self):
-        # increase the lines counter
-        self._line_counter += 1
-
-        # Read the next line from the file
-        line = self._opened_file.readline()
-
-        # If the line is empty, it means end of file (EOF)
-        if not line:
-            return None
-
-        # Strip any trailing newline or extra spaces
-        return line.strip()
+    def get_line(self, line_number):
+        return self._opened_file.get_line(line_number)
 
     # in case the system stopped executing the file in the middle of the process
     # or and error happened during the execution
@@ -170,16 +169,74 @@ class JobsManager:
         # Join the lines back together
         updated_content = '\n'.join(lines)
 
-        # Write the modified content to the file
-        with open(file_path, 'wb') as gcode_file:
+        # Write the modified content to a temporary file then replace the old file,
+        # the opened file (or a running job) keeps reading the old content until it is reopened
+        temporary_file_path = file_path + '.tmp'
+        with open(temporary_file_path, 'wb') as gcode_file:
             gcode_file.write(updated_content.encode('utf-8'))
 
-            # incase the user uploaded the file that has the name similar to opened file
-            if filename == self.get_open_filename():
-                self._file_content = updated_content
+        self.replace_gcode_file(temporary_file_path, file_path)
+
+    # write the generated gcode lines in batches, the file content is never fully in memory
+    def write_gcode_lines(self, filename, gcode_lines):
+        file_path = os.path.join(self._job_base_directory, filename)
+        gcode_lines = iter(gcode_lines)
+
+        temporary_file_path = file_path + '.tmp'
+        try:
+            with open(temporary_file_path, 'w', encoding='utf-8', newline='') as gcode_file:
+                separator = ''
+                while True:
+                    lines_batch = list(itertools.islice(
+                        gcode_lines, constants.WRITE_LINES_BATCH_SIZE))
+                    if not lines_batch:
+                        break
+
+                    gcode_file.write(separator + '\n'.join(lines_batch))
+                    separator = '\n'
+        except BaseException:
+            # the generation failed or was cancelled, the old file is kept
+            os.remove(temporary_file_path)
+            raise
+
+        # the generation runs in its own process, the generated file is listed with its estimate
+        self.replace_gcode_file(temporary_file_path, file_path, is_background_build=False)
 
     def copy_gcode_file(self, file_path):
-        shutil.copy(file_path, constants.JOB_BASE_DIR)
+        new_file_path = os.path.join(
+            self._job_base_directory, os.path.basename(file_path))
+        temporary_file_path = new_file_path + '.tmp'
+        shutil.copy(file_path, temporary_file_path)
+
+        self.replace_gcode_file(temporary_file_path, new_file_path)
+
+    def replace_gcode_file(self, temporary_file_path, file_path, is_background_build=True):
+        os.replace(temporary_file_path, file_path)
+
+        # the upload request is answered without waiting for the index and the estimate of a big file,
+        # the file is listed without its estimated time until the estimate is saved
+        if is_background_build:
+            threading.Thread(target=self.build_job_file_data, args=(file_path,), daemon=True).start()
+        else:
+            self.build_job_file_data(file_path)
+
+        # incase the new file has the name similar to opened file
+        filename = os.path.relpath(file_path, self._job_base_directory)
+        if filename == self.get_open_filename():
+            self.open_file(filename)
+
+    @staticmethod
+    def build_job_file_data(file_path):
+        try:
+            # build the lines index once, the opened file and the job streamer only map it
+            JobFile.build_index(file_path)
+            # estimate the job time once with the controller settings, the files list and the job progress read it
+            JobTimeEstimator.build_estimate(file_path)
+
+        # the file was deleted or renamed in the meantime, the job file builds its index when it is opened
+        except OSError as error:
+            if os.getenv('ENV') == 'development':
+                print('Job File Data Error:', error)
 
     def delete_file(self, filename):
         # close the file if it is the same open file before delete
@@ -190,6 +247,9 @@ class JobsManager:
 
         file_path = os.path.join(self._job_base_directory, filename)
         os.remove(file_path)
+        JobFile.delete_index(file_path)
+        JobTimeEstimator.delete_estimate(file_path)
+        JobCheckpoint.delete(file_path)
 
     def get_file_path(self, filename):
         if filename:
@@ -198,13 +258,12 @@ class JobsManager:
         return ''
 
     def generate_gcode_file(self, gcode_file_data):
-        gcode_file_content = ImageToGcodeGenerator.generate_gcode(
+        # the gcode is written in the file system while it is generated
+        gcode_lines = ImageToGcodeGenerator.generate_gcode_lines(
             gcode_file_data)
-        # write the generated gcode in the file system
         filename = gcode_file_data.name
-        self.write_gcode_file(filename, gcode_file_content)
+        self.write_gcode_lines(filename, gcode_lines)
 
     def close_file(self):
         self._opened_file.close()
         self._opened_file = None
-        self._file_content = ''
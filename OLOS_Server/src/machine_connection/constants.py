@@ -1,3 +1,6 @@
+import os
+
+
 class MachineConstants:
     MACHINE_TYPES = {
         'LASER_CUTTER': 'Laser Cutter',
@@ -15,6 +18,10 @@ class MachineConstants:
     # delimiters
     NEWLINE = "\n"
 
+    # G-code comments
+    GCODE_COMMENT_PARENTHESES = '('
+    GCODE_COMMENT_SEMICOLON = ';'
+
     # GRBL answers
     GRBL_ANSWER_OK = "ok"
     GRBL_ANSWER_ERROR = "error"
@@ -31,10 +38,42 @@ class MachineConstants:
     GRBL_COMMAND_TOOL_CHANGE = 'M6'
     GRBL_COMMAND_RESET_ZERO = 'G92 X0 Y0 Z0'
     GRBL_COMMAND_HOMING = '$H'
+    GRBL_COMMAND_SETTINGS = '$$'
     GRBL_COMMAND_RETURN_TO_ZERO = 'G1 X0 Y0 F5000'
     GRBL_COMMAND_SOFT_RESET = '\x18'
     GRBL_COMMAND_DUMMY_STATUS_HOMING = "<Home|MPos:0.000,0.000,0.000|FS:0.0,0>"
 
+    REAL_TIME_COMMANDS = [GRBL_COMMAND_PAUSE, GRBL_COMMAND_RESUME,
+                          GRBL_COMMAND_STOP, GRBL_COMMAND_STATUS]
+    # the overrides (feed rate, rapids, spindle / laser power...) are single bytes from 0x80
+    REAL_TIME_COMMAND_MIN_BYTE = 0x80
+
+    # GRBL settings read from the controller, used to estimate the jobs time
+    GRBL_SETTINGS_CACHE_PATH = os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), 'grbl_settings.json')
+
+    # Streaming protocols
+    CHARACTER_COUNTING_PROTOCOL = 'character_counting'
+    SEND_RESPONSE_PROTOCOL = 'send_response'
+    # GRBL serial RX buffer size in bytes
+    DEFAULT_RX_BUFFER_SIZE = 128
+
+    # Job streaming
+    # send the job progress to the core 10 times per second (configurable)
+    DEFAULT_JOB_PROGRESS_RATE = 10
+    # number of the last executed lines sent with every job progress (configurable)
+    DEFAULT_EXECUTED_LINES_BATCH_SIZE = 50
+    # weight of the last measured lines rate in the smoothed rate
+    JOB_LINES_RATE_SMOOTHING = 0.3
+    # check the write queue every 10 ms while streaming a job
+    JOB_STREAMING_QUEUE_INTERVAL = 0.01
+    # wait 1 ms when the controller buffer is full to not consume the CPU
+    JOB_STREAMING_IDLE_TIMEOUT = 0.001
+
+    # Job streaming processes
+    START_JOB_STREAM_PROCESS = 'Start'
+    STOP_JOB_STREAM_PROCESS = 'Stop'
+
     # PICO commands
     PICO_ENABLE_STATUS = 'GSE'
     PICO_DISABLE_STATUS = 'GSD'
@@ -44,6 +83,10 @@ class MachineConstants:
     TOOL_CHANGER_ERROR = 'TCSE'
     # soft limits reply message
     SOFT_LIMITS_TRIGGER = 'MPOUT'
+    # the controller stops after an alarm and rejects the next lines with error:9
+    GRBL_ANSWER_ALARM = 'ALARM:'
+    # welcome message sent by the controller after a reset (Grbl 1.1h ['$' for help])
+    GRBL_RESET_BANNER = 'Grbl '
 
     # priority constants for the priority queue
     HIGH_PRIORITY_COMMAND = 1
@@ -59,6 +102,10 @@ class MachineConstants:
     NORMAL_COMMAND_DATA_TYPE = 'NORMAL_COMMAND'
     MACHINE_CONNECTION_DATA_TYPE = 'MACHINE_CONNECTION'
     JOYSTICK_STATUS_DATA_TYPE = 'JOYSTICK_STATUS'
+    STREAMING_STATISTICS_DATA_TYPE = 'STREAMING_STATISTICS'
+    JOB_STREAM_DATA_TYPE = 'JOB_STREAM'
+    JOB_PROGRESS_DATA_TYPE = 'JOB_PROGRESS'
+    JOB_FINISHED_DATA_TYPE = 'JOB_FINISHED'
 
     # Joystick speed mm/s
     LOW_JOYSTICK_SPEED = 1
@@ -1,8 +1,13 @@
+import queue
 import time
+from collections import deque
 from multiprocessing import Process
 from utils.configuration_loader import ConfigurationLoader
+from utils.grbl_settings import GrblSettings
 from utils.joystick_handler import JoystickHandler
 from utils.serial_connection import SerialConnection
+from utils.serial_streaming_protocol import SerialStreamingProtocol
+from utils.job_streamer import JobStreamer
 from .constants import MachineConstants as constants
 import os
 from dotenv import load_dotenv
@@ -30,9 +35,44 @@ class MachineConnector(Process):
         # configuration settings
         self._config = None
 
+        # streaming protocol to control the commands sent to the controller buffer
+        self._streaming_protocol = None
+
+        # commands waiting for free space inside the controller buffer
+        self._pending_commands = deque()
+        # commands outside the job sent and still waiting for their answer (in the order of the answers)
+        self._sent_commands = deque()
+
+        # stream the job file lines to the controller inside this process
+        self._job_streamer = None
+        # id of the streamed job given by the core, to ignore the events of previous jobs
+        self._job_id = None
+        # the job progress is coalesced and sent to the core on a fixed rate
+        self._job_progress_interval = 1 / constants.DEFAULT_JOB_PROGRESS_RATE
+        self._last_job_progress_time = time.time()
+        self._last_write_queue_check_time = time.time()
+
+        # local copy of the machine pause status, followed from the real time commands
+        # to not read the shared value on every loop
+        self._is_machine_pause = False
+
+        # controller settings ($$) cached for the jobs time estimation
+        self._grbl_settings = None
+
     def run(self):
         try:
             self._config = ConfigurationLoader.from_yaml()
+            self._grbl_settings = GrblSettings.load()
+
+            self._streaming_protocol = SerialStreamingProtocol(
+                self._config.serial_connection.streaming_protocol,
+                self._config.serial_connection.rx_buffer_size)
+            job_progress_config = self._config.job_progress
+            self._job_streamer = JobStreamer(
+                self._serial_connection, self._streaming_protocol,
+                job_progress_config.executed_lines_batch_size if job_progress_config else None)
+            if job_progress_config and job_progress_config.rate:
+                self._job_progress_interval = 1 / job_progress_config.rate
 
             # start serial connection
             self._serial_connection.connect_to_serial(
@@ -72,41 +112,202 @@ class MachineConnector(Process):
     def start_machine_communication(self):
 
         self.reset_counter()
+        self.read_grbl_settings()
         while True:
+            is_job_streaming = self._job_streamer.is_streaming()
+
             self.handle_reading_from_serial()
-            self.handle_writing_to_serial()
-            self.fetch_machine_status()
 
-            if not self.machine_connector_data.is_job_execute_process:
-                time.sleep(constants.TIMEOUT)
+            if not is_job_streaming:
+                # wait for the next command instead of sleeping, to send it directly to the machine
+                self.handle_writing_to_serial(wait_timeout=constants.TIMEOUT)
+                self.fetch_machine_status()
+
+            # while streaming a job check the write queue on specific interval
+            # to not slow down the streaming with the communication between the processes
+            elif time.time() - self._last_write_queue_check_time > constants.JOB_STREAMING_QUEUE_INTERVAL:
+                self._last_write_queue_check_time = time.time()
+                self.handle_writing_to_serial()
+                self.fetch_machine_status()
+
+            sent_lines = self.handle_job_streaming()
+
+            # the controller buffer is full, wait for its answers
+            if is_job_streaming and not sent_lines:
+                time.sleep(constants.JOB_STREAMING_IDLE_TIMEOUT)
 
     # Writing data to the serial port
 
-    def handle_writing_to_serial(self):
+    def handle_writing_to_serial(self, wait_timeout=None):
         '''
-        make sure that the queue is not empty and 
-        all the command in the machine got executed
-        and the machine is not changing the tool to not overflow the buffer
+        send all the commands inside the queue, incase of a wait timeout
+        wait for the first command to arrive.
+        make sure the command fits inside the controller buffer (based on the streaming protocol)
+        to not overflow the buffer
         '''
 
-        if not self.machine_connector_data.serial_write_queue.empty():
-            type, gcode_command = self.machine_connector_data.serial_write_queue.get()
-            if gcode_command:
-                # increase the counter to wait for
-                # an ok message after sending a command to the machine
-                self.machine_connector_data.ok_messages_counter += 1
+        is_waiting = wait_timeout is not None
+        while True:
+            try:
+                # do not wait for the rest of the commands
+                # incase the core flushed the queue in the meantime
+                type, data = self.machine_connector_data.serial_write_queue.get(
+                    block=is_waiting, timeout=wait_timeout)
+            except queue.Empty:
+                break
+
+            is_waiting = False
+
+            # requests from the core to start/stop streaming a job
+            if type == constants.JOB_STREAM_DATA_TYPE:
+                self.handle_job_stream_request(data)
+
+            elif data:
+                self.handle_command(data)
+
+        self.send_pending_commands()
+
+    def handle_command(self, gcode_command):
+        # real time commands skip the controller buffer in every protocol, so send them directly
+        if self._streaming_protocol.is_real_time_command(gcode_command):
+            self._serial_connection.write_real_time_command(gcode_command)
+
+        # wait until there is enough space inside the controller buffer
+        elif self._streaming_protocol.is_character_counting():
+            self._pending_commands.append(gcode_command)
+
+        else:
+            self.write_command_to_serial(gcode_command)
+
+        self.handle_real_time_command_sent(gcode_command)
+
+    def send_pending_commands(self):
+        # send the commands as long as the controller buffer has space for them
+        while (self._pending_commands and
+               self._streaming_protocol.is_buffer_available(self._pending_commands[0])):
+            self.write_command_to_serial(self._pending_commands.popleft())
+
+    def write_command_to_serial(self, gcode_command):
+        # increase the counter to wait for
+        # an ok message after sending a command to the machine
+        self.machine_connector_data.ok_messages_counter += 1
+        self._streaming_protocol.add_sent_command(gcode_command)
+        self._sent_commands.append(gcode_command)
+
+        self._serial_connection.write_to_serial(gcode_command)
+
+    # follow the state of the machine locally from the commands sent to it
+    def handle_real_time_command_sent(self, command):
+        # the controller clears its buffer after a soft reset
+        if command == constants.GRBL_COMMAND_SOFT_RESET:
+            self._is_machine_pause = False
+            self.reset_counter()
+            self.finish_job_streaming(is_completed=False)
+
+        elif command == constants.GRBL_COMMAND_PAUSE:
+            self._is_machine_pause = True
+
+        elif command == constants.GRBL_COMMAND_RESUME:
+            self._is_machine_pause = False
+
+    def handle_job_stream_request(self, data):
+        process = data.get('process')
+
+        if process == constants.START_JOB_STREAM_PROCESS:
+            self.start_streaming_job_file(data.get('job_id'),
+                                          data.get('file_path'),
+                                          data.get('start_line', 1),
+                                          data.get('preamble'))
+
+        elif process == constants.STOP_JOB_STREAM_PROCESS:
+            self._is_machine_pause = False
+            self.finish_job_streaming(is_completed=False)
+
+    def start_streaming_job_file(self, job_id, file_path, start_line=1, preamble=None):
+        self._job_id = job_id
+        try:
+            # when start executing file reset the counter
+            self._is_machine_pause = False
+            self.reset_counter()
+
+            self._job_streamer.start(file_path, start_line, preamble)
+            self._streaming_protocol.start_job_statistics()
+            self._last_job_progress_time = time.time()
+
+        except Exception as error:
+            print("Job Streaming Error:", error)
+            self._job_streamer.stop()
+
+            # notify the core that the job is not running
+            self.add_to_serial_read_queue(constants.JOB_FINISHED_DATA_TYPE,
+                                          constants.HIGH_PRIORITY_COMMAND,
+                                          {'job_id': job_id, 'is_completed': False})
+
+    def handle_job_streaming(self):
+        if not self._job_streamer.is_streaming():
+            return 0
+
+        sent_lines = 0
+        # keep the order of the commands sent by the user during the job
+        # and stop filling the buffer while the machine is paused
+        if not self._pending_commands and not self._is_machine_pause:
+            sent_lines = self._job_streamer.stream_lines()
+
+            if sent_lines and self._job_streamer.is_waiting_tool_change():
+                self.machine_connector_data.is_tool_change_process = True
+
+        if self._job_streamer.is_finished():
+            # the lines rejected by the controller are not executed, the job is not completed
+            self.finish_job_streaming(is_completed=not self._job_streamer.has_errors())
+
+        elif time.time() - self._last_job_progress_time > self._job_progress_interval:
+            self.send_job_progress()
+
+        return sent_lines
+
+    # send the job progress to the core only when it changes
+    def send_job_progress(self):
+        self._last_job_progress_time = time.time()
+
+        if self._job_streamer.is_progress_changed():
+            job_progress = self._job_streamer.get_progress()
+            self.add_to_serial_read_queue(constants.JOB_PROGRESS_DATA_TYPE,
+                                          constants.MIDDLE_PRIORITY_COMMAND,
+                                          {'job_id': self._job_id, **job_progress})
 
-                self._serial_connection.write_to_serial(gcode_command)
+    def finish_job_streaming(self, is_completed):
+        if not self._job_streamer.is_streaming():
+            return
+
+        job_progress = self._job_streamer.get_progress()
+        self._job_streamer.stop()
+
+        self.add_to_serial_read_queue(constants.JOB_FINISHED_DATA_TYPE,
+                                      constants.MIDDLE_PRIORITY_COMMAND,
+                                      {'job_id': self._job_id, 'is_completed': is_completed, **job_progress})
+
+        # collect the streaming statistics for every executed job
+        streaming_statistics = self._streaming_protocol.stop_job_statistics()
+        self.add_to_serial_read_queue(constants.STREAMING_STATISTICS_DATA_TYPE,
+                                      constants.LOW_PRIORITY_COMMAND,
+                                      streaming_statistics)
 
     # Reading data from the serial
     def handle_reading_from_serial(self):
-        # read incoming bytes from serial and convert it to string
+        # read all the incoming lines from serial and convert them to string
         data_to_fetch = self._serial_connection.read_from_serial()
+        while data_to_fetch:
+            self.analyze_serial_data(data_to_fetch)
+            data_to_fetch = self._serial_connection.read_from_serial()
+
+    def analyze_serial_data(self, data_to_fetch):
         if data_to_fetch:
             if constants.GRBL_ANSWER_OK in data_to_fetch:
-                # decrease the counter because the machine replied
-                # with an ok message after sending a command to the machine
-                self.machine_connector_data.ok_messages_counter -= 1
+                self.acknowledge_command(is_accepted=True)
+
+                # the controller finished answering the settings command or accepted a changed setting
+                if self._grbl_settings.is_changed():
+                    self._grbl_settings.save()
 
             # check if the machine's door is open (for the homing the machine process)
             elif self._is_machine_door_open_on_start and data_to_fetch.startswith('<Idle'):
@@ -125,8 +326,10 @@ class MachineConnector(Process):
             elif data_to_fetch.startswith('[') and data_to_fetch.endswith(']'):
                 pass
 
-            # rest of commands
+            # rest of commands, the settings lines are also cached to estimate the jobs time
             else:
+                self._grbl_settings.update_from_line(data_to_fetch)
+
                 if constants.TOOL_CHANGER_SUCCESS in data_to_fetch:
                     # check if the machine finished changing the tool
                     # it will reply with TOCK message
@@ -134,6 +337,7 @@ class MachineConnector(Process):
                     # reset the counter after tool change because the pico will
                     # execute different commands where the server will not count
                     self.reset_counter()
+                    self._job_streamer.finish_tool_change()
 
                 elif constants.TOOL_CHANGER_ERROR in data_to_fetch:
                     # Error happened during changing the tool
@@ -143,15 +347,47 @@ class MachineConnector(Process):
 
                 elif constants.SOFT_LIMITS_TRIGGER == data_to_fetch:
                     # make sure that the counter stay updated if the command is not passed to the machine
-                    self.reset_counter()
+                    # while streaming only release the rejected command to keep counting the rest of the buffer
+                    if self._streaming_protocol.is_character_counting():
+                        self.acknowledge_command()
+                    else:
+                        self.reset_counter()
+
+                elif data_to_fetch.startswith(constants.GRBL_ANSWER_ERROR):
+                    # the controller removed the command from its buffer (the error replaces the ok)
+                    # acknowledge it in every protocol to not block the streaming
+                    self.acknowledge_command(is_error=True)
+
+                elif (data_to_fetch.startswith(constants.GRBL_ANSWER_ALARM) or
+                      data_to_fetch.startswith(constants.GRBL_RESET_BANNER)):
+                    self.handle_machine_alarm()
 
                 self.add_to_serial_read_queue(constants.SERIAL_COMMAND_DATA_TYPE,
                                               constants.LOW_PRIORITY_COMMAND,
                                               data_to_fetch)
 
+    def acknowledge_command(self, is_accepted=False, is_error=False):
+        line_index = self._streaming_protocol.acknowledge_command(
+            self._is_machine_pause)
+
+        # the answer belongs to a job line, keep it inside the process
+        if line_index is not None:
+            self._job_streamer.acknowledge_line(line_index, is_error)
+
+        else:
+            # a changed setting ($110=5000) is cached only once the controller accepted it
+            if self._sent_commands:
+                sent_command = self._sent_commands.popleft()
+                if is_accepted:
+                    self._grbl_settings.update_from_line(sent_command)
+
+            # decrease the counter because the machine replied
+            # with an ok message after sending a command to the machine
+            self.machine_connector_data.ok_messages_counter -= 1
+
     def fetch_machine_status(self):
         # Refresh every specific time interval while the machine in pause/run status
-        time_interval = constants.STATUS_REFRESH_INTERVAL_PAUSE if self.machine_connector_data.is_machine_pause else constants.STATUS_REFRESH_INTERVAL_RUN
+        time_interval = constants.STATUS_REFRESH_INTERVAL_PAUSE if self._is_machine_pause else constants.STATUS_REFRESH_INTERVAL_RUN
         if time.time() - self._current_refresh_status_time > time_interval:
             self.update_machine_status()
 
@@ -164,6 +400,23 @@ class MachineConnector(Process):
             # Send a status command to the machine
             self.add_to_serial_write_queue(constants.MACHINE_STATUS_DATA_TYPE,
                                            constants.MIDDLE_PRIORITY_COMMAND, constants.GRBL_COMMAND_STATUS)
+
+    # ask the machine connector process to stream the job file
+    # incase of resuming a job, the preamble restores the machine state before the start line
+    def start_job_streaming(self, job_id, file_path, start_line=1, preamble=None):
+        self.add_to_serial_write_queue(constants.JOB_STREAM_DATA_TYPE,
+                                       constants.HIGH_PRIORITY_COMMAND,
+                                       {'process': constants.START_JOB_STREAM_PROCESS,
+                                        'job_id': job_id,
+                                        'file_path': file_path,
+                                        'start_line': start_line,
+                                        'preamble': preamble})
+
+    def stop_job_streaming(self):
+        self.add_to_serial_write_queue(constants.JOB_STREAM_DATA_TYPE,
+                                       constants.HIGH_PRIORITY_COMMAND,
+                                       {'process': constants.STOP_JOB_STREAM_PROCESS})
+
     # add new command to the serial write queue
 
     def add_to_serial_write_queue(self, type, priority, command):
@@ -187,6 +440,11 @@ class MachineConnector(Process):
         self.add_to_serial_write_queue(constants.NORMAL_COMMAND_DATA_TYPE, constants.MIDDLE_PRIORITY_COMMAND,
                                        constants.GRBL_COMMAND_HOMING)
 
+    # read the controller settings, the answer lines are cached by the analyze serial data
+    def read_grbl_settings(self):
+        self.add_to_serial_write_queue(constants.NORMAL_COMMAND_DATA_TYPE, constants.MIDDLE_PRIORITY_COMMAND,
+                                       constants.GRBL_COMMAND_SETTINGS)
+
     def unlock_machine(self):
         self.reset_the_machine_system()
 
@@ -235,30 +493,39 @@ class MachineConnector(Process):
         self.flush_write_queue()
         self.flush_read_queue()
 
+    # the controller stopped executing (alarm) or was reset, the lines in its buffer are lost
+    # and the rest of the job would be rejected, so stop the job before sending more lines
+    def handle_machine_alarm(self):
+        self._is_machine_pause = False
+        self.finish_job_streaming(is_completed=False)
+        self.reset_counter()
+
     def reset_counter(self):
         self.machine_connector_data.ok_messages_counter = -1
 
+        # the streaming protocol only exists inside the machine connector process
+        if self._streaming_protocol:
+            self._streaming_protocol.reset()
+            self._pending_commands.clear()
+            self._sent_commands.clear()
+
     # delete all the elements inside the write queue
     def flush_write_queue(self):
         # clear the write queue
         while not self.machine_connector_data.serial_write_queue.empty():
-            self.machine_connector_data.serial_write_queue.get()
+            try:
+                self.machine_connector_data.serial_write_queue.get(block=False)
+            except queue.Empty:
+                break
 
     # delete all the elements inside the read queue
     def flush_read_queue(self):
         # clear the write queue
         while not self.machine_connector_data.serial_read_queue.empty():
-            self.machine_connector_data.serial_read_queue.get()
-
-    # Handshake custom protocol to make sure that the
-    # machine is ready to receive the next command
-    def is_machine_ready(self):
-        if (self.machine_connector_data.ok_messages_counter <= 0 and
-            not self.machine_connector_data.is_tool_change_process and
-                not self.machine_connector_data.is_machine_pause):
-            return True
-
-        return False
+            try:
+                self.machine_connector_data.serial_read_queue.get(block=False)
+            except queue.Empty:
+                break
 
     # try to reconnect to serial incase of not detecting any device or
     # serial port is busy
@@ -1,24 +1,43 @@
 from multiprocessing import Process
 import platform
+import time
 import cv2
+import numpy as np
 
 # This module is used to handle the stream from the cameras
+# the frames are captured directly in the shared frames ring of the camera (no pickling through a pipe),
+# the cameras system reads the latest complete frame and the old frames are overwritten
+# incase the camera has a calibration the frame is undistorted in the slot with the undistortion maps
+# computed once for the frame size (fixed point maps, one remap per frame)
 
 
 class CameraStream(Process):
-    def __init__(self, index, pipe_end):
+    def __init__(self, index, frames_ring, camera_matrix=None, camera_coeffs=None, capture_event=None):
         super(CameraStream, self).__init__()
         self.index = index
-        self.pipe_end = pipe_end
+        self.frames_ring = frames_ring
+        self.camera_matrix = camera_matrix
+        self.camera_coeffs = camera_coeffs
+        # the frames are captured only while the event is set (the cameras stream is not paused)
+        self.capture_event = capture_event
+
+        # undistortion maps of the frame size and the raw frame reused for every capture
+        self._undistortion_maps = None
+        self._undistortion_size = None
+        self._raw_frame = None
 
     def run(self):
         camera = self.open_camera()
         try:
             if camera:
+                frame_shape = None
                 while True:
-                    ret, frame = camera.read()
-                    if ret:
-                        self.pipe_end.send(frame)
+                    if self.capture_event is not None:
+                        self.capture_event.wait()
+                    if self.camera_matrix is not None:
+                        self.capture_undistorted_frame(camera)
+                    else:
+                        frame_shape = self.capture_frame(camera, frame_shape)
 
         except Exception as Error:
             print(Error)
@@ -26,6 +45,60 @@ class CameraStream(Process):
         except KeyboardInterrupt:
             camera.release()
 
+    # capture the next frame in the next slot of the ring, return the shape of the captured frame
+    def capture_frame(self, camera, frame_shape):
+        slot_content = self.frames_ring.begin_write()
+
+        # the frame is captured in the slot when it has the same shape as the previous frame
+        slot_frame = None
+        if frame_shape is not None and np.prod(frame_shape) <= len(slot_content):
+            slot_frame = np.ndarray(frame_shape, dtype=np.uint8, buffer=slot_content)
+        ret, frame = camera.read(slot_frame) if slot_frame is not None else camera.read()
+        frame_time = time.time()
+
+        if not ret or frame.nbytes > len(slot_content):
+            self.frames_ring.cancel_write()
+            return frame_shape
+
+        # first frame or the camera changed the frame size, the frame is copied in the slot
+        if slot_frame is None or frame.ctypes.data != slot_frame.ctypes.data:
+            slot_content[:frame.nbytes] = memoryview(np.ascontiguousarray(frame, dtype=np.uint8)).cast('B')
+
+        self.frames_ring.end_write(frame.nbytes, frame.shape[1], frame.shape[0], frame_time)
+        return frame.shape
+
+    # capture the raw frame and undistort it in the next slot of the ring
+    def capture_undistorted_frame(self, camera):
+        ret, raw_frame = camera.read(self._raw_frame) if self._raw_frame is not None else camera.read()
+        frame_time = time.time()
+
+        if not ret:
+            return
+        self._raw_frame = raw_frame
+
+        slot_content = self.frames_ring.begin_write()
+        if raw_frame.nbytes > len(slot_content):
+            self.frames_ring.cancel_write()
+            return
+
+        map1, map2 = self.get_undistortion_maps(raw_frame.shape[1], raw_frame.shape[0])
+        slot_frame = np.ndarray(raw_frame.shape, dtype=np.uint8, buffer=slot_content)
+        frame = cv2.remap(raw_frame, map1, map2, cv2.INTER_LINEAR, dst=slot_frame)
+        if frame.ctypes.data != slot_frame.ctypes.data:
+            np.copyto(slot_frame, frame)
+
+        self.frames_ring.end_write(raw_frame.nbytes, raw_frame.shape[1], raw_frame.shape[0], frame_time)
+
+    # fixed point undistortion maps, computed again only when the camera changes the frame size
+    def get_undistortion_maps(self, width, height):
+        if self._undistortion_size != (width, height):
+            camera_matrix = np.array(self.camera_matrix, dtype=np.float64)
+            self._undistortion_maps = cv2.initUndistortRectifyMap(
+                camera_matrix, np.array(self.camera_coeffs, dtype=np.float64), None, camera_matrix,
+                (width, height), cv2.CV_16SC2)
+            self._undistortion_size = (width, height)
+        return self._undistortion_maps
+
     def open_camera(self):
         system = platform.system()
 
@@ -0,0 +1,121 @@
+import time
+import cv2
+
+'''
+Policy of the cameras stream (streaming_settings in config.yaml): the users ask a quality level
+(thumbnail, live view, full resolution snapshot...), the cameras system encodes every frame once for
+every asked quality level instead of streaming the full frames as fast as the loop allows
+- no asked quality level (no user watches the stream): the capture and the encoding are paused
+- the frames rate is the highest rate of the asked quality levels
+- the quality levels with 0 frames per second are one frame (snapshot) every time a user asks it
+- during a job the frames rate and width are limited so the job streaming keeps the priority
+  (the snapshots stay at their quality, they are asked by the user)
+'''
+
+
+class CameraStreamingController:
+    DEFAULT_QUALITY_LEVELS = {
+        'live': {'max_width': 1280, 'jpeg_quality': 80, 'fps': 15}
+    }
+    DEFAULT_QUALITY = 'live'
+
+    def __init__(self, streaming_settings=None):
+        streaming_settings = streaming_settings or {}
+        self._quality_levels = streaming_settings.get('quality_levels') or self.DEFAULT_QUALITY_LEVELS
+        self._default_quality = streaming_settings.get('default_quality') or self.DEFAULT_QUALITY
+        self._pause_without_users = streaming_settings.get('pause_without_users', True)
+        self._job_execution_settings = streaming_settings.get('job_execution') or {}
+
+        # quality levels streamed continuously and the snapshots waiting for the next frame
+        self._qualities = set()
+        self._snapshot_qualities = set()
+        self._is_job_execute_process = False
+        self._next_frame_time = 0
+
+    def get_default_quality(self):
+        return self._default_quality
+
+    def is_quality_level(self, quality):
+        return quality in self._quality_levels
+
+    # one frame every time a user asks it
+    def is_snapshot_quality(self, quality):
+        return self.is_quality_level(quality) and not self._quality_levels[quality].get('fps')
+
+    # quality levels asked by the users, the snapshot qualities are added until the next frame
+    def update_subscription(self, qualities):
+        self._qualities = set()
+        for quality in qualities or []:
+            quality_level = self._quality_levels.get(quality)
+            if quality_level is None:
+                continue
+            if quality_level.get('fps'):
+                self._qualities.add(quality)
+            else:
+                self._snapshot_qualities.add(quality)
+
+    def set_job_execution(self, is_job_execute_process):
+        self._is_job_execute_process = is_job_execute_process
+
+    def is_paused(self):
+        return not self._get_streamed_qualities() and not self._snapshot_qualities
+
+    # time to wait before the next frame (an asked snapshot is sent with the next frame)
+    def get_wait_time(self):
+        if self._snapshot_qualities:
+            return 0
+        return max(self._next_frame_time - time.monotonic(), 0)
+
+    '''
+    encode the frame for every asked quality level
+    return a list of (quality, jpeg buffer, width, height)
+    '''
+    def encode_frame(self, frame):
+        encoded_frames = []
+        qualities = self._get_streamed_qualities()
+        for quality in sorted(qualities | self._snapshot_qualities):
+            quality_level = self._quality_levels[quality]
+            max_width = quality_level.get('max_width') or 0
+            # the job limits only the continuous stream
+            if self._is_job_execute_process and quality in qualities:
+                max_width = min(max_width or frame.shape[1], self._job_execution_settings.get('max_width') or
+                                frame.shape[1])
+
+            resized_frame = self._resize_frame(frame, max_width)
+            _, buffer = cv2.imencode('.jpg', resized_frame,
+                                     [cv2.IMWRITE_JPEG_QUALITY, int(quality_level.get('jpeg_quality') or 95)])
+            encoded_frames.append((quality, buffer, resized_frame.shape[1], resized_frame.shape[0]))
+
+        self._snapshot_qualities = set()
+        # the frames are scheduled at the frames rate (the wait for the camera frame is not added),
+        # a frame later than one frame interval (first frame, paused stream) restarts the schedule
+        frames_rate = self._get_frames_rate(qualities)
+        current_time = time.monotonic()
+        if not frames_rate:
+            self._next_frame_time = current_time
+        else:
+            frame_time = (self._next_frame_time if current_time - self._next_frame_time < 1 / frames_rate
+                          else current_time)
+            self._next_frame_time = frame_time + 1 / frames_rate
+        return encoded_frames
+
+    # the default quality is streamed without users only incase the stream is not paused without users
+    def _get_streamed_qualities(self):
+        if not self._qualities and not self._pause_without_users and self._default_quality in self._quality_levels:
+            return {self._default_quality}
+        return self._qualities
+
+    def _get_frames_rate(self, qualities):
+        frames_rate = max((self._quality_levels[quality].get('fps') or 0 for quality in qualities), default=0)
+        max_frames_rate = self._job_execution_settings.get('max_fps')
+        if self._is_job_execute_process and max_frames_rate:
+            frames_rate = min(frames_rate, max_frames_rate)
+        return frames_rate
+
+    # keep the aspect ratio of the frame, the frames smaller than the max width are not resized
+    def _resize_frame(self, frame, max_width):
+        height, width = frame.shape[:2]
+        if not max_width or width <= max_width:
+            return frame
+        return cv2.resize(frame, (int(max_width), max(round(height * max_width / width), 1)),
+                          interpolation=cv2.INTER_AREA)
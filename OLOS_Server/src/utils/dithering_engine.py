@@ -0,0 +1,242 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+'''
+Dither the engraving images in the server at the engraving resolution (after the scaling and the rotation),
+every pixel becomes black (burned with the max power) or white (not burned)
+the algorithms have the same names as the interface algorithms, the gray shift is added to the pixels first
+and the white pixels (blank background) stay white like the transparent pixels of the interface
+
+- error diffusion (Floyd-Steinberg, Jarvis, Stucki, Atkinson): a pixel depends only on the pixels before it
+  on its row and on the pixels up to 2 columns after it on the rows above, so all the pixels on the line
+  x + skew * y (wavefront) are independent and dithered at once with numpy, the rows are stored shifted
+  by skew columns (skewed buffer) to make every wavefront a column of the buffer,
+  the image is dithered by bands of rows and the error of the last band rows is carried to the next band
+  so the result is the same as dithering the whole image pixel by pixel (there are no seams between the bands)
+  incase numba is installed, the image is dithered pixel by pixel by the compiled scan instead
+- threshold maps (Ordered, Bayer, Halftone, Grid, Average, Random): the whole image is compared at once
+  with a threshold matrix repeated over the image
+'''
+
+
+# dither the padded pixels in place (2 rows below, 2 columns on each side), pixel by pixel
+def _scan_error_diffusion(padded_pixels, kernel):
+    rows, columns = padded_pixels.shape
+    for row in range(rows - 2):
+        for column in range(2, columns - 2):
+            old_pixel = padded_pixels[row, column]
+            new_pixel = np.float32(0) if old_pixel < 128 else np.float32(255)
+            error = old_pixel - new_pixel
+            padded_pixels[row, column] = new_pixel
+            for kernel_row in range(3):
+                for kernel_column in range(5):
+                    weight = kernel[kernel_row, kernel_column]
+                    if weight != 0:
+                        padded_pixels[row + kernel_row, column + kernel_column - 2] += error * weight
+
+
+# compiled once per process on the first error diffusion
+_compiled_scan_error_diffusion = numba.njit(nogil=True)(_scan_error_diffusion) if numba else None
+
+
+class DitheringEngine:
+    FLOYD_STEINBERG = 'Floyd-Steinberg'
+    JARVIS = 'Jarvis'
+    STUCKI = 'Stucki'
+    ATKINSON = 'Atkinson'
+    ORDERED = 'Ordered'
+    BAYER = 'Bayer'
+    HALFTONE = 'Halftone'
+    GRID = 'Grid'
+    AVERAGE = 'Average'
+    RANDOM = 'Random'
+
+    # error diffusion weights, the pixel is on the first row in the middle column
+    ERROR_DIFFUSION_KERNELS = {
+        FLOYD_STEINBERG: np.array([[0, 0, 0, 7, 0],
+                                   [0, 3, 5, 1, 0],
+                                   [0, 0, 0, 0, 0]], dtype=np.float32) / 16,
+        JARVIS: np.array([[0, 0, 0, 7, 5],
+                          [3, 5, 7, 5, 3],
+                          [1, 3, 5, 3, 1]], dtype=np.float32) / 48,
+        STUCKI: np.array([[0, 0, 0, 8, 4],
+                          [2, 4, 8, 4, 2],
+                          [1, 2, 4, 2, 1]], dtype=np.float32) / 42,
+        # only 3/4 of the error is diffused
+        ATKINSON: np.array([[0, 0, 0, 1, 1],
+                            [0, 1, 1, 1, 0],
+                            [0, 0, 1, 0, 0]], dtype=np.float32) / 8
+    }
+
+    # thresholds of the interface ordered dithering (4x4 bayer matrix)
+    ORDERED_MATRIX = np.array([[16, 144, 48, 176],
+                               [208, 80, 240, 112],
+                               [64, 192, 32, 160],
+                               [256, 128, 224, 96]], dtype=np.float32)
+
+    # clustered dots of the interface halftone dithering
+    HALFTONE_MATRIX = np.array([[24, 10, 12, 26, 35, 47, 49, 37],
+                                [8, 0, 2, 14, 45, 59, 61, 51],
+                                [22, 6, 4, 16, 43, 57, 63, 53],
+                                [30, 20, 18, 28, 33, 41, 55, 39],
+                                [34, 46, 48, 36, 25, 11, 13, 27],
+                                [44, 58, 60, 50, 9, 1, 3, 15],
+                                [42, 56, 62, 52, 23, 7, 5, 17],
+                                [32, 40, 54, 38, 31, 21, 19, 29]], dtype=np.float32)
+
+    BAYER_MATRIX_SIZE = 8
+
+    # rows of the skewed buffer, the longer the wavefronts the fewer numpy calls
+    DEFAULT_BAND_ROWS = 256
+
+    # the random dithering gives the same gcode for the same image (gcode cache)
+    RANDOM_SEED = 0
+
+    def __init__(self, band_rows=DEFAULT_BAND_ROWS, use_numba=True):
+        self._band_rows = max(int(band_rows or self.DEFAULT_BAND_ROWS), 1)
+        self._use_numba = use_numba and numba is not None
+
+    @classmethod
+    def is_numba_available(cls):
+        return numba is not None
+
+    @classmethod
+    def get_algorithms(cls):
+        return list(cls.ERROR_DIFFUSION_KERNELS) + \
+            [cls.ORDERED, cls.BAYER, cls.HALFTONE, cls.GRID, cls.AVERAGE, cls.RANDOM]
+
+    # bayer matrix of size 2^n built recursively, the values are 0 to size^2 - 1
+    @classmethod
+    def get_bayer_matrix(cls, size):
+        matrix = np.zeros((1, 1), dtype=np.int64)
+        while len(matrix) < size:
+            matrix = np.block([[4 * matrix, 4 * matrix + 2],
+                               [4 * matrix + 3, 4 * matrix + 1]])
+        return matrix
+
+    '''
+    pixels: grayscale image (uint8), the first row is dithered first
+    return the dithered pixels (0 or 255), the pixels are returned unchanged incase the algorithm is unknown
+    '''
+    def dither(self, pixels, algorithm, gray_shift=0, block_size=1, block_distance=0):
+        if algorithm not in self.get_algorithms() or not pixels.size:
+            return pixels
+
+        pixels = np.asarray(pixels)
+        shifted_pixels = np.clip(pixels.astype(np.float32) + np.float32(gray_shift or 0), 0, 255)
+
+        if algorithm in self.ERROR_DIFFUSION_KERNELS:
+            dithered_pixels = self._diffuse_error(shifted_pixels, self.ERROR_DIFFUSION_KERNELS[algorithm])
+        else:
+            is_black = shifted_pixels < self._get_thresholds(pixels, algorithm)
+            if algorithm == self.GRID:
+                is_black &= self._get_grid_mask(pixels.shape, block_size, block_distance)
+            dithered_pixels = np.where(is_black, 0, 255).astype(np.uint8)
+
+        # the blank background is never burned
+        dithered_pixels[pixels == 255] = 255
+        return dithered_pixels
+
+    def _get_thresholds(self, pixels, algorithm):
+        height, width = pixels.shape
+
+        if algorithm in (self.AVERAGE, self.GRID):
+            return np.float32(pixels.mean())
+
+        if algorithm == self.RANDOM:
+            return np.random.default_rng(self.RANDOM_SEED).random(pixels.shape, dtype=np.float32) * 255
+
+        if algorithm == self.ORDERED:
+            matrix = self.ORDERED_MATRIX
+        elif algorithm == self.BAYER:
+            bayer_matrix = self.get_bayer_matrix(self.BAYER_MATRIX_SIZE)
+            matrix = ((bayer_matrix + 0.5) * 256 / bayer_matrix.size).astype(np.float32)
+        else:
+            matrix = (1 + self.HALFTONE_MATRIX) * 256 / (1 + self.HALFTONE_MATRIX.size)
+
+        # repeat the matrix over the image without building the repeated matrix
+        matrix_size = len(matrix)
+        return matrix[(np.arange(height) % matrix_size)[:, None], np.arange(width) % matrix_size]
+
+    # blocks of block size pixels every block size + block distance pixels (like the interface grid)
+    def _get_grid_mask(self, shape, block_size, block_distance):
+        block_size = block_size or 0
+        cell_size = block_size + (block_distance or 0)
+        if cell_size <= 0:
+            return np.ones(shape, dtype=bool)
+
+        height, width = shape
+        return ((np.arange(height) % cell_size <= block_size)[:, None] &
+                (np.arange(width) % cell_size <= block_size)[None, :])
+
+    def _diffuse_error(self, shifted_pixels, kernel):
+        if self._use_numba:
+            height, width = shifted_pixels.shape
+            padded_pixels = np.zeros((height + 2, width + 4), dtype=np.float32)
+            padded_pixels[:height, 2:-2] = shifted_pixels
+            _compiled_scan_error_diffusion(padded_pixels, kernel)
+            return padded_pixels[:height, 2:-2].astype(np.uint8)
+
+        return self._diffuse_error_by_wavefronts(shifted_pixels, kernel)
+
+    # columns between the wavefronts of two rows, a pixel is dithered after the pixels that diffuse error to it
+    @classmethod
+    def get_wavefront_skew(cls, kernel):
+        rows, columns = np.nonzero(kernel[1:])
+        if not len(rows):
+            return 1
+        # the pixel at (row - dy, column - dx) diffuses to (row, column): skew * dy > -dx
+        return int(np.floor(np.max((2 - columns) / (rows + 1)))) + 1
+
+    def _diffuse_error_by_wavefronts(self, shifted_pixels, kernel):
+        height, width = shifted_pixels.shape
+        skew = self.get_wavefront_skew(kernel)
+
+        # non zero weights of every kernel row: row offset, first and last column offsets, weights
+        kernel_rows = []
+        for kernel_row in range(3):
+            columns = np.flatnonzero(kernel[kernel_row])
+            if len(columns):
+                kernel_rows.append((kernel_row, columns[0] - 2, columns[-1] - 1,
+                                    kernel[kernel_row, columns[0]:columns[-1] + 1]))
+
+        dithered_pixels = np.empty((height, width), dtype=np.uint8)
+        # error diffused to the 2 rows after the band
+        carried_errors = np.zeros((2, width), dtype=np.float32)
+
+        for band_start in range(0, height, self._band_rows):
+            band_rows = min(self._band_rows, height - band_start)
+
+            # the pixel (row, column) is at (row, column + 2 + skew * row), 2 columns on each side for the error
+            skewed_buffer = np.zeros((band_rows + 2, width + 4 + skew * (band_rows + 2)), dtype=np.float32)
+            for row in range(band_rows):
+                skewed_buffer[row, 2 + skew * row:2 + skew * row + width] = shifted_pixels[band_start + row]
+            for row in range(2):
+                skewed_buffer[row, 2 + skew * row:2 + skew * row + width] += carried_errors[row]
+
+            for wavefront in range(width + skew * (band_rows - 1)):
+                # rows of the wavefront pixels inside the image
+                first_row = max(0, (wavefront - width) // skew + 1)
+                last_row = min(band_rows - 1, wavefront // skew) + 1
+                column = wavefront + 2
+
+                old_pixels = skewed_buffer[first_row:last_row, column]
+                new_pixels = np.where(old_pixels < 128, np.float32(0), np.float32(255))
+                errors = (old_pixels - new_pixels)[:, None]
+                skewed_buffer[first_row:last_row, column] = new_pixels
+
+                for kernel_row, first_column, last_column, weights in kernel_rows:
+                    kernel_column = column + skew * kernel_row
+                    skewed_buffer[first_row + kernel_row:last_row + kernel_row,
+                                  kernel_column + first_column:kernel_column + last_column] += errors * weights
+
+            for row in range(band_rows):
+                dithered_pixels[band_start + row] = skewed_buffer[row, 2 + skew * row:2 + skew * row + width]
+            carried_errors = np.stack([skewed_buffer[row, 2 + skew * row:2 + skew * row + width]
+                                       for row in (band_rows, band_rows + 1)])
+
+        return dithered_pixels
@@ -0,0 +1,278 @@
+import math
+import re
+import numpy as np
+from utils.gcode_modal_state import GcodeModalState
+
+'''
+Post processor of the generated cutting and marking gcode, the svg curves are flattened to many short G1 moves
+that are slow to stream to GRBL over the serial connection and make the job files bigger
+- the runs of G1 moves (same feed rate and power) are replaced by fewer moves: the collinear moves are merged
+  in one G1 move and the moves along a circle become one G2 (clockwise) or G3 (counterclockwise) arc
+  with the center offset from the start (I J)
+- the new path never goes more than the tolerance away from the original moves: the points and the middles
+  of the original moves are checked against every merged move and every arc before it is used
+- the feed rate (F) and the power (S) words are written only when they change
+the other lines are not changed, the moves are not fitted in relative distances (G91), inches (G20)
+or inverse time feed rate (G93), the ends of the moves are written exactly like the original moves
+'''
+
+
+class GcodeArcFitter:
+    # max distance between the new path and the original moves (mm)
+    DEFAULT_TOLERANCE = 0.01
+    # digits after the decimal point of the arcs centers offsets (mm)
+    PRECISION = 3
+
+    # an arc replaces at least 3 moves
+    MIN_ARC_MOVES = 3
+    # the arcs with a bigger radius (mm) are almost lines, GRBL segments them badly
+    MAX_ARC_RADIUS = 1000
+    # the distances of the arc start and end from the center are the same for GRBL (error limit 0.005 mm)
+    MAX_ARC_RADIUS_ERROR = 0.002
+    # an arc is less than a full circle, GRBL can not tell the direction of a full circle from its ends
+    MAX_ARC_SWEEP = 2 * math.pi - 0.01
+
+    # move of the run: optional G1, X and Y with optional F and S words, nothing else
+    MOVE_PATTERN = re.compile(
+        r'\s*(?:G0*1(?![\d.])\s*)?((?:[XYFS]\s*[-+]?(?:\d+\.?\d*|\.\d+)\s*)+)$')
+    MOVE_WORD_PATTERN = re.compile(r'([XYFS])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+    MOTION_WORD_PATTERN = re.compile(r'G0*[0-3](?![\d.])')
+    AXIS_WORD_PATTERN = re.compile(r'[XYZ]\s*[-+]?[\d.]')
+
+    def __init__(self, tolerance=DEFAULT_TOLERANCE):
+        # the written ends and centers are rounded to the gcode precision, the fits are checked with the margin
+        self._tolerance = max((tolerance or self.DEFAULT_TOLERANCE) - 10 ** -self.PRECISION,
+                              10 ** -self.PRECISION)
+
+        # state of the original gcode
+        self._modal_state = GcodeModalState()
+        # motion mode of the written gcode, the arcs change it from G1 to G2 / G3
+        self._motion = self._modal_state.motion
+
+        # points of the current run (the first point is the start position) and their x, y words
+        self._run_points = []
+        self._run_words = []
+        # feed rate and power words of the run, written on its first move incase they changed
+        self._run_modal_words = ''
+
+        self._moves_number = 0
+        self._fitted_moves_number = 0
+
+    def get_stats(self):
+        return {'moves': self._moves_number, 'fitted_moves': self._fitted_moves_number}
+
+    # filter of the gcode lines
+    def fit_lines(self, gcode_lines):
+        for line in gcode_lines:
+            move_words = self._parse_move(line)
+            if move_words is None:
+                yield from self._flush_run()
+                yield self._pass_line(line)
+            else:
+                yield from self._add_move(line, move_words)
+
+        yield from self._flush_run()
+
+    # words of a move that can be fitted, None for the other lines
+    def _parse_move(self, line):
+        match = self.MOVE_PATTERN.match(line.upper())
+        if not match or (self._modal_state.motion != 'G1' and 'G' not in line.upper()):
+            return None
+        if self._modal_state.distance != 'G90' or self._modal_state.units != 'G21' or \
+                self._modal_state.feed_rate_mode != 'G94':
+            return None
+
+        move_words = dict(self.MOVE_WORD_PATTERN.findall(match.group(1)))
+        if 'X' not in move_words and 'Y' not in move_words:
+            return None
+        return move_words
+
+    def _add_move(self, line, move_words):
+        start = (self._modal_state.position['x'], self._modal_state.position['y'])
+        feed_rate, power = self._modal_state.feed_rate, self._modal_state.spindle_speed
+
+        self._modal_state.update(line)
+        x, y = self._modal_state.position['x'], self._modal_state.position['y']
+
+        # the start position is unknown (first move of the file), the move is not fitted
+        if start[0] is None or start[1] is None or x is None or y is None:
+            yield from self._flush_run()
+            yield self._pass_line(line, is_updated=True)
+            return
+
+        # the feed rate or the power changed, a new run starts with the new words
+        modal_words = ''.join(f' {letter}{move_words[letter]}' for letter in ('S', 'F')
+                              if letter in move_words and
+                              float(move_words[letter]) != (power if letter == 'S' else feed_rate))
+        if modal_words:
+            yield from self._flush_run()
+            self._run_modal_words = modal_words
+
+        if not self._run_points:
+            self._run_points.append(start)
+            self._run_words.append(tuple(GcodeModalState.format_number(value) for value in start))
+
+        # the axis without word keeps the word of the previous point
+        previous_words = self._run_words[-1]
+        self._run_points.append((x, y))
+        self._run_words.append((move_words.get('X', previous_words[0]), move_words.get('Y', previous_words[1])))
+
+    def _pass_line(self, line, is_updated=False):
+        if not is_updated:
+            self._modal_state.update(line)
+
+        upper_line = line.upper()
+        if self.MOTION_WORD_PATTERN.search(upper_line):
+            self._motion = self._modal_state.motion
+        # the line continues the original motion mode, the written motion mode is an arc
+        elif self._motion != self._modal_state.motion and self.AXIS_WORD_PATTERN.search(upper_line):
+            line = f'{self._modal_state.motion} {line.lstrip()}'
+            self._motion = self._modal_state.motion
+
+        return line
+
+    def _flush_run(self):
+        if len(self._run_points) < 2:
+            self._run_points, self._run_words = [], []
+            return
+
+        points = np.array(self._run_points, dtype=float)
+        words = self._run_words
+        modal_words = self._run_modal_words
+        self._run_points, self._run_words, self._run_modal_words = [], [], ''
+
+        self._moves_number += len(points) - 1
+        previous_words = words[0]
+        for motion, end, center_offset in self.fit_points(points):
+            x_word, y_word = words[end]
+            move = motion
+            # the unchanged axis is not written for the lines, the arcs have both axes
+            if motion != 'G1' or x_word != previous_words[0]:
+                move += f' X{x_word}'
+            if motion != 'G1' or y_word != previous_words[1]:
+                move += f' Y{y_word}'
+            if center_offset is not None:
+                move += f' I{center_offset[0]!r} J{center_offset[1]!r}'
+
+            self._fitted_moves_number += 1
+            self._motion = motion
+            previous_words = (x_word, y_word)
+            yield move + modal_words
+            modal_words = ''
+
+    '''
+    points: start point and the ends of the moves (mm)
+    yield the motion (G1, G2, G3), the index of the end point and the center offset of the arcs
+    '''
+    def fit_points(self, points):
+        start = 0
+        last = len(points) - 1
+        while start < last:
+            line_end = self._find_fit_end(points, start, start + 1, self._fit_line)
+            arc_end = self._find_fit_end(points, start, start + self.MIN_ARC_MOVES, self._fit_arc)
+
+            if arc_end is not None and arc_end > line_end:
+                motion, center_offset = self._fit_arc(points, start, arc_end)
+                yield motion, arc_end, center_offset
+                start = arc_end
+            else:
+                yield 'G1', line_end, None
+                start = line_end
+
+    # last end point fitted from the start, the ends are tried by doubling the moves then by bisection
+    def _find_fit_end(self, points, start, first_end, fit):
+        last = len(points) - 1
+        if first_end > last or fit(points, start, first_end) is None:
+            return None
+
+        fitted_end, failed_end = first_end, None
+        while fitted_end < last:
+            end = min(start + 2 * (fitted_end - start), last)
+            if fit(points, start, end) is None:
+                failed_end = end
+                break
+            fitted_end = end
+
+        while failed_end is not None and failed_end - fitted_end > 1:
+            end = (fitted_end + failed_end) // 2
+            if fit(points, start, end) is None:
+                failed_end = end
+            else:
+                fitted_end = end
+
+        return fitted_end
+
+    # the points between the start and the end are on the line and go forward, return True or None
+    def _fit_line(self, points, start, end):
+        if end - start == 1:
+            return True
+
+        direction = points[end] - points[start]
+        length = math.hypot(*direction)
+        if not length:
+            return None
+
+        vectors = points[start + 1:end] - points[start]
+        distances = np.abs(vectors[:, 0] * direction[1] - vectors[:, 1] * direction[0]) / length
+        if distances.max() > self._tolerance:
+            return None
+
+        projections = np.concatenate(([0], vectors @ direction / length, [length]))
+        if np.any(np.diff(projections) < 0):
+            return None
+        return True
+
+    # the points and the middles of the moves are on the arc, return the motion and the center offset or None
+    def _fit_arc(self, points, start, end):
+        first_point, last_point = points[start], points[end]
+        middles = (points[start + 1:end + 1] + points[start:end]) / 2
+        center = self.get_arc_center(first_point, last_point, np.concatenate((points[start + 1:end], middles)))
+        if center is None:
+            return None
+
+        # the center offset is written with the gcode precision, the arc is checked with the written center
+        center_offset = np.round(center - first_point, self.PRECISION) + 0.0
+        center = first_point + center_offset
+        radius = math.hypot(*center_offset)
+        if not self._tolerance < radius <= self.MAX_ARC_RADIUS or \
+                abs(math.hypot(*(last_point - center)) - radius) > self.MAX_ARC_RADIUS_ERROR:
+            return None
+
+        vectors = points[start:end + 1] - center
+        angles = np.unwrap(np.arctan2(vectors[:, 1], vectors[:, 0]))
+        steps = np.diff(angles)
+        sweep = angles[-1] - angles[0]
+        if not (np.all(steps > 0) or np.all(steps < 0)) or abs(sweep) > self.MAX_ARC_SWEEP:
+            return None
+
+        middles -= center
+        if np.abs(np.hypot(vectors[:, 0], vectors[:, 1]) - radius).max() > self._tolerance or \
+                np.abs(np.hypot(middles[:, 0], middles[:, 1]) - radius).max() > self._tolerance:
+            return None
+
+        return ('G3' if sweep > 0 else 'G2'), center_offset.tolist()
+
+    '''
+    center of the arc from the first point to the last point closest to the points (least squares),
+    the center is on the bisector of the chord: center = middle + t * normal, radius^2 = half chord^2 + t^2
+    and |point - center|^2 - radius^2 = |point - middle|^2 - half chord^2 - 2 * t * (point - middle) . normal
+    is linear in t, None incase the points are on the chord
+    '''
+    @classmethod
+    def get_arc_center(cls, first_point, last_point, points):
+        chord = last_point - first_point
+        half_chord = math.hypot(*chord) / 2
+        if not half_chord:
+            return None
+
+        chord_middle = (first_point + last_point) / 2
+        normal = np.array([-chord[1], chord[0]]) / (2 * half_chord)
+
+        vectors = points - chord_middle
+        distances = (vectors * vectors).sum(axis=1) - half_chord ** 2
+        normal_distances = vectors @ normal
+        normal_norm = (normal_distances * normal_distances).sum()
+        if normal_norm < 1e-12:
+            return None
+
+        return chord_middle + normal * (distances @ normal_distances / (2 * normal_norm))
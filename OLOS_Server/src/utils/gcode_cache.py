@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import uuid
+from files_manager.constants import FilesManagerConstants as constants
+
+'''
+Content addressed cache of the gcode generated for every image and operation (gcode fragment)
+the key is the hash of the decoded image bytes, the operation, the image settings (metrics, tool, power...)
+and everything else that changes the generated gcode (images bounding box, generator configuration),
+so an unchanged image reuses its fragment and only the edited images are generated again
+
+- every fragment is a file (<key>.gcode) written in a temporary file first while its lines are generated,
+  it is saved only incase all the lines are generated (the generation can be cancelled)
+- the modification time of a fragment is its last use, the least recently used fragments are removed
+  when the fragments size exceeds the cache size
+'''
+
+
+class GcodeCache:
+    def __init__(self, max_size, cache_directory=constants.GCODE_CACHE_DIR):
+        # max size of the fragments in megabytes
+        self._max_size = max_size * constants.BYTES_TO_MEGABYTES
+        self._cache_directory = cache_directory
+
+        if not os.path.exists(self._cache_directory):
+            os.makedirs(self._cache_directory, exist_ok=True)
+
+    # the pydantic settings models are serialized as dictionaries
+    @classmethod
+    def _serialize(cls, value):
+        try:
+            return dict(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+    @classmethod
+    def get_key(cls, content, *parameters):
+        hasher = hashlib.sha256(content or b'')
+        hasher.update(json.dumps([constants.GCODE_CACHE_VERSION, parameters],
+                                 sort_keys=True, default=cls._serialize).encode('utf-8'))
+        return hasher.hexdigest()
+
+    def get_fragment_path(self, key):
+        return os.path.join(self._cache_directory, key + constants.GCODE_CACHE_FILE_EXTENSION)
+
+    def has_fragment(self, key):
+        return os.path.exists(self.get_fragment_path(key))
+
+    # lines of the cached fragment, None incase the fragment is not cached
+    def read_lines(self, key):
+        fragment_path = self.get_fragment_path(key)
+        try:
+            fragment_file = open(fragment_path, 'r', encoding='utf-8', newline='')
+            # the fragment is used now, it is the last one to be removed
+            os.utime(fragment_path)
+        except OSError:
+            return None
+
+        return self._read_fragment_lines(fragment_file)
+
+    def _read_fragment_lines(self, fragment_file):
+        with fragment_file:
+            for line in fragment_file:
+                yield line.rstrip('\n')
+
+    # yield the generated lines and save them as the fragment of the key
+    def write_lines(self, key, gcode_lines):
+        fragment_path = self.get_fragment_path(key)
+        # unique temporary file, the same fragment can be generated by two workers at the same time
+        temporary_fragment_path = f'{fragment_path}.{uuid.uuid4().hex}.tmp'
+
+        try:
+            fragment_file = open(temporary_fragment_path, 'w', encoding='utf-8', newline='')
+        # the cache is not writable, the gcode is still generated
+        except OSError as error:
+            self._print_error(error)
+            yield from gcode_lines
+            return
+
+        try:
+            for line in gcode_lines:
+                if fragment_file:
+                    fragment_file = self._write_line(fragment_file, line)
+                yield line
+
+            # all the lines are generated
+            if fragment_file and self._close_fragment_file(fragment_file):
+                self._save_fragment(temporary_fragment_path, fragment_path)
+
+        finally:
+            if fragment_file:
+                self._close_fragment_file(fragment_file)
+            if os.path.exists(temporary_fragment_path):
+                os.remove(temporary_fragment_path)
+
+    def _write_line(self, fragment_file, line):
+        try:
+            fragment_file.write(line + '\n')
+            return fragment_file
+        except OSError as error:
+            self._print_error(error)
+            self._close_fragment_file(fragment_file)
+            return None
+
+    def _close_fragment_file(self, fragment_file):
+        try:
+            fragment_file.close()
+            return True
+        except OSError as error:
+            self._print_error(error)
+            return False
+
+    def _save_fragment(self, temporary_fragment_path, fragment_path):
+        try:
+            os.replace(temporary_fragment_path, fragment_path)
+        except OSError as error:
+            self._print_error(error)
+
+    def _print_error(self, error):
+        if os.getenv('ENV') == 'development':
+            print('Gcode Cache Error:', error)
+
+    # remove the least recently used fragments until the cache fits in its size
+    def evict(self):
+        fragments = []
+        cache_size = 0
+        for entry in os.scandir(self._cache_directory):
+            if entry.is_file() and entry.name.endswith(constants.GCODE_CACHE_FILE_EXTENSION):
+                entry_stat = entry.stat()
+                fragments.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+                cache_size += entry_stat.st_size
+
+        for _, fragment_size, fragment_path in sorted(fragments):
+            if cache_size <= self._max_size:
+                break
+            try:
+                os.remove(fragment_path)
+                cache_size -= fragment_size
+            except OSError:
+                pass
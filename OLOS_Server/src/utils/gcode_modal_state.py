@@ -0,0 +1,269 @@
+import re
+
+'''
+Track the modal state of the machine while going through the lines of a job file
+(motion mode, plane, units, distance mode, feed rate mode, coordinate system, spindle/laser, coolant,
+feed rate, spindle speed/laser power, active tool and the position at the end of the last line)
+
+the state is used to resume a job from any line without replaying the lines before it,
+the preamble brings the machine back to the same state before streaming the rest of the file
+'''
+
+
+class GcodeModalState:
+    GCODE_WORD_PATTERN = re.compile(r'([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+    GCODE_COMMENTS_PATTERN = re.compile(r'\(.*?\)|;.*')
+
+    # modal groups
+    MOTION_MODES = ('G0', 'G1', 'G2', 'G3', 'G38.2',
+                    'G38.3', 'G38.4', 'G38.5', 'G80')
+    PLANE_MODES = ('G17', 'G18', 'G19')
+    UNITS_MODES = ('G20', 'G21')
+    DISTANCE_MODES = ('G90', 'G91')
+    FEED_RATE_MODES = ('G93', 'G94')
+    COORDINATE_SYSTEMS = ('G54', 'G55', 'G56', 'G57', 'G58', 'G59')
+    SPINDLE_MODES = ('M3', 'M4', 'M5')
+    COOLANT_MODES = ('M7', 'M8')
+    COOLANT_OFF = 'M9'
+    TOOL_CHANGE = 'M6'
+
+    # motion modes that can be restored without axis words, GRBL rejects an arc word
+    # without the axis words of the arc so the arc motion word is written with the resumed line
+    RESTORABLE_MOTION_MODES = ('G0', 'G1')
+    ARC_MOTION_MODES = ('G2', 'G3')
+
+    # the axis words of these commands are not a move in the work coordinates
+    NON_MOTION_AXIS_COMMANDS = ('G10', 'G28', 'G30', 'G92')
+    MACHINE_COORDINATES_COMMAND = 'G53'
+
+    AXES = ('x', 'y', 'z')
+    # the words of a line continuing the motion mode (axis words and arc offsets)
+    MOTION_WORDS = ('X', 'Y', 'Z', 'I', 'J', 'K', 'R')
+
+    def __init__(self):
+        # GRBL power up state
+        self.motion = 'G0'
+        self.plane = 'G17'
+        self.units = 'G21'
+        self.distance = 'G90'
+        self.feed_rate_mode = 'G94'
+        self.coordinate_system = 'G54'
+        self.spindle = 'M5'
+        self.coolant = []
+        self.feed_rate = 0
+        self.spindle_speed = 0
+
+        # tool selected by the T word and the tool changed by M6
+        self.selected_tool = None
+        self.tool = None
+
+        # position in the work coordinates, unknown until the job moves the axis
+        self.position = {axis: None for axis in self.AXES}
+        # last position moved to in the machine coordinates (G53), like the bed height for the laser cutter
+        self.machine_position = {axis: None for axis in self.AXES}
+
+    @classmethod
+    def from_dict(cls, modal_state_dict):
+        modal_state = cls()
+        for key, value in modal_state_dict.items():
+            if hasattr(modal_state, key):
+                setattr(modal_state, key, value)
+        return modal_state
+
+    # go through the lines of the job file until specific line
+    @classmethod
+    def from_job_file(cls, job_file, last_line):
+        modal_state = cls()
+        modal_state.update_from_job_file(job_file, 1, last_line)
+        return modal_state
+
+    def to_dict(self):
+        return {
+            'motion': self.motion,
+            'plane': self.plane,
+            'units': self.units,
+            'distance': self.distance,
+            'feed_rate_mode': self.feed_rate_mode,
+            'coordinate_system': self.coordinate_system,
+            'spindle': self.spindle,
+            'coolant': list(self.coolant),
+            'feed_rate': self.feed_rate,
+            'spindle_speed': self.spindle_speed,
+            'selected_tool': self.selected_tool,
+            'tool': self.tool,
+            'position': dict(self.position),
+            'machine_position': dict(self.machine_position)
+        }
+
+    def update_from_job_file(self, job_file, first_line, last_line):
+        if last_line < first_line:
+            return
+
+        for line_index, line in job_file.iter_lines(first_line):
+            self.update(str(line, 'utf-8', errors='replace'))
+            if line_index >= last_line:
+                break
+
+    def update(self, line):
+        line = self.GCODE_COMMENTS_PATTERN.sub('', line.upper())
+        words = self.GCODE_WORD_PATTERN.findall(line)
+        if not words:
+            return
+
+        axis_words = {}
+        is_work_coordinates_move = True
+        is_machine_coordinates_move = False
+        is_tool_change = False
+
+        for letter, value in words:
+            number = float(value)
+
+            if letter == 'G':
+                command = self.format_command(letter, number)
+
+                if command in self.MOTION_MODES:
+                    self.motion = command
+                elif command in self.PLANE_MODES:
+                    self.plane = command
+                elif command in self.UNITS_MODES:
+                    self.units = command
+                elif command in self.DISTANCE_MODES:
+                    self.distance = command
+                elif command in self.FEED_RATE_MODES:
+                    self.feed_rate_mode = command
+                elif command in self.COORDINATE_SYSTEMS:
+                    self.coordinate_system = command
+                elif command == self.MACHINE_COORDINATES_COMMAND:
+                    is_work_coordinates_move = False
+                    is_machine_coordinates_move = True
+                elif command in self.NON_MOTION_AXIS_COMMANDS:
+                    is_work_coordinates_move = False
+
+            elif letter == 'M':
+                command = self.format_command(letter, number)
+
+                if command in self.SPINDLE_MODES:
+                    self.spindle = command
+                elif command in self.COOLANT_MODES:
+                    if command not in self.coolant:
+                        self.coolant.append(command)
+                elif command == self.COOLANT_OFF:
+                    self.coolant = []
+                elif command == self.TOOL_CHANGE:
+                    is_tool_change = True
+
+            elif letter == 'F':
+                self.feed_rate = number
+            elif letter == 'S':
+                self.spindle_speed = number
+            elif letter == 'T':
+                self.selected_tool = int(number)
+            elif letter in ('X', 'Y', 'Z'):
+                axis_words[letter.lower()] = number
+
+        if is_tool_change:
+            self.tool = self.selected_tool
+
+        if axis_words:
+            if is_work_coordinates_move:
+                self.update_position(axis_words)
+            elif is_machine_coordinates_move:
+                self.machine_position.update(axis_words)
+
+    def update_position(self, axis_words):
+        for axis, value in axis_words.items():
+            if self.distance == 'G90':
+                self.position[axis] = value
+            # relative move from unknown position is still unknown
+            elif self.position[axis] is not None:
+                self.position[axis] += value
+
+    @classmethod
+    def format_command(cls, letter, number):
+        # G00 -> G0, G38.2 -> G38.2
+        return f'{letter}{int(number)}' if number.is_integer() else f'{letter}{number}'
+
+    @classmethod
+    def format_number(cls, number):
+        return f'{number:.4f}'.rstrip('0').rstrip('.')
+
+    # the resumed line with the arc motion word incase it continues an arc block without its own motion word
+    # (X10 Y5 I2 J0 after G2 -> G2 X10 Y5 I2 J0), None incase the line does not need the motion word
+    def get_arc_motion_line(self, line):
+        if self.motion not in self.ARC_MOTION_MODES or not line:
+            return None
+
+        line = self.GCODE_COMMENTS_PATTERN.sub('', line).strip()
+        words = self.GCODE_WORD_PATTERN.findall(line.upper())
+        if not any(letter in self.MOTION_WORDS for letter, _ in words):
+            return None
+
+        # the line has its own motion word or its axis words are not a move (G92 X0)
+        for letter, value in words:
+            if letter == 'G':
+                command = self.format_command(letter, float(value))
+                if (command in self.MOTION_MODES or command in self.NON_MOTION_AXIS_COMMANDS or
+                        command == self.MACHINE_COORDINATES_COMMAND):
+                    return None
+
+        return f'{self.motion} {line}'
+
+    def get_preamble(self, safe_z_command, resume_line=None):
+        '''
+        commands to bring the machine to the same state of the resumed line:
+        1. turn off the spindle/laser and coolant while moving to the start position
+        2. restore the plane, units, feed rate mode and coordinate system in absolute mode
+        3. change to the active tool (the tool changer waits for it)
+        4. move to the start position, from a safe height incase the job moves the z axis
+        5. turn on the spindle/laser and coolant then move down to the job height
+        6. restore the distance mode, motion mode and feed rate, inside an arc block
+           the resumed line is the last command with the arc motion word (get_arc_motion_line),
+           the job is streamed after it
+        '''
+        preamble = ['M5', self.COOLANT_OFF,
+                    f'G90 {self.plane} {self.units} {self.feed_rate_mode} {self.coordinate_system}']
+
+        if self.tool is not None:
+            preamble.append(f'{self.TOOL_CHANGE}T{self.tool}')
+
+        is_z_position_known = self.position['z'] is not None
+        if is_z_position_known:
+            preamble.append(safe_z_command)
+        elif self.machine_position['z'] is not None:
+            preamble.append(
+                f"G53 G0 Z{self.format_number(self.machine_position['z'])}")
+
+        xy_words = ' '.join(f'{axis.upper()}{self.format_number(self.position[axis])}'
+                            for axis in ('x', 'y') if self.position[axis] is not None)
+        if xy_words:
+            preamble.append(f'G0 {xy_words}')
+
+        if self.spindle != 'M5':
+            preamble.append(
+                f'{self.spindle} S{self.format_number(self.spindle_speed)}')
+        preamble.extend(self.coolant)
+
+        if is_z_position_known:
+            z_position = self.format_number(self.position['z'])
+            if self.feed_rate:
+                preamble.append(
+                    f'G1 Z{z_position} F{self.format_number(self.feed_rate)}')
+            else:
+                preamble.append(f'G0 Z{z_position}')
+
+        if self.distance != 'G90':
+            preamble.append(self.distance)
+
+        motion_words = []
+        if self.motion in self.RESTORABLE_MOTION_MODES:
+            motion_words.append(self.motion)
+        if self.feed_rate:
+            motion_words.append(f'F{self.format_number(self.feed_rate)}')
+        if motion_words:
+            preamble.append(' '.join(motion_words))
+
+        arc_motion_line = self.get_arc_motion_line(resume_line)
+        if arc_motion_line:
+            preamble.append(arc_motion_line)
+
+        return preamble
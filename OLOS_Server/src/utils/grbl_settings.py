@@ -0,0 +1,93 @@
+import json
+import os
+import re
+from machine_connection.constants import MachineConstants as constants
+from utils.configuration_loader import ConfigurationLoader
+
+'''
+Cache of the GRBL settings ($<number>=<value>) read from the controller with the $$ command
+the settings are saved in a json file so the processes without the serial connection (jobs generation,
+files upload) can use them, until the controller answers the default settings of the configuration file are used
+- $11 junction deviation (mm)
+- $110, $111, $112 max rate of the x, y, z axis (mm/min)
+- $120, $121, $122 acceleration of the x, y, z axis (mm/s^2)
+'''
+
+
+class GrblSettings:
+    SETTING_PATTERN = re.compile(r'^\$(\d+)=([-+]?(?:\d+\.?\d*|\.\d+))')
+
+    JUNCTION_DEVIATION_SETTING = 11
+    MAX_RATES_SETTINGS = (110, 111, 112)
+    ACCELERATIONS_SETTINGS = (120, 121, 122)
+
+    # GRBL firmware defaults incase the setting is missing
+    DEFAULT_SETTINGS = {11: 0.01, 110: 500, 111: 500, 112: 500, 120: 10, 121: 10, 122: 10}
+
+    def __init__(self, settings=None):
+        self._settings = dict(settings or {})
+        self._is_changed = False
+
+    # settings read from the controller, the configured defaults fill the missing settings
+    @classmethod
+    def load(cls, cache_path=constants.GRBL_SETTINGS_CACHE_PATH):
+        settings = {}
+
+        config = ConfigurationLoader.from_yaml()
+        default_settings = config.get_dict('job_time_estimation.default_grbl_settings')
+        if default_settings:
+            settings.update({int(str(number).lstrip('$')): float(value)
+                             for number, value in default_settings.items()})
+
+        try:
+            with open(cache_path, 'r') as cache_file:
+                settings.update({int(number): float(value)
+                                 for number, value in json.load(cache_file).items()})
+        except (OSError, ValueError):
+            pass
+
+        return cls(settings)
+
+    def save(self, cache_path=constants.GRBL_SETTINGS_CACHE_PATH):
+        self._is_changed = False
+        try:
+            # write the settings in a temporary file first to not leave a broken cache behind
+            temporary_cache_path = cache_path + '.tmp'
+            with open(temporary_cache_path, 'w') as cache_file:
+                json.dump({str(number): value for number, value in sorted(self._settings.items())},
+                          cache_file, indent=2)
+            os.replace(temporary_cache_path, cache_path)
+
+        except OSError as error:
+            if os.getenv('ENV') == 'development':
+                print('GRBL Settings Error:', error)
+
+    # update the setting incase the line is a setting ($110=5000.000), return True for a setting line
+    def update_from_line(self, line):
+        match = self.SETTING_PATTERN.match(line.strip())
+        if not match:
+            return False
+
+        number, value = int(match.group(1)), float(match.group(2))
+        if self._settings.get(number) != value:
+            self._settings[number] = value
+            self._is_changed = True
+        return True
+
+    def is_changed(self):
+        return self._is_changed
+
+    def get(self, number):
+        return self._settings.get(number, self.DEFAULT_SETTINGS.get(number))
+
+    def get_junction_deviation(self):
+        return self.get(self.JUNCTION_DEVIATION_SETTING)
+
+    def get_max_rates(self):
+        return [self.get(number) for number in self.MAX_RATES_SETTINGS]
+
+    def get_accelerations(self):
+        return [self.get(number) for number in self.ACCELERATIONS_SETTINGS]
+
+    def to_dict(self):
+        return dict(self._settings)
@@ -0,0 +1,195 @@
+'''
+Parse the GRBL 1.1 status report in one pass: <State|Field:value|Field:value...>
+the report is split on '|' and every field is dispatched on its key:
+- MPos, WPos, WCO: machine position, work position and work coordinate offset (x, y, z)
+- Bf: planner blocks and serial buffer bytes available
+- Ln: line number, F / FS: feed rate (and spindle speed)
+- Pn: input pins, Ov: overrides (feed, rapids, spindle), A: accessories
+- T: active tool (tool changer firmware)
+
+GRBL sends WCO and Ov only every few reports and Pn/A only when they are active,
+so the missing WCO and Ov are taken from the previous report and the missing Pn/A are empty
+
+the status is compared with the previous one to send only the reports that changed,
+the same report text is not parsed again
+'''
+
+
+class GrblStatus:
+    __slots__ = ('report', 'state', 'sub_state', 'machine_position', 'work_position',
+                 'work_coordinate_offset', 'commands_queued', 'buffer_length', 'line_number',
+                 'feed_rate', 'speed', 'pins', 'overrides', 'accessories', 'machine_tool')
+
+    # fields compared between two reports
+    FIELDS = __slots__[1:]
+
+    NO_POSITION = (None, None, None)
+    NO_OVERRIDES = (None, None, None)
+
+    def __init__(self):
+        self.report = None
+        self.state = None
+        self.sub_state = None
+        self.machine_position = self.NO_POSITION
+        self.work_position = self.NO_POSITION
+        self.work_coordinate_offset = self.NO_POSITION
+        self.commands_queued = None
+        self.buffer_length = None
+        self.line_number = None
+        self.feed_rate = None
+        self.speed = None
+        self.pins = ''
+        self.overrides = self.NO_OVERRIDES
+        self.accessories = ''
+        self.machine_tool = None
+
+    @classmethod
+    def parse(cls, report, previous_status=None):
+        # fast path: the machine did not change since the previous report
+        if previous_status is not None and report == previous_status.report:
+            return previous_status
+
+        status = cls()
+        status.report = report
+
+        fields = report.strip('<>\r\n ').split('|')
+        state, _, sub_state = fields[0].partition(':')
+        status.state = state or None
+        status.sub_state = int(sub_state) if sub_state.isdigit() else None
+
+        fields_parsers = cls.FIELDS_PARSERS
+        for field in fields[1:]:
+            key, _, value = field.partition(':')
+            parse_field = fields_parsers.get(key)
+            if parse_field is not None:
+                try:
+                    parse_field(status, value)
+                # ignore a broken field (corrupted serial data)
+                except ValueError:
+                    pass
+
+        if previous_status is not None:
+            # the offset and the overrides are not in every report
+            if status.work_coordinate_offset is cls.NO_POSITION:
+                status.work_coordinate_offset = previous_status.work_coordinate_offset
+            if status.overrides is cls.NO_OVERRIDES:
+                status.overrides = previous_status.overrides
+
+        status.complete_positions()
+
+        return status
+
+    @classmethod
+    def parse_numbers(cls, value):
+        return tuple(map(float, value.split(',')))
+
+    @classmethod
+    def parse_position(cls, value):
+        position = tuple(map(float, value.split(',')))
+        if len(position) == 3:
+            return position
+        # the missing axes (machines without z axis) are None
+        return (position + cls.NO_POSITION)[:3]
+
+    def parse_machine_position(self, value):
+        self.machine_position = self.parse_position(value)
+
+    def parse_work_position(self, value):
+        self.work_position = self.parse_position(value)
+
+    def parse_work_coordinate_offset(self, value):
+        self.work_coordinate_offset = self.parse_position(value)
+
+    def parse_buffer(self, value):
+        self.commands_queued, self.buffer_length = self.parse_numbers(value)[:2]
+
+    def parse_line_number(self, value):
+        self.line_number = int(value)
+
+    def parse_feed(self, value):
+        self.feed_rate = float(value)
+
+    def parse_feed_and_speed(self, value):
+        self.feed_rate, self.speed = self.parse_numbers(value)[:2]
+
+    def parse_pins(self, value):
+        self.pins = value
+
+    def parse_overrides(self, value):
+        self.overrides = self.parse_numbers(value)[:3]
+
+    def parse_accessories(self, value):
+        self.accessories = value
+
+    def parse_machine_tool(self, value):
+        self.machine_tool = float(value)
+
+    # GRBL reports the machine position or the work position depending on its $10 setting
+    # the other one is calculated from the work coordinate offset
+    def complete_positions(self):
+        if self.work_coordinate_offset is self.NO_POSITION:
+            return
+
+        if self.machine_position is not self.NO_POSITION and self.work_position is self.NO_POSITION:
+            self.work_position = tuple(
+                None if position is None or offset is None else round(position - offset, 3)
+                for position, offset in zip(self.machine_position, self.work_coordinate_offset))
+
+        elif self.work_position is not self.NO_POSITION and self.machine_position is self.NO_POSITION:
+            self.machine_position = tuple(
+                None if position is None or offset is None else round(position + offset, 3)
+                for position, offset in zip(self.work_position, self.work_coordinate_offset))
+
+    # names of the fields that changed since the previous status
+    def diff(self, previous_status):
+        if previous_status is None:
+            return list(self.FIELDS)
+        if previous_status is self:
+            return []
+
+        return [field for field in self.FIELDS
+                if getattr(self, field) != getattr(previous_status, field)]
+
+    def to_dict(self, type):
+        machine_x, machine_y, machine_z = self.machine_position
+        work_x, work_y, work_z = self.work_position
+        offset_x, offset_y, offset_z = self.work_coordinate_offset
+        feed_override, rapids_override, spindle_override = self.overrides
+
+        return {
+            "type": type,
+            "state": self.state,
+            "sub_state": self.sub_state,
+            "machine_position": {"x": machine_x, "y": machine_y, "z": machine_z},
+            "work_position": {"x": work_x, "y": work_y, "z": work_z},
+            "work_coordinate_offset": {"x": offset_x, "y": offset_y, "z": offset_z},
+            "buffer_state": {
+                "commands_queued": self.commands_queued,
+                "buffer_length": self.buffer_length,
+            },
+            "line_number": self.line_number,
+            "feed_and_speed": {"feed_rate": self.feed_rate, "speed": self.speed},
+            "pins": self.pins,
+            "overrides": {
+                "feed": feed_override,
+                "rapids": rapids_override,
+                "spindle": spindle_override,
+            },
+            "accessories": self.accessories,
+            "machine_tool": self.machine_tool
+        }
+
+
+GrblStatus.FIELDS_PARSERS = {
+    'MPos': GrblStatus.parse_machine_position,
+    'WPos': GrblStatus.parse_work_position,
+    'WCO': GrblStatus.parse_work_coordinate_offset,
+    'Bf': GrblStatus.parse_buffer,
+    'Ln': GrblStatus.parse_line_number,
+    'F': GrblStatus.parse_feed,
+    'FS': GrblStatus.parse_feed_and_speed,
+    'Pn': GrblStatus.parse_pins,
+    'Ov': GrblStatus.parse_overrides,
+    'A': GrblStatus.parse_accessories,
+    'T': GrblStatus.parse_machine_tool,
+}
@@ -1,14 +1,20 @@
 import io
+import itertools
+import multiprocessing
 import os
 import re
-import subprocess
 import tempfile
-import numpy as np
-from PIL import Image, ImageOps
+from PIL import Image
 
 from core.constants import CoreConstants as constants
 from utils.image_convertor_helper import convert_base64_to_image
 from utils.configuration_loader import ConfigurationLoader
+from utils.dithering_engine import DitheringEngine
+from utils.gcode_arc_fitter import GcodeArcFitter
+from utils.gcode_cache import GcodeCache
+from utils.path_optimizer import PathOptimizer
+from utils.raster_gcode_engine import RasterGcodeEngine
+from utils.svg_gcode_engine import SvgGcodeEngine
 
 # handle all sizes of images
 Image.MAX_IMAGE_PIXELS = None
@@ -20,40 +26,67 @@ class ImageToGcodeGenerator:
         self._config = ConfigurationLoader.from_yaml()
         self._images_bounding_box = None
 
+        image_to_gcode_config = self._config.image_to_gcode
+        self._svg_curve_tolerance = image_to_gcode_config.svg_curve_tolerance if image_to_gcode_config else None
+        # number of processes generating the images gcode in parallel (all the cpu cores by default)
+        self._workers = (image_to_gcode_config.workers if image_to_gcode_config else None) or \
+            os.cpu_count() or 1
+
+        # order of the cut and mark paths to reduce the travel with the laser off
+        self._path_optimizer = None
+        if image_to_gcode_config and image_to_gcode_config.optimize_paths:
+            self._path_optimizer = PathOptimizer(
+                travel_speed=image_to_gcode_config.travel_speed)
+
+        # the engraving images are dithered at the engraving resolution with the algorithm of their settings
+        self._dithering_engine = None
+        if image_to_gcode_config and image_to_gcode_config.dithering:
+            self._dithering_engine = DitheringEngine()
+
+        # the flattened svg moves are fitted to arcs and merged lines within the tolerance (mm)
+        self._arc_tolerance = image_to_gcode_config.arc_tolerance if image_to_gcode_config else None
+
+        # the gcode of the unchanged images is reused from the cache
+        self._gcode_cache = None
+        if image_to_gcode_config and image_to_gcode_config.cache_size:
+            self._gcode_cache = GcodeCache(image_to_gcode_config.cache_size)
+        # configuration that changes the generated gcode of every image
+        self._generator_settings = {
+            'svg_curve_tolerance': self._svg_curve_tolerance,
+            'optimize_paths': self._path_optimizer is not None,
+            'dithering': self._dithering_engine is not None,
+            'arc_tolerance': self._arc_tolerance,
+            'travel_speed': image_to_gcode_config.travel_speed if image_to_gcode_config else None,
+            'laser_cutter_settings': self._config.get_dict('laser_cutter_settings')
+        }
+
+    # the gcode file is generated line by line (without the line endings) and every modification
+    # of the generated gcode is a filter on the lines, the file content is never fully in memory
     @classmethod
-    def generate_gcode(cls, gcode_file_data):
+    def generate_gcode_lines(cls, gcode_file_data):
         generator = cls()
         modified_images_data_list = gcode_file_data.modifiedImagesData
 
-        # full gcode file content
-        gcode_file_content = ''
-
         engraving_images_data, marking_images_data, cutting_images_data, materials_settings_list = \
             generator._classify_images_data(modified_images_data_list)
 
-        # add the material setting at the top of the file
-        gcode_file_content += generator._add_material_settings_comment(
-            materials_settings_list)
-
-        gcode_file_content += generator._add_images_bounding_box_comment()
-
-        if engraving_images_data:
-            gcode_file_content += generator._generate_gcode_for_images_data(
-                images_data=engraving_images_data, process=constants.IMAGE_GENERATOR_ENGRAVE_PROCESS)
+        # add the material setting and the images bounding box at the top of the file
+        comments_lines = generator._split_lines([
+            generator._add_material_settings_comment(materials_settings_list),
+            generator._add_images_bounding_box_comment()])
 
-        if marking_images_data:
-            gcode_file_content += generator._generate_gcode_for_images_data(
-                images_data=marking_images_data, process=constants.IMAGE_GENERATOR_MARK_PROCESS)
+        # the gcode of the images is joined in the order engrave -> mark -> cut
+        images_tasks = \
+            [(constants.IMAGE_GENERATOR_ENGRAVE_PROCESS, image_data) for image_data in engraving_images_data] + \
+            [(constants.IMAGE_GENERATOR_MARK_PROCESS, image_data) for image_data in marking_images_data] + \
+            [(constants.IMAGE_GENERATOR_CUT_PROCESS, image_data)
+             for image_data in cutting_images_data]
 
-        if cutting_images_data:
-            gcode_file_content += generator._generate_gcode_for_images_data(
-                images_data=cutting_images_data, process=constants.IMAGE_GENERATOR_CUT_PROCESS)
+        gcode_lines = itertools.chain(
+            comments_lines, generator._generate_gcode_for_images_data(images_tasks))
 
         # Add some modification to the generated gcode
-        gcode_file_content = generator._modify_gcode_content(
-            gcode_file_content)
-
-        return gcode_file_content.encode('utf-8')
+        yield from generator._modify_gcode_lines(gcode_lines)
 
     def _classify_images_data(self, images_list):
         # list to group the images data based operation
@@ -111,7 +144,6 @@ class ImageToGcodeGenerator:
         return engraving_images_data, marking_images_data, cutting_images_data, materials_settings_list
 
     def _prepare_image_data(self, image, settings, process):
-        image_file_content = convert_base64_to_image(image)
         image_settings = {}
 
         if process == constants.IMAGE_GENERATOR_ENGRAVE_PROCESS:
@@ -128,7 +160,8 @@ class ImageToGcodeGenerator:
         if image_settings:
             self._check_images_bounding_box_metrics(image_settings)
 
-        return image_file_content, image_settings
+        # the image is decoded by the process that generates its gcode
+        return image, image_settings
 
     def _check_images_bounding_box_metrics(self, image_settings):
         if self._images_bounding_box:
@@ -159,96 +192,118 @@ class ImageToGcodeGenerator:
                 )
             )
 
-    def _generate_gcode_for_images_data(self, images_data, process):
-        gcode_content = ''
-        for image_data in images_data:
-            image_file_content = image_data.get('image')
-            image_settings = image_data.get('settings')
+    def _generate_gcode_for_images_data(self, images_tasks):
+        # the images are decoded once to find their cached gcode
+        images_tasks = [(process, convert_base64_to_image(image_data.get('image')), image_data.get('settings'))
+                        for process, image_data in images_tasks]
+        cache_keys = [self._get_cache_key(*image_task) for image_task in images_tasks]
 
-            if process == constants.IMAGE_GENERATOR_ENGRAVE_PROCESS:
-                gcode_content += self._generate_gcode_for_image(
-                    image_file_content, image_settings)
-            else:
-                gcode_content += self._generate_gcode_for_svg(
-                    image_file_content, image_settings)
+        # only the images without cached gcode are generated
+        generated_tasks = [index for index, cache_key in enumerate(cache_keys)
+                           if cache_key is None or not self._gcode_cache.has_fragment(cache_key)]
 
-        return gcode_content
+        workers = min(self._workers, len(generated_tasks))
+        if workers <= 1:
+            for image_task, cache_key in zip(images_tasks, cache_keys):
+                yield from self._generate_gcode_for_image_data(*image_task, cache_key)
 
-    def _generate_gcode_for_svg(self, svg_file_content, svg_settings):
-        main_gcode_content = ''
-
-        svg_tmp_file_path = self._save_spooled_temp_file_to_disk(
-            svg_file_content)
-        gcode_tmp_file_path = self._generate_temp_gcode_file()
-
-        command = [
-            'svg2gcode',
-            '--cuttingpower', str(int(svg_settings.get('power'))),
-            '--cuttingspeed', str(int(svg_settings.get('speed'))),
-            '--constantburn',
-            '--pixelsize', str(100),
-            '--xmaxtravel', str(self._config.machine_bed_size.width),
-            '--ymaxtravel', str(self._config.machine_bed_size.height),
-            '--nofill',
-            svg_tmp_file_path,
-            gcode_tmp_file_path
-        ]
-
-        # Apply user-provided scaling and rotation factors (scaleX, scaleY, rotation) and adjust the origin accordingly
-        rotation = round(svg_settings.get('metrics').rotation)
-        user_scale_x = svg_settings.get('metrics').scaleX
-        user_scale_y = svg_settings.get('metrics').scaleY
-        user_shift_x = svg_settings.get('metrics').x
-        user_shift_y = svg_settings.get('metrics').y
-
-        # Find the shift and scale for the SVG to match the image
-        scale_x, scale_y, shift_x, shift_y = self._calculate_shift_and_scale(
-            svg_file_content.decode('utf-8'), user_scale_x, user_scale_y, user_shift_x, user_shift_y, rotation)
-
-        # Add commands for origin and scaling to the gcode generation command
-        command.extend([
-            '--rotate', str(rotation),
-            '--origin',
-            str(shift_x - self._images_bounding_box['min_point']['x']
-                if shift_x - self._images_bounding_box['min_point']['x'] >
-                0.000001 else 0),
-            str(shift_y - self._images_bounding_box['min_point']['y']
-                if shift_y - self._images_bounding_box['min_point']['y'] >
-                0.000001 else 0),
-            '--scale', str(scale_x), str(scale_y)
-        ])
-
-        try:
-            subprocess.run(command, check=True,
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            # every image is generated by a worker with the same bounding box, the worker writes the gcode
+            # in a fragment file and returns only its path, so the gcode of the images is never in memory,
+            # the fragments are read line by line in the order of the tasks as soon as they are ready
+            with tempfile.TemporaryDirectory() as fragments_directory:
+                with multiprocessing.Pool(processes=workers) as pool:
+                    fragments_paths = pool.imap(
+                        generate_gcode_for_image_data,
+                        [images_tasks[index] + (cache_keys[index], self._images_bounding_box,
+                                                os.path.join(fragments_directory, str(index) +
+                                                             constants.IMAGE_GENERATOR_FRAGMENT_FILE_EXTENSION))
+                         for index in generated_tasks],
+                        chunksize=1)
+
+                    generated_tasks = set(generated_tasks)
+                    for index, (image_task, cache_key) in enumerate(zip(images_tasks, cache_keys)):
+                        if index in generated_tasks:
+                            yield from self._read_fragment_lines(next(fragments_paths))
+                        else:
+                            yield from self._generate_gcode_for_image_data(*image_task, cache_key)
+
+        # keep the cache inside its size, the fragments of this job are the last ones to be removed
+        if self._gcode_cache:
+            self._gcode_cache.evict()
+
+    # the key of the image gcode inside the cache, None incase the cache is disabled
+    def _get_cache_key(self, process, image_file_content, image_settings):
+        if not self._gcode_cache:
+            return None
+        return GcodeCache.get_key(image_file_content, process, image_settings,
+                                  self._images_bounding_box['min_point'], self._generator_settings)
 
-            # Add tool and material thickness to the generated gcode
-            main_gcode_content += self._add_tool_and_thickness_commands(
-                gcode_tmp_file_path, svg_settings)
+    def _generate_gcode_for_image_data(self, process, image_file_content, image_settings, cache_key=None):
+        if cache_key:
+            cached_gcode_lines = self._gcode_cache.read_lines(cache_key)
+            if cached_gcode_lines is not None:
+                return cached_gcode_lines
 
-            return main_gcode_content
+        if process == constants.IMAGE_GENERATOR_ENGRAVE_PROCESS:
+            gcode_lines = self._generate_gcode_for_image(
+                image_file_content, image_settings)
+        else:
+            gcode_lines = self._generate_gcode_for_svg(
+                image_file_content, image_settings)
 
-        except subprocess.CalledProcessError as e:
-            print("Error:", e)
-            return None
+        # the lines are saved in the cache while they are generated
+        return self._gcode_cache.write_lines(cache_key, gcode_lines) if cache_key else gcode_lines
 
+    # lines of the fragment file written by a worker, the file is removed once it is read
+    def _read_fragment_lines(self, fragment_path):
+        try:
+            with open(fragment_path, 'r', encoding='utf-8', newline='') as fragment_file:
+                for line in fragment_file:
+                    yield line.rstrip(constants.NEW_LINE)
         finally:
-            # Remove temp files
-            self._remove_temp_file_from_system(svg_tmp_file_path)
-            self._remove_temp_file_from_system(gcode_tmp_file_path)
-
-    def _generate_gcode_for_image(self, image_file_content, image_settings):
-        main_gcode_content = ''
+            os.remove(fragment_path)
 
-        image_tmp_file_path = self._save_spooled_temp_file_to_disk(
-            image_file_content)
+    # lines of gcode chunks, a line can continue in the next chunk
+    def _split_lines(self, gcode_chunks):
+        remaining_content = ''
+        for gcode_chunk in gcode_chunks:
+            lines = (remaining_content + gcode_chunk).split(constants.NEW_LINE)
+            remaining_content = lines.pop()
+            yield from lines
 
-        # apply transformation on image (scale - rotate)
-        self._apply_transformation_on_image(
-            image_tmp_file_path, image_settings)
+        if remaining_content:
+            yield remaining_content
 
-        gcode_tmp_file_path = self._generate_temp_gcode_file()
+    def _generate_gcode_for_svg(self, svg_file_content, svg_settings):
+        metrics = svg_settings.get('metrics')
+
+        # prevent very small values from passing to the generated gcode
+        user_shift_x = metrics.x if abs(metrics.x) > 0.000001 else 0
+        user_shift_y = metrics.y if abs(metrics.y) > 0.000001 else 0
+
+        # generate the cutting gcode in the server process, the svg fills the same box as the images on the bed
+        svg_gcode_engine = SvgGcodeEngine(
+            power=int(svg_settings.get('power')),
+            speed=int(svg_settings.get('speed')),
+            curve_tolerance=self._svg_curve_tolerance,
+            path_optimizer=self._path_optimizer)
+        gcode_content = svg_gcode_engine.generate(
+            svg_file_content,
+            size=(metrics.width * metrics.scaleX, metrics.height * metrics.scaleY)
+            if metrics.width and metrics.height else None,
+            rotation=metrics.rotation,
+            offset=(user_shift_x - self._images_bounding_box['min_point']['x'],
+                    user_shift_y - self._images_bounding_box['min_point']['y']))
+
+        gcode_lines = self._split_lines([gcode_content])
+        if self._arc_tolerance:
+            gcode_lines = GcodeArcFitter(self._arc_tolerance).fit_lines(gcode_lines)
+
+        # Add tool and material thickness to the generated gcode
+        return self._add_tool_and_thickness_commands(gcode_lines, svg_settings)
 
+    def _generate_gcode_for_image(self, image_file_content, image_settings):
         resolution = image_settings.get('dithering').resolution
         # prevent very small values from passing to the
         user_shift_x = image_settings.get('metrics').x if abs(
@@ -256,53 +311,43 @@ class ImageToGcodeGenerator:
         user_shift_y = image_settings.get('metrics').y if abs(
             image_settings.get('metrics').y) > 0.000001 else 0
 
-        # create the command to run using the subprocess
-        command = [
-            'image2gcode',
-            '--maxpower', str(int(image_settings.get('power'))),
-            '--speed', str(int(image_settings.get('speed'))),
-            '--pixelsize', str(100 / resolution),
-            '--offset', str(user_shift_x - self._images_bounding_box['min_point']['x']), str(
-                user_shift_y - self._images_bounding_box['min_point']['y']),
-            image_tmp_file_path,
-            gcode_tmp_file_path
-        ]
-
-        try:
-            subprocess.run(command, check=True,
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-            # Add tool and material thickness to the generated gcode
-            main_gcode_content += self._add_tool_and_thickness_commands(
-                gcode_tmp_file_path, image_settings)
-
-            return main_gcode_content
-
-        except subprocess.CalledProcessError as e:
-            raise subprocess.SubprocessError(e)
-
-        finally:
-            # remove the temp files from the system
-            self._remove_temp_file_from_system(image_tmp_file_path)
-            self._remove_temp_file_from_system(gcode_tmp_file_path)
-
-    def _add_tool_and_thickness_commands(self, gcode_tmp_file_path, image_settings):
-        main_gcode_content = ''
-        with open(gcode_tmp_file_path, 'r') as gcode_file:
-            main_gcode_content = gcode_file.read()
-
-            # add tool command
-            if self._config.laser_cutter_settings.tool_changer:
-                tool = image_settings.get('tool')
-                gcode_content_with_tool = self._add_tool_command(
-                    main_gcode_content, tool)
-
-                # Adjust for material thickness and tool type
-                material_thickness = image_settings.get('thickness')
-                main_gcode_content = self._add_material_thickness_command(
-                    gcode_content_with_tool, material_thickness, tool)
-
-        return main_gcode_content
+        # generate the engraving gcode in the server process
+        raster_gcode_engine = RasterGcodeEngine(
+            pixel_size=100 / resolution,
+            speed=int(image_settings.get('speed')),
+            max_power=int(image_settings.get('power')),
+            offset=(user_shift_x - self._images_bounding_box['min_point']['x'],
+                    user_shift_y - self._images_bounding_box['min_point']['y']))
+        # scale, flip and rotate the image in one warp of its grayscale pixels
+        pixels = self._load_transformed_image(
+            Image.open(io.BytesIO(image_file_content)), image_settings)
+        # the interface sends the undithered grayscale image, its dithered image is only the preview
+        if self._dithering_engine:
+            dithering = image_settings.get('dithering')
+            # the loaded pixels are flipped, the image is dithered from its top row like the interface preview
+            pixels = self._dithering_engine.dither(
+                pixels[::-1], dithering.algorithm, dithering.grayShift,
+                dithering.blockSize, dithering.blockDistance)[::-1]
+
+        # the scan lines are generated while the gcode is written
+        gcode_chunks = raster_gcode_engine.generate_chunks(pixels)
+
+        # Add tool and material thickness to the generated gcode
+        return self._add_tool_and_thickness_commands(
+            self._split_lines(gcode_chunks), image_settings)
+
+    def _add_tool_and_thickness_commands(self, gcode_lines, image_settings):
+        # add tool command
+        if self._config.laser_cutter_settings.tool_changer:
+            tool = image_settings.get('tool')
+            gcode_lines = self._add_tool_command(gcode_lines, tool)
+
+            # Adjust for material thickness and tool type
+            material_thickness = image_settings.get('thickness')
+            gcode_lines = self._add_material_thickness_command(
+                gcode_lines, material_thickness, tool)
+
+        return gcode_lines
 
     def _add_material_settings_comment(self, materials_settings_list):
         material_comment = ''
@@ -339,116 +384,35 @@ class ImageToGcodeGenerator:
             )
         return ''
 
-    def _add_padding_to_image(self, image_file_path):
-        # Open the image using PIL
-        image = Image.open(image_file_path)
-
-        # Concatenate the white boxes with the original image
-        new_image = ImageOps.expand(image, border=(
-            constants.BOUNDING_DIMENSION, 0, constants.BOUNDING_DIMENSION, 0), fill='white')
-
-        # Convert the resulting image back to binary data
-        image_with_padding = io.BytesIO()
-        new_image.save(image_with_padding, format='PNG')
-
-        # Update the image content with the new transformed image
-        self._update_image_content(
-            image_with_padding.getvalue(), image_file_path)
-
-    def _apply_transformation_on_image(self, image_file_path, image_settings):
-        # Open the image using PIL
-        image = Image.open(image_file_path)
-
-        # Scale the image
-        scaled_image = self._apply_scaling_on_image(image, image_settings)
-
-        # Rotate the image
-        rotated_scaled_image = self._apply_rotation_on_image(
-            scaled_image, image_settings)
-
-        # Convert the rotated, scaled, and cropped image back to binary data
-        image_with_transformation = io.BytesIO()
-        rotated_scaled_image.save(image_with_transformation, format='PNG')
-
-        # Update the image content
-        self._update_image_content(
-            image_with_transformation.getvalue(), image_file_path)
-
-    def _apply_scaling_on_image(self, image, image_settings):
-        # get resolution value
+    def _load_transformed_image(self, image, image_settings):
+        metrics = image_settings.get('metrics')
         resolution = image_settings.get('dithering').resolution
 
-        # Scale the image based on the image settings
-        user_scale_x = image_settings.get('metrics').scaleX * resolution / 100
-        user_scale_y = image_settings.get('metrics').scaleY * resolution / 100
-
-        # If scale_y is negative, flip the image vertically
-        if user_scale_y < 0:
-            image = ImageOps.flip(image)
-            # Make scale_y positive after flipping
-            user_scale_y = abs(user_scale_y)
-
-        # Get the original width and height
-        original_width, original_height = image_settings.get(
-            'metrics').width, image_settings.get('metrics').height
-
-        # Scale the image while maintaining aspect ratio if only one scale is provided
-        new_width = round(original_width * user_scale_x)
-        new_height = round(original_height * user_scale_y)
-
-        # Resize the image using the new dimensions
-        scaled_image = image.resize(
-            (new_width, new_height), Image.Resampling.LANCZOS)
-
-        return scaled_image
+        # size of the image at the engraving resolution, a negative y scale flips the image vertically
+        user_scale_x = metrics.scaleX * resolution / 100
+        user_scale_y = metrics.scaleY * resolution / 100
 
-    def _apply_rotation_on_image(self, image, image_settings):
-        # Rotate the image based on the image settings
-        rotation_angle = image_settings.get('metrics').rotation
+        return RasterGcodeEngine.load_image(
+            image,
+            size=(round(metrics.width * user_scale_x), round(metrics.height * abs(user_scale_y))),
+            rotation=metrics.rotation,
+            is_flipped=user_scale_y < 0)
 
-        # Rotate using PIL's rotate (expand=True to prevent cropping)
-        rotated_image = image.rotate(
-            rotation_angle, expand=True, fillcolor=(255, 255, 255))
-
-        return rotated_image
-
-    def _update_image_content(self, new_image_content, image_file_path):
-        with open(image_file_path, 'wb') as image_file:
-            image_file.write(new_image_content)
-
-    def _generate_temp_gcode_file(self):
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.gcode') as temp_file:
-            return temp_file.name
-
-    def _save_spooled_temp_file_to_disk(self, spooled_temp_file_content):
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.svg') as temp_file:
-            temp_file.write(spooled_temp_file_content)
-        return temp_file.name
+    # add the tool which the user pick from the settings
+    def _add_tool_command(self, gcode_lines, tool):
+        # Construct the tool command
+        tool_command = self._generate_tool_command(tool)
 
-    def _remove_temp_file_from_system(self, temp_file_path):
-        os.unlink(temp_file_path)
+        # Insert the tool command after the (first) absolute position command,
+        # If the absolute position command is not found, the lines are not changed
+        gcode_lines = iter(gcode_lines)
+        for line in gcode_lines:
+            yield line
+            if tool_command and line.endswith(constants.GRBL_COMMAND_RELATIVE_POSITION):
+                yield tool_command
+                break
 
-    # add the tool which the user pick from the settings
-    def _add_tool_command(self, gcode_content, tool):
-        # Find the index of the relative position command
-        relative_position_index = gcode_content.find(
-            constants.GRBL_COMMAND_RELATIVE_POSITION + constants.NEW_LINE)
-        if relative_position_index != -1:
-            insertion_index = relative_position_index + \
-                len(constants.GRBL_COMMAND_RELATIVE_POSITION) + \
-                len(constants.NEW_LINE)
-
-            # Construct the tool command
-            tool_command = self._generate_tool_command(tool)
-
-            # Insert the tool command into the G-code content
-            modified_gcode_content = gcode_content[:insertion_index] + \
-                tool_command + \
-                gcode_content[insertion_index:]
-            return modified_gcode_content
-        else:
-            # If the relative position command is not found, return the original G-code content
-            return gcode_content
+        yield from gcode_lines
 
     def _generate_tool_command(self, tool):
         tool_command = ''
@@ -463,7 +427,7 @@ class ImageToGcodeGenerator:
         return self._config.get_dict(
             'laser_cutter_settings.tools')
 
-    def _add_material_thickness_command(self, gcode_content, material_thickness, tool):
+    def _add_material_thickness_command(self, gcode_lines, material_thickness, tool):
         # check the metrics for the bed based on the used tool
         min_z_axis_value = 0
         max_z_axis_value = 0
@@ -475,205 +439,78 @@ class ImageToGcodeGenerator:
                 min_z_axis_value = tool_settings['z_axis']['min']
                 max_z_axis_value = tool_settings['z_axis']['max']
 
+        gcode_lines = iter(gcode_lines)
+
         # Ensure the value stays inside the range of the bed
         if material_thickness + max_z_axis_value < min_z_axis_value:
             # Define regex pattern for tool changer commands
             pattern = rf'{re.escape(constants.GRBL_TOOL_CHANGE)}T\d+'
             # Compile the regular expression pattern
             regex_pattern = re.compile(pattern)
-            # Search for the pattern in the gcode content
-            match = regex_pattern.search(gcode_content)
-            if match:
-                tool_changer_index = match.end()
-                # Construct the material thickness command
-                material_thickness_command = constants.GRBL_COMMAND_MOVE_BED + str(max_z_axis_value + material_thickness) + \
-                    constants.GRBL_MATERIAL_THICKNESS_COMMENT + \
-                    constants.NEW_LINE
-
-                # Insert the material thickness command into the G-code content
-                modified_gcode_content = gcode_content[:tool_changer_index] + constants.NEW_LINE + \
-                    material_thickness_command + \
-                    gcode_content[tool_changer_index:]
-                return modified_gcode_content
-            else:
-                # If the relative position command is not found, return the original G-code content
-                return gcode_content
+            # Construct the material thickness command
+            material_thickness_command = constants.GRBL_COMMAND_MOVE_BED + str(max_z_axis_value + material_thickness) + \
+                constants.GRBL_MATERIAL_THICKNESS_COMMENT
+
+            # Insert the material thickness command after the (first) tool changer command,
+            # If the tool changer command is not found, the lines are not changed
+            for line in gcode_lines:
+                yield line
+                if regex_pattern.search(line):
+                    yield material_thickness_command
+                    break
+
+        yield from gcode_lines
 
     # customize the generated gcode
-    def _modify_gcode_content(self, gcode_content):
+    def _modify_gcode_lines(self, gcode_lines):
         # remove M2 and M9 from the gcode to prevent stopping the machine
-        modified_gcode_content = self._remove_unnecessary_commands(
-            gcode_content)
+        modified_gcode_lines = self._remove_unnecessary_commands(
+            gcode_lines)
 
         # replace eular numbers to decimal (because previewer can't recognize numbers that contains characters)
-        modified_gcode_content = self._convert_scientific_notation_to_decimal(
-            modified_gcode_content)
+        modified_gcode_lines = self._convert_scientific_notation_to_decimal(
+            modified_gcode_lines)
 
         # remove all the commands that contains S1 (not necessary commands)
-        modified_gcode_content = self._remove_lines_containing_S1(
-            modified_gcode_content)
+        modified_gcode_lines = self._remove_lines_containing_S1(
+            modified_gcode_lines)
 
         # remove the tool at the end of the generated gcode
-        modified_gcode_content = self._add_remove_tool_command_at_end(
-            modified_gcode_content)
+        modified_gcode_lines = self._add_remove_tool_command_at_end(
+            modified_gcode_lines)
 
         # at the end of the job add M9 to finish the job
-        modified_gcode_content = self._add_end_of_job_commands(
-            modified_gcode_content)
+        modified_gcode_lines = self._add_end_of_job_commands(
+            modified_gcode_lines)
 
-        return modified_gcode_content
+        return modified_gcode_lines
 
-    def _remove_lines_containing_S1(self, gcode_content):
-        # Split the input string into lines
-        lines = gcode_content.split('\n')
+    def _remove_lines_containing_S1(self, gcode_lines):
+        s1_pattern = re.compile(r'S1(?!\d)')
 
         # Filter out lines that contain the specific substring "S1" but not "S10", "S11", etc.
-        filtered_lines = [
-            line for line in lines if not re.search(r'S1(?!\d)', line)]
-
-        # Join the remaining lines back into a single string
-        result_string = '\n'.join(filtered_lines)
-
-        return result_string
-
-    def _remove_unnecessary_commands(self, gcode_content):
-        gcode_content = gcode_content.replace(
-            constants.GRBL_END_PROGRAM, '')
-        gcode_content = gcode_content.replace(
-            constants.GRBL_COOLANT_OFF, '')
-        return gcode_content
-
-    def _add_remove_tool_command_at_end(self, gcode_content):
-        return gcode_content + constants.NEW_LINE + \
-            constants.GRBL_TOOL_CHANGE + constants.GRBL_NO_TOOL
-
-    def _add_end_of_job_commands(self, gcode_content):
-        return gcode_content + constants.NEW_LINE + \
-            constants.GRBL_COOLANT_OFF + constants.NEW_LINE + constants.GRBL_END_PROGRAM
-
-    def _calculate_shift_and_scale(self, svg_file_content, user_scale_x=1, user_scale_y=1, user_shift_x=0, user_shift_y=0, rotation=0):
-        # Extract viewBox and width/height attributes from the SVG string
-        viewbox_match = re.search(r'viewBox="([^"]+)"', svg_file_content)
-        width_match = re.search(r'width="([^"]+)"', svg_file_content)
-        height_match = re.search(r'height="([^"]+)"', svg_file_content)
-
-        if viewbox_match and width_match and height_match:
-            # Parse viewBox, width, and height values
-            viewbox_values = list(map(float, viewbox_match.group(1).split()))
-            width, width_unit = self._extract_value_with_unit(width_match)
-            height, height_unit = self._extract_value_with_unit(height_match)
-
-            # Convert width and height to pixels
-            width_px = self._convert_to_pixels(
-                width, width_unit, reference=viewbox_values[2])
-            height_px = self._convert_to_pixels(
-                height, height_unit, reference=viewbox_values[3])
-
-            # Adjust viewBox if units are not pixels
-            if width_unit != 'px':
-                viewbox_values[2] = width_px
-            if height_unit != 'px':
-                viewbox_values[3] = height_px
-
-            # Calculate initial scale and shift factors
-            scale_x = (width_px / viewbox_values[2]) * user_scale_x
-            scale_y = (height_px / viewbox_values[3]) * user_scale_y
-            shift_x = user_shift_x - viewbox_values[0]
-            shift_y = user_shift_y - viewbox_values[1]
-
-            # Apply rotation and find shifts
-            if rotation != 0:
-                shift_x_rot, shift_y_rot = self._apply_rotation_and_find_shift(
-                    viewbox_values[2] * scale_x, viewbox_values[3] * scale_y, rotation)
-
-                return scale_x, scale_y, shift_x + shift_x_rot, shift_y + shift_y_rot
-
-            else:
-                # no rotation
-                return scale_x, scale_y, shift_x, shift_y
-        else:
-            # Apply rotation and find shifts
-            if rotation != 0:
-                width, width_unit = self._extract_value_with_unit(width_match)
-                height, height_unit = self._extract_value_with_unit(
-                    height_match)
-
-                # Convert width and height to pixels
-                width_px = self._convert_to_pixels(
-                    width, width_unit)
-                height_px = self._convert_to_pixels(
-                    height, height_unit)
-
-                if width_px and height_px:
-                    shift_x_rot, shift_y_rot = self._apply_rotation_and_find_shift(
-                        width_px * user_scale_x, height_px * user_scale_y, rotation)
-
-                    return user_scale_x, user_scale_y, shift_x_rot, shift_y_rot
-                else:
-                    return user_scale_x, user_scale_y, user_shift_x, user_shift_y
-
-            else:
-                return user_scale_x, user_scale_y, 0, 0
-
-    def _apply_rotation_and_find_shift(self, width, height, rotation):
-        theta = np.radians(rotation)
-
-        # Define original corners of the bounding box (before any transformations)
-        corners = np.array([
-            [0, height],
-            [width, height],
-            [0, 0],
-            [width, 0]
-        ])
-
-        # Rotation matrix
-        rotation_matrix = np.array([
-            [np.cos(theta), -np.sin(theta)],
-            [np.sin(theta), np.cos(theta)]
-        ])
-
-        # Rotate corners
-        rotated_corners = np.dot(corners, rotation_matrix.T)
-
-        # Find minimum x and y values after rotation
-        min_x = np.min(rotated_corners[:, 0])
-        min_y = np.min(rotated_corners[:, 1])
-
-        # Calculate the shifts to move the shape to the positive quadrant
-        shift_x = -min_x if min_x < 0 else 0
-        shift_y = -min_y if min_y < 0 else 0
-
-        return shift_x, shift_y
-
-    def _extract_value_with_unit(self, match, default_unit='px'):
-        if match:
-            value_with_unit = match.group(1)
-            value, unit = re.match(r'([\d.]+)(\D+)?', value_with_unit).groups()
-            if unit:
-                return float(value), unit
-            else:
-                return float(value), default_unit
-        else:
-            return None, default_unit
-
-    def _convert_to_pixels(self, value, unit, reference=None, dpi=96):
-        if unit == 'px':
-            return value
-        elif unit == 'in':
-            return value * dpi
-        elif unit == 'cm':
-            return value * dpi / 2.54
-        elif unit == 'mm':
-            return value * dpi / 25.4
-        elif unit == 'pt':
-            return value * dpi / 72
-        elif unit == '%':
-            if reference is not None:
-                return value * reference / 100
-            else:
-                return None  # Return None if no reference is available
-        else:
-            raise ValueError(f"Unsupported unit: {unit}")
+        for line in gcode_lines:
+            if 'S1' in line and s1_pattern.search(line):
+                continue
+            yield line
+
+    def _remove_unnecessary_commands(self, gcode_lines):
+        for line in gcode_lines:
+            if constants.GRBL_END_PROGRAM in line or constants.GRBL_COOLANT_OFF in line:
+                line = line.replace(constants.GRBL_END_PROGRAM, '').replace(
+                    constants.GRBL_COOLANT_OFF, '')
+            yield line
+
+    def _add_remove_tool_command_at_end(self, gcode_lines):
+        yield from gcode_lines
+        # empty line between the images gcode and the end of the job
+        yield ''
+        yield constants.GRBL_TOOL_CHANGE + constants.GRBL_NO_TOOL
+
+    def _add_end_of_job_commands(self, gcode_lines):
+        yield from gcode_lines
+        yield constants.GRBL_COOLANT_OFF
+        yield constants.GRBL_END_PROGRAM
 
     # create new dictionary based on specific keys
     def _fetch_specific_settings(self, gcode_settings, type_of_settings):
@@ -683,7 +520,7 @@ class ImageToGcodeGenerator:
             specific_settings.update(gcode_settings.get(setting))
         return specific_settings
 
-    def _convert_scientific_notation_to_decimal(self, content):
+    def _convert_scientific_notation_to_decimal(self, gcode_lines):
         # Regular expression to find numbers in scientific notation
         scientific_notation_pattern = re.compile(
             r'([-+]?\d*\.?\d+[eE][-+]?\d+)(?![\d])')
@@ -696,7 +533,27 @@ class ImageToGcodeGenerator:
             return decimal_representation
 
         # Substitute all scientific notation numbers with their decimal representation
-        result_string = scientific_notation_pattern.sub(
-            convert_match, content)
+        for line in gcode_lines:
+            if 'e' in line or 'E' in line:
+                line = scientific_notation_pattern.sub(convert_match, line)
+            yield line
+
+
+# generator of a pool worker process, it is created by the first task of the worker
+_worker_generator = None
+
+
+def generate_gcode_for_image_data(image_task):
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = ImageToGcodeGenerator()
+
+    process, image_file_content, image_settings, cache_key, images_bounding_box, fragment_path = image_task
+    _worker_generator._images_bounding_box = images_bounding_box
+    gcode_lines = _worker_generator._generate_gcode_for_image_data(
+        process, image_file_content, image_settings, cache_key)
 
-        return result_string
+    # the lines are written while they are generated, only the fragment path is sent back to the parent process
+    with open(fragment_path, 'w', encoding='utf-8', newline='') as fragment_file:
+        fragment_file.writelines(line + constants.NEW_LINE for line in gcode_lines)
+    return fragment_path
@@ -0,0 +1,223 @@
+import datetime
+import json
+import os
+import time
+from core.constants import CoreConstants as constants
+from files_manager.job_file import JobFile
+from utils.gcode_modal_state import GcodeModalState
+
+'''
+Save the progress of the running job in a checkpoint file beside the job file (<job file>.checkpoint)
+the checkpoint contains the last executed line, the modal state of the machine at that line
+and the elapsed time of the job, it is saved periodically and when the job stops before its end
+so the job can be resumed after a stop, an error or a power loss
+
+the checkpoint is removed when the job is completed without errors
+'''
+
+
+class JobCheckpoint:
+    def __init__(self):
+        # the checkpoint opens its own job file, the opened file may change during the job
+        self._job_file = None
+        self._start_line = 1
+
+        # modal state at the end of the parsed line
+        self._modal_state = None
+        self._parsed_line = 0
+
+        self._acknowledged_line = 0
+        self._elapsed_time = 0
+        self._last_save_time = 0
+
+    def start(self, file_path, start_line=1, modal_state=None):
+        self.stop()
+
+        self._job_file = JobFile(file_path)
+        self._start_line = start_line
+
+        self._modal_state = modal_state if modal_state else GcodeModalState()
+        self._parsed_line = start_line - 1
+
+        self._acknowledged_line = start_line - 1
+        self._elapsed_time = 0
+        self._last_save_time = time.time()
+
+    def stop(self):
+        if self._job_file:
+            self._job_file.close()
+            self._job_file = None
+
+    def update(self, acknowledged_line, elapsed_time):
+        if not self._job_file:
+            return
+
+        self._acknowledged_line = max(acknowledged_line, self._acknowledged_line)
+        self._elapsed_time = elapsed_time
+
+        if time.time() - self._last_save_time > constants.JOB_CHECKPOINT_INTERVAL:
+            self.save()
+
+    # the checkpoint is removed only when all the lines of the job are executed without errors
+    def finish(self, is_completed, acknowledged_line=None, error_line=None):
+        if not self._job_file:
+            return
+
+        if is_completed and error_line is None:
+            self.delete(self._job_file.get_file_path())
+
+        # the job stopped before its end, keep its last progress
+        elif acknowledged_line is not None:
+            self._acknowledged_line = max(acknowledged_line, self._acknowledged_line)
+
+            # the controller rejected a line, resume the job from it
+            if error_line is not None:
+                self.rewind(error_line - 1)
+            self.save()
+
+        self.stop()
+
+    # go back to a line before the saved progress, the modal state is parsed again from the file start
+    def rewind(self, acknowledged_line):
+        acknowledged_line = max(acknowledged_line, self._start_line - 1)
+        if acknowledged_line >= self._acknowledged_line:
+            return
+
+        self._acknowledged_line = acknowledged_line
+        if self._parsed_line > acknowledged_line - constants.GRBL_PLANNER_BUFFER_LINES:
+            self._modal_state = GcodeModalState()
+            self._parsed_line = 0
+
+    def save(self):
+        self._last_save_time = time.time()
+
+        # the acknowledged lines inside the planner buffer are not executed yet
+        executed_line = max(self._acknowledged_line - constants.GRBL_PLANNER_BUFFER_LINES,
+                            self._start_line - 1)
+
+        # parse only the new executed lines since the last save
+        self._modal_state.update_from_job_file(
+            self._job_file, self._parsed_line + 1, executed_line)
+        self._parsed_line = max(self._parsed_line, executed_line)
+
+        file_path = self._job_file.get_file_path()
+        try:
+            file_stat = os.stat(file_path)
+            checkpoint = {
+                'file_size': file_stat.st_size,
+                'file_modification_time': file_stat.st_mtime_ns,
+                'line': self._parsed_line,
+                'acknowledged_line': self._acknowledged_line,
+                'total_lines': self._job_file.get_total_lines(),
+                'elapsed_time': self._elapsed_time,
+                'modal_state': self._modal_state.to_dict(),
+                'time': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+
+            # write the checkpoint in a temporary file first to not leave a broken checkpoint behind
+            checkpoint_path = self.get_checkpoint_path(file_path)
+            temporary_checkpoint_path = checkpoint_path + '.tmp'
+            with open(temporary_checkpoint_path, 'w') as checkpoint_file:
+                json.dump(checkpoint, checkpoint_file)
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+            os.replace(temporary_checkpoint_path, checkpoint_path)
+
+        except OSError as error:
+            if os.getenv('ENV') == 'development':
+                print('Job Checkpoint Error:', error)
+
+    @classmethod
+    def get_checkpoint_path(cls, file_path):
+        return file_path + constants.JOB_CHECKPOINT_FILE_EXTENSION
+
+    # load the checkpoint incase it still matches the job file
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with open(cls.get_checkpoint_path(file_path), 'r') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+
+            file_stat = os.stat(file_path)
+            if (checkpoint.get('file_size') != file_stat.st_size or
+                    checkpoint.get('file_modification_time') != file_stat.st_mtime_ns):
+                return None
+
+            return checkpoint
+
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def delete(cls, file_path):
+        checkpoint_path = cls.get_checkpoint_path(file_path)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    @classmethod
+    def rename(cls, old_file_path, new_file_path):
+        old_checkpoint_path = cls.get_checkpoint_path(old_file_path)
+        if os.path.exists(old_checkpoint_path):
+            os.replace(old_checkpoint_path,
+                       cls.get_checkpoint_path(new_file_path))
+
+    '''
+    find from where to resume the job:
+    - without a line, resume after the last executed line saved in the checkpoint
+    - with a line, resume from that line and get the modal state by parsing the lines before it
+    '''
+    @classmethod
+    def get_resume_data(cls, file_path, line=None):
+        checkpoint = cls.load(file_path)
+        job_file = JobFile(file_path)
+
+        try:
+            if line is None:
+                if checkpoint is None:
+                    raise Exception('There is no checkpoint saved for the job')
+
+                start_line = checkpoint.get('line') + 1
+                modal_state = GcodeModalState.from_dict(
+                    checkpoint.get('modal_state'))
+                elapsed_time = checkpoint.get('elapsed_time')
+
+            else:
+                start_line = int(line)
+                modal_state = GcodeModalState.from_job_file(
+                    job_file, start_line - 1)
+                # keep the elapsed time only when resuming from the checkpoint line
+                is_checkpoint_line = checkpoint and checkpoint.get(
+                    'line') + 1 == start_line
+                elapsed_time = checkpoint.get(
+                    'elapsed_time') if is_checkpoint_line else 0
+
+            if not 1 <= start_line <= job_file.get_total_lines():
+                raise Exception(
+                    f'Line {start_line} is out of the job file lines')
+
+            # inside an arc block the resumed line is sent with the arc motion word at the end of the preamble,
+            # the job is streamed after it (the empty lines and comments before it are skipped)
+            resume_line_number, resume_line = cls.get_resume_line(job_file, start_line)
+            preamble = modal_state.get_preamble(constants.GRBL_COMMAND_SAFE_Z, resume_line)
+            stream_start_line = resume_line_number + 1 \
+                if modal_state.get_arc_motion_line(resume_line) else start_line
+
+        finally:
+            job_file.close()
+
+        return {
+            'start_line': start_line,
+            'stream_start_line': stream_start_line,
+            'modal_state': modal_state,
+            'preamble': preamble,
+            'elapsed_time': elapsed_time
+        }
+
+    # first line with commands from the start line (line number, line)
+    @classmethod
+    def get_resume_line(cls, job_file, start_line):
+        for line_index, line in job_file.iter_lines(start_line):
+            line = str(line, 'utf-8', errors='replace')
+            if GcodeModalState.GCODE_COMMENTS_PATTERN.sub('', line).strip():
+                return line_index, line
+        return None, None
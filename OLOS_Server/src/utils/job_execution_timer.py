@@ -10,9 +10,10 @@ class JobExecutionTimer:
         self._paused_duration = 0
         self._is_running = False
 
-    def start(self):
+    # elapsed time incase of resuming a stopped job
+    def start(self, elapsed_time=0):
         if not self._is_running:
-            self._start_time = time.time() - self._paused_duration
+            self._start_time = time.time() - self._paused_duration - elapsed_time
             self._is_running = True
 
     def pause(self):
@@ -27,6 +28,8 @@ class JobExecutionTimer:
 
     def stop(self):
         if self._is_running:
+            # keep the elapsed time after stopping the timer
+            self._pause_time = time.time()
             self._is_running = False
 
     def reset(self):
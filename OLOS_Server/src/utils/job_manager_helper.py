@@ -1,11 +1,17 @@
 import multiprocessing
-import re
+import signal
+import sys
 from core.constants import CoreConstants as constants
 from files_manager.jobs_manager import JobsManager
+from utils.job_checkpoint import JobCheckpoint
 from utils.materials_library_helper import MaterialsLibraryHelper
 
 
 def generate_file(gcode_file_data, queue):
+    # cancelling the generation terminates this process, exit normally so
+    # the images generation workers are terminated with it
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     jobs_manager = JobsManager()
     material_library_helper = MaterialsLibraryHelper()
     file_manager_helper = JobsManagerHelper(
@@ -90,9 +96,6 @@ class JobsManagerHelper:
         opened_file = self._jobs_manager.get_open_filename()
         # make sure the file is open
         if opened_file is not None:
-            # reopen in case of restarting the file again
-            self._jobs_manager.open_file(opened_file)
-
             # when start executing file reset the counter
             machine_connector.reset_counter()
 
@@ -101,15 +104,14 @@ class JobsManagerHelper:
             job_execution_timer.start()
 
             material_name, material_image, material_thickness = self._get_opened_file_material_settings()
-            file_content = self._jobs_manager.get_opened_file_content()
 
-            # get opened file
+            # get opened file, the content is already loaded by the user when the file is opened
             response = self.fastapi_jobs_manager_response(
                 type=constants.JOBS_MANAGER_DATA_TYPE,
                 process=constants.START_JOB_PROCESS,
                 file_data={
                     'fileName': opened_file,
-                    'fileContent': file_content,
+                    'fileContent': '',
                     'materialName': material_name,
                     'materialImage': material_image,
                     'materialThickness': material_thickness
@@ -137,6 +139,40 @@ class JobsManagerHelper:
 
         return response
 
+    # resume the opened file from the saved checkpoint or from specific line
+    def handle_resume_file(self, line, machine_connector, job_execution_timer):
+        opened_file = self._jobs_manager.get_open_filename()
+        if not opened_file:
+            raise Exception('There is no file open in the system')
+
+        resume_data = JobCheckpoint.get_resume_data(
+            self._jobs_manager.get_file_path(opened_file), line)
+
+        # when resuming the file reset the counter
+        machine_connector.reset_counter()
+
+        # continue the job execution timer from the checkpoint
+        job_execution_timer.reset()
+        job_execution_timer.start(resume_data.get('elapsed_time'))
+
+        material_name, material_image, material_thickness = self._get_opened_file_material_settings()
+
+        response = self.fastapi_jobs_manager_response(
+            type=constants.JOBS_MANAGER_DATA_TYPE,
+            process=constants.RESUME_JOB_PROCESS,
+            file_data={
+                'fileName': opened_file,
+                'fileContent': '',
+                'materialName': material_name,
+                'materialImage': material_image,
+                'materialThickness': material_thickness
+            },
+            files_list=self._jobs_manager.get_files_list(),
+            success=True,
+        )
+
+        return response, resume_data
+
     # delete specific file base on its name
 
     def handle_delete_file(self, filename):
@@ -246,17 +282,11 @@ class JobsManagerHelper:
         return response
 
     def _get_opened_file_material_settings(self):
-        file_content = self._jobs_manager.get_opened_file_content()
         # Extracting material settings values from file content
-        material_name_match = re.search(
-            f"{constants.MATERIAL_NAME_SEARCH_KEYWORD}\s*(.*)", file_content)
-        material_thickness_match = re.search(
-            f"{constants.MATERIAL_THICKNESS_SEARCH_KEYWORD}\s*(.*)", file_content)
-
-        material_name = material_name_match.group(
-            1) if material_name_match else ''
-        material_thickness = material_thickness_match.group(
-            1) if material_thickness_match else ''
+        material_name = self._jobs_manager.search_opened_file(
+            f"{constants.MATERIAL_NAME_SEARCH_KEYWORD}\s*(.*)")
+        material_thickness = self._jobs_manager.search_opened_file(
+            f"{constants.MATERIAL_THICKNESS_SEARCH_KEYWORD}\s*(.*)")
 
         # fetch material image from the database if any
         material_image = ''
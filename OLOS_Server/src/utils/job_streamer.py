@@ -0,0 +1,256 @@
+import re
+import time
+from collections import deque
+from core.constants import CoreConstants
+from files_manager.job_file import JobFile
+from machine_connection.constants import MachineConstants as constants
+from utils.job_time_estimator import JobTimeEstimator
+
+# Stream the lines of the job file to the controller from inside the machine connector process
+# the core only sends the file path and receives progress events back,
+# so there is no communication between the processes for every executed line
+
+
+class JobStreamer:
+    def __init__(self, serial_connection, streaming_protocol, executed_lines_batch_size=constants.DEFAULT_EXECUTED_LINES_BATCH_SIZE):
+        self._serial_connection = serial_connection
+        self._streaming_protocol = streaming_protocol
+
+        # memory mapped job file and the iterator over its lines
+        self._job_file = None
+        self._job_lines = None
+        self._total_lines = 0
+        # estimated time at the end of every line, saved beside the job file
+        self._lines_times = None
+
+        # number of lines read from the job file
+        self._line_index = 0
+        # index of the last line sent to the controller
+        self._sent_index = 0
+        # index of the last line executed by the controller
+        self._acknowledged_index = 0
+
+        # lines sent and waiting for the controller answer
+        self._in_flight_lines = deque()
+        # last executed lines since the last progress (coalesced into one progress event)
+        self._executed_lines = deque(
+            maxlen=executed_lines_batch_size or constants.DEFAULT_EXECUTED_LINES_BATCH_SIZE)
+        self._is_progress_changed = False
+        # number of job lines rejected by the controller and the index of the first one
+        self._errors_number = 0
+        self._error_index = None
+
+        # smoothed number of executed lines per second
+        self._lines_per_second = None
+        self._rate_time = 0
+        self._rate_index = 0
+
+        # line read from the file and waiting for space inside the controller buffer
+        self._next_line = None
+        # commands sent before the first line incase of resuming the job
+        self._preamble = []
+
+        self._is_streaming = False
+        self._is_file_ended = False
+        self._is_waiting_tool_change = False
+
+    def start(self, file_path, start_line=1, preamble=None):
+        self.stop()
+
+        # the lines index is already built by the jobs manager
+        self._job_file = JobFile(file_path)
+        self._job_lines = self._job_file.iter_lines(start_line)
+        self._total_lines = self._job_file.get_total_lines()
+
+        # the estimate is built by the jobs manager with the job file
+        self._lines_times = JobTimeEstimator.load_lines_times(file_path)
+        if self._lines_times is not None and len(self._lines_times) != self._total_lines + 1:
+            self._lines_times = None
+
+        # the lines before the start line are already executed
+        self._line_index = start_line - 1
+        self._sent_index = start_line - 1
+        self._acknowledged_index = start_line - 1
+        self._in_flight_lines.clear()
+        self._executed_lines.clear()
+        self._is_progress_changed = True
+        self._errors_number = 0
+        self._error_index = None
+
+        self._lines_per_second = None
+        self._rate_time = time.time()
+        self._rate_index = start_line - 1
+
+        self._next_line = None
+        self._preamble = list(preamble) if preamble else []
+
+        self._is_streaming = True
+        self._is_file_ended = False
+        self._is_waiting_tool_change = False
+
+    def stop(self):
+        if self._job_file:
+            self._job_lines.close()
+            self._job_lines = None
+            self._job_file.close()
+            self._job_file = None
+            self._lines_times = None
+
+        self._is_streaming = False
+        self._next_line = None
+        self._preamble = []
+        self._is_waiting_tool_change = False
+
+    def is_streaming(self):
+        return self._is_streaming
+
+    def is_waiting_tool_change(self):
+        return self._is_waiting_tool_change
+
+    # all the lines are sent and the controller answered all of them
+    def is_finished(self):
+        return (self._is_streaming and
+                self._is_file_ended and
+                self._next_line is None and
+                not self._is_waiting_tool_change and
+                not self._streaming_protocol.has_commands_in_flight())
+
+    # send the next lines as long as the controller buffer has space for them
+    def stream_lines(self):
+        if not self._is_streaming or self._is_waiting_tool_change:
+            return 0
+
+        sent_lines = 0
+        while True:
+            if self._next_line is None:
+                self._next_line = self.read_next_line()
+
+                # end of file
+                if self._next_line is None:
+                    break
+
+            if not self._streaming_protocol.is_buffer_available(self._next_line):
+                break
+
+            line = self._next_line
+            self._next_line = None
+            self.send_line(line)
+            sent_lines += 1
+
+            # stop streaming until the tool changer finish its process
+            if constants.GRBL_COMMAND_TOOL_CHANGE in line:
+                self._is_waiting_tool_change = True
+                break
+
+        return sent_lines
+
+    def read_next_line(self):
+        # the preamble lines have the index of the line before the start line
+        if self._preamble:
+            return self._preamble.pop(0)
+
+        for line_index, line in self._job_lines:
+            self._line_index = line_index
+            line = str(line, 'utf-8', errors='replace')
+
+            # comments are ignored by the controller, do not waste the buffer space on them
+            if constants.GCODE_COMMENT_SEMICOLON in line:
+                line = line.split(constants.GCODE_COMMENT_SEMICOLON, 1)[0]
+            if constants.GCODE_COMMENT_PARENTHESES in line:
+                line = re.sub(r'\(.*?\)', '', line)
+
+            line = line.strip()
+
+            # skip empty lines
+            if line:
+                return line
+
+        self._is_file_ended = True
+        return None
+
+    def send_line(self, line):
+        self._streaming_protocol.add_sent_command(line, self._line_index)
+        self._serial_connection.write_to_serial(line)
+
+        self._sent_index = self._line_index
+        self._in_flight_lines.append((self._line_index, line))
+        self._is_progress_changed = True
+
+    # the controller answers a rejected line with an error instead of the ok, the line is not executed
+    def acknowledge_line(self, line_index, is_error=False):
+        if is_error:
+            self._errors_number += 1
+            if self._error_index is None:
+                self._error_index = line_index
+
+        if line_index > self._acknowledged_index:
+            self._acknowledged_index = line_index
+
+        while self._in_flight_lines and self._in_flight_lines[0][0] <= line_index:
+            self._executed_lines.append(self._in_flight_lines.popleft()[1])
+        self._is_progress_changed = True
+
+    # the machine finished changing the tool, all the lines before the tool change are executed
+    def finish_tool_change(self):
+        self._is_waiting_tool_change = False
+        self.acknowledge_line(self._sent_index)
+
+    def has_errors(self):
+        return self._errors_number > 0
+
+    def is_progress_changed(self):
+        return self._is_progress_changed
+
+    def update_lines_rate(self):
+        current_time = time.time()
+        elapsed_time = current_time - self._rate_time
+        if elapsed_time <= 0:
+            return
+
+        lines_rate = (self._acknowledged_index - self._rate_index) / elapsed_time
+        if self._lines_per_second is None:
+            self._lines_per_second = lines_rate
+        else:
+            self._lines_per_second = (constants.JOB_LINES_RATE_SMOOTHING * lines_rate +
+                                      (1 - constants.JOB_LINES_RATE_SMOOTHING) * self._lines_per_second)
+
+        self._rate_time = current_time
+        self._rate_index = self._acknowledged_index
+
+    # estimated time of the lines not executed yet, or from the lines rate incase the job has no estimate
+    def get_remaining_time(self, lines_per_second):
+        if self._lines_times is not None:
+            # the acknowledged lines inside the planner buffer are still not executed
+            executed_index = self._acknowledged_index if self.is_finished() else \
+                max(self._acknowledged_index - CoreConstants.GRBL_PLANNER_BUFFER_LINES, 0)
+            return float(self._lines_times[-1] - self._lines_times[executed_index])
+
+        if lines_per_second > 0:
+            return (self._total_lines - self._acknowledged_index) / lines_per_second
+        return None
+
+    # the progress contains the executed lines since the last progress
+    def get_progress(self):
+        # include the skipped lines at the end of the file
+        if self.is_finished():
+            self._sent_index = self._acknowledged_index = self._line_index
+
+        self.update_lines_rate()
+        lines_per_second = self._lines_per_second or 0
+        # estimated remaining time in seconds
+        eta = self.get_remaining_time(lines_per_second)
+
+        executed_lines = list(self._executed_lines)
+        self._executed_lines.clear()
+        self._is_progress_changed = False
+
+        return {
+            'lines': executed_lines,
+            'line_index': self._sent_index,
+            'acknowledged_index': self._acknowledged_index,
+            'total_lines': self._total_lines,
+            'errors_number': self._errors_number,
+            'error_index': self._error_index,
+            'lines_per_second': round(lines_per_second, 1),
+            'eta': round(eta, 1) if eta is not None else None
+        }
@@ -0,0 +1,516 @@
+import os
+import re
+import struct
+import numpy as np
+from core.constants import CoreConstants
+from files_manager.constants import FilesManagerConstants as constants
+from files_manager.job_file import JobFile
+from utils.gcode_modal_state import GcodeModalState
+from utils.grbl_settings import GrblSettings
+
+'''
+Estimate the execution time of a job file with the motion planner model of GRBL
+and save it in an estimate file beside the job file (<job file>.estimate)
+
+1. the lines are read by blocks, the common lines (G0/G1/G2/G3 with X Y Z I J F S words) are parsed
+   by one regex call for the whole block, the other lines (modes, comments, tool change, dwell) one by one
+2. the modal state (motion mode, units, distance mode, feed rate, position) is filled forward through
+   the lines of the block with numpy and every move becomes a segment (line or arc)
+3. every segment has a nominal speed (feed rate or rapid rate limited by the max rate of every axis)
+   and an acceleration (limited by the acceleration of every axis) like the GRBL planner,
+   the max speed at every junction comes from the junction deviation ($11) and the arcs are limited
+   by their segmentation ($12), a tool change, a program pause or a dwell stops the machine
+4. the entry speeds are planned for every block at once (MotionPlanner), then every segment is
+   a trapezoid (or triangle) speed profile between its entry and exit speeds
+
+the estimate file contains the total time and the time at the end of every line, so the remaining time
+of a running job is the time of its remaining lines, the estimate is built once when the job file is written
+'''
+
+
+class MotionPlanner:
+    '''
+    entry speeds of the segments like the GRBL planner, the speeds are squared while planning (v^2 = v0^2 + 2 * a * d)
+    - backward: the machine must be able to stop at the end of the planner buffer (the last block in the buffer
+      is planned to stop) and at the end of the job, so the entry of a segment is limited by the next segments
+    - forward: the machine accelerates from the entry of the previous segment
+
+    the segments are added by blocks, the last segments of a block wait for the next block
+    because their speeds depend on the segments after them
+    '''
+
+    # the junction is a straight line or a full reverse (cos of the junction angle)
+    STRAIGHT_JUNCTION_COS = 0.999999
+
+    def __init__(self, max_rates, accelerations, junction_deviation, planner_buffer_blocks):
+        self._max_rates = np.asarray(max_rates, dtype=float)
+        self._accelerations = np.asarray(accelerations, dtype=float)
+        self._junction_deviation = junction_deviation
+        self._planner_buffer_blocks = planner_buffer_blocks
+
+        # segments waiting for the next block
+        self._pending_segments = None
+        # last planned segment, the machine starts stopped
+        self._previous_direction = np.zeros(3)
+        self._previous_speed = 0.0
+        self._max_entry_speed = 0.0
+
+    # max value along a direction without exceeding the limit of every axis
+    @classmethod
+    def limit_by_axes(cls, directions, axes_limits):
+        with np.errstate(divide='ignore'):
+            return (axes_limits / np.abs(directions)).min(axis=1)
+
+    '''
+    segments: lines numbers, start and end directions (unit vectors), lengths (mm),
+    speeds limit (feed rate or arcs speed in mm/s, inf for the rapid moves) and if the machine stops before them
+    return the lines numbers and the times (seconds) of the planned segments
+    '''
+    def add_segments(self, segments, is_last=False):
+        if self._pending_segments is not None:
+            segments = tuple(np.concatenate(arrays) for arrays in zip(self._pending_segments, segments))
+        lines_numbers, starts_directions, ends_directions, lengths, speeds_limits, is_stops = segments
+
+        segments_number = len(lengths)
+        planned_number = segments_number if is_last else segments_number - self._planner_buffer_blocks - 1
+        if planned_number <= 0:
+            self._pending_segments = None if is_last else segments
+            return lines_numbers[:0], lengths[:0]
+
+        max_speeds = self.limit_by_axes(starts_directions, self._max_rates)
+        nominal_speeds = np.minimum(speeds_limits, max_speeds)
+        # the feed rate is not set, GRBL refuses the move, count it with the max rate
+        nominal_speeds = np.where(nominal_speeds > 0, nominal_speeds, max_speeds)
+        accelerations = self.limit_by_axes(starts_directions, self._accelerations)
+
+        max_entry_speeds = self.get_max_entry_speeds(starts_directions, ends_directions, nominal_speeds)
+        max_entry_speeds[is_stops] = 0
+
+        # distances[i] = 2 * a * L, the squared speed gained (or lost) over the segment i
+        # speeds_distances[i] = sum of the distances before the segment i
+        distances = 2 * accelerations * lengths
+        speeds_distances = np.concatenate(([0], np.cumsum(distances)))
+        planned_distances = speeds_distances[:planned_number + 1]
+
+        # backward: entry[i] <= max_entry[j] + distances from i to j for the segments in the buffer
+        # the machine stops at the end of the buffer and at the end of the job
+        max_entry_speeds = np.append(max_entry_speeds, 0)
+        indices = np.arange(planned_number + 1)
+        entry_speeds = speeds_distances[np.minimum(indices + self._planner_buffer_blocks, segments_number)]
+        for offset in range(self._planner_buffer_blocks):
+            next_indices = np.minimum(indices + offset, segments_number)
+            entry_speeds = np.minimum(entry_speeds,
+                                      max_entry_speeds[next_indices] + speeds_distances[next_indices])
+        entry_speeds -= planned_distances
+
+        # forward: entry[j] <= entry[i] + distances from i to j
+        entry_speeds[0] = min(entry_speeds[0], self._max_entry_speed)
+        entry_speeds = np.minimum.accumulate(entry_speeds - planned_distances) + planned_distances
+
+        self._pending_segments = None if is_last else tuple(array[planned_number:] for array in segments)
+        self._previous_direction = ends_directions[planned_number - 1]
+        self._previous_speed = nominal_speeds[planned_number - 1]
+        self._max_entry_speed = entry_speeds[planned_number]
+
+        entry_speeds = np.sqrt(np.maximum(entry_speeds, 0))
+        times = self.get_segments_times(entry_speeds[:-1], entry_speeds[1:], nominal_speeds[:planned_number],
+                                        accelerations[:planned_number], lengths[:planned_number])
+        return lines_numbers[:planned_number], times
+
+    # max entry speed (squared) of every segment from the junction deviation
+    def get_max_entry_speeds(self, starts_directions, ends_directions, nominal_speeds):
+        previous_directions = np.vstack((self._previous_direction, ends_directions[:-1]))
+        junction_cos = -(previous_directions * starts_directions).sum(axis=1)
+
+        junction_directions = starts_directions - previous_directions
+        junction_norms = np.linalg.norm(junction_directions, axis=1, keepdims=True)
+        junction_directions = np.divide(junction_directions, junction_norms,
+                                        out=np.zeros_like(junction_directions), where=junction_norms > 0)
+        junction_accelerations = self.limit_by_axes(junction_directions, self._accelerations)
+
+        sin_half_angle = np.sqrt(np.clip(0.5 * (1 - junction_cos), 0, 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            junction_speeds = junction_accelerations * self._junction_deviation * \
+                sin_half_angle / (1 - sin_half_angle)
+        junction_speeds = np.where(junction_cos < -self.STRAIGHT_JUNCTION_COS, np.inf, junction_speeds)
+        junction_speeds = np.where(junction_cos > self.STRAIGHT_JUNCTION_COS, 0, junction_speeds)
+
+        previous_speeds = np.append(self._previous_speed, nominal_speeds[:-1])
+        return np.minimum(junction_speeds, np.minimum(previous_speeds, nominal_speeds) ** 2)
+
+    @classmethod
+    def get_segments_times(cls, start_speeds, end_speeds, nominal_speeds, accelerations, lengths):
+        acceleration_lengths = (nominal_speeds ** 2 - start_speeds ** 2) / (2 * accelerations)
+        deceleration_lengths = (nominal_speeds ** 2 - end_speeds ** 2) / (2 * accelerations)
+        cruise_lengths = lengths - acceleration_lengths - deceleration_lengths
+
+        # trapezoid: accelerate to the nominal speed, cruise then decelerate
+        trapezoid_times = (2 * nominal_speeds - start_speeds - end_speeds) / accelerations + \
+            np.maximum(cruise_lengths, 0) / nominal_speeds
+        # triangle: the nominal speed is not reached
+        peak_speeds = np.sqrt(np.maximum(accelerations * lengths + (start_speeds ** 2 + end_speeds ** 2) / 2,
+                                         np.maximum(start_speeds, end_speeds) ** 2))
+        triangle_times = (2 * peak_speeds - start_speeds - end_speeds) / accelerations
+
+        return np.where(cruise_lengths >= 0, trapezoid_times, triangle_times)
+
+
+class JobTimeEstimator:
+    # magic, version, job file size, job file modification time, total lines, total time
+    ESTIMATE_HEADER_FORMAT = '<4sIQQQd'
+    ESTIMATE_HEADER_SIZE = struct.calcsize(ESTIMATE_HEADER_FORMAT)
+    ESTIMATE_TIME_TYPE = np.dtype('<f4')
+
+    # motion mode, X, Y, Z, I, J, F, S words in this order, the rest of the line is parsed alone
+    LINE_PATTERN = re.compile(rb'^[ \t]*(?:G0*([0-3])(?![\d.])[ \t]*)?'
+                              rb'(?:X([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:Y([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:Z([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:I([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:J([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:F([-+]?(?:\d+\.?\d*|\.\d+))[ \t]*)?'
+                              rb'(?:S[-+]?(?:\d+\.?\d*|\.\d+)[ \t]*)?'
+                              rb'([^\n]*?)\r?$', re.MULTILINE | re.IGNORECASE)
+    LINE_COLUMNS = ('motion', 'X', 'Y', 'Z', 'I', 'J', 'F')
+
+    MOTION_MODES = ('G0', 'G1', 'G2', 'G3')
+    RAPID_MOTION = 0
+    CLOCKWISE_ARC_MOTION = 2
+    DWELL_COMMAND = 'G4'
+    # program pause, program end and tool change empty the planner buffer
+    STOP_COMMANDS = ('M0', 'M1', 'M2', 'M6', 'M30')
+
+    INCH_TO_MM = 25.4
+    ARC_TOLERANCE_SETTING = 12
+    # GRBL arc tolerance incase the setting is missing (mm)
+    DEFAULT_ARC_TOLERANCE = 0.002
+    # GRBL arc angular travel epsilon, an arc with the same start and end is a full circle
+    ARC_ANGULAR_TRAVEL_EPSILON = 5e-7
+
+    def __init__(self, grbl_settings, planner_buffer_blocks=CoreConstants.GRBL_PLANNER_BUFFER_LINES):
+        # speeds in mm/s and accelerations in mm/s^2
+        self._max_rates = np.array(grbl_settings.get_max_rates(), dtype=float) / 60
+        self._accelerations = np.array(grbl_settings.get_accelerations(), dtype=float)
+        self._junction_deviation = grbl_settings.get_junction_deviation()
+        self._arc_tolerance = grbl_settings.get(self.ARC_TOLERANCE_SETTING) or self.DEFAULT_ARC_TOLERANCE
+        self._planner_buffer_blocks = planner_buffer_blocks
+        self.reset()
+
+    # GRBL power up state
+    def reset(self):
+        self._motion = self.RAPID_MOTION
+        self._units_scale = 1.0
+        self._is_relative = False
+        self._feed_rate = 0.0
+        self._position = np.zeros(3)
+        self._is_stop = True
+
+    @classmethod
+    def get_estimate_path(cls, file_path):
+        return file_path + constants.JOB_ESTIMATE_FILE_EXTENSION
+
+    # estimate the job file with the cached controller settings and save the estimate file
+    @classmethod
+    def build_estimate(cls, file_path):
+        try:
+            job_file = JobFile(file_path)
+            try:
+                lines_times = cls(GrblSettings.load()).estimate_job_file(job_file)
+            finally:
+                job_file.close()
+
+            cls.save_estimate(file_path, lines_times)
+            return float(lines_times[-1])
+
+        # the job can still run without the estimate
+        except (OSError, ValueError) as error:
+            if os.getenv('ENV') == 'development':
+                print('Job Time Estimation Error:', error)
+            return None
+
+    @classmethod
+    def save_estimate(cls, file_path, lines_times):
+        file_stat = os.stat(file_path)
+
+        # write the estimate in a temporary file first to not leave a broken estimate behind
+        estimate_path = cls.get_estimate_path(file_path)
+        temporary_estimate_path = estimate_path + '.tmp'
+        with open(temporary_estimate_path, 'wb') as estimate_file:
+            estimate_file.write(struct.pack(cls.ESTIMATE_HEADER_FORMAT,
+                                            constants.JOB_ESTIMATE_MAGIC,
+                                            constants.JOB_ESTIMATE_VERSION,
+                                            file_stat.st_size,
+                                            file_stat.st_mtime_ns,
+                                            len(lines_times) - 1,
+                                            float(lines_times[-1])))
+            lines_times.astype(cls.ESTIMATE_TIME_TYPE).tofile(estimate_file)
+        os.replace(temporary_estimate_path, estimate_path)
+
+    # total lines and total time of the estimate file incase it still matches the job file
+    @classmethod
+    def load_header(cls, file_path):
+        try:
+            with open(cls.get_estimate_path(file_path), 'rb') as estimate_file:
+                header = estimate_file.read(cls.ESTIMATE_HEADER_SIZE)
+
+            if len(header) != cls.ESTIMATE_HEADER_SIZE:
+                return None
+
+            magic, version, file_size, file_modification_time, total_lines, total_time = struct.unpack(
+                cls.ESTIMATE_HEADER_FORMAT, header)
+
+            file_stat = os.stat(file_path)
+            if (magic != constants.JOB_ESTIMATE_MAGIC or
+                version != constants.JOB_ESTIMATE_VERSION or
+                file_size != file_stat.st_size or
+                    file_modification_time != file_stat.st_mtime_ns):
+                return None
+
+            return total_lines, total_time
+
+        except OSError:
+            return None
+
+    # estimated time of the whole job in seconds, only the header of the estimate file is read
+    @classmethod
+    def load_total_time(cls, file_path):
+        header = cls.load_header(file_path)
+        return round(header[1]) if header else None
+
+    # estimated time at the end of every line in seconds (lines_times[0] = 0 before the first line)
+    @classmethod
+    def load_lines_times(cls, file_path):
+        header = cls.load_header(file_path)
+        if header is None:
+            return None
+
+        try:
+            return np.memmap(cls.get_estimate_path(file_path), dtype=cls.ESTIMATE_TIME_TYPE, mode='r',
+                             offset=cls.ESTIMATE_HEADER_SIZE, shape=(header[0] + 1,))
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def delete_estimate(cls, file_path):
+        estimate_path = cls.get_estimate_path(file_path)
+        if os.path.exists(estimate_path):
+            os.remove(estimate_path)
+
+    @classmethod
+    def rename_estimate(cls, old_file_path, new_file_path):
+        old_estimate_path = cls.get_estimate_path(old_file_path)
+        if os.path.exists(old_estimate_path):
+            os.replace(old_estimate_path, cls.get_estimate_path(new_file_path))
+
+    # time at the end of every line (seconds)
+    def estimate_job_file(self, job_file):
+        self.reset()
+        planner = MotionPlanner(self._max_rates, self._accelerations,
+                                self._junction_deviation, self._planner_buffer_blocks)
+
+        total_lines = job_file.get_total_lines()
+        lines_times = np.zeros(total_lines + 1)
+
+        for first_line, block in job_file.iter_blocks(constants.JOB_ESTIMATE_BLOCK_LINES):
+            lines_number = min(constants.JOB_ESTIMATE_BLOCK_LINES, total_lines - first_line + 1)
+            columns = self.parse_block(job_file, first_line, block, lines_number)
+
+            segments, dwells_lines, dwells_times = self.get_segments(columns)
+            lines_times[first_line + dwells_lines] += dwells_times
+            self.add_lines_times(lines_times, *planner.add_segments(
+                (segments[0] + first_line,) + segments[1:]))
+
+        self.add_lines_times(lines_times, *planner.add_segments(self.get_segments(None)[0], is_last=True))
+        return np.cumsum(lines_times)
+
+    @classmethod
+    def add_lines_times(cls, lines_times, lines_numbers, times):
+        if len(lines_numbers):
+            first_line = lines_numbers[0]
+            lines_times[first_line:lines_numbers[-1] + 1] += np.bincount(lines_numbers - first_line, weights=times)
+
+    # modes and words of every line of the block (nan where the word is missing)
+    def parse_block(self, job_file, first_line, block, lines_number):
+        matches = self.LINE_PATTERN.findall(block)
+
+        columns = {key: np.full(lines_number, np.nan)
+                   for key in self.LINE_COLUMNS + ('R', 'units_scale', 'is_relative', 'dwell')}
+        for key in ('is_stop', 'is_machine_coordinates', 'is_non_motion'):
+            columns[key] = np.zeros(lines_number, dtype=bool)
+
+        if len(matches) == lines_number:
+            words = list(zip(*matches))
+            for key, values in zip(self.LINE_COLUMNS, words):
+                values = np.array(values)
+                is_given = values != b''
+                columns[key][is_given] = values[is_given].astype(float)
+            other_lines = np.flatnonzero(np.array(words[-1]) != b'').tolist()
+        else:
+            other_lines = range(lines_number)
+
+        for index in other_lines:
+            self.parse_line(job_file.get_line(first_line + index), index, columns)
+
+        return columns
+
+    # the lines that are not only a move
+    def parse_line(self, line, index, columns):
+        line = GcodeModalState.GCODE_COMMENTS_PATTERN.sub('', line.upper())
+        for key in self.LINE_COLUMNS + ('R',):
+            columns[key][index] = np.nan
+
+        is_dwell = False
+        dwell_time = 0.0
+        for letter, value in GcodeModalState.GCODE_WORD_PATTERN.findall(line):
+            number = float(value)
+
+            if letter in ('G', 'M'):
+                command = GcodeModalState.format_command(letter, number)
+
+                if command in self.MOTION_MODES:
+                    columns['motion'][index] = number
+                elif command in GcodeModalState.UNITS_MODES:
+                    columns['units_scale'][index] = self.INCH_TO_MM if command == 'G20' else 1.0
+                elif command in GcodeModalState.DISTANCE_MODES:
+                    columns['is_relative'][index] = command == 'G91'
+                elif command == GcodeModalState.MACHINE_COORDINATES_COMMAND:
+                    columns['is_machine_coordinates'][index] = True
+                elif command in GcodeModalState.NON_MOTION_AXIS_COMMANDS:
+                    columns['is_non_motion'][index] = True
+                elif command == self.DWELL_COMMAND:
+                    is_dwell = True
+                elif command in self.STOP_COMMANDS:
+                    columns['is_stop'][index] = True
+
+            elif letter == 'P':
+                dwell_time = number
+            elif letter in columns:
+                columns[letter][index] = number
+
+        if is_dwell:
+            columns['dwell'][index] = dwell_time
+
+    @classmethod
+    def fill_forward(cls, values, initial_value):
+        indexes = np.maximum.accumulate(np.where(np.isnan(values), -1, np.arange(len(values))))
+        return np.where(indexes >= 0, values[indexes], initial_value), indexes
+
+    '''
+    segments of the parsed lines (see MotionPlanner.add_segments) with the lines indexes in the block,
+    the indexes and times of the dwells
+    the modal state at the end of the block is kept for the next block
+    '''
+    def get_segments(self, columns):
+        if columns is None:
+            return (np.zeros(0, dtype=np.int64), np.zeros((0, 3)), np.zeros((0, 3)),
+                    np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)), None, None
+
+        units_scales = self.fill_forward(columns['units_scale'], self._units_scale)[0]
+        is_relative = self.fill_forward(columns['is_relative'], float(self._is_relative))[0] == 1
+        motions = self.fill_forward(columns['motion'], self._motion)[0]
+        feed_rates = self.fill_forward(columns['F'] * units_scales / 60, self._feed_rate)[0]
+
+        # position at the end of every line: last absolute position plus the relative moves after it
+        # the axis words of G10, G28, G30 and G92 set the position without moving
+        positions = np.empty((len(motions), 3))
+        has_axis_words = np.zeros(len(motions), dtype=bool)
+        for axis, key in enumerate(('X', 'Y', 'Z')):
+            values = columns[key] * units_scales
+            is_given = ~np.isnan(values)
+            has_axis_words |= is_given
+
+            is_relative_move = is_given & is_relative & ~columns['is_machine_coordinates']
+            relative_moves = np.cumsum(np.where(is_relative_move, values, 0))
+            absolute_indexes = self.fill_forward(np.where(is_given & ~is_relative_move, values, np.nan), 0)[1]
+            positions[:, axis] = relative_moves + np.where(
+                absolute_indexes >= 0,
+                values[absolute_indexes] - relative_moves[absolute_indexes], self._position[axis])
+
+        is_dwell = ~np.isnan(columns['dwell'])
+        moves_indexes = np.flatnonzero(has_axis_words & ~columns['is_non_motion'] & ~is_dwell)
+        starts = np.vstack((self._position, positions[:-1]))[moves_indexes]
+        ends = positions[moves_indexes]
+        moves_motions = motions[moves_indexes]
+
+        deltas = ends - starts
+        lengths = np.linalg.norm(deltas, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            starts_directions = deltas / lengths[:, None]
+        ends_directions = starts_directions.copy()
+        speeds_limits = np.where(moves_motions == self.RAPID_MOTION, np.inf, feed_rates[moves_indexes])
+
+        is_arc = moves_motions >= self.CLOCKWISE_ARC_MOTION
+        if is_arc.any():
+            arcs_indexes = moves_indexes[is_arc]
+            arcs_scales = units_scales[arcs_indexes]
+            lengths[is_arc], starts_directions[is_arc], ends_directions[is_arc], arcs_speeds = self.get_arcs(
+                starts[is_arc], ends[is_arc],
+                np.nan_to_num(columns['I'][arcs_indexes]) * arcs_scales,
+                np.nan_to_num(columns['J'][arcs_indexes]) * arcs_scales,
+                columns['R'][arcs_indexes] * arcs_scales,
+                moves_motions[is_arc] == self.CLOCKWISE_ARC_MOTION)
+            speeds_limits[is_arc] = np.minimum(speeds_limits[is_arc], arcs_speeds)
+
+        # the machine stops before the first move after a stop command or a dwell
+        stops = np.cumsum(columns['is_stop'] | is_dwell)
+        is_valid = lengths > 0
+        moves_indexes = moves_indexes[is_valid]
+        moves_stops = stops[moves_indexes]
+        is_stops = moves_stops > np.append(0, moves_stops[:-1])
+        if len(is_stops):
+            is_stops[0] |= self._is_stop
+            self._is_stop = bool(stops[-1] > moves_stops[-1])
+        else:
+            self._is_stop |= bool(stops[-1])
+
+        self._motion = motions[-1]
+        self._units_scale = units_scales[-1]
+        self._is_relative = bool(is_relative[-1])
+        self._feed_rate = feed_rates[-1]
+        self._position = positions[-1]
+
+        dwells_lines = np.flatnonzero(is_dwell)
+        return (moves_indexes, starts_directions[is_valid], ends_directions[is_valid], lengths[is_valid],
+                speeds_limits[is_valid], is_stops), dwells_lines, columns['dwell'][dwells_lines]
+
+    # lengths, start and end directions and max speeds of the arcs in the XY plane
+    def get_arcs(self, starts, ends, offsets_x, offsets_y, radii, is_clockwise):
+        deltas = ends - starts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the center is on the left of the chord for a counter clockwise arc smaller than a half circle
+            chords = np.hypot(deltas[:, 0], deltas[:, 1])
+            heights = np.sqrt(radii ** 2 - (chords / 2) ** 2)
+            heights = np.where(is_clockwise == (radii > 0), -heights, heights)
+            is_radius = ~np.isnan(radii)
+            centers_x = starts[:, 0] + np.where(is_radius, deltas[:, 0] / 2 - heights * deltas[:, 1] / chords,
+                                                offsets_x)
+            centers_y = starts[:, 1] + np.where(is_radius, deltas[:, 1] / 2 + heights * deltas[:, 0] / chords,
+                                                offsets_y)
+
+            arcs_radii = np.hypot(starts[:, 0] - centers_x, starts[:, 1] - centers_y)
+            starts_angles = np.arctan2(starts[:, 1] - centers_y, starts[:, 0] - centers_x)
+            angles = np.arctan2(ends[:, 1] - centers_y, ends[:, 0] - centers_x) - starts_angles
+            angles = np.where(is_clockwise,
+                              np.where(angles >= -self.ARC_ANGULAR_TRAVEL_EPSILON, angles - 2 * np.pi, angles),
+                              np.where(angles <= self.ARC_ANGULAR_TRAVEL_EPSILON, angles + 2 * np.pi, angles))
+
+            # invalid arcs (radius too small for the chord) have no length and are skipped
+            lengths = np.nan_to_num(np.hypot(arcs_radii * angles, deltas[:, 2]))
+
+            signs = np.where(is_clockwise, -1, 1)
+            ends_angles = starts_angles + angles
+            zeros = np.zeros(len(angles))
+            starts_directions = np.column_stack((-signs * np.sin(starts_angles), signs * np.cos(starts_angles), zeros))
+            ends_directions = np.column_stack((-signs * np.sin(ends_angles), signs * np.cos(ends_angles), zeros))
+
+            # GRBL cuts the arcs into segments (arc tolerance $12), the junctions between them limit the speed
+            # sin of the half junction angle = cos of the half segment angle = 1 - tolerance / radius
+            is_segmented = np.abs(angles) * arcs_radii >= \
+                np.sqrt(self._arc_tolerance * (2 * arcs_radii - self._arc_tolerance))
+            sin_half_angles = np.clip(1 - self._arc_tolerance / arcs_radii, 0, 1)
+            speeds = np.sqrt(self._accelerations[:2].min() * self._junction_deviation *
+                             sin_half_angles / (1 - sin_half_angles))
+            speeds = np.where(is_segmented & (sin_half_angles < 1), speeds, np.inf)
+
+        return lengths, np.nan_to_num(starts_directions), np.nan_to_num(ends_directions), speeds
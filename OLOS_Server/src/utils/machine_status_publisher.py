@@ -0,0 +1,108 @@
+import threading
+import time
+from core.constants import CoreConstants as constants
+from utils.grbl_status import GrblStatus
+
+'''
+Keep the last known status of the machine and publish only the fields that changed
+- every field of the status message (state, machine_position, feed_and_speed...) is compared
+  with the last value sent to the users and only the changed fields are sent
+- the fields with a rate (positions, feed and speed, buffer state) are sent at most that many times per second,
+  their last change is held back and sent with the next report or the next flush
+- the fields without a rate (state, overrides, tool...) are sent immediately
+- a snapshot contains all the fields, it is sent when a new user connects
+
+the users merge the received fields into their status
+'''
+
+
+class MachineStatusPublisher:
+    # a field that was never sent
+    MISSING_FIELD = object()
+
+    def __init__(self, fields_rates=None):
+        # the status is updated by the machine data thread and the snapshot is asked by the websocket thread
+        self._lock = threading.Lock()
+
+        # minimum time between two messages of the same field
+        self._fields_intervals = {field: 1 / rate
+                                  for field, rate in (fields_rates or {}).items() if rate}
+
+        # last status received from the machine
+        self._status = None
+        # last status compared with the published fields
+        self._published_status = None
+        self._published_fields = {}
+        self._published_fields_time = {}
+        # some changed fields are held back by their rate
+        self._is_pending = False
+
+    # forget the published fields, the next status is sent with all its fields
+    def reset(self):
+        with self._lock:
+            self._status = None
+            self._published_status = None
+            self._published_fields = {}
+            self._published_fields_time = {}
+            self._is_pending = False
+
+    def update(self, report):
+        with self._lock:
+            self._status = GrblStatus.parse(report, self._status)
+            return self._get_changed_fields()
+
+    # publish the fields held back by their rate
+    def flush(self):
+        with self._lock:
+            if not self._is_pending or self._status is None:
+                return None
+            return self._get_changed_fields()
+
+    def get_snapshot(self):
+        with self._lock:
+            if self._status is None:
+                return None
+
+            status_fields = self._get_status_fields()
+            now = time.time()
+            self._published_status = self._status
+            self._published_fields = status_fields.copy()
+            self._published_fields_time = dict.fromkeys(status_fields, now)
+            self._is_pending = False
+
+            return {"type": constants.MACHINE_STATUS_DATA_TYPE, **status_fields}
+
+    def _get_changed_fields(self):
+        # fast path: no new status and nothing held back
+        if self._status is self._published_status and not self._is_pending:
+            return None
+
+        now = time.time()
+        changed_fields = {}
+        self._is_pending = False
+
+        for field, value in self._get_status_fields().items():
+            if self._published_fields.get(field, self.MISSING_FIELD) == value:
+                continue
+
+            interval = self._fields_intervals.get(field)
+            if interval and now - self._published_fields_time.get(field, 0) < interval:
+                self._is_pending = True
+                continue
+
+            changed_fields[field] = value
+            self._published_fields[field] = value
+            self._published_fields_time[field] = now
+
+        self._published_status = self._status
+
+        if not changed_fields:
+            return None
+        return {"type": constants.MACHINE_STATUS_DATA_TYPE, **changed_fields}
+
+    # fields of the status message without its type
+    def _get_status_fields(self):
+        status_fields = self._status.to_dict(constants.MACHINE_STATUS_DATA_TYPE)
+        del status_fields['type']
+        return status_fields
+
@@ -0,0 +1,374 @@
+import math
+import numpy as np
+
+'''
+Order the paths of a cut or mark layer to reduce the travel of the laser head (moves with the laser off)
+- nearest neighbour: the next path is the closest one to the current position of the head,
+  an open path can be cut from any of its ends and a closed contour from any of its points (entry point)
+- inner contours first: a path inside a closed contour is cut before the contour,
+  so the parts do not drop (or move) before their holes and details are cut
+- 2-opt: the order is improved by reversing the segments of the order that make the travel shorter,
+  only the nearest paths are tried and a segment that breaks the inner contours rule is not reversed
+- the entry points of the closed contours are chosen again for the final order
+
+the nearest points are found with a uniform grid, so large layouts (thousands of paths) stay fast
+'''
+
+
+class PointsGrid:
+    # average number of points in a cell
+    POINTS_PER_CELL = 4
+    MAX_CELLS_PER_AXIS = 1024
+
+    def __init__(self, points, points_paths):
+        self._points = points
+        self._points_paths = points_paths
+
+        self._origin = points.min(axis=0)
+        extent = np.maximum(points.max(axis=0) - self._origin, 1e-6)
+        self._cell_size = max(math.sqrt(extent[0] * extent[1] * self.POINTS_PER_CELL / len(points)),
+                              float(extent.max()) / self.MAX_CELLS_PER_AXIS, 1e-6)
+        self._cells_number = (extent // self._cell_size).astype(int) + 1
+
+        # points indexes of every not empty cell
+        cells = self._get_cells(points)
+        sorted_indexes = np.argsort(cells, kind='stable')
+        cells_keys, cells_starts = np.unique(
+            cells[sorted_indexes], return_index=True)
+        self._cells = dict(zip(cells_keys.tolist(), np.split(
+            sorted_indexes, cells_starts[1:])))
+
+    def _get_cells(self, points):
+        cells = ((points - self._origin) // self._cell_size).astype(int)
+        cells = np.clip(cells, 0, self._cells_number - 1)
+        return cells[:, 0] * self._cells_number[1] + cells[:, 1]
+
+    # nearest point of the usable paths, the cells with only removed paths are dropped
+    def nearest(self, point, usable_paths, removed_paths):
+        cell_x, cell_y, max_ring = self._get_cell_and_max_ring(point)
+
+        best_index, best_distance = None, math.inf
+        visited_cells = 0
+        for ring in range(max_ring + 1):
+            # the points of the next rings are at least this far
+            if best_distance <= (ring - 1) * self._cell_size:
+                break
+            # too many empty cells, compare with all the points
+            if visited_cells > len(self._cells):
+                return self._nearest_in(point, np.flatnonzero(usable_paths[self._points_paths]))
+
+            candidates = []
+            for cell in self._get_ring_cells(cell_x, cell_y, ring):
+                visited_cells += 1
+                cell_points = self._cells.get(cell)
+                if cell_points is None:
+                    continue
+                cell_paths = self._points_paths[cell_points]
+                if removed_paths[cell_paths].all():
+                    del self._cells[cell]
+                    continue
+                candidates.append(cell_points[usable_paths[cell_paths]])
+
+            if candidates:
+                index, distance = self._nearest_in(
+                    point, np.concatenate(candidates), with_distance=True)
+                if distance < best_distance:
+                    best_index, best_distance = index, distance
+
+        return best_index
+
+    # nearest paths of a point (without repetition)
+    def k_nearest(self, point, k):
+        cell_x, cell_y, max_ring = self._get_cell_and_max_ring(point)
+
+        candidates = []
+        for ring in range(max_ring + 1):
+            for cell in self._get_ring_cells(cell_x, cell_y, ring):
+                cell_points = self._cells.get(cell)
+                if cell_points is not None:
+                    candidates.append(cell_points)
+            # the cells of the next ring can have points closer than the corners of this ring
+            if sum(len(cell_points) for cell_points in candidates) >= k and \
+                    ring * self._cell_size >= self._get_kth_distance(point, candidates, k):
+                break
+
+        candidates = np.concatenate(candidates) if candidates else np.zeros(0, dtype=int)
+        distances = np.hypot(*(self._points[candidates] - point).T)
+        return self._points_paths[candidates[np.argsort(distances, kind='stable')]][:k]
+
+    def _get_kth_distance(self, point, candidates, k):
+        distances = np.hypot(*(self._points[np.concatenate(candidates)] - point).T)
+        return np.partition(distances, k - 1)[k - 1]
+
+    def _nearest_in(self, point, indexes, with_distance=False):
+        if not len(indexes):
+            return (None, math.inf) if with_distance else None
+        distances = np.hypot(*(self._points[indexes] - point).T)
+        nearest = int(np.argmin(distances))
+        if with_distance:
+            return int(indexes[nearest]), float(distances[nearest])
+        return int(indexes[nearest])
+
+    # cell of a point (it can be outside the grid) and the ring that covers all the grid
+    def _get_cell_and_max_ring(self, point):
+        cell_x, cell_y = ((np.asarray(point) - self._origin) // self._cell_size).astype(int).tolist()
+        cells_x, cells_y = self._cells_number.tolist()
+        return cell_x, cell_y, max(abs(cell_x), abs(cell_y), abs(cells_x - cell_x), abs(cells_y - cell_y))
+
+    def _get_ring_cells(self, cell_x, cell_y, ring):
+        cells_x, cells_y = self._cells_number.tolist()
+        if ring == 0:
+            ring_cells = [(cell_x, cell_y)]
+        else:
+            ring_cells = [(cell_x + offset, cell_y + side) for offset in range(-ring, ring + 1)
+                          for side in (-ring, ring)]
+            ring_cells += [(cell_x + side, cell_y + offset) for offset in range(-ring + 1, ring)
+                           for side in (-ring, ring)]
+
+        return [x * cells_y + y for x, y in ring_cells if 0 <= x < cells_x and 0 <= y < cells_y]
+
+
+class PathOptimizer:
+    # number of nearest paths tried by the 2-opt for every position
+    NEIGHBOURS_NUMBER = 8
+    MAX_TWO_OPT_PASSES = 5
+    # ignore the improvements smaller than this (mm)
+    MIN_IMPROVEMENT = 1e-6
+
+    # speed of the travel moves (mm/min) to estimate the travel time
+    DEFAULT_TRAVEL_SPEED = 6000
+
+    def __init__(self, travel_speed=DEFAULT_TRAVEL_SPEED, start_point=(0, 0)):
+        self._travel_speed = travel_speed or self.DEFAULT_TRAVEL_SPEED
+        self._start_point = np.array(start_point, dtype=float)
+
+    # time of the travel moves (seconds)
+    def get_travel_time(self, travel_distance):
+        return travel_distance / self._travel_speed * 60
+
+    # travel of the head (mm) to cut the paths in this order, every path starts with its first point
+    def get_travel_distance(self, sub_paths):
+        position = self._start_point
+        travel_distance = 0.0
+        for points in sub_paths:
+            travel_distance += math.dist(position, points[0])
+            position = points[-1]
+        return travel_distance
+
+    # paths in the optimized order, the open paths can be reversed and the closed contours start at their entry point
+    def optimize(self, sub_paths):
+        if len(sub_paths) < 2 and not (sub_paths and self.is_closed(sub_paths[0])):
+            return list(sub_paths)
+
+        is_closed = np.array([self.is_closed(points) for points in sub_paths])
+        containers = self.get_containers(sub_paths, is_closed)
+
+        order, entry_points = self._get_nearest_neighbour_order(
+            sub_paths, is_closed, containers)
+        order, entry_points = self._improve_order(
+            sub_paths, is_closed, containers, order, entry_points)
+
+        optimized_sub_paths = []
+        for path, (entry_point, exit_point) in zip(order.tolist(), entry_points.tolist()):
+            points = sub_paths[path]
+            if is_closed[path]:
+                optimized_sub_paths.append(
+                    self._get_closed_path_from(points, entry_point))
+            elif exit_point == 0:
+                optimized_sub_paths.append(points[::-1])
+            else:
+                optimized_sub_paths.append(points)
+
+        return optimized_sub_paths
+
+    @classmethod
+    def is_closed(cls, points):
+        return len(points) > 3 and bool((points[0] == points[-1]).all())
+
+    # the closed contours that contain every path: list of (path, container) pairs
+    @classmethod
+    def get_containers(cls, sub_paths, is_closed):
+        closed_paths = np.flatnonzero(is_closed)
+        if not len(closed_paths):
+            return np.zeros((0, 2), dtype=int)
+
+        bounding_boxes = np.array([np.concatenate((points.min(axis=0), points.max(axis=0)))
+                                   for points in sub_paths])
+        areas = (bounding_boxes[:, 2] - bounding_boxes[:, 0]) * \
+            (bounding_boxes[:, 3] - bounding_boxes[:, 1])
+        closed_boxes = bounding_boxes[closed_paths]
+
+        pairs = []
+        for path, box in enumerate(bounding_boxes):
+            # the contour bounding box contains the path bounding box and it is larger
+            candidates = closed_paths[(closed_boxes[:, 0] <= box[0]) & (closed_boxes[:, 1] <= box[1]) &
+                                      (closed_boxes[:, 2] >= box[2]) & (closed_boxes[:, 3] >= box[3]) &
+                                      (areas[closed_paths] > areas[path])]
+            for container in candidates.tolist():
+                if cls.is_point_inside(sub_paths[path][0], sub_paths[container]):
+                    pairs.append((path, container))
+
+        return np.array(pairs, dtype=int).reshape(-1, 2)
+
+    # even-odd rule (ray casting) with a closed polygon
+    @classmethod
+    def is_point_inside(cls, point, polygon):
+        x, y = point
+        start_x, start_y = polygon[:-1, 0], polygon[:-1, 1]
+        end_x, end_y = polygon[1:, 0], polygon[1:, 1]
+
+        is_crossing_y = (start_y > y) != (end_y > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = start_x + (y - start_y) * \
+                (end_x - start_x) / (end_y - start_y)
+        return bool(np.count_nonzero(is_crossing_y & (x < crossing_x)) % 2)
+
+    def _get_nearest_neighbour_order(self, sub_paths, is_closed, containers):
+        paths_number = len(sub_paths)
+
+        # entry points: all the points of the closed contours and the ends of the open paths
+        points, points_paths, points_indexes = [], [], []
+        for path, path_points in enumerate(sub_paths):
+            indexes = np.arange(len(path_points) - 1) if is_closed[path] \
+                else np.array([0, len(path_points) - 1])
+            points.append(path_points[indexes])
+            points_paths.append(np.full(len(indexes), path))
+            points_indexes.append(indexes)
+        points = np.concatenate(points)
+        points_paths = np.concatenate(points_paths)
+        points_indexes = np.concatenate(points_indexes)
+        grid = PointsGrid(points, points_paths)
+
+        # a contour can be cut when all the paths inside it are cut
+        inner_paths_number = np.bincount(
+            containers[:, 1], minlength=paths_number)
+        paths_containers = [[] for _ in range(paths_number)]
+        for path, container in containers.tolist():
+            paths_containers[path].append(container)
+
+        is_cut = np.zeros(paths_number, dtype=bool)
+        is_usable = inner_paths_number == 0
+
+        order = []
+        entry_points = []
+        position = self._start_point
+        for _ in range(paths_number):
+            point = grid.nearest(position, is_usable, is_cut)
+            path, point_index = int(points_paths[point]), int(points_indexes[point])
+
+            # exit point: the same point for a closed contour, the other end for an open path
+            exit_index = point_index if is_closed[path] else len(
+                sub_paths[path]) - 1 - point_index
+            order.append(path)
+            entry_points.append((point_index, exit_index))
+            position = sub_paths[path][exit_index]
+
+            is_cut[path] = True
+            is_usable[path] = False
+            for container in paths_containers[path]:
+                inner_paths_number[container] -= 1
+                if inner_paths_number[container] == 0:
+                    is_usable[container] = True
+
+        return np.array(order), np.array(entry_points)
+
+    def _improve_order(self, sub_paths, is_closed, containers, order, entry_points):
+        paths_number = len(order)
+        # entry and exit positions of the paths in the order
+        entries = np.array([sub_paths[path][entry] for path, (entry, _)
+                            in zip(order.tolist(), entry_points.tolist())])
+        exits = np.array([sub_paths[path][exit] for path, (_, exit)
+                          in zip(order.tolist(), entry_points.tolist())])
+        positions = np.empty(paths_number, dtype=int)
+        positions[order] = np.arange(paths_number)
+
+        # nearest paths of every path (by their entry points)
+        grid = PointsGrid(entries[np.argsort(order)], np.arange(paths_number))
+        neighbours = [grid.k_nearest(point, self.NEIGHBOURS_NUMBER + 1)
+                      for point in entries[np.argsort(order)]]
+        start_neighbours = grid.k_nearest(
+            self._start_point, self.NEIGHBOURS_NUMBER)
+
+        first_containers_positions = self._get_first_containers_positions(
+            containers, positions, order)
+
+        def distance(point, other_point):
+            return math.hypot(point[0] - other_point[0], point[1] - other_point[1])
+
+        for _ in range(self.MAX_TWO_OPT_PASSES):
+            is_improved = False
+            for index in range(paths_number):
+                previous_exit = exits[index - 1] if index else self._start_point
+                candidates = neighbours[order[index - 1]] if index else start_neighbours
+
+                for candidate in candidates.tolist():
+                    # reverse the segment [index, last_index] of the order
+                    last_index = positions[candidate]
+                    if last_index < index:
+                        continue
+
+                    removed_distance = distance(previous_exit, entries[index])
+                    added_distance = distance(previous_exit, exits[last_index])
+                    if last_index + 1 < paths_number:
+                        removed_distance += distance(exits[last_index], entries[last_index + 1])
+                        added_distance += distance(entries[index], entries[last_index + 1])
+                    if added_distance > removed_distance - self.MIN_IMPROVEMENT:
+                        continue
+
+                    # a path and its container in the segment would be cut in the wrong order
+                    if last_index > index and \
+                            first_containers_positions[index:last_index + 1].min() <= last_index:
+                        continue
+
+                    segment = slice(index, last_index + 1)
+                    order[segment] = order[segment][::-1]
+                    entries[segment], exits[segment] = exits[segment][::-1].copy(), \
+                        entries[segment][::-1].copy()
+                    entry_points[segment] = entry_points[segment][::-1, ::-1].copy()
+                    positions[order[segment]] = np.arange(index, last_index + 1)
+                    first_containers_positions = self._get_first_containers_positions(
+                        containers, positions, order)
+                    is_improved = True
+                    break
+
+            if not is_improved:
+                break
+
+        return order, self._choose_entry_points(sub_paths, is_closed, order, entry_points)
+
+    # position of the first container of every path in the order (paths count when there is no container)
+    def _get_first_containers_positions(self, containers, positions, order):
+        first_positions = np.full(len(order), len(order))
+        np.minimum.at(first_positions,
+                      containers[:, 0], positions[containers[:, 1]])
+        return first_positions[order]
+
+    # closest point of the closed contours to the previous exit point, kept when the travel is shorter
+    def _choose_entry_points(self, sub_paths, is_closed, order, entry_points):
+        new_entry_points = entry_points.copy()
+        position = self._start_point
+        travel_distance, new_travel_distance = 0.0, 0.0
+        new_position = self._start_point
+
+        for index, path in enumerate(order.tolist()):
+            points = sub_paths[path]
+            entry, exit = entry_points[index].tolist()
+            travel_distance += math.dist(position, points[entry])
+            position = points[exit]
+
+            if is_closed[path]:
+                distances = np.hypot(*(points[:-1] - new_position).T)
+                new_entry = int(np.argmin(distances))
+                new_entry_points[index] = (new_entry, new_entry)
+                new_travel_distance += float(distances[new_entry])
+            else:
+                new_travel_distance += math.dist(new_position, points[entry])
+            new_position = points[new_entry_points[index][1]]
+
+        return new_entry_points if new_travel_distance < travel_distance else entry_points
+
+    @classmethod
+    def _get_closed_path_from(cls, points, entry_point):
+        if entry_point == 0:
+            return points
+        return np.concatenate((points[entry_point:-1], points[:entry_point + 1]))
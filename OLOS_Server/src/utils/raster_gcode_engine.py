@@ -0,0 +1,228 @@
+import math
+import numpy as np
+from PIL import Image, ImageOps
+
+'''
+Convert a raster image to laser engraving gcode inside the server process (no temporary files or subprocess)
+it writes the same gcode dialect as the image2gcode tool that was used before:
+- the image is scanned from the bottom row, left to right then right to left (bidirectional)
+- every pixel is converted to a laser power: round((1 - pixel / 255) * max power) (black = max power)
+- the pixels with the same power on a scan line are merged in one move "X<x>S<power>"
+- the zero power runs (blank margins, blank rows) are not burned, the laser head moves over them
+  with "X<x>Y<y>S0" or with a fast move "G0 X<x>Y<y>" when the distance is more than speed moves (mm)
+- the coordinates have the same number of digits as the pixel size (0.1 -> 1 digit)
+
+the runs of every scan line are found with numpy, only the runs (not the pixels) are handled in python
+
+the image is loaded in grayscale first, then it is scaled, flipped and rotated by one affine warp of its
+grayscale pixels (one matrix from the gcode pixels to the image pixels), the loaded pixels are the engraving
+at the engraving resolution without any intermediate image
+'''
+
+
+class RasterGcodeEngine:
+    # fast move over the blank runs longer than 10 mm
+    DEFAULT_SPEED_MOVES = 10
+    # do not burn the pixels with this power or less
+    DEFAULT_NOISE = 0
+
+    GCODE_INIT = 'G00 G17 G40 G21 G54\nG90\n'
+    # laser stop, fan on, laser on while moving (constant burn) or speed adaptive burn
+    GCODE_CONSTANT_BURN_HEADER = 'M5\nM8\nM3\n'
+    GCODE_DYNAMIC_BURN_HEADER = 'M4\n'
+    # laser off, fan off, program stop
+    GCODE_FOOTER = 'M5\nM9\nM2\n'
+
+    # max reduction of the affine warp, the larger images are reduced by a box filter before the warp
+    MAX_WARP_REDUCTION = 2
+
+    def __init__(self, pixel_size, speed, max_power, offset=(0, 0),
+                 speed_moves=DEFAULT_SPEED_MOVES, noise=DEFAULT_NOISE, constant_burn=True):
+        self._pixel_size = float(pixel_size)
+        self._precision = self.get_precision(self._pixel_size)
+        self._speed = speed
+        self._max_power = max_power
+        self._offset = offset
+        self._speed_moves = speed_moves
+        self._noise = noise
+        self._constant_burn = constant_burn
+
+        # laser power of every pixel value (0 - 255)
+        self._power_table = np.array([round((1.0 - pixel / 255) * max_power)
+                                      for pixel in range(256)], dtype=np.int32)
+
+        # x positions of the pixels edges for every scan line start and direction
+        self._scan_positions = {}
+
+    @classmethod
+    def get_precision(cls, pixel_size):
+        # number of digits after the decimal point of the pixel size
+        return len(repr(pixel_size).split('.')[1]) if '.' in repr(pixel_size) else 0
+
+    '''
+    image with a white background in grayscale, flipped because the gcode y axis goes up
+    size: size of the scaled image (pixels), is_flipped: the image is flipped vertically before the rotation,
+    rotation: counterclockwise angle (degrees), the rotated image is expanded to fit all the image
+    '''
+    @classmethod
+    def load_image(cls, image, size=None, rotation=0, is_flipped=False):
+        image = cls.convert_to_grayscale(image)
+        width, height = size or image.size
+        width, height = max(int(width), 1), max(int(height), 1)
+
+        if (width, height) == image.size and not rotation % 360 and not is_flipped:
+            return np.flipud(np.asarray(image))
+
+        # the bicubic warp skips pixels when it reduces the image more than twice, the image is reduced first
+        reduction = int(min(image.width / width, image.height / height) // cls.MAX_WARP_REDUCTION)
+        if reduction > 1:
+            image = image.reduce(reduction)
+
+        matrix, rotated_size = cls.get_warp_matrix(image.size, (width, height), rotation, is_flipped)
+        warped_image = image.transform(rotated_size, Image.Transform.AFFINE, data=tuple(matrix[:2].flatten()),
+                                       resample=Image.Resampling.BICUBIC, fillcolor=255)
+        return np.asarray(warped_image)
+
+    # the transparent pixels are white
+    @classmethod
+    def convert_to_grayscale(cls, image):
+        if image.mode == 'L':
+            return image
+        if not image.has_transparency_data:
+            return image.convert('L')
+
+        if image.mode not in ('RGBA', 'LA'):
+            image = image.convert('RGBA')
+
+        # white pasted through the transparency: gray * alpha + white * (1 - alpha)
+        grayscale_image = image.convert('L')
+        grayscale_image.paste(255, mask=ImageOps.invert(image.getchannel('A')))
+        return grayscale_image
+
+    '''
+    matrix from the loaded pixels to the image pixels (3x3) and the size of the loaded pixels
+    - the loaded pixels are flipped (gcode y axis), then they are rotated around the center of the rotated image
+      (same size and angle as PIL rotate with expand) and scaled from the scaled size to the image size
+    '''
+    @classmethod
+    def get_warp_matrix(cls, image_size, scaled_size, rotation, is_flipped):
+        image_width, image_height = image_size
+        width, height = scaled_size
+
+        angle = math.radians(rotation)
+        cos, sin = round(math.cos(angle), 15), round(math.sin(angle), 15)
+
+        # bounding box of the rotated image like PIL rotate (the right angles are exact)
+        if not rotation % 90:
+            rotated_width, rotated_height = (height, width) if rotation % 180 else (width, height)
+        else:
+            corners_x = [cos * (x - width / 2) - sin * (y - height / 2) + width / 2
+                         for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+            corners_y = [sin * (x - width / 2) + cos * (y - height / 2) + height / 2
+                         for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+            rotated_width = math.ceil(max(corners_x)) - math.floor(min(corners_x))
+            rotated_height = math.ceil(max(corners_y)) - math.floor(min(corners_y))
+
+        flip_matrix = np.array([[1, 0, 0],
+                                [0, -1, rotated_height],
+                                [0, 0, 1]], dtype=float)
+        rotation_matrix = np.array([[cos, -sin, width / 2],
+                                    [sin, cos, height / 2],
+                                    [0, 0, 1]], dtype=float) @ \
+            np.array([[1, 0, -rotated_width / 2],
+                      [0, 1, -rotated_height / 2],
+                      [0, 0, 1]], dtype=float)
+        scale_matrix = np.array([[image_width / width, 0, 0],
+                                 [0, image_height / height, 0],
+                                 [0, 0, 1]], dtype=float)
+        if is_flipped:
+            scale_matrix[1] = [0, -image_height / height, image_height]
+
+        return scale_matrix @ rotation_matrix @ flip_matrix, (rotated_width, rotated_height)
+
+    def generate(self, pixels):
+        return ''.join(self.generate_chunks(pixels))
+
+    # the gcode is produced one scan line at a time, the chunks are joined without separator
+    def generate_chunks(self, pixels):
+        height, width = pixels.shape
+        print_area = (f'print area: {round(width * self._pixel_size, 2)}x'
+                      f'{round(height * self._pixel_size, 2)} mm (XY)')
+
+        header = (f';    raster engine: pixel size {self._pixel_size} mm, speed {self._speed}, '
+                  f'max power {self._max_power}\n'
+                  f';    {print_area}\n;\n\n')
+        burn_header = self.GCODE_CONSTANT_BURN_HEADER if self._constant_burn else self.GCODE_DYNAMIC_BURN_HEADER
+
+        yield header + self.GCODE_INIT + burn_header
+        yield from self.generate_scan_lines(pixels)
+        yield '\n' + self.GCODE_FOOTER
+
+    def generate_scan_lines(self, pixels):
+        height, width = pixels.shape
+        precision = self._precision
+
+        x = round(self._offset[0], precision)
+        y = round(self._offset[1], precision)
+
+        yield f'G0X{x}Y{y}\nG1F{self._speed}'
+        # position of the laser head
+        head = (x, y)
+        is_left_to_right = True
+
+        for row in pixels:
+            scan_positions, scan_texts = self._get_scan_positions(
+                x, is_left_to_right, width)
+            powers = self._power_table[row if is_left_to_right else row[::-1]]
+
+            # runs of the same power: [starts[i], ends[i])
+            changes = np.flatnonzero(powers[1:] != powers[:-1]) + 1
+            starts = np.concatenate(([0], changes))
+            ends = np.concatenate((changes, [width]))
+            runs_powers = powers[starts]
+
+            burned_runs = np.flatnonzero(runs_powers > self._noise)
+            if burned_runs.size:
+                # the head moves to the start of a burned run only after a blank run or at the start of the line
+                previous_runs = np.maximum(burned_runs - 1, 0)
+                is_move_needed = (burned_runs == 0) | (
+                    runs_powers[previous_runs] <= self._noise)
+
+                y_text = repr(y)
+                line_gcode = []
+                for start, end, power, is_move in zip(starts[burned_runs].tolist(), ends[burned_runs].tolist(),
+                                                      runs_powers[burned_runs].tolist(), is_move_needed.tolist()):
+                    if is_move:
+                        start_x = scan_positions[start]
+                        if self._speed_moves and \
+                                math.sqrt(abs(head[0] - start_x) ** 2 + abs(head[1] - y) ** 2) > self._speed_moves:
+                            line_gcode.append(
+                                f'G0 X{scan_texts[start]}Y{y_text}\nG1\nX{scan_texts[end]}S{power}')
+                        else:
+                            line_gcode.append(
+                                f'X{scan_texts[start]}Y{y_text}S0\nX{scan_texts[end]}S{power}')
+                    else:
+                        line_gcode.append(f'X{scan_texts[end]}S{power}')
+
+                    head = (scan_positions[end], y)
+
+                yield '\n' + '\n'.join(line_gcode)
+
+            # next scan line in the other direction
+            x = scan_positions[width]
+            y = round(y + self._pixel_size, precision)
+            is_left_to_right = not is_left_to_right
+
+    # the positions are added one pixel at a time and rounded like the previous tool
+    # so the scan lines end at the same positions, they are calculated once per start and direction
+    def _get_scan_positions(self, start_x, is_left_to_right, width):
+        key = (start_x, is_left_to_right)
+        if key not in self._scan_positions:
+            step = self._pixel_size if is_left_to_right else -self._pixel_size
+            positions = [start_x]
+            for _ in range(width):
+                positions.append(round(positions[-1] + step, self._precision))
+            self._scan_positions[key] = (
+                positions, [repr(position) for position in positions])
+
+        return self._scan_positions[key]
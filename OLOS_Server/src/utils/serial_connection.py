@@ -118,6 +118,15 @@ class SerialConnection:
             print("Write operation timed out")
             self.disconnect_serial()
 
+    # real time commands are sent without a new line delimiter
+    # (latin-1 keeps the override commands from 0x80 as one byte)
+    def write_real_time_command(self, command):
+        try:
+            self._serial_connection.write(command.encode('latin-1'))
+        except serial.SerialTimeoutException:
+            print("Write operation timed out")
+            self.disconnect_serial()
+
     def read_from_serial(self):
         try:
             if self._serial_connection.in_waiting > 0:
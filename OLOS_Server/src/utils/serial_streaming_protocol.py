@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from machine_connection.constants import MachineConstants as constants
+
+# Streaming protocol used to decide when the next command can be written to the controller
+# - character counting: keep track of the bytes inside the controller RX buffer and keep it full
+# - send response: send one command and wait for its answer before sending the next one
+
+
+class SerialStreamingProtocol:
+    def __init__(self, protocol=constants.CHARACTER_COUNTING_PROTOCOL, rx_buffer_size=constants.DEFAULT_RX_BUFFER_SIZE):
+        # fallback to the send response protocol incase of unknown protocol
+        if protocol not in (constants.CHARACTER_COUNTING_PROTOCOL, constants.SEND_RESPONSE_PROTOCOL):
+            protocol = constants.SEND_RESPONSE_PROTOCOL
+
+        self._protocol = protocol
+        self._rx_buffer_size = rx_buffer_size or constants.DEFAULT_RX_BUFFER_SIZE
+
+        # length in bytes of each command sent and still waiting for its answer
+        self._sent_commands_lengths = deque()
+        # job line index of each command sent (None for commands outside the job)
+        self._sent_commands_line_indexes = deque()
+        self._rx_buffer_usage = 0
+
+        # job streaming statistics
+        self._is_job_running = False
+        self._job_start_time = 0
+        self._job_acknowledged_lines = 0
+        self._planner_starvation_count = 0
+
+    def get_protocol(self):
+        return self._protocol
+
+    def is_character_counting(self):
+        return self._protocol == constants.CHARACTER_COUNTING_PROTOCOL
+
+    def is_real_time_command(self, command):
+        # real time commands are picked directly by the controller and never reach the RX buffer,
+        # the controller never answers them with an ok whatever the streaming protocol is
+        return isinstance(command, str) and (
+            command in constants.REAL_TIME_COMMANDS or
+            (len(command) == 1 and ord(command) >= constants.REAL_TIME_COMMAND_MIN_BYTE))
+
+    def get_command_length(self, command):
+        # the command and the new line delimiter are stored inside the RX buffer
+        return len(command.encode()) + len(constants.NEWLINE)
+
+    def is_buffer_available(self, command):
+        if self.is_character_counting():
+            # always allow a command when the buffer is empty, even if it is bigger than the buffer
+            return (not self._sent_commands_lengths or
+                    self._rx_buffer_usage + self.get_command_length(command) <= self._rx_buffer_size)
+
+        # send response: only one command at a time
+        return not self._sent_commands_lengths
+
+    def has_commands_in_flight(self):
+        return bool(self._sent_commands_lengths)
+
+    def add_sent_command(self, command, line_index=None):
+        command_length = self.get_command_length(command)
+        self._sent_commands_lengths.append(command_length)
+        self._sent_commands_line_indexes.append(line_index)
+        self._rx_buffer_usage += command_length
+
+    # return the job line index of the acknowledged command (None if it is not a job line)
+    def acknowledge_command(self, is_machine_pause=False):
+        # the controller processed the oldest command in the buffer
+        if self._sent_commands_lengths:
+            self._rx_buffer_usage -= self._sent_commands_lengths.popleft()
+            line_index = self._sent_commands_line_indexes.popleft()
+
+            if self._is_job_running and line_index is not None:
+                self._job_acknowledged_lines += 1
+
+                # the controller consumed everything the server sent, the planner is waiting for new commands
+                if not self._sent_commands_lengths and not is_machine_pause:
+                    self._planner_starvation_count += 1
+
+            return line_index
+
+        return None
+
+    def reset(self):
+        self._sent_commands_lengths.clear()
+        self._sent_commands_line_indexes.clear()
+        self._rx_buffer_usage = 0
+
+    def start_job_statistics(self):
+        self._is_job_running = True
+        self._job_start_time = time.time()
+        self._job_acknowledged_lines = 0
+        self._planner_starvation_count = 0
+
+    def stop_job_statistics(self):
+        self._is_job_running = False
+        duration = time.time() - self._job_start_time
+
+        return {
+            'protocol': self._protocol,
+            'lines': self._job_acknowledged_lines,
+            'duration': round(duration, 3),
+            'lines_per_second': round(self._job_acknowledged_lines / duration, 2) if duration > 0 else 0,
+            'planner_starvation_count': self._planner_starvation_count
+        }
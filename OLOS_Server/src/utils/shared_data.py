@@ -1,13 +1,24 @@
 # This module contains the shared data between the core and other services
 # used to ease the use of shared memory object in multiprocessing
 
+from multiprocessing import RawValue
 from multiprocessing.managers import SyncManager
 from utils.priority_queue_with_counter import PriorityQueueWithCounter
+from utils.shared_frame_ring import SharedFrameRing
+from utils.shared_memory_priority_queue import SharedMemoryPriorityQueue
 
 '''
 Use Manager module to be able to manage all the processes in the system
 register in the manager a priority queue to make sure to prioritize 
 specific commands based on how important they are
+
+The machine and websocket data are exchanged continuously, so they use
+shared memory priority queues and raw shared values (flags) instead of
+the manager to not pass through the manager process on every access
+
+The camera frames are written in a shared memory frames ring, only their
+metadata is sent to the core (shared memory queue) and from the core to the
+websocket connector that reads the frame content from the ring
 '''
 
 
@@ -24,14 +35,13 @@ class SharedDataManager:
 
 class SharedMachineData:
     def __init__(self):
-        manager = SharedDataManager().get_manager()
         self._data = {
-            'serial_read_queue': manager.PriorityQueueWithCounter(),
-            'serial_write_queue': manager.PriorityQueueWithCounter(),
-            'ok_messages_counter': manager.Value('i', 0),
-            'is_tool_change_process': manager.Value('b', False),
-            'is_machine_pause': manager.Value('b', False),
-            'is_job_execute_process': manager.Value('b', False)
+            'serial_read_queue': SharedMemoryPriorityQueue(),
+            'serial_write_queue': SharedMemoryPriorityQueue(),
+            'ok_messages_counter': RawValue('i', 0),
+            'is_tool_change_process': RawValue('b', False),
+            'is_machine_pause': RawValue('b', False),
+            'is_job_execute_process': RawValue('b', False)
         }
 
     @property
@@ -74,14 +84,18 @@ class SharedMachineData:
     def is_job_execute_process(self, value):
         self._data['is_job_execute_process'].value = value
 
+    # release the shared memory of the queues
+    def close(self):
+        self.serial_read_queue.close()
+        self.serial_write_queue.close()
+
 
 class SharedWebsocketData:
     def __init__(self):
-        manager = SharedDataManager().get_manager()
         self._data = {
-            'websocket_read_queue': manager.PriorityQueueWithCounter(),
-            'websocket_write_queue': manager.PriorityQueueWithCounter(),
-            'is_job_execute_process': manager.Value('b', False)
+            'websocket_read_queue': SharedMemoryPriorityQueue(),
+            'websocket_write_queue': SharedMemoryPriorityQueue(),
+            'is_job_execute_process': RawValue('b', False)
         }
 
     @property
@@ -100,6 +114,11 @@ class SharedWebsocketData:
     def is_job_execute_process(self, value):
         self._data['is_job_execute_process'].value = value
 
+    # release the shared memory of the queues
+    def close(self):
+        self.websocket_read_queue.close()
+        self.websocket_write_queue.close()
+
 
 class SharedFastApiData:
     def __init__(self):
@@ -119,12 +138,18 @@ class SharedFastApiData:
 
 
 class SharedCamerasSystemData:
-    def __init__(self):
+    # only the frames metadata pass through the queue
+    FRAMES_METADATA_QUEUE_SIZE = 64 * 1024
+
+    def __init__(self, frames_slots_number=4, frame_slot_size=4 * 1024 * 1024):
         manager = SharedDataManager().get_manager()
         self._data = {
-            'cameras_read_queue': manager.Queue(),
+            'cameras_read_queue': SharedMemoryPriorityQueue(
+                priorities_number=1, ring_buffer_size=self.FRAMES_METADATA_QUEUE_SIZE),
             'cameras_write_queue': manager.Queue(),
-
+            'frames_ring': SharedFrameRing(frames_slots_number, frame_slot_size),
+            # the cameras stream is limited during the job execution
+            'is_job_execute_process': RawValue('b', False)
         }
 
     @property
@@ -134,3 +159,20 @@ class SharedCamerasSystemData:
     @property
     def cameras_write_queue(self):
         return self._data['cameras_write_queue']
+
+    @property
+    def frames_ring(self):
+        return self._data['frames_ring']
+
+    @property
+    def is_job_execute_process(self):
+        return self._data['is_job_execute_process'].value
+
+    @is_job_execute_process.setter
+    def is_job_execute_process(self, value):
+        self._data['is_job_execute_process'].value = value
+
+    # release the shared memory of the queue and the frames ring
+    def close(self):
+        self.cameras_read_queue.close()
+        self.frames_ring.close()
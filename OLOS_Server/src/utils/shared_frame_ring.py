@@ -0,0 +1,147 @@
+import struct
+import time
+from multiprocessing import shared_memory
+
+'''
+Ring of frame slots shared between processes, a process writes the frames (raw camera frames or
+encoded jpeg frames) directly into the shared memory and the other processes get only their metadata
+(frame id, size...), the frame content is copied once from the shared memory by the process using it
+
+- the frames are written in the slots one after the other, a slot is reused after all the other slots
+- the writer never waits for the readers: every slot has a sequence number (seqlock) incremented before
+  and after writing the slot, the reader copies the frame then checks that the sequence did not change,
+  a frame overwritten while it is read (or already overwritten) is not returned and the next one is used
+- the latest frame id is written after its slot, the readers can skip the frames older than the latest
+- the frames have a sequence number (frame id) and a timestamp, the frames of different rings captured
+  at the same time can be paired (stitching)
+- the writer can fill the slot itself (begin_write / end_write), the camera captures the frame directly
+  in the shared memory without copying it
+'''
+
+
+class SharedFrameRing:
+    # latest frame id written in the ring (0 = no frame)
+    HEADER_FORMAT = struct.Struct('<Q')
+    # sequence (odd while the slot is written), frame id, size, width, height and time of the frame
+    SLOT_HEADER_FORMAT = struct.Struct('<QQIHHd')
+
+    def __init__(self, slots_number=4, slot_size=4 * 1024 * 1024):
+        self._slots_number = slots_number
+        self._slot_size = slot_size
+
+        self._shared_memory = shared_memory.SharedMemory(
+            create=True, size=self.HEADER_FORMAT.size + self._get_slot_stride() * slots_number)
+        self._shared_memory.buf[:self.HEADER_FORMAT.size] = bytes(self.HEADER_FORMAT.size)
+        for slot in range(slots_number):
+            self.SLOT_HEADER_FORMAT.pack_into(self._shared_memory.buf, self._get_slot_start(slot), 0, 0, 0, 0, 0, 0)
+        self._is_owner = True
+        # slot being written (only in the writer process)
+        self._write_slot_start = None
+
+        self._init_buffer()
+
+    def _init_buffer(self):
+        self._buffer = self._shared_memory.buf
+
+    # the ring is sent to the child processes by the shared memory name
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shared_memory'] = self._shared_memory.name
+        state['_is_owner'] = False
+        del state['_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shared_memory = shared_memory.SharedMemory(
+            name=state['_shared_memory'])
+        self._init_buffer()
+
+    def _get_slot_stride(self):
+        return self.SLOT_HEADER_FORMAT.size + self._slot_size
+
+    def _get_slot_start(self, slot):
+        return self.HEADER_FORMAT.size + slot * self._get_slot_stride()
+
+    def get_slot_size(self):
+        return self._slot_size
+
+    def get_latest_frame_id(self):
+        return self.HEADER_FORMAT.unpack_from(self._buffer, 0)[0]
+
+    '''
+    frame_content: frame (bytes like object), width and height of the frame in pixels
+    return the metadata of the frame, None incase the frame is bigger than a slot
+    only one process writes in the ring
+    '''
+    def write(self, frame_content, width=0, height=0):
+        frame_content = memoryview(frame_content).cast('B')
+        if len(frame_content) > self._slot_size:
+            return None
+
+        slot_content = self.begin_write()
+        slot_content[:len(frame_content)] = frame_content
+        return self.end_write(len(frame_content), width, height)
+
+    # the next slot is marked as being written (odd sequence), return the slot content to fill
+    def begin_write(self):
+        frame_id = self.get_latest_frame_id() + 1
+        self._write_slot_start = self._get_slot_start(frame_id % self._slots_number)
+        data_start = self._write_slot_start + self.SLOT_HEADER_FORMAT.size
+
+        sequence = self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, self._write_slot_start)[0]
+        self.SLOT_HEADER_FORMAT.pack_into(self._buffer, self._write_slot_start, sequence + 1, 0, 0, 0, 0, 0)
+        return self._buffer[data_start:data_start + self._slot_size]
+
+    # the filled slot becomes the latest frame, return its metadata
+    def end_write(self, size, width=0, height=0, frame_time=None):
+        frame_id = self.get_latest_frame_id() + 1
+        frame_time = time.time() if frame_time is None else frame_time
+
+        sequence = self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, self._write_slot_start)[0]
+        self.SLOT_HEADER_FORMAT.pack_into(self._buffer, self._write_slot_start, sequence + 1, frame_id,
+                                          size, width, height, frame_time)
+        self.HEADER_FORMAT.pack_into(self._buffer, 0, frame_id)
+        self._write_slot_start = None
+
+        return {'frame_id': frame_id, 'size': size, 'width': width, 'height': height, 'time': frame_time}
+
+    # the slot was not filled (no frame captured), it stays empty
+    def cancel_write(self):
+        sequence = self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, self._write_slot_start)[0]
+        self.SLOT_HEADER_FORMAT.pack_into(self._buffer, self._write_slot_start, sequence + 1, 0, 0, 0, 0, 0)
+        self._write_slot_start = None
+
+    # metadata of the complete frames in the ring (from the oldest to the latest)
+    def get_frames_metadata(self):
+        frames_metadata = []
+        for slot in range(self._slots_number):
+            sequence, frame_id, size, width, height, frame_time = \
+                self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, self._get_slot_start(slot))
+            if not sequence % 2 and frame_id:
+                frames_metadata.append({'frame_id': frame_id, 'size': size,
+                                        'width': width, 'height': height, 'time': frame_time})
+        return sorted(frames_metadata, key=lambda frame_metadata: frame_metadata['frame_id'])
+
+    # copy of the frame content, None incase the frame is overwritten
+    def read(self, frame_id):
+        slot_start = self._get_slot_start(frame_id % self._slots_number)
+        data_start = slot_start + self.SLOT_HEADER_FORMAT.size
+
+        sequence, slot_frame_id, size, _, _, _ = self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, slot_start)
+        if sequence % 2 or slot_frame_id != frame_id:
+            return None
+
+        frame_content = bytes(self._buffer[data_start:data_start + size])
+
+        # the writer started writing the slot again while it was copied
+        if self.SLOT_HEADER_FORMAT.unpack_from(self._buffer, slot_start)[0] != sequence:
+            return None
+        return frame_content
+
+    def close(self):
+        self._buffer = None
+        self._shared_memory.close()
+        # only the process that created the ring removes the shared memory
+        if self._is_owner:
+            self._shared_memory.unlink()
@@ -0,0 +1,181 @@
+import pickle
+import queue
+import struct
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+
+'''
+Priority queue shared between processes without a manager server process
+every priority has its own ring buffer inside one shared memory block,
+the messages are pickled and copied directly into the ring buffer
+
+- put/get lock the queue only while copying the bytes (no round trip to another process)
+- empty() reads the ring buffers positions directly without locking
+- messages bigger than the ring buffer go through the pipe of their priority, a marker keeps their order
+'''
+
+
+class SharedMemoryPriorityQueue:
+    # head (read position) and tail (write position) of every ring buffer
+    POSITIONS_FORMAT = 'QQ'
+    POSITIONS_SIZE = struct.calcsize(POSITIONS_FORMAT)
+    # every message starts with its size
+    RECORD_SIZE_FORMAT = 'I'
+    RECORD_SIZE_LENGTH = struct.calcsize(RECORD_SIZE_FORMAT)
+    # marker for the messages sent through the overflow pipe
+    OVERFLOW_RECORD_MARKER = 0xFFFFFFFF
+
+    # wait 1 ms when the ring buffer is full
+    FULL_QUEUE_TIMEOUT = 0.001
+
+    def __init__(self, priorities_number=3, ring_buffer_size=1024 * 1024):
+        self._priorities_number = priorities_number
+        self._ring_buffer_size = ring_buffer_size
+        # keep enough space for other messages in the ring buffer
+        self._max_record_size = ring_buffer_size // 4
+
+        header_size = self.POSITIONS_SIZE * priorities_number
+        self._shared_memory = shared_memory.SharedMemory(
+            create=True, size=header_size + ring_buffer_size * priorities_number)
+        self._shared_memory.buf[:header_size] = bytes(header_size)
+        self._is_owner = True
+
+        self._lock = multiprocessing.Lock()
+        # count the messages inside the queue to block the get until a message is available
+        self._messages_semaphore = multiprocessing.Semaphore(0)
+        # one pipe for every priority so the big messages keep the priority order
+        self._overflow_queues = [multiprocessing.Queue() for _ in range(priorities_number)]
+
+        self._init_buffers()
+
+    def _init_buffers(self):
+        self._buffer = self._shared_memory.buf
+        self._header_size = self.POSITIONS_SIZE * self._priorities_number
+
+    # the queue is sent to the child processes by the shared memory name
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shared_memory'] = self._shared_memory.name
+        state['_is_owner'] = False
+        del state['_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shared_memory = shared_memory.SharedMemory(
+            name=state['_shared_memory'])
+        self._init_buffers()
+
+    def _get_positions(self, lane):
+        return struct.unpack_from(self.POSITIONS_FORMAT, self._buffer, lane * self.POSITIONS_SIZE)
+
+    def _set_positions(self, lane, head, tail):
+        struct.pack_into(self.POSITIONS_FORMAT, self._buffer,
+                         lane * self.POSITIONS_SIZE, head, tail)
+
+    def _get_lane(self, priority):
+        # priorities start from 1 (high priority)
+        return min(max(int(priority) - 1, 0), self._priorities_number - 1)
+
+    # copy bytes into the ring buffer, split them incase of reaching the end of the buffer
+    def _write_bytes(self, lane, position, data):
+        lane_start = self._header_size + lane * self._ring_buffer_size
+        offset = position % self._ring_buffer_size
+        first_part_size = min(len(data), self._ring_buffer_size - offset)
+
+        self._buffer[lane_start + offset:lane_start + offset + first_part_size] = \
+            data[:first_part_size]
+        if first_part_size < len(data):
+            self._buffer[lane_start:lane_start + len(data) - first_part_size] = \
+                data[first_part_size:]
+
+    def _read_bytes(self, lane, position, size):
+        lane_start = self._header_size + lane * self._ring_buffer_size
+        offset = position % self._ring_buffer_size
+        first_part_size = min(size, self._ring_buffer_size - offset)
+
+        data = bytes(
+            self._buffer[lane_start + offset:lane_start + offset + first_part_size])
+        if first_part_size < size:
+            data += bytes(self._buffer[lane_start:lane_start +
+                          size - first_part_size])
+        return data
+
+    def put(self, type, priority, item=None):
+        record = pickle.dumps((type, item), protocol=pickle.HIGHEST_PROTOCOL)
+        lane = self._get_lane(priority)
+
+        is_overflow_record = len(record) > self._max_record_size
+        record_size = self.RECORD_SIZE_LENGTH + \
+            (0 if is_overflow_record else len(record))
+
+        while True:
+            with self._lock:
+                head, tail = self._get_positions(lane)
+
+                if self._ring_buffer_size - (tail - head) >= record_size:
+                    if is_overflow_record:
+                        # send the message through the pipe before the marker (inside the lock to keep the order)
+                        self._overflow_queues[lane].put(record)
+                        self._write_bytes(lane, tail, struct.pack(
+                            self.RECORD_SIZE_FORMAT, self.OVERFLOW_RECORD_MARKER))
+                    else:
+                        self._write_bytes(lane, tail, struct.pack(
+                            self.RECORD_SIZE_FORMAT, len(record)))
+                        self._write_bytes(
+                            lane, tail + self.RECORD_SIZE_LENGTH, record)
+
+                    self._set_positions(lane, head, tail + record_size)
+                    break
+
+            # the ring buffer is full, wait for the consumer
+            time.sleep(self.FULL_QUEUE_TIMEOUT)
+
+        self._messages_semaphore.release()
+
+    def get(self, block=True, timeout=None):
+        if not self._messages_semaphore.acquire(block, timeout):
+            raise queue.Empty
+
+        record = None
+        with self._lock:
+            # read the message with the highest priority
+            for lane in range(self._priorities_number):
+                head, tail = self._get_positions(lane)
+                if head == tail:
+                    continue
+
+                record_size, = struct.unpack(self.RECORD_SIZE_FORMAT,
+                                             self._read_bytes(lane, head, self.RECORD_SIZE_LENGTH))
+
+                if record_size == self.OVERFLOW_RECORD_MARKER:
+                    record = self._overflow_queues[lane].get()
+                    record_size = 0
+                else:
+                    record = self._read_bytes(
+                        lane, head + self.RECORD_SIZE_LENGTH, record_size)
+
+                self._set_positions(
+                    lane, head + self.RECORD_SIZE_LENGTH + record_size, tail)
+                break
+
+        # the message is already taken by another consumer (flushing the queue)
+        if record is None:
+            raise queue.Empty
+
+        return pickle.loads(record)  # Return both type and item
+
+    def empty(self):
+        for lane in range(self._priorities_number):
+            head, tail = self._get_positions(lane)
+            if head != tail:
+                return False
+        return True
+
+    def close(self):
+        self._buffer = None
+        self._shared_memory.close()
+        # only the process that created the queue removes the shared memory
+        if self._is_owner:
+            self._shared_memory.unlink()
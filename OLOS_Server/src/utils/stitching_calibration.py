@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+
+'''
+Calibrate once stitching of the cameras frames: the cameras look at the flat machine bed, so every camera
+frame is placed on the frame of the first camera with a homography estimated once from the features of
+the frames, then every frame is composed with precomputed maps instead of stitching it again
+- the frames are already undistorted by the camera streams, the remap maps of every camera place the
+  frame pixels in the panorama (one remap per frame)
+- the seam masks are the blend weights of every camera, the frames are blended around the middle of
+  the overlap (blend width from the blend strength like the stitching feather blender)
+- the homographies are saved in a cache file with a fingerprint of the cameras calibration (it changes
+  the undistorted frames) and the algorithm settings, the maps and the seam masks are rebuilt from them
+  (a config change recalibrates)
+- the drift of the cameras is checked by estimating the homographies again, the calibration is replaced
+  only when the corners of a frame moved more than the drift tolerance
+'''
+
+
+class StitchingCalibration:
+    # version of the cache file, change it when the calibration is computed differently
+    CACHE_VERSION = 2
+
+    # matches of two frames kept by the ratio test and used for the homography
+    MATCH_RATIO = 0.75
+    MIN_MATCHES = 10
+    RANSAC_REPROJECTION_THRESHOLD = 3.0
+    # the panorama of a wrong homography is huge, the calibration is refused
+    MAX_CANVAS_AREA_RATIO = 4
+
+    def __init__(self, algorithm_settings=None, cameras_calibration=None):
+        self._algorithm_settings = dict(algorithm_settings or {})
+        # calibration used by the camera streams to undistort the frames
+        self._cameras_calibration = dict(cameras_calibration or {})
+
+        # homographies of the undistorted frames to the panorama, size of the panorama and of the frames
+        self._homographies = None
+        self._canvas_size = None
+        self._frames_sizes = None
+        # remap maps, position in the panorama (x, y, width, height), seam mask and blend weights of
+        # every camera, region of the panorama where the frames are blended
+        self._cameras_maps = []
+        self._blend_region = None
+
+    def is_calibrated(self):
+        return self._homographies is not None
+
+    '''
+    estimate the homographies of the frames (one frame of every camera captured together)
+    return True incase the cameras are calibrated
+    '''
+    def calibrate(self, frames):
+        homographies = self._estimate_homographies(frames)
+        if homographies is None:
+            return False
+
+        self._set_calibration(homographies, self._get_frames_sizes(frames))
+        return self.is_calibrated()
+
+    '''
+    estimate the homographies of the frames again and recalibrate incase a frame moved more than
+    the tolerance (pixels), return True incase the cameras are recalibrated
+    '''
+    def check_drift(self, frames, tolerance):
+        homographies = self._estimate_homographies(frames)
+        if homographies is None or self._get_frames_sizes(frames) != self._frames_sizes:
+            return False
+
+        drift = max(self._get_corners_displacement(homography, calibrated_homography, frames_size)
+                    for homography, calibrated_homography, frames_size
+                    in zip(homographies, self._get_frames_homographies(), self._frames_sizes))
+        if drift <= tolerance:
+            return False
+
+        self._set_calibration(homographies, self._frames_sizes)
+        return self.is_calibrated()
+
+    # compose the panorama of the frames with the precomputed maps and seam masks
+    def compose(self, frames):
+        canvas_width, canvas_height = self._canvas_size
+        panorama = np.zeros((canvas_height, canvas_width, 3), dtype=np.uint8)
+        blend_x, blend_y, blend_width, blend_height = self._blend_region
+        blend = np.zeros((blend_height, blend_width, 3), dtype=np.float32)
+
+        for frame, (map1, map2, (x, y, width, height), seam_mask, blend_slices, weights) in zip(
+                frames, self._cameras_maps):
+            warped_frame = cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+            # the pixels of only this camera are copied, the pixels around the seams are blended
+            cv2.copyTo(warped_frame, seam_mask, panorama[y:y + height, x:x + width])
+            if weights is not None:
+                region_slice, blend_slice = blend_slices
+                blend[blend_slice] += warped_frame[region_slice] * weights
+
+        if blend.size:
+            panorama[blend_y:blend_y + blend_height, blend_x:blend_x + blend_width] = blend + 0.5
+        return panorama
+
+    # load the cached calibration incase it matches the cameras calibration, settings and frames sizes
+    def load(self, cache_path, frames):
+        try:
+            with np.load(cache_path) as cache:
+                fingerprint = str(cache['fingerprint'])
+                homographies = list(cache['homographies'])
+        except (OSError, KeyError, ValueError):
+            return False
+
+        frames_sizes = self._get_frames_sizes(frames)
+        if fingerprint != self._get_fingerprint(frames_sizes):
+            return False
+
+        self._set_calibration(homographies, frames_sizes)
+        return self.is_calibrated()
+
+    def save(self, cache_path):
+        try:
+            # write the calibration in a temporary file first to not leave a broken cache behind
+            temporary_cache_path = cache_path + '.tmp'
+            with open(temporary_cache_path, 'wb') as cache_file:
+                np.savez(cache_file, fingerprint=np.array(self._get_fingerprint(self._frames_sizes)),
+                         homographies=np.array(self._get_frames_homographies()))
+            os.replace(temporary_cache_path, cache_path)
+
+        except OSError as error:
+            if os.getenv('ENV') == 'development':
+                print('Stitching Calibration Error:', error)
+
+    # the cache is used only for the same cameras calibration, algorithm settings and frames sizes
+    def _get_fingerprint(self, frames_sizes):
+        fingerprint = json.dumps({
+            'version': self.CACHE_VERSION,
+            'cameras_calibration': self._cameras_calibration,
+            'algorithm_settings': self._algorithm_settings,
+            'frames_sizes': frames_sizes}, sort_keys=True, default=str)
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+    def _get_frames_sizes(self, frames):
+        return [[frame.shape[1], frame.shape[0]] for frame in frames]
+
+    # homographies of the undistorted frames to the first camera frame (without the panorama offset)
+    def _get_frames_homographies(self):
+        offset = self._homographies[0]
+        return [np.linalg.inv(offset) @ homography for homography in self._homographies]
+
+    # largest distance between the corners of the frame placed with the two homographies
+    def _get_corners_displacement(self, homography, other_homography, frame_size):
+        corners = self._get_frame_corners(frame_size)
+        return float(np.max(np.linalg.norm(cv2.perspectiveTransform(corners, homography) -
+                                           cv2.perspectiveTransform(corners, other_homography), axis=2)))
+
+    def _get_frame_corners(self, frame_size):
+        width, height = frame_size
+        return np.array([[[0, 0]], [[width, 0]], [[width, height]], [[0, height]]], dtype=np.float64)
+
+    '''
+    homographies of the undistorted frames to the first camera frame, every camera is matched with the
+    previous camera (cameras placed one next to the other), None incase the frames cannot be matched
+    '''
+    def _estimate_homographies(self, frames):
+        detector, norm_type = self._create_detector()
+        matcher = cv2.BFMatcher(norm_type)
+
+        features = []
+        for frame in frames:
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            features.append(detector.detectAndCompute(gray_frame, None))
+
+        homographies = [np.eye(3)]
+        for (keypoints, descriptors), (previous_keypoints, previous_descriptors) in zip(features[1:], features):
+            if descriptors is None or previous_descriptors is None or len(previous_descriptors) < 2:
+                return None
+
+            matches = [pair[0] for pair in matcher.knnMatch(descriptors, previous_descriptors, k=2)
+                       if len(pair) == 2 and pair[0].distance < self.MATCH_RATIO * pair[1].distance]
+            if len(matches) < self.MIN_MATCHES:
+                return None
+
+            points = np.float32([keypoints[match.queryIdx].pt for match in matches]).reshape(-1, 1, 2)
+            previous_points = np.float32([previous_keypoints[match.trainIdx].pt
+                                          for match in matches]).reshape(-1, 1, 2)
+            homography, inliers_mask = cv2.findHomography(points, previous_points, cv2.RANSAC,
+                                                          self.RANSAC_REPROJECTION_THRESHOLD)
+            if homography is None:
+                return None
+
+            # same confidence as the stitching matcher: inliers / (8 + 0.3 * matches)
+            inliers_number = int(inliers_mask.sum())
+            confidence = inliers_number / (8 + 0.3 * len(matches))
+            if (inliers_number < self.MIN_MATCHES or
+                    confidence < float(self._algorithm_settings.get('confidence_threshold') or 0)):
+                return None
+
+            homographies.append(homographies[-1] @ homography)
+
+        return [homography / homography[2, 2] for homography in homographies]
+
+    # feature detector of the algorithm settings and the norm to match its descriptors
+    def _create_detector(self):
+        detector = str(self._algorithm_settings.get('detector') or 'orb').lower()
+        nfeatures = int(self._algorithm_settings.get('nfeatures') or 500)
+
+        if detector == 'sift':
+            return cv2.SIFT_create(nfeatures), cv2.NORM_L2
+        if detector == 'brisk':
+            return cv2.BRISK_create(), cv2.NORM_HAMMING
+        if detector == 'akaze':
+            return cv2.AKAZE_create(), cv2.NORM_HAMMING
+        return cv2.ORB_create(nfeatures), cv2.NORM_HAMMING
+
+    # place the frames in the panorama and build the maps and seam masks of every camera
+    def _set_calibration(self, homographies, frames_sizes):
+        frames_corners = [cv2.perspectiveTransform(self._get_frame_corners(frame_size), homography)
+                          for homography, frame_size in zip(homographies, frames_sizes)]
+        corners = np.concatenate(frames_corners).reshape(-1, 2)
+        min_x, min_y = np.floor(corners.min(axis=0))
+        max_x, max_y = np.ceil(corners.max(axis=0))
+        canvas_width, canvas_height = int(max_x - min_x), int(max_y - min_y)
+
+        frames_area = sum(width * height for width, height in frames_sizes)
+        if canvas_width * canvas_height > self.MAX_CANVAS_AREA_RATIO * frames_area:
+            if os.getenv('ENV') == 'development':
+                print('Stitching Calibration Error: the frames cannot be placed on the bed')
+            return
+
+        offset = np.array([[1, 0, -min_x], [0, 1, -min_y], [0, 0, 1]], dtype=np.float64)
+        canvas_homographies = [offset @ homography for homography in homographies]
+
+        # position of every frame in the panorama and its pixels seen by the camera
+        frames_regions = []
+        for homography, frame_corners, frame_size in zip(canvas_homographies, frames_corners, frames_sizes):
+            frame_corners = frame_corners.reshape(-1, 2) - (min_x, min_y)
+            x, y = np.maximum(np.floor(frame_corners.min(axis=0)), 0).astype(int)
+            end_x, end_y = np.minimum(np.ceil(frame_corners.max(axis=0)),
+                                      (canvas_width, canvas_height)).astype(int)
+            map_x, map_y, valid_mask = self._get_frame_maps(homography, frame_size, (x, y, end_x - x, end_y - y))
+            frames_regions.append(((x, y, end_x - x, end_y - y), map_x, map_y, valid_mask))
+
+        seams_weights = self._get_seams_weights(frames_regions, (canvas_width, canvas_height))
+
+        # the blended pixels are in a region around the seams, the other pixels are seen by one camera
+        blend_mask = np.any((seams_weights > 0) & (seams_weights < 1), axis=0)
+        blend_x, blend_y, blend_width, blend_height = cv2.boundingRect(blend_mask.astype(np.uint8))
+
+        self._cameras_maps = []
+        for ((x, y, width, height), map_x, map_y, _), seam_weights in zip(frames_regions, seams_weights):
+            # fixed point maps are faster to remap
+            map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+            seam_mask = (seam_weights[y:y + height, x:x + width] == 1).astype(np.uint8)
+
+            # region of the camera frame blended with the other frames
+            start_x, start_y = max(x, blend_x), max(y, blend_y)
+            end_x, end_y = min(x + width, blend_x + blend_width), min(y + height, blend_y + blend_height)
+            blend_slices, weights = None, None
+            if start_x < end_x and start_y < end_y:
+                blend_slices = ((slice(start_y - y, end_y - y), slice(start_x - x, end_x - x)),
+                                (slice(start_y - blend_y, end_y - blend_y), slice(start_x - blend_x, end_x - blend_x)))
+                weights = seam_weights[start_y:end_y, start_x:end_x, np.newaxis].copy()
+            self._cameras_maps.append((map1, map2, (x, y, width, height), seam_mask, blend_slices, weights))
+
+        self._blend_region = (blend_x, blend_y, blend_width, blend_height)
+        self._homographies = canvas_homographies
+        self._canvas_size = (canvas_width, canvas_height)
+        self._frames_sizes = [list(frame_size) for frame_size in frames_sizes]
+
+    # maps of the panorama region (x, y, width, height) to the frame pixels with the inverse homography
+    def _get_frame_maps(self, homography, frame_size, region):
+        x, y, width, height = region
+        frame_width, frame_height = frame_size
+        inverse_homography = np.linalg.inv(homography)
+
+        columns, rows = np.meshgrid(np.arange(x, x + width, dtype=np.float64),
+                                    np.arange(y, y + height, dtype=np.float64))
+        scale = inverse_homography[2, 0] * columns + inverse_homography[2, 1] * rows + inverse_homography[2, 2]
+        map_x = ((inverse_homography[0, 0] * columns + inverse_homography[0, 1] * rows +
+                  inverse_homography[0, 2]) / scale).astype(np.float32)
+        map_y = ((inverse_homography[1, 0] * columns + inverse_homography[1, 1] * rows +
+                  inverse_homography[1, 2]) / scale).astype(np.float32)
+
+        valid_mask = ((scale > 0) &
+                      (map_x >= 0) & (map_x <= frame_width - 1) &
+                      (map_y >= 0) & (map_y <= frame_height - 1))
+        # the pixels not seen by the camera are read outside of the frame (black)
+        map_x[~valid_mask] = -1
+        map_y[~valid_mask] = -1
+        return map_x, map_y, valid_mask
+
+    '''
+    blend weights of every camera in the panorama: the seam is where the pixel is at the same distance
+    of the border of the two frames, the frames are blended on the blend width around the seam
+    '''
+    def _get_seams_weights(self, frames_regions, canvas_size):
+        canvas_width, canvas_height = canvas_size
+        blend_strength = float(self._algorithm_settings.get('blend_strength') or 0)
+        blend_width = max(np.sqrt(canvas_width * canvas_height) * blend_strength / 100, 1)
+
+        distances = []
+        for (x, y, width, height), _, _, valid_mask in frames_regions:
+            mask = np.zeros((canvas_height, canvas_width), dtype=np.uint8)
+            mask[y:y + height, x:x + width] = valid_mask
+            mask = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            distances.append(cv2.distanceTransform(mask, cv2.DIST_L2, 3)[1:-1, 1:-1])
+
+        distances = np.array(distances)
+        seams_weights = []
+        for camera_index, distance in enumerate(distances):
+            other_distance = (np.max(np.delete(distances, camera_index, axis=0), axis=0)
+                              if len(distances) > 1 else np.zeros_like(distance))
+            weights = np.clip(0.5 + (distance - other_distance) / (2 * blend_width), 0, 1)
+            weights[distance <= 0] = 0
+            seams_weights.append(weights)
+
+        # the weights of a pixel add up to 1
+        weights_sum = np.sum(seams_weights, axis=0)
+        weights_sum[weights_sum == 0] = 1
+        return (np.array(seams_weights) / weights_sum).astype(np.float32)
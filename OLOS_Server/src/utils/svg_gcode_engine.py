@@ -0,0 +1,585 @@
+import math
+import re
+from xml.etree import ElementTree
+import numpy as np
+
+'''
+Convert the shapes of an svg file to laser cutting gcode inside the server process (no temporary files or subprocess)
+it writes the same gcode dialect as the svg2gcode tool that was used before:
+- every visible shape (path, rect, circle, ellipse, line, polyline, polygon) is cut with the same power and speed
+- every sub path starts with a fast move "G0 X<x> Y<y>" with the laser off (M5) then the laser is turned on (M3 / M4)
+  and the sub path is cut with "G1 X<x> Y<y>" moves, an axis that does not change is not written
+- the curves (bezier curves and arcs) are flattened to lines, the distance between a curve and its lines
+  is less than the curve tolerance (mm)
+- the sub paths are cut in the svg order, or in the order of the path optimizer (shorter travel, inner contours first)
+
+the svg is placed on the machine like the images:
+- the view box is scaled to the size of the document on the machine (mm) and the y axis is flipped,
+  so the bottom left corner of the document is at (0, 0), a negative size mirrors the document
+- without a size the document size is its width and height converted to pixels (1 pixel = 1 mm like the interface)
+- the document is rotated (counter clockwise) by the user, then moved back to the positive quadrant
+- the offset moves the document to its position on the machine bed (mm)
+the transform attributes of the groups and the shapes are applied on top of the document transform,
+the lengths with units (mm, in, pt...) inside the svg are converted to user units (pixels)
+'''
+
+
+class SvgGcodeEngine:
+    # max distance between a curve and its lines (mm)
+    DEFAULT_CURVE_TOLERANCE = 0.01
+    # digits after the decimal point of the coordinates (mm)
+    PRECISION = 3
+
+    # rapid move, XY plane, cutter compensation off, coordinate system 1, feed rate in mm/min
+    GCODE_INIT = 'G0 G17 G40 G54 G94\nG21\nG90\n'
+    # laser off, program stop
+    GCODE_FOOTER = 'M5\nM2\n'
+
+    # size of the svg units in pixels (96 pixels per inch)
+    UNITS_PIXELS = {'': 1, 'px': 1, 'in': 96, 'cm': 96 / 2.54, 'mm': 96 / 25.4,
+                    'q': 96 / 101.6, 'pt': 96 / 72, 'pc': 16}
+
+    SHAPES_TAGS = ('path', 'rect', 'circle', 'ellipse',
+                   'line', 'polyline', 'polygon')
+    # elements that are not drawn (or only drawn when they are referenced)
+    HIDDEN_TAGS = ('defs', 'clipPath', 'mask', 'symbol', 'marker', 'pattern',
+                   'title', 'desc', 'metadata', 'style', 'script', 'image', 'text')
+
+    # number of arguments of every path command
+    PATH_COMMANDS_ARGUMENTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4,
+                               'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+    NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+    # the arc flags can be written without separators (a10 10 0 1150 50)
+    FLAG_PATTERN = re.compile(r'[01]')
+    SEPARATORS_PATTERN = re.compile(r'[\s,]*')
+    LENGTH_PATTERN = re.compile(
+        r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-zA-Z%]*)\s*$')
+    TRANSFORM_PATTERN = re.compile(
+        r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+
+    def __init__(self, power, speed, curve_tolerance=DEFAULT_CURVE_TOLERANCE, constant_burn=True, path_optimizer=None):
+        self._power = power
+        self._speed = speed
+        self._curve_tolerance = curve_tolerance or self.DEFAULT_CURVE_TOLERANCE
+        self._laser_on_command = 'M3' if constant_burn else 'M4'
+        # order of the sub paths, the svg order is kept without optimizer
+        self._path_optimizer = path_optimizer
+
+        # bezier curves basis for every number of segments
+        self._cubic_bases = {}
+        self._quadratic_bases = {}
+
+    def generate(self, svg_content, size=None, rotation=0, offset=(0, 0)):
+        sub_paths = self.get_sub_paths(svg_content, size, rotation, offset)
+
+        header = (f';    svg engine: power {self._power}, speed {self._speed}, '
+                  f'curve tolerance {self._curve_tolerance} mm\n')
+        if sub_paths:
+            points = np.concatenate(sub_paths)
+            min_x, min_y = points.min(axis=0).tolist()
+            max_x, max_y = points.max(axis=0).tolist()
+            header += (f';    paths: {len(sub_paths)}, bounding box: '
+                       f'(X{min_x},Y{min_y}:X{max_x},Y{max_y})\n')
+
+        if sub_paths and self._path_optimizer:
+            travel_distance = self._path_optimizer.get_travel_distance(sub_paths)
+            sub_paths = self._path_optimizer.optimize(sub_paths)
+            optimized_travel_distance = self._path_optimizer.get_travel_distance(sub_paths)
+            saved_time = self._path_optimizer.get_travel_time(
+                travel_distance - optimized_travel_distance)
+            header += (f';    travel: {travel_distance:.1f} mm -> {optimized_travel_distance:.1f} mm, '
+                       f'estimated time saved: {saved_time:.1f} s\n')
+
+        return header + ';\n\n' + self.GCODE_INIT + \
+            self.generate_moves(sub_paths) + self.GCODE_FOOTER
+
+    def generate_moves(self, sub_paths):
+        gcode = []
+        # the power and the speed are modal, they are written on the first cut move only
+        power_and_speed = f' S{self._power} F{self._speed}'
+
+        for points in sub_paths:
+            points = points.tolist()
+            x, y = points[0]
+            gcode.append(f'M5\nG0 X{x!r} Y{y!r}\n{self._laser_on_command}')
+
+            for next_x, next_y in points[1:]:
+                if next_x == x and next_y == y:
+                    continue
+
+                move = 'G1'
+                if next_x != x:
+                    move += f' X{next_x!r}'
+                if next_y != y:
+                    move += f' Y{next_y!r}'
+                if power_and_speed:
+                    move += power_and_speed
+                    power_and_speed = ''
+
+                gcode.append(move)
+                x, y = next_x, next_y
+
+        return '\n'.join(gcode) + '\n' if gcode else ''
+
+    # every sub path of the visible shapes in machine coordinates (mm), rounded to the gcode precision
+    def get_sub_paths(self, svg_content, size=None, rotation=0, offset=(0, 0)):
+        try:
+            root = ElementTree.fromstring(svg_content)
+        except ElementTree.ParseError as e:
+            raise ValueError(f'Invalid svg file: {e}')
+
+        document_transform = self.get_document_transform(
+            root, size, rotation, offset)
+
+        sub_paths = []
+        self._add_element_sub_paths(
+            root, document_transform, True, sub_paths)
+
+        rounded_sub_paths = []
+        for points in sub_paths:
+            if len(points) > 1:
+                # + 0.0 removes the negative zeros
+                rounded_sub_paths.append(
+                    np.round(np.array(points), self.PRECISION) + 0.0)
+        return rounded_sub_paths
+
+    # svg user units to machine coordinates
+    def get_document_transform(self, root, size=None, rotation=0, offset=(0, 0)):
+        width = self.parse_length(root.get('width'))
+        height = self.parse_length(root.get('height'))
+
+        view_box = [float(value) for value in
+                    self.NUMBER_PATTERN.findall(root.get('viewBox') or '')]
+        if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+            view_box_x, view_box_y, view_box_width, view_box_height = view_box
+        else:
+            view_box_x, view_box_y = 0, 0
+            view_box_width, view_box_height = width or 0, height or 0
+
+        # the percentages are relative to the view box
+        width = self.parse_length(root.get('width'), view_box_width) or view_box_width
+        height = self.parse_length(root.get('height'), view_box_height) or view_box_height
+        if not view_box_width or not view_box_height:
+            raise ValueError('The svg file has no size (width, height or viewBox)')
+
+        # move the top left corner of the view box to (0, 0) and flip the y axis up
+        transform = self.get_translation(-view_box_x, -view_box_y)
+        transform = self.get_scaling(1, -1) @ transform
+        transform = self.get_translation(0, view_box_height) @ transform
+
+        # view box size to the document size on the machine
+        document_width, document_height = size if size else (width, height)
+        transform = self.get_scaling(document_width / view_box_width,
+                                     document_height / view_box_height) @ transform
+        if rotation:
+            transform = self.get_rotation(rotation) @ transform
+
+        # move the scaled, rotated (or mirrored) document back to the positive quadrant
+        corners = transform @ np.array([[view_box_x, view_box_x + view_box_width, view_box_x, view_box_x + view_box_width],
+                                        [view_box_y, view_box_y, view_box_y + view_box_height, view_box_y + view_box_height],
+                                        [1, 1, 1, 1]])
+        min_x, min_y = corners[0].min(), corners[1].min()
+
+        return self.get_translation(offset[0] - min_x, offset[1] - min_y) @ transform
+
+    def _add_element_sub_paths(self, element, transform, is_visible, sub_paths):
+        for child in element:
+            if not isinstance(child.tag, str):
+                # comments and processing instructions
+                continue
+
+            tag = child.tag.rpartition('}')[2]
+            style = self.parse_style(child)
+            if tag in self.HIDDEN_TAGS or style.get('display') == 'none':
+                continue
+
+            # the visibility is inherited but it can be changed by the children
+            visibility = style.get('visibility')
+            child_is_visible = is_visible if visibility is None else visibility == 'visible'
+
+            child_transform = transform
+            if child.get('transform'):
+                child_transform = transform @ self.parse_transform(
+                    child.get('transform'))
+
+            if tag in self.SHAPES_TAGS:
+                if child_is_visible:
+                    try:
+                        commands = self.get_shape_commands(tag, child)
+                    except ValueError:
+                        continue
+                    sub_paths.extend(self.get_commands_sub_paths(
+                        commands, child_transform))
+            else:
+                # groups, links, nested svg...
+                self._add_element_sub_paths(
+                    child, child_transform, child_is_visible, sub_paths)
+
+    @classmethod
+    def parse_style(cls, element):
+        style = {}
+        for declaration in (element.get('style') or '').split(';'):
+            name, _, value = declaration.partition(':')
+            if value:
+                style[name.strip()] = value.strip()
+
+        # the presentation attributes have a lower priority than the style attribute
+        for name in ('display', 'visibility'):
+            if name not in style and element.get(name):
+                style[name] = element.get(name).strip()
+        return style
+
+    @classmethod
+    def parse_length(cls, value, reference=None):
+        if value is None:
+            return None
+
+        match = cls.LENGTH_PATTERN.match(value)
+        if not match:
+            return None
+
+        number, unit = float(match.group(1)), match.group(2).lower()
+        if unit == '%':
+            return number * reference / 100 if reference else None
+        if unit in ('em', 'ex'):
+            # default font size
+            return number * 16 if unit == 'em' else number * 8
+        if unit not in cls.UNITS_PIXELS:
+            raise ValueError(f'Unsupported unit: {unit}')
+        return number * cls.UNITS_PIXELS[unit]
+
+    @classmethod
+    def parse_transform(cls, transform_attribute):
+        transform = np.identity(3)
+
+        for name, arguments in cls.TRANSFORM_PATTERN.findall(transform_attribute):
+            values = [float(value) for value in cls.NUMBER_PATTERN.findall(arguments)]
+
+            if name == 'matrix' and len(values) == 6:
+                a, b, c, d, e, f = values
+                matrix = np.array([[a, c, e], [b, d, f], [0, 0, 1]])
+            elif name == 'translate' and values:
+                matrix = cls.get_translation(
+                    values[0], values[1] if len(values) > 1 else 0)
+            elif name == 'scale' and values:
+                matrix = cls.get_scaling(
+                    values[0], values[1] if len(values) > 1 else values[0])
+            elif name == 'rotate' and values:
+                center_x, center_y = values[1:3] if len(values) == 3 else (0, 0)
+                matrix = cls.get_translation(center_x, center_y) @ cls.get_rotation(values[0]) @ \
+                    cls.get_translation(-center_x, -center_y)
+            elif name == 'skewX' and values:
+                matrix = np.array([[1, math.tan(math.radians(values[0])), 0], [0, 1, 0], [0, 0, 1]])
+            elif name == 'skewY' and values:
+                matrix = np.array([[1, 0, 0], [math.tan(math.radians(values[0])), 1, 0], [0, 0, 1]])
+            else:
+                raise ValueError(f'Invalid transform: {name}({arguments})')
+
+            transform = transform @ matrix
+
+        return transform
+
+    @classmethod
+    def get_translation(cls, x, y):
+        return np.array([[1, 0, x], [0, 1, y], [0, 0, 1]], dtype=float)
+
+    @classmethod
+    def get_scaling(cls, x, y):
+        return np.array([[x, 0, 0], [0, y, 0], [0, 0, 1]], dtype=float)
+
+    # counter clockwise rotation (y axis up)
+    @classmethod
+    def get_rotation(cls, angle):
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        return np.array([[cos, -sin, 0], [sin, cos, 0], [0, 0, 1]])
+
+    # path commands of the shape with absolute coordinates
+    def get_shape_commands(self, tag, element):
+        def length(name):
+            return self.parse_length(element.get(name, '0')) or 0
+
+        if tag == 'path':
+            return self.parse_path_data(element.get('d') or '')
+
+        if tag == 'line':
+            return [('M', (length('x1'), length('y1'))), ('L', (length('x2'), length('y2')))]
+
+        if tag in ('polyline', 'polygon'):
+            values = [float(value) for value in
+                      self.NUMBER_PATTERN.findall(element.get('points') or '')]
+            points = list(zip(values[0::2], values[1::2]))
+            if not points:
+                return []
+            commands = [('M', points[0])] + [('L', point) for point in points[1:]]
+            return commands + [('Z', ())] if tag == 'polygon' else commands
+
+        if tag in ('circle', 'ellipse'):
+            center_x, center_y = length('cx'), length('cy')
+            if tag == 'circle':
+                radius_x = radius_y = length('r')
+            else:
+                radius_x, radius_y = length('rx'), length('ry')
+            if radius_x <= 0 or radius_y <= 0:
+                return []
+            return [('M', (center_x + radius_x, center_y)),
+                    ('A', (radius_x, radius_y, 0, 0, 1, center_x - radius_x, center_y)),
+                    ('A', (radius_x, radius_y, 0, 0, 1, center_x + radius_x, center_y)),
+                    ('Z', ())]
+
+        # rect
+        x, y, width, height = length('x'), length('y'), length('width'), length('height')
+        if width <= 0 or height <= 0:
+            return []
+        # a missing corner radius is the same as the other one
+        radius_x = self.parse_length(element.get('rx')) if element.get('rx') else None
+        radius_y = self.parse_length(element.get('ry')) if element.get('ry') else None
+        radius_x = min(radius_x if radius_x is not None else radius_y or 0, width / 2)
+        radius_y = min(radius_y if radius_y is not None else radius_x or 0, height / 2)
+
+        if radius_x <= 0 or radius_y <= 0:
+            return [('M', (x, y)), ('L', (x + width, y)), ('L', (x + width, y + height)),
+                    ('L', (x, y + height)), ('Z', ())]
+
+        corner = (radius_x, radius_y, 0, 0, 1)
+        return [('M', (x + radius_x, y)), ('L', (x + width - radius_x, y)),
+                ('A', corner + (x + width, y + radius_y)), ('L', (x + width, y + height - radius_y)),
+                ('A', corner + (x + width - radius_x, y + height)), ('L', (x + radius_x, y + height)),
+                ('A', corner + (x, y + height - radius_y)), ('L', (x, y + radius_y)),
+                ('A', corner + (x + radius_x, y)), ('Z', ())]
+
+    # path data to absolute commands: (command, arguments) with the commands M, L, C, Q, A and Z
+    @classmethod
+    def parse_path_data(cls, path_data):
+        commands = []
+        position = 0
+        command = None
+        length = len(path_data)
+
+        current_x = current_y = 0.0
+        start_x = start_y = 0.0
+        # last control point of the previous bezier curve for the smooth curves (S, T)
+        last_cubic_control = last_quadratic_control = None
+
+        while True:
+            position = cls.SEPARATORS_PATTERN.match(path_data, position).end()
+            if position >= length:
+                break
+
+            if path_data[position].upper() in cls.PATH_COMMANDS_ARGUMENTS:
+                command = path_data[position]
+                position += 1
+                if command not in 'Zz':
+                    continue
+            elif command is None or command in 'Zz':
+                # the path data is broken, the path is drawn until the error
+                break
+
+            # read the arguments of the command (repeated commands have no letter)
+            arguments = []
+            for index in range(cls.PATH_COMMANDS_ARGUMENTS[command.upper()]):
+                position = cls.SEPARATORS_PATTERN.match(path_data, position).end()
+                pattern = cls.FLAG_PATTERN if command in 'Aa' and index in (3, 4) else cls.NUMBER_PATTERN
+                match = pattern.match(path_data, position)
+                if not match:
+                    break
+                arguments.append(float(match.group()))
+                position = match.end()
+            else:
+                absolute_command = command.upper()
+                # relative coordinates
+                if command.islower():
+                    if absolute_command == 'H':
+                        arguments[0] += current_x
+                    elif absolute_command == 'V':
+                        arguments[0] += current_y
+                    elif absolute_command == 'A':
+                        arguments[5] += current_x
+                        arguments[6] += current_y
+                    elif absolute_command != 'Z':
+                        for index in range(0, len(arguments), 2):
+                            arguments[index] += current_x
+                            arguments[index + 1] += current_y
+
+                cubic_control = quadratic_control = None
+
+                if absolute_command == 'M':
+                    start_x, start_y = arguments
+                    commands.append(('M', arguments))
+                    # the next coordinates are lines
+                    command = 'l' if command == 'm' else 'L'
+                elif absolute_command in ('L', 'H', 'V'):
+                    if absolute_command == 'H':
+                        arguments = [arguments[0], current_y]
+                    elif absolute_command == 'V':
+                        arguments = [current_x, arguments[0]]
+                    commands.append(('L', arguments))
+                elif absolute_command == 'C':
+                    commands.append(('C', arguments))
+                    cubic_control = arguments[2:4]
+                elif absolute_command == 'S':
+                    # the first control point is the reflection of the previous one
+                    control_x, control_y = (2 * current_x - last_cubic_control[0], 2 * current_y - last_cubic_control[1]) \
+                        if last_cubic_control else (current_x, current_y)
+                    commands.append(('C', [control_x, control_y] + arguments))
+                    cubic_control = arguments[0:2]
+                elif absolute_command == 'Q':
+                    commands.append(('Q', arguments))
+                    quadratic_control = arguments[0:2]
+                elif absolute_command == 'T':
+                    quadratic_control = (2 * current_x - last_quadratic_control[0], 2 * current_y - last_quadratic_control[1]) \
+                        if last_quadratic_control else (current_x, current_y)
+                    commands.append(('Q', list(quadratic_control) + arguments))
+                elif absolute_command == 'A':
+                    commands.append(('A', arguments))
+                else:
+                    commands.append(('Z', ()))
+                    arguments = [start_x, start_y]
+
+                current_x, current_y = arguments[-2:]
+                last_cubic_control, last_quadratic_control = cubic_control, quadratic_control
+                continue
+
+            # missing arguments
+            break
+
+        return commands
+
+    # flatten the commands to sub paths (lists of points) in machine coordinates
+    def get_commands_sub_paths(self, commands, transform):
+        (a, c, e), (b, d, f) = transform[:2].tolist()
+        # max size of a unit in machine coordinates to choose the number of segments of the arcs
+        transform_scale = np.linalg.norm(transform[:2, :2], 2)
+
+        sub_paths = []
+        points = None
+        current_x = current_y = 0.0
+        start_x = start_y = 0.0
+
+        for command, arguments in commands:
+            if command == 'M':
+                current_x, current_y = start_x, start_y = arguments
+                points = [(a * current_x + c * current_y + e, b * current_x + d * current_y + f)]
+                sub_paths.append(points)
+                continue
+
+            if points is None:
+                # a path must start with a move
+                break
+
+            if command == 'Z':
+                points.append(points[0])
+                current_x, current_y = start_x, start_y
+                # the next commands without a move start a new sub path from the same point
+                points = [points[0]]
+                sub_paths.append(points)
+                continue
+
+            if command == 'L':
+                x, y = arguments
+                points.append((a * x + c * y + e, b * x + d * y + f))
+
+            elif command in ('C', 'Q'):
+                control_points = [(current_x, current_y)] + \
+                    list(zip(arguments[0::2], arguments[1::2]))
+                control_points = [(a * x + c * y + e, b * x + d * y + f)
+                                  for x, y in control_points]
+                points.extend(self.flatten_bezier(control_points))
+
+            elif command == 'A':
+                points.extend(self.flatten_arc(current_x, current_y, arguments,
+                                               transform, transform_scale))
+
+            current_x, current_y = arguments[-2:]
+
+        return sub_paths
+
+    # points of the bezier curve (without its start point)
+    def flatten_bezier(self, control_points):
+        control_points = np.array(control_points)
+
+        # the distance between a curve and its lines is less than max(second derivative) / (8 * segments ^ 2)
+        second_differences = control_points[2:] - 2 * \
+            control_points[1:-1] + control_points[:-2]
+        degree = len(control_points) - 1
+        max_second_derivative = degree * (degree - 1) * \
+            np.sqrt((second_differences ** 2).sum(axis=1)).max()
+        segments = max(1, math.ceil(math.sqrt(
+            max_second_derivative / (8 * self._curve_tolerance))))
+
+        return (self._get_bezier_basis(degree, segments) @ control_points).tolist()
+
+    # bernstein polynomials for t in (0, 1], calculated once per number of segments
+    def _get_bezier_basis(self, degree, segments):
+        bases = self._cubic_bases if degree == 3 else self._quadratic_bases
+        if segments not in bases:
+            t = np.linspace(0, 1, segments + 1)[1:, None]
+            if degree == 3:
+                bases[segments] = np.hstack(((1 - t) ** 3, 3 * (1 - t) ** 2 * t,
+                                             3 * (1 - t) * t ** 2, t ** 3))
+            else:
+                bases[segments] = np.hstack(((1 - t) ** 2, 2 * (1 - t) * t, t ** 2))
+        return bases[segments]
+
+    # points of the elliptical arc (without its start point)
+    # the center parameterization comes from the svg implementation notes (https://www.w3.org/TR/SVG2/implnote.html)
+    def flatten_arc(self, start_x, start_y, arguments, transform, transform_scale):
+        radius_x, radius_y, angle, large_arc, sweep, end_x, end_y = arguments
+        radius_x, radius_y = abs(radius_x), abs(radius_y)
+
+        if (start_x == end_x and start_y == end_y):
+            return []
+        if radius_x == 0 or radius_y == 0:
+            return [tuple((transform @ (end_x, end_y, 1))[:2].tolist())]
+
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        half_x, half_y = (start_x - end_x) / 2, (start_y - end_y) / 2
+        prime_x = cos * half_x + sin * half_y
+        prime_y = -sin * half_x + cos * half_y
+
+        # the radii are too small, scale them up
+        radii_scale = (prime_x / radius_x) ** 2 + (prime_y / radius_y) ** 2
+        if radii_scale > 1:
+            radius_x *= math.sqrt(radii_scale)
+            radius_y *= math.sqrt(radii_scale)
+
+        numerator = (radius_x * radius_y) ** 2 - (radius_x * prime_y) ** 2 - (radius_y * prime_x) ** 2
+        denominator = (radius_x * prime_y) ** 2 + (radius_y * prime_x) ** 2
+        factor = math.sqrt(max(0, numerator / denominator))
+        if large_arc == sweep:
+            factor = -factor
+        center_prime_x = factor * radius_x * prime_y / radius_y
+        center_prime_y = -factor * radius_y * prime_x / radius_x
+
+        center_x = cos * center_prime_x - sin * center_prime_y + (start_x + end_x) / 2
+        center_y = sin * center_prime_x + cos * center_prime_y + (start_y + end_y) / 2
+
+        start_angle = math.atan2((prime_y - center_prime_y) / radius_y,
+                                 (prime_x - center_prime_x) / radius_x)
+        end_angle = math.atan2((-prime_y - center_prime_y) / radius_y,
+                               (-prime_x - center_prime_x) / radius_x)
+        sweep_angle = end_angle - start_angle
+        if sweep and sweep_angle < 0:
+            sweep_angle += 2 * math.pi
+        elif not sweep and sweep_angle > 0:
+            sweep_angle -= 2 * math.pi
+
+        # the distance between an arc and its chord is radius * (1 - cos(step / 2))
+        radius = max(radius_x, radius_y) * transform_scale
+        if radius <= self._curve_tolerance:
+            step = math.pi / 2
+        else:
+            step = 2 * math.acos(1 - self._curve_tolerance / radius)
+        segments = max(1, math.ceil(abs(sweep_angle) / step))
+
+        angles = start_angle + sweep_angle * np.linspace(0, 1, segments + 1)[1:]
+        ellipse_x = radius_x * np.cos(angles)
+        ellipse_y = radius_y * np.sin(angles)
+        points = np.vstack((cos * ellipse_x - sin * ellipse_y + center_x,
+                            sin * ellipse_x + cos * ellipse_y + center_y,
+                            np.ones(segments)))
+        points = (transform @ points)[:2].T
+        # the last point is exactly the end of the arc
+        points[-1] = (transform @ (end_x, end_y, 1))[:2]
+
+        return points.tolist()
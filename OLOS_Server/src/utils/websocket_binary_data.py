@@ -0,0 +1,132 @@
+import math
+import struct
+from core.constants import CoreConstants as constants
+
+'''
+Binary layout of the frequent websocket messages (machine status, job progress and camera frames)
+it is used only for the users that negotiated the binary subprotocol, the other users get the json messages
+
+all the numbers are little endian, a missing value is sent as NaN (float32) or -1 (int8) and decoded as null
+- machine status: message id (uint8), fields mask (uint16), then only the fields of the mask in this order:
+  state (state id uint8, sub state int8), machine position (3 float32), work position (3 float32),
+  work coordinate offset (3 float32), buffer state (2 float32), line number (float32),
+  feed and speed (2 float32), pins (length uint8 + ascii), overrides (3 float32),
+  accessories (length uint8 + ascii), machine tool (float32)
+- job progress: message id (uint8), line index, acknowledged index, total lines (uint32),
+  lines per second, eta, file timer (float32), executed lines number (uint32),
+  then the rest of the message is the executed lines (utf-8 joined by new lines)
+- camera frame: message id (uint8), frame id (uint32), width and height (uint16),
+  then the rest of the message is the jpeg frame (read from the shared frames ring)
+
+the other messages have no binary layout and are always sent as json
+'''
+
+
+class WebsocketBinaryData:
+    MACHINE_STATUS_MESSAGE_ID = 1
+    JOB_PROGRESS_MESSAGE_ID = 2
+    CAMERA_FRAME_MESSAGE_ID = 3
+
+    MACHINE_STATUS_HEADER_FORMAT = struct.Struct('<BH')
+    STATE_FORMAT = struct.Struct('<Bb')
+    FLOATS_FORMATS = {number: struct.Struct(f'<{number}f') for number in (1, 2, 3)}
+    JOB_PROGRESS_FORMAT = struct.Struct('<BIIIfffI')
+    CAMERA_FRAME_FORMAT = struct.Struct('<BIHH')
+
+    # the state id is the index of the state + 1, 0 for a missing state
+    MACHINE_STATES = ('Idle', 'Run', 'Hold', 'Jog', 'Alarm',
+                      'Door', 'Check', 'Home', 'Sleep')
+
+    # order of the status fields in the message, the bit of every field in the mask is its index
+    # (field, keys of the values inside the field or None for the text and single value fields)
+    MACHINE_STATUS_FIELDS = (
+        ('state', None),
+        ('machine_position', ('x', 'y', 'z')),
+        ('work_position', ('x', 'y', 'z')),
+        ('work_coordinate_offset', ('x', 'y', 'z')),
+        ('buffer_state', ('commands_queued', 'buffer_length')),
+        ('line_number', None),
+        ('feed_and_speed', ('feed_rate', 'speed')),
+        ('pins', None),
+        ('overrides', ('feed', 'rapids', 'spindle')),
+        ('accessories', None),
+        ('machine_tool', None),
+    )
+    TEXT_FIELDS = ('pins', 'accessories')
+
+    @classmethod
+    def encode(cls, type, data):
+        if type == constants.MACHINE_STATUS_DATA_TYPE:
+            return cls.encode_machine_status(data)
+        elif type == constants.JOB_EXECUTION_DATA_TYPE:
+            return cls.encode_job_progress(data)
+        elif type == constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE:
+            return cls.encode_camera_frame(data)
+        return None
+
+    @classmethod
+    def to_float(cls, value):
+        return math.nan if value is None else value
+
+    # the status message contains only the changed fields (or all of them for a snapshot)
+    @classmethod
+    def encode_machine_status(cls, status):
+        fields_mask = 0
+        values = []
+
+        for bit, (field, keys) in enumerate(cls.MACHINE_STATUS_FIELDS):
+            if field == 'state':
+                # the sub state is sent with the state
+                if 'state' not in status and 'sub_state' not in status:
+                    continue
+                state = status.get('state')
+                if state is not None and state not in cls.MACHINE_STATES:
+                    # unknown state, keep its name by sending the json message
+                    return None
+                sub_state = status.get('sub_state')
+                values.append(cls.STATE_FORMAT.pack(
+                    cls.MACHINE_STATES.index(state) + 1 if state else 0,
+                    -1 if sub_state is None else sub_state))
+
+            elif field not in status:
+                continue
+
+            elif field in cls.TEXT_FIELDS:
+                text = (status.get(field) or '').encode('ascii', errors='replace')
+                values.append(bytes((len(text),)) + text)
+
+            elif keys is None:
+                values.append(cls.FLOATS_FORMATS[1].pack(
+                    cls.to_float(status.get(field))))
+
+            else:
+                field_values = status.get(field) or {}
+                values.append(cls.FLOATS_FORMATS[len(keys)].pack(
+                    *(cls.to_float(field_values.get(key)) for key in keys)))
+
+            fields_mask |= 1 << bit
+
+        return cls.MACHINE_STATUS_HEADER_FORMAT.pack(cls.MACHINE_STATUS_MESSAGE_ID, fields_mask) + \
+            b''.join(values)
+
+    @classmethod
+    def encode_job_progress(cls, job_progress):
+        lines = job_progress.get('lines') or []
+
+        return cls.JOB_PROGRESS_FORMAT.pack(
+            cls.JOB_PROGRESS_MESSAGE_ID,
+            job_progress.get('line_index') or 0,
+            job_progress.get('acknowledged_index') or 0,
+            job_progress.get('total_lines') or 0,
+            cls.to_float(job_progress.get('lines_per_second')),
+            cls.to_float(job_progress.get('eta')),
+            cls.to_float(job_progress.get('file_timer')),
+            len(lines)) + '\n'.join(lines).encode('utf-8')
+
+    @classmethod
+    def encode_camera_frame(cls, camera_frame):
+        return cls.CAMERA_FRAME_FORMAT.pack(
+            cls.CAMERA_FRAME_MESSAGE_ID,
+            (camera_frame.get('frame_id') or 0) & 0xFFFFFFFF,
+            camera_frame.get('width') or 0,
+            camera_frame.get('height') or 0) + camera_frame.get('frame')
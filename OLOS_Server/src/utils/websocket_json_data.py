@@ -1,84 +1,61 @@
-import datetime
+import base64
 import json
-import re
+import time
 from core.constants import CoreConstants as constants
 
 
 class WebsocketJsonData:
+    # the time text is formatted only once per second
+    _time_second = None
+    _time_text = None
+
+    @classmethod
+    def get_time(cls):
+        now = int(time.time())
+        if now != cls._time_second:
+            cls._time_second = now
+            cls._time_text = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return cls._time_text
+
+    # messages are sent without indentation
+    @classmethod
+    def to_json(cls, data):
+        return json.dumps(data, separators=(',', ':'))
+
+    # the status is parsed once by GrblStatus, the same dictionary is encoded for every user
+    @classmethod
+    def parse_grbl_status(cls, grbl_status):
+        return grbl_status.to_dict(constants.MACHINE_STATUS_DATA_TYPE)
+
     @classmethod
-    def parse_grbl_status_to_json(cls, machine_status):
-        # Define regular expressions to extract values
-        state_pattern = re.compile(r'<(\w+)|')
-        machine_position_pattern = re.compile(
-            r'MPos:([-\d.]+),([-\d.]+),([-\d.]+)')
-        work_coordinate_offset_pattern = re.compile(
-            r'WCO:([-\d.]+),([-\d.]+),([-\d.]+)')
-        buffer_pattern = re.compile(r'Bf:(\d+),(\d+)')
-        feed_speed_pattern = re.compile(r'FS:(\d+),(\d+)')
-        override_pattern = re.compile(r'Ov:(\d+),(\d+),(\d+)')
-        machine_tool_pattern = re.compile(r'T:(\d+)')
-
-        # Extract values using regular expressions
-        state_match = state_pattern.search(machine_status)
-        machine_position_match = machine_position_pattern.search(
-            machine_status)
-        work_coordinate_offset_match = work_coordinate_offset_pattern.search(
-            machine_status)
-        buffer_match = buffer_pattern.search(machine_status)
-        feed_speed_match = feed_speed_pattern.search(machine_status)
-        override_match = override_pattern.search(machine_status)
-        machine_tool_match = machine_tool_pattern.search(machine_status)
-
-        # Create a dictionary with extracted values
-        status_dict = {
-            "type": constants.MACHINE_STATUS_DATA_TYPE,
-            "state": state_match.group(1) if state_match else None,
-            "machine_position": {
-                "x": float(machine_position_match.group(1)) if machine_position_match else None,
-                "y": float(machine_position_match.group(2)) if machine_position_match else None,
-                "z": float(machine_position_match.group(3)) if machine_position_match else None,
-            },
-            "work_coordinate_offset": {
-                "x": float(work_coordinate_offset_match.group(1)) if work_coordinate_offset_match else None,
-                "y": float(work_coordinate_offset_match.group(2)) if work_coordinate_offset_match else None,
-                "z": float(work_coordinate_offset_match.group(3)) if work_coordinate_offset_match else None,
-            },
-            "buffer_state": {
-                "commands_queued": float(buffer_match.group(1)) if buffer_match else None,
-                "buffer_length": float(buffer_match.group(2)) if buffer_match else None,
-            },
-            "feed_and_speed": {
-                "feed_rate": float(feed_speed_match.group(1)) if feed_speed_match else None,
-                "speed": float(feed_speed_match.group(2)) if feed_speed_match else None,
-            },
-            "overrides": {
-                "feed": float(override_match.group(1)) if override_match else None,
-                "rapids": float(override_match.group(2)) if override_match else None,
-                "spindle": float(override_match.group(3)) if override_match else None,
-            },
-            "machine_tool": float(machine_tool_match.group(1)) if machine_tool_match else None
-        }
-
-        return json.dumps(status_dict, indent=2)
+    def parse_grbl_status_to_json(cls, grbl_status):
+        return cls.to_json(cls.parse_grbl_status(grbl_status))
 
     @classmethod
     def parse_serial_command_to_json(cls, command):
         dict = {"type": constants.SERIAL_COMMAND_DATA_TYPE,
                 "text": command,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                "time": cls.get_time()}
 
-        return json.dumps(dict, indent=2)
+        return cls.to_json(dict)
 
+    # one coalesced progress event for all the lines executed since the last event
     @classmethod
-    def parse_job_execution_command_to_json(cls, command, line_index, total_lines, file_timer):
-        dict = {"type": constants.JOB_EXECUTION_DATA_TYPE,
-                "text": command,
-                "line_index": line_index,
-                "total_lines": total_lines,
+    def parse_job_progress(cls, job_progress, file_timer):
+        return {"type": constants.JOB_EXECUTION_DATA_TYPE,
+                "lines": job_progress.get('lines'),
+                "line_index": job_progress.get('line_index'),
+                "acknowledged_index": job_progress.get('acknowledged_index'),
+                "total_lines": job_progress.get('total_lines'),
+                "lines_per_second": job_progress.get('lines_per_second'),
+                "eta": job_progress.get('eta'),
                 "file_timer": file_timer,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                "time": cls.get_time()}
 
-        return json.dumps(dict, indent=2)
+    @classmethod
+    def parse_job_progress_to_json(cls, job_progress, file_timer):
+        return cls.to_json(cls.parse_job_progress(job_progress, file_timer))
 
     @classmethod
     def parse_file_manager_message_to_json(cls, opened_filename, file_content, files_list):
@@ -86,25 +63,37 @@ class WebsocketJsonData:
                 "opened_file": opened_filename,
                 "file_content": file_content,
                 "files_list": files_list,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                "time": cls.get_time()}
 
-        return json.dumps(dict, indent=2)
+        return cls.to_json(dict)
 
     @classmethod
     def parse_connection_status_to_json(cls, success):
         dict = {"type": constants.MACHINE_CONNECTION_DATA_TYPE,
                 "success": success,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                "time": cls.get_time()}
+
+        return cls.to_json(dict)
+
+    @classmethod
+    def parse_streaming_statistics_to_json(cls, streaming_statistics):
+        dict = {"type": constants.STREAMING_STATISTICS_DATA_TYPE,
+                **streaming_statistics,
+                "time": cls.get_time()}
 
-        return json.dumps(dict, indent=2)
+        return cls.to_json(dict)
 
+    # the users without the binary subprotocol get the jpeg frame as base64 text
     @classmethod
-    def parse_cameras_frame_to_json(cls, frameStr):
+    def parse_cameras_frame_to_json(cls, camera_frame):
         dict = {"type": constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE,
-                "frame": frameStr,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                "frame": base64.b64encode(camera_frame.get('frame')).decode('ascii'),
+                "frame_id": camera_frame.get('frame_id'),
+                "width": camera_frame.get('width'),
+                "height": camera_frame.get('height'),
+                "time": cls.get_time()}
 
-        return json.dumps(dict, indent=2)
+        return cls.to_json(dict)
 
     @classmethod
     def parse_usb_storage_monitor_data_to_json(cls, device_name, job_files_data, image_files_data, is_connected):
@@ -113,5 +102,5 @@ class WebsocketJsonData:
                 "job_files_data": job_files_data,
                 "image_files_data": image_files_data,
                 "is_connected": is_connected,
-                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-        return json.dumps(dict, indent=2)
+                "time": cls.get_time()}
+        return cls.to_json(dict)
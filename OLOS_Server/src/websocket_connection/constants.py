@@ -1,9 +1,26 @@
 class WebsocketConstants:
     TIMEOUT = 0.01  # 5 ms
+    # max time to wait for a new message in the write queue
+    QUEUE_WAIT_TIMEOUT = 0.5
 
     # priority constants for the priority queue
     HIGH_PRIORITY_COMMAND = 1
     MIDDLE_PRIORITY_COMMAND = 2
     LOW_PRIORITY_COMMAND = 3
 
+    # sent to the core when a new user connects
+    USER_CONNECTED_DATA_TYPE = 'USER_CONNECTED'
+    # metadata of the camera frames sent by the core, the frames content is in the shared frames ring
+    CAMERAS_SYSTEM_STREAM_DATA_TYPE = 'CAMERAS_STREAM'
+    # quality levels of the cameras stream watched by the users, sent to the core for the cameras system
+    CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE = 'CAMERAS_STREAM_SUBSCRIPTION'
+    # a snapshot not delivered after this time (overwritten in the frames ring) is asked again (seconds)
+    CAMERAS_SNAPSHOT_RETRY_TIMEOUT = 2
+
     MAX_FRAME_SIZE = 1024 * 1024 * 500  # 500MB
+
+    # encodings negotiated with every user through the websocket subprotocol
+    # the users without a subprotocol get the json messages
+    BINARY_SUBPROTOCOL = 'olos.binary.v1'
+    JSON_SUBPROTOCOL = 'olos.json'
+    SUBPROTOCOLS = [BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL]
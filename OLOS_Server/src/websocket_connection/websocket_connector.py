@@ -1,8 +1,14 @@
 import asyncio
 import json
+import queue
+import time
 import websockets
 from multiprocessing import Process
 from .constants import WebsocketConstants as constants
+from utils.camera_streaming_controller import CameraStreamingController
+from utils.configuration_loader import ConfigurationLoader
+from utils.websocket_binary_data import WebsocketBinaryData
+from utils.websocket_json_data import WebsocketJsonData
 import os
 from dotenv import load_dotenv
 import sys
@@ -12,17 +18,27 @@ load_dotenv()
 
 
 class WebSocketConnector(Process):
-    def __init__(self, websocket_server_data):
+    def __init__(self, websocket_server_data, cameras_frames_ring=None):
         super(WebSocketConnector, self).__init__()
         self._websocket_connections = set()
         self._is_connected = False
 
         # shared objects with the core
         self.websocket_server_data = websocket_server_data
+        # the core sends only the metadata of the camera frames, their content is read from the ring
+        self._cameras_frames_ring = cameras_frames_ring
 
-        # Lockers to make sure not to allow opening multiple connections during refresh
-        self._recv_lock = asyncio.Lock()
-        self._send_lock = asyncio.Lock()
+        # quality level of the cameras stream watched by every user (None = the user does not watch it),
+        # quality of the snapshots asked by the users and the quality levels last sent to the cameras system
+        self._cameras_qualities = {}
+        self._cameras_snapshots = {}
+        self._cameras_subscription = None
+        self._cameras_snapshot_request_time = 0
+        self._cameras_streaming_controller = CameraStreamingController(
+            ConfigurationLoader.from_yaml().get_dict('cameras_connection.streaming_settings'))
+
+        # set while at least one user is connected, the server messages wait for it
+        self._users_connected_event = None
 
         # Register signal handler for graceful termination
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -47,6 +63,7 @@ class WebSocketConnector(Process):
                 os.getenv("HOST"),
                 os.getenv("WEBSOCKET_PORT"),
                 max_size=constants.MAX_FRAME_SIZE,
+                subprotocols=constants.SUBPROTOCOLS,
                 ping_interval=None
             )
 
@@ -57,8 +74,14 @@ class WebSocketConnector(Process):
                 print('Websocket connection started')
 
             self._is_connected = True
+
+            # send the server messages to the users as soon as they arrive
+            self._users_connected_event = asyncio.Event()
+            send_task = asyncio.create_task(self.send_data_to_users())
+
             # keep the event loop running
             await server.wait_closed()
+            send_task.cancel()
 
         # error the port is busy
         except OSError as e:
@@ -71,30 +94,37 @@ class WebSocketConnector(Process):
 
     async def handle_client(self, websocket, path):
         self._websocket_connections.add(websocket)
+        self._users_connected_event.set()
+        # the user watches the default quality until it asks another quality level
+        self._cameras_qualities[websocket] = self._cameras_streaming_controller.get_default_quality()
+        self.send_cameras_subscription()
+
+        if os.getenv("ENV") == "development":
+            print("Websocket user connected with the subprotocol:",
+                  websocket.subprotocol)
+
+        # the core sends the full machine status to the new user
+        self.add_to_websocket_read_queue(constants.USER_CONNECTED_DATA_TYPE,
+                                         constants.HIGH_PRIORITY_COMMAND,
+                                         {})
         try:
-            while True:
-                send_task = asyncio.create_task(self.send_data_to_users())
-                recv_task = asyncio.create_task(self.receive_data_from_users())
+            # wait for the messages of the user, the loop ends when the user closes the connection
+            async for json_data in websocket:
+                self.analyze_user_message(json_data, websocket)
 
-                # Ensure that receiving is prioritized by awaiting recv_task first
-                await recv_task
-                await send_task
+            print("WebSocket connection closed by the client")
 
-                # Delay to not consume the CPU
-                if not self.websocket_server_data.is_job_execute_process:
-                    await asyncio.sleep(constants.TIMEOUT)
+        except websockets.exceptions.ConnectionClosedError:
+            print("WebSocket connection closed unexpectedly")
 
-        except websockets.exceptions.ConnectionClosedOK:
-            print("WebSocket connection closed by the client")
+        finally:
             self._websocket_connections.discard(
                 websocket)  # Remove closed connection
             if not self._websocket_connections:  # Check if there are no connections left
-                self._is_connected = False
-
-        except websockets.exceptions.ConnectionClosedError:
-            print("WebSocket connection closed unexpectedly")
-            self._websocket_connections = set()
-            self._is_connected = False
+                self._users_connected_event.clear()
+            self._cameras_qualities.pop(websocket, None)
+            self._cameras_snapshots.pop(websocket, None)
+            self.send_cameras_subscription()
 
     # add new command to the websocket read queue
     def add_to_websocket_read_queue(self, type, priority, command):
@@ -108,22 +138,130 @@ class WebSocketConnector(Process):
 
     # Handle data that the server wants to send to the user
     async def send_data_to_users(self):
-        async with self._send_lock:
-            if (not self.websocket_server_data.websocket_write_queue.empty() and
-                    self._websocket_connections):
-                type, data = self.websocket_server_data.websocket_write_queue.get()
-
-                await asyncio.gather(*(ws_connection.send(data) for ws_connection in self._websocket_connections))
+        loop = asyncio.get_running_loop()
+        while True:
+            # keep the messages inside the queue until a user is connected
+            await self._users_connected_event.wait()
+
+            # wait for the next message in a separate thread to not block the event loop
+            message = await loop.run_in_executor(None, self.get_from_websocket_write_queue)
+            self.check_cameras_snapshots()
+
+            if message is not None and self._websocket_connections:
+                type, data = message
+                websocket_connections = self._websocket_connections
+                # the camera frame is copied once from the shared memory for all the users
+                # and sent only to the users watching its quality level
+                if type == constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE:
+                    data = self.read_camera_frame(data)
+                    if data is None:
+                        continue
+                    websocket_connections = self.get_camera_frame_users(data.get('quality'))
+
+                encoded_messages = {}
+                await asyncio.gather(*(ws_connection.send(self.encode_message(type, data, ws_connection.subprotocol, encoded_messages))
+                                       for ws_connection in websocket_connections),
+                                     return_exceptions=True)
+
+    def get_from_websocket_write_queue(self):
+        try:
+            return self.websocket_server_data.websocket_write_queue.get(
+                timeout=constants.QUEUE_WAIT_TIMEOUT)
+        except queue.Empty:
+            return None
+
+    # the frame with its content, None incase a newer frame is available or the frame is overwritten
+    # (the users get the latest frame without waiting for the old frames), the frames encoded for the
+    # quality levels of the same camera frame are a group written together, an asked snapshot
+    # is read even if a newer frame is available because the newer frames may not carry it
+    def read_camera_frame(self, frame_metadata):
+        if self._cameras_frames_ring is None:
+            return None
+
+        group_frame_id = frame_metadata.get('group_frame_id', frame_metadata.get('frame_id'))
+        if (self._cameras_frames_ring.get_latest_frame_id() > group_frame_id and
+                frame_metadata.get('quality') not in self._cameras_snapshots.values()):
+            return None
+
+        frame_content = self._cameras_frames_ring.read(frame_metadata.get('frame_id'))
+        if frame_content is None:
+            return None
+        return {**frame_metadata, 'frame': frame_content}
+
+    # users watching the quality level of the frame, the users waiting for this snapshot get it once
+    def get_camera_frame_users(self, quality):
+        if quality is None:
+            return set()
+
+        snapshot_users = {websocket for websocket, snapshot_quality in self._cameras_snapshots.items()
+                          if snapshot_quality == quality}
+        if snapshot_users:
+            for websocket in snapshot_users:
+                del self._cameras_snapshots[websocket]
+            self.send_cameras_subscription()
+
+        return snapshot_users | {websocket for websocket, user_quality in self._cameras_qualities.items()
+                                 if user_quality == quality}
+
+    '''
+    the user asks a quality level of the cameras stream ({"quality": "thumbnail"}, "off" to stop watching it),
+    a snapshot quality level is one frame sent only to the user
+    '''
+    def update_cameras_stream_quality(self, websocket, data):
+        quality = (data or {}).get('quality') if isinstance(data, dict) else data
+        if self._cameras_streaming_controller.is_snapshot_quality(quality):
+            self._cameras_snapshots[websocket] = quality
+            # the cameras system encodes one snapshot for every request
+            self.send_cameras_subscription(is_snapshot_requested=True)
+            return
+
+        self._cameras_qualities[websocket] = (quality if self._cameras_streaming_controller.is_quality_level(quality)
+                                              else None)
+        self.send_cameras_subscription()
+
+    # the core forwards the quality levels watched by the users to the cameras system when they change
+    def send_cameras_subscription(self, is_snapshot_requested=False):
+        qualities = sorted({quality for quality in self._cameras_qualities.values() if quality} |
+                           set(self._cameras_snapshots.values()))
+        if qualities == self._cameras_subscription and not is_snapshot_requested:
+            return
+
+        self._cameras_subscription = qualities
+        if is_snapshot_requested:
+            self._cameras_snapshot_request_time = time.monotonic()
+        self.add_to_websocket_read_queue(constants.CAMERAS_STREAM_SUBSCRIPTION_DATA_TYPE,
+                                         constants.HIGH_PRIORITY_COMMAND,
+                                         {'qualities': qualities})
+
+    # the asked snapshots are asked again until they are delivered (the snapshot frame can be overwritten
+    # in the frames ring before it is read)
+    def check_cameras_snapshots(self):
+        if (self._cameras_snapshots and
+                time.monotonic() - self._cameras_snapshot_request_time > constants.CAMERAS_SNAPSHOT_RETRY_TIMEOUT):
+            self.send_cameras_subscription(is_snapshot_requested=True)
+
+    # the core sends the frequent messages as dictionaries and the other messages as json text
+    # a dictionary is encoded once for every subprotocol used by the connected users
+    def encode_message(self, type, data, subprotocol, encoded_messages):
+        if not isinstance(data, dict):
+            return data
+
+        if subprotocol not in encoded_messages:
+            message = None
+            if subprotocol == constants.BINARY_SUBPROTOCOL:
+                message = WebsocketBinaryData.encode(type, data)
+            # no binary layout for this message
+            if message is None and type == constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE:
+                message = WebsocketJsonData.parse_cameras_frame_to_json(data)
+            elif message is None:
+                message = WebsocketJsonData.to_json(data)
+            encoded_messages[subprotocol] = message
+
+        return encoded_messages[subprotocol]
 
     # Handle sent data from the user
-    async def receive_data_from_users(self):
-        async with self._recv_lock:
-            if len(self._websocket_connections):
-                await asyncio.gather(*(self.analyze_user_message(ws_connection) for ws_connection in self._websocket_connections))
-
-    async def analyze_user_message(self, ws_connection):
+    def analyze_user_message(self, json_data, websocket=None):
         try:
-            json_data = await asyncio.wait_for(ws_connection.recv(), timeout=constants.TIMEOUT)
             if json_data:
                 data_dict = json.loads(json_data)
                 type = data_dict.get('type')
@@ -132,16 +270,15 @@ class WebSocketConnector(Process):
                 if os.getenv("ENV") == 'development':
                     print("Data received from user: ", data_dict)
 
+                # the quality level of the cameras stream is handled for every user
+                if type == constants.CAMERAS_SYSTEM_STREAM_DATA_TYPE:
+                    self.update_cameras_stream_quality(websocket, data)
+                    return
+
                 self.add_to_websocket_read_queue(type,
                                                  constants.HIGH_PRIORITY_COMMAND,
                                                  data)
 
-        except asyncio.TimeoutError:
-            pass  # Continue the loop if no data received within the timeout
-
-        except websockets.exceptions.ConnectionClosed:
-            pass  # ignore closing connection errors
-
         except Exception as error:
             print(f'An error occurred: {error}')
 
@@ -0,0 +1,118 @@
+import os
+import sys
+
+# add the server source code to the path to import the utils modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'src'))
+
+from core.constants import CoreConstants as constants  # noqa: E402
+from utils.gcode_modal_state import GcodeModalState  # noqa: E402
+from utils.job_checkpoint import JobCheckpoint  # noqa: E402
+
+# laser engraving of a circle made of two arcs, the second arc continues the G2 block without its motion word
+ARC_JOB_LINES = [
+    'G21 G90 G17',
+    'M3 S800',
+    'G0 X0 Y0',
+    'G2 X10 Y0 I5 J0 F600',
+    '(second half of the circle)',
+    'X0 Y0 I-5 J0',
+    'G0 X20 Y20',
+    'M5',
+]
+
+
+def write_job_file(directory, lines):
+    file_path = os.path.join(str(directory), 'arc_job.nc')
+    with open(file_path, 'w', newline='') as job_file:
+        job_file.write('\n'.join(lines))
+    return file_path
+
+
+def get_modal_state(lines):
+    modal_state = GcodeModalState()
+    for line in lines:
+        modal_state.update(line)
+    return modal_state
+
+
+def test_preamble_restores_the_arc_motion_with_the_resumed_line():
+    modal_state = get_modal_state(ARC_JOB_LINES[:5])
+    preamble = modal_state.get_preamble(constants.GRBL_COMMAND_SAFE_Z, ARC_JOB_LINES[5])
+
+    assert modal_state.motion == 'G2'
+    # the machine moves to the end of the first arc before the laser is turned on
+    assert preamble.index('G0 X10 Y0') < preamble.index('M3 S800')
+    assert 'F600' in preamble
+    # GRBL rejects G2 without axis words, the arc motion word is written with the resumed line
+    assert 'G2' not in preamble
+    assert preamble[-1] == 'G2 X0 Y0 I-5 J0'
+
+
+def test_preamble_keeps_the_resumed_line_with_its_own_motion_word():
+    modal_state = get_modal_state(ARC_JOB_LINES[:3])
+    preamble = modal_state.get_preamble(constants.GRBL_COMMAND_SAFE_Z, ARC_JOB_LINES[3])
+
+    assert preamble[-1] == 'G0'
+    assert modal_state.get_arc_motion_line(ARC_JOB_LINES[3]) is None
+
+
+def test_preamble_restores_the_linear_motion_without_the_resumed_line():
+    modal_state = get_modal_state(['G21 G90', 'M3 S500', 'G1 X5 Y5 F1200'])
+    preamble = modal_state.get_preamble(constants.GRBL_COMMAND_SAFE_Z, 'X10 Y5')
+
+    assert preamble[-1] == 'G1 F1200'
+    assert modal_state.get_arc_motion_line('X10 Y5') is None
+
+
+def test_resume_inside_an_arc_block_streams_after_the_resumed_line(tmp_path):
+    file_path = write_job_file(tmp_path, ARC_JOB_LINES)
+
+    # resume from the comment line before the arc continuation
+    resume_data = JobCheckpoint.get_resume_data(file_path, 5)
+
+    assert resume_data['start_line'] == 5
+    assert resume_data['preamble'][-1] == 'G2 X0 Y0 I-5 J0'
+    assert resume_data['stream_start_line'] == 7
+    assert resume_data['modal_state'].position == {'x': 10, 'y': 0, 'z': None}
+
+
+def test_resume_outside_an_arc_block_streams_from_the_start_line(tmp_path):
+    file_path = write_job_file(tmp_path, ARC_JOB_LINES)
+
+    # the resumed line has its own motion word, only the feed rate of the arc is restored
+    resume_data = JobCheckpoint.get_resume_data(file_path, 7)
+
+    assert resume_data['preamble'][-1] == 'F600'
+    assert resume_data['stream_start_line'] == 7
+
+
+def test_checkpoint_is_saved_before_the_first_rejected_line(tmp_path):
+    lines = ['G21 G90', 'M3 S500'] + ['G1 X%d Y0 F1200' % index for index in range(60)]
+    file_path = write_job_file(tmp_path, lines)
+    error_line = 40
+
+    job_checkpoint = JobCheckpoint()
+    job_checkpoint.start(file_path)
+    job_checkpoint.update(len(lines), 10)
+    job_checkpoint.save()
+    # all the lines are acknowledged but the controller rejected one of them
+    job_checkpoint.finish(True, len(lines), error_line)
+
+    checkpoint = JobCheckpoint.load(file_path)
+    assert checkpoint['acknowledged_line'] == error_line - 1
+    assert checkpoint['line'] == error_line - 1 - constants.GRBL_PLANNER_BUFFER_LINES
+    assert checkpoint['modal_state'] == \
+        get_modal_state(lines[:checkpoint['line']]).to_dict()
+
+
+def test_checkpoint_is_deleted_when_the_job_is_completed(tmp_path):
+    file_path = write_job_file(tmp_path, ARC_JOB_LINES)
+
+    job_checkpoint = JobCheckpoint()
+    job_checkpoint.start(file_path)
+    job_checkpoint.update(len(ARC_JOB_LINES), 10)
+    job_checkpoint.save()
+    job_checkpoint.finish(True, len(ARC_JOB_LINES))
+
+    assert JobCheckpoint.load(file_path) is None